@@ -13,6 +13,8 @@ from .models import (
     AnalyticsExport,
     AnalyticsInsight,
     UserAnalyticsProfile,
+    DailyUserFacts,
+    ForecastModel,
 )
 
 
@@ -116,3 +118,19 @@ class UserAnalyticsProfileAdmin(admin.ModelAdmin):
     list_display = ['user', 'total_data_points', 'current_streak_days', 'total_badges_earned', 'calculated_at']
     search_fields = ['user__email']
     readonly_fields = ['calculated_at']
+
+
+@admin.register(DailyUserFacts)
+class DailyUserFactsAdmin(admin.ModelAdmin):
+    list_display = ['user', 'date', 'mood_avg', 'sleep_minutes', 'tasks_completed', 'habit_completions', 'focus_minutes']
+    list_filter = ['date']
+    search_fields = ['user__email']
+    readonly_fields = ['updated_at']
+
+
+@admin.register(ForecastModel)
+class ForecastModelAdmin(admin.ModelAdmin):
+    list_display = ['user', 'module', 'metric_name', 'method', 'last_date', 'observations', 'backtest_wape', 'backtested_at']
+    list_filter = ['module', 'method']
+    search_fields = ['user__email']
+    readonly_fields = ['id', 'fitted_at', 'updated_at']
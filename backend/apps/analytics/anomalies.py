@@ -0,0 +1,210 @@
+"""Incremental anomaly scanning over the daily fact table.
+
+Each (user, module, metric) keeps an ``AnomalyBaseline`` with Welford running
+mean/variance, per-weekday running statistics and a short window of recent
+values. A scan reads only the facts after the baseline's watermark, scores
+every day against the baseline as it stood before that day and persists all
+flagged days in one ``bulk_create``.
+
+Facts can still change after the day has passed (an entry logged late), so
+the last ``LOOKBACK_DAYS`` are re-scored on every scan and only folded into
+the baseline, moving the watermark, once they are older than that.
+"""
+import math
+from datetime import timedelta
+from decimal import Decimal
+from statistics import median
+
+from django.utils import timezone
+
+from .models import AnomalyBaseline, AnomalyDetection, DailyUserFacts
+
+RECENT_WINDOW = 60
+LOOKBACK_DAYS = 7
+MIN_SAMPLES = 7
+MIN_WEEKDAY_SAMPLES = 4
+
+# Score thresholds per baseline method
+THRESHOLDS = {
+    'zscore': 2.0,
+    'weekday': 2.0,
+    'mad': 3.5,
+}
+METHODS = list(THRESHOLDS)
+
+
+def _mood_anomaly(value, expected, score):
+    high = score > 0
+    return {
+        'anomaly_type': 'spike' if high else 'drop',
+        'title': f"Unusual {'High' if high else 'Low'} Mood",
+        'description': f"Your mood rating was {value:.1f}, which is unusual compared to your average of {expected:.1f}.",
+    }
+
+
+def _sleep_anomaly(value, expected, score):
+    return {
+        'anomaly_type': 'outlier',
+        'title': "Unusual Sleep Duration",
+        'description': f"You slept {value / 60:.1f} hours, which differs from your average of {expected / 60:.1f} hours.",
+    }
+
+
+def _task_anomaly(value, expected, score):
+    return {
+        'anomaly_type': 'spike',
+        'title': 'High Productivity Day',
+        'description': f"You completed {int(value)} tasks, which is above your average of {expected:.1f}.",
+    }
+
+
+# (module, metric name, facts column, only flag high values, default severity, describe)
+ANOMALY_METRICS = [
+    ('mood', 'mood_rating', 'mood_avg', False, 'medium', _mood_anomaly),
+    ('sleep', 'sleep_duration', 'sleep_minutes', False, 'medium', _sleep_anomaly),
+    ('tasks', 'tasks_completed', 'tasks_completed', True, 'low', _task_anomaly),
+]
+
+
+def _welford(count, mean, m2, value):
+    count += 1
+    delta = value - mean
+    mean += delta / count
+    m2 += delta * (value - mean)
+    return count, mean, m2
+
+
+def _std(count, m2):
+    return math.sqrt(m2 / (count - 1)) if count > 1 else 0.0
+
+
+def _expected_and_score(baseline, value, weekday, method):
+    """Baseline expectation and anomaly score for a value, or None when not scorable"""
+    if method == 'mad':
+        window = baseline.recent_values
+        if len(window) < MIN_SAMPLES:
+            return None
+        center = median(window)
+        mad = median(abs(v - center) for v in window)
+        if mad == 0:
+            return None
+        return center, 0.6745 * (value - center) / mad, mad
+
+    if method == 'weekday':
+        count, mean, m2 = baseline.weekday_stats[weekday]
+        if count < MIN_WEEKDAY_SAMPLES:
+            return None
+    else:
+        count, mean, m2 = baseline.count, baseline.mean, baseline.m2
+        if count < MIN_SAMPLES:
+            return None
+
+    std = _std(count, m2)
+    if std == 0:
+        return None
+    return mean, (value - mean) / std, std
+
+
+def _observe(baseline, value, weekday):
+    baseline.count, baseline.mean, baseline.m2 = _welford(baseline.count, baseline.mean, baseline.m2, value)
+    baseline.weekday_stats[weekday] = list(_welford(*baseline.weekday_stats[weekday], value))
+    baseline.recent_values = (baseline.recent_values + [value])[-RECENT_WINDOW:]
+
+
+def _decimal(value):
+    return Decimal(str(round(value, 4)))
+
+
+def scan_user_anomalies(user_id, method='zscore', seed_days=30, end_date=None):
+    """Score a user's facts since the watermark and persist new anomalies.
+
+    Only complete days (up to yesterday by default) are scored. A metric that
+    has never been scanned seeds its baseline from the last ``seed_days``.
+    Returns the number of anomalies flagged, not counting days flagged before.
+    """
+    threshold = THRESHOLDS[method]
+    end_date = end_date or timezone.now().date() - timedelta(days=1)
+    settled = end_date - timedelta(days=LOOKBACK_DAYS)
+
+    baselines = {
+        (b.module, b.metric_name): b
+        for b in AnomalyBaseline.objects.filter(user_id=user_id)
+    }
+    for module, metric_name, *_ in ANOMALY_METRICS:
+        if (module, metric_name) not in baselines:
+            baselines[(module, metric_name)] = AnomalyBaseline(
+                user_id=user_id,
+                module=module,
+                metric_name=metric_name,
+                weekday_stats=[[0, 0.0, 0.0] for _ in range(7)],
+                watermark=end_date - timedelta(days=seed_days + 1),
+            )
+
+    start_date = min(b.watermark for b in baselines.values()) + timedelta(days=1)
+    if start_date > end_date:
+        return 0
+
+    facts = DailyUserFacts.objects.filter(
+        user_id=user_id,
+        date__gte=start_date,
+        date__lte=end_date
+    ).order_by('date')
+    flagged_before = set(
+        AnomalyDetection.objects.filter(
+            user_id=user_id,
+            detected_date__gte=start_date,
+            detected_date__lte=end_date
+        ).values_list('module', 'metric_name', 'detected_date')
+    )
+
+    anomalies = []
+    for fact in facts:
+        weekday = fact.date.weekday()
+        for module, metric_name, column, high_only, severity, describe in ANOMALY_METRICS:
+            baseline = baselines[(module, metric_name)]
+            value = getattr(fact, column)
+            # Zero is a real value; only days without data are skipped
+            if fact.date <= baseline.watermark or value is None:
+                continue
+            value = float(value)
+
+            scored = None
+            if (module, metric_name, fact.date) not in flagged_before:
+                scored = _expected_and_score(baseline, value, weekday, method)
+            if scored:
+                expected, score, spread = scored
+                flagged = score > threshold if high_only else abs(score) > threshold
+                if flagged:
+                    anomalies.append(AnomalyDetection(
+                        user_id=user_id,
+                        module=module,
+                        metric_name=metric_name,
+                        severity='high' if abs(score) > threshold * 1.5 else severity,
+                        detected_date=fact.date,
+                        expected_value=_decimal(expected),
+                        actual_value=_decimal(value),
+                        deviation_percentage=_decimal((value - expected) / expected * 100) if expected else None,
+                        baseline_average=_decimal(expected),
+                        baseline_std_dev=_decimal(spread),
+                        possible_causes=[f'{method} score {score:.2f}'],
+                        **describe(value, expected, score),
+                    ))
+            if fact.date <= settled:
+                _observe(baseline, value, weekday)
+
+    now = timezone.now()
+    for baseline in baselines.values():
+        baseline.watermark = max(baseline.watermark, settled)
+        # bulk_update writes the in-memory value; auto_now only applies on save()
+        baseline.updated_at = now
+
+    AnomalyDetection.objects.bulk_create(anomalies, ignore_conflicts=True)
+
+    new = [b for b in baselines.values() if b.pk is None]
+    existing = [b for b in baselines.values() if b.pk is not None]
+    AnomalyBaseline.objects.bulk_create(new, ignore_conflicts=True)
+    AnomalyBaseline.objects.bulk_update(
+        existing,
+        ['count', 'mean', 'm2', 'weekday_stats', 'recent_values', 'watermark', 'updated_at'],
+    )
+    return len(anomalies)
@@ -0,0 +1,348 @@
+"""Daily cross-module fact table maintenance and reads.
+
+``DailyUserFacts`` keeps one row per user per day so analytics endpoints can
+read a contiguous slice with a single indexed range scan instead of
+re-querying every source module. Rows are refreshed per module from grouped
+aggregates: signals refresh the days touched by a write and the
+``rebuild_daily_facts`` command refreshes whole ranges in chunks.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.db.models import Avg, Count, DecimalField, ExpressionWrapper, F, Max, Min, Sum, Value
+from django.db.models.functions import Greatest, TruncDate
+from django.utils import timezone
+
+from .models import AnalyticsDataVersion, DailyUserFacts, UserAnalyticsProfile
+
+
+def as_date(value):
+    """Normalize a date/datetime field value to a date"""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value)
+        return value.date()
+    return value
+
+
+def _collect_mood(user_id, start_date, end_date):
+    from apps.mood.models import MoodEntry
+    rows = MoodEntry.objects.filter(
+        user_id=user_id,
+        entry_date__gte=start_date,
+        entry_date__lte=end_date
+    ).values('entry_date').annotate(
+        avg=Avg('mood_value'),
+        low=Min('mood_value'),
+        high=Max('mood_value'),
+        count=Count('id')
+    )
+    return {
+        row['entry_date']: {
+            'mood_avg': Decimal(str(round(row['avg'], 2))),
+            'mood_min': row['low'],
+            'mood_max': row['high'],
+            'mood_entries': row['count'],
+        }
+        for row in rows
+    }
+
+
+def _collect_sleep(user_id, start_date, end_date):
+    from apps.health.models import SleepLog
+    rows = SleepLog.objects.filter(
+        user_id=user_id,
+        date__gte=start_date,
+        date__lte=end_date
+    ).values('date').annotate(
+        minutes=Sum('duration_minutes'),
+        quality=Avg('quality')
+    )
+    return {
+        row['date']: {
+            'sleep_minutes': row['minutes'],
+            'sleep_quality': Decimal(str(round(row['quality'], 2))) if row['quality'] is not None else None,
+        }
+        for row in rows
+    }
+
+
+def _collect_tasks(user_id, start_date, end_date):
+    from apps.tasks.models import Task
+    data = defaultdict(dict)
+    created = Task.objects.filter(
+        user_id=user_id,
+        created_at__date__gte=start_date,
+        created_at__date__lte=end_date
+    ).annotate(day=TruncDate('created_at')).values('day').annotate(count=Count('id'))
+    for row in created:
+        data[row['day']]['tasks_created'] = row['count']
+
+    completed = Task.objects.filter(
+        user_id=user_id,
+        status='completed',
+        completed_at__date__gte=start_date,
+        completed_at__date__lte=end_date
+    ).annotate(day=TruncDate('completed_at')).values('day').annotate(count=Count('id'))
+    for row in completed:
+        data[row['day']]['tasks_completed'] = row['count']
+    return data
+
+
+def _collect_habits(user_id, start_date, end_date):
+    from apps.habits.models import Habit, HabitCompletion
+    data = defaultdict(dict)
+    completions = HabitCompletion.objects.filter(
+        habit__user_id=user_id,
+        date__gte=start_date,
+        date__lte=end_date,
+        completed=True
+    ).values('date').annotate(count=Count('id'))
+    for row in completions:
+        data[row['date']]['habit_completions'] = row['count']
+
+    habits = list(Habit.objects.filter(user_id=user_id, is_archived=False))
+    if habits:
+        day = start_date
+        while day <= end_date:
+            due = sum(
+                1 for habit in habits
+                if habit.created_at.date() <= day and habit.is_due_on_date(day)
+            )
+            if due:
+                data[day]['habits_due'] = due
+            day += timedelta(days=1)
+    return data
+
+
+def _collect_focus(user_id, start_date, end_date):
+    from apps.pomodoro.models import PomodoroSession
+    rows = PomodoroSession.objects.filter(
+        user_id=user_id,
+        session_type='work',
+        completed=True,
+        started_at__date__gte=start_date,
+        started_at__date__lte=end_date
+    ).annotate(day=TruncDate('started_at')).values('day').annotate(minutes=Sum('duration'))
+    return {row['day']: {'focus_minutes': row['minutes'] or 0} for row in rows}
+
+
+def _collect_exercise(user_id, start_date, end_date):
+    from apps.health.models import WorkoutLog
+    rows = WorkoutLog.objects.filter(
+        user_id=user_id,
+        date__gte=start_date,
+        date__lte=end_date
+    ).values('date').annotate(minutes=Sum('duration_minutes'))
+    return {row['date']: {'exercise_minutes': row['minutes'] or 0} for row in rows}
+
+
+def _collect_journal(user_id, start_date, end_date):
+    from apps.journal.models import JournalEntry
+    rows = JournalEntry.objects.filter(
+        user_id=user_id,
+        entry_date__gte=start_date,
+        entry_date__lte=end_date
+    ).values('entry_date').annotate(words=Sum('word_count'))
+    return {row['entry_date']: {'journal_words': row['words'] or 0} for row in rows}
+
+
+def _collect_finance(user_id, start_date, end_date):
+    from apps.finance.models import Transaction
+    rows = Transaction.objects.filter(
+        user_id=user_id,
+        type='expense',
+        date__date__gte=start_date,
+        date__date__lte=end_date
+    ).annotate(day=TruncDate('date')).values('day').annotate(total=Sum('amount'))
+    return {row['day']: {'spending': row['total'] or Decimal('0.00')} for row in rows}
+
+
+def _collect_water(user_id, start_date, end_date):
+    from apps.health.models import WaterLog
+    rows = WaterLog.objects.filter(
+        user_id=user_id,
+        date__gte=start_date,
+        date__lte=end_date
+    ).values('date').annotate(total=Sum('amount_ml'))
+    return {row['date']: {'water_ml': row['total'] or 0} for row in rows}
+
+
+# module -> (collector, column defaults used when the module has no data that day)
+FACT_MODULES = {
+    'mood': (_collect_mood, {'mood_avg': None, 'mood_min': None, 'mood_max': None, 'mood_entries': 0}),
+    'sleep': (_collect_sleep, {'sleep_minutes': None, 'sleep_quality': None}),
+    'tasks': (_collect_tasks, {'tasks_created': 0, 'tasks_completed': 0}),
+    'habits': (_collect_habits, {'habit_completions': 0, 'habits_due': 0}),
+    'pomodoro': (_collect_focus, {'focus_minutes': 0}),
+    'exercise': (_collect_exercise, {'exercise_minutes': 0}),
+    'journal': (_collect_journal, {'journal_words': 0}),
+    'finance': (_collect_finance, {'spending': Decimal('0.00')}),
+    'water': (_collect_water, {'water_ml': 0}),
+}
+
+
+def refresh_daily_facts(user_id, start_date, end_date, modules=None, days=None):
+    """Recompute the given modules' columns for a user's date range.
+
+    Aggregates are read with one grouped query per module over the whole
+    range. Days with data are upserted in one statement; existing rows for
+    days that no longer have data get the module columns reset. When ``days``
+    is given only those days inside the range are written. The modules' data
+    versions are bumped so cached report sections are recomputed.
+    """
+    modules = modules or list(FACT_MODULES)
+    defaults = {}
+    values = defaultdict(dict)
+    for module in modules:
+        collector, module_defaults = FACT_MODULES[module]
+        defaults.update(module_defaults)
+        for day, columns in collector(user_id, start_date, end_date).items():
+            values[day].update(columns)
+
+    if days is not None:
+        days = {d for d in days if start_date <= d <= end_date}
+        values = {d: cols for d, cols in values.items() if d in days}
+        empty_days = days - set(values)
+    else:
+        empty_days = None
+
+    if values:
+        DailyUserFacts.objects.bulk_create(
+            [
+                DailyUserFacts(user_id=user_id, date=day, **{**defaults, **columns})
+                for day, columns in values.items()
+            ],
+            update_conflicts=True,
+            unique_fields=['user', 'date'],
+            update_fields=list(defaults) + ['updated_at'],
+        )
+
+    stale = DailyUserFacts.objects.filter(user_id=user_id)
+    if empty_days is None:
+        stale = stale.filter(date__gte=start_date, date__lte=end_date).exclude(date__in=list(values))
+    else:
+        stale = stale.filter(date__in=list(empty_days))
+    if empty_days is None or empty_days:
+        stale.update(updated_at=timezone.now(), **defaults)
+
+    for module in modules:
+        bump_data_version(user_id, module)
+    return len(values)
+
+
+def bump_data_version(user_id, module):
+    """Invalidate anything cached against a user's module data"""
+    updated = AnalyticsDataVersion.objects.filter(
+        user_id=user_id,
+        module=module
+    ).update(version=F('version') + 1, updated_at=timezone.now())
+    if not updated:
+        AnalyticsDataVersion.objects.bulk_create(
+            [AnalyticsDataVersion(user_id=user_id, module=module, version=1)],
+            ignore_conflicts=True
+        )
+
+
+def get_data_versions(user_id, modules):
+    """Current data version for each module (0 when never written)"""
+    versions = dict(
+        AnalyticsDataVersion.objects.filter(
+            user_id=user_id,
+            module__in=modules
+        ).values_list('module', 'version')
+    )
+    return {module: versions.get(module, 0) for module in modules}
+
+
+def refresh_days(user_id, days, modules=None):
+    """Refresh facts for a set of specific days (used by signals)"""
+    days = {d for d in days if d is not None}
+    if not days:
+        return 0
+    return refresh_daily_facts(user_id, min(days), max(days), modules=modules, days=days)
+
+
+def facts_range(user, start_date, end_date):
+    """Contiguous slice of a user's facts ordered by date"""
+    return DailyUserFacts.objects.filter(
+        user=user,
+        date__gte=start_date,
+        date__lte=end_date
+    ).order_by('date')
+
+
+def summarize_facts(user, start_date, end_date):
+    """Aggregate a user's facts over a period in a single query"""
+    totals = DailyUserFacts.objects.filter(
+        user=user,
+        date__gte=start_date,
+        date__lte=end_date
+    ).aggregate(
+        mood_weighted=Sum(ExpressionWrapper(F('mood_avg') * F('mood_entries'), output_field=DecimalField())),
+        mood_entries=Sum('mood_entries'),
+        sleep_minutes_avg=Avg('sleep_minutes'),
+        sleep_quality_avg=Avg('sleep_quality'),
+        tasks_created=Sum('tasks_created'),
+        tasks_completed=Sum('tasks_completed'),
+        habit_completions=Sum('habit_completions'),
+        habits_due=Sum('habits_due'),
+        focus_minutes=Sum('focus_minutes'),
+        exercise_minutes=Sum('exercise_minutes'),
+        journal_words=Sum('journal_words'),
+        spending=Sum('spending'),
+        water_ml=Sum('water_ml'),
+        days=Count('id'),
+    )
+    mood_weighted = totals.pop('mood_weighted')
+    mood_entries = totals['mood_entries']
+    totals['mood_avg'] = float(mood_weighted) / mood_entries if mood_entries else None
+    for key, value in totals.items():
+        if value is None and key not in ('mood_avg', 'sleep_minutes_avg', 'sleep_quality_avg'):
+            totals[key] = 0
+    return totals
+
+
+def is_active_day(fact):
+    """Whether a facts row records any tracked activity"""
+    return bool(
+        fact.mood_entries or fact.sleep_minutes or fact.tasks_created or fact.tasks_completed
+        or fact.habit_completions or fact.focus_minutes or fact.exercise_minutes
+        or fact.journal_words or fact.water_ml or fact.spending
+    )
+
+
+def refresh_activity_profile(user_id, today=None, create=True):
+    """Store the streak and consistency the dashboard summary reads.
+
+    Reads a year of facts in one range scan. With ``create=False`` a missing
+    profile is left missing, so deletes cascading from a user never re-insert it.
+    """
+    today = today or timezone.now().date()
+    active_days = {
+        f.date for f in facts_range(user_id, today - timedelta(days=364), today)
+        if is_active_day(f)
+    }
+    streak = 0
+    day = today if today in active_days else today - timedelta(days=1)
+    while day in active_days:
+        streak += 1
+        day -= timedelta(days=1)
+    month_active = sum(1 for d in active_days if d > today - timedelta(days=30))
+    values = {
+        'current_streak_days': streak,
+        'overall_consistency_score': round(month_active / 30 * 100),
+        'calculated_at': timezone.now(),
+    }
+    updated = UserAnalyticsProfile.objects.filter(user_id=user_id).update(
+        longest_streak_days=Greatest('longest_streak_days', Value(streak)),
+        **values
+    )
+    if not updated and create:
+        UserAnalyticsProfile.objects.bulk_create(
+            [UserAnalyticsProfile(user_id=user_id, longest_streak_days=streak, **values)],
+            ignore_conflicts=True
+        )
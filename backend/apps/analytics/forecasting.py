@@ -0,0 +1,420 @@
+"""Forecasting over the daily fact table.
+
+Two NumPy models are available for every ``DailyUserFacts`` metric:
+
+* ``holt_winters`` - damped additive Holt-Winters with weekly seasonality.
+  Smoothing parameters are picked by running the recursion for a whole grid
+  of candidates at once and keeping the lowest one-step squared error.
+* ``ridge`` - ridge regression on lagged values plus weekday indicators,
+  solved in closed form from the ``X'X``/``X'y`` sufficient statistics.
+
+Fitted parameters and the state needed to continue a fit are stored per
+(user, metric, method) in ``ForecastModel``. New days are folded into the
+stored state with the cached parameters; parameters are re-estimated from
+the full history window every ``REFIT_AFTER`` new observations. Accuracy
+is measured separately by a rolling-origin backtest run in a Celery task.
+"""
+import itertools
+import math
+from datetime import timedelta
+
+import numpy as np
+from django.utils import timezone
+
+from .models import DailyUserFacts, ForecastModel
+
+SEASON = 7
+HISTORY_DAYS = 365
+REFIT_AFTER = 28
+
+BACKTEST_HORIZON = 7
+BACKTEST_STEP = 7
+BACKTEST_ORIGINS = 12
+BACKTEST_MAX_AGE = timedelta(days=7)
+
+# module -> metric -> (facts column, divisor applied to forecasts)
+FORECAST_METRICS = {
+    'mood': {
+        'average': ('mood_avg', 1),
+        'low': ('mood_min', 1),
+        'high': ('mood_max', 1),
+        'entries': ('mood_entries', 1),
+    },
+    'sleep': {
+        'duration': ('sleep_minutes', 60),
+        'quality': ('sleep_quality', 1),
+    },
+    'tasks': {
+        'created': ('tasks_created', 1),
+        'completed': ('tasks_completed', 1),
+    },
+    'habits': {
+        'completions': ('habit_completions', 1),
+        'due': ('habits_due', 1),
+    },
+    'pomodoro': {
+        'focus_minutes': ('focus_minutes', 1),
+    },
+    'exercise': {
+        'minutes': ('exercise_minutes', 1),
+    },
+    'journal': {
+        'words': ('journal_words', 1),
+    },
+    'finance': {
+        'spending': ('spending', 1),
+    },
+    'water': {
+        'ml': ('water_ml', 1),
+    },
+}
+
+# Holt-Winters candidate grid: alpha (level), beta (trend), gamma (season), phi (damping)
+HW_GRID = np.array(list(itertools.product(
+    [0.05, 0.1, 0.2, 0.3, 0.5, 0.7],
+    [0.0, 0.05, 0.15],
+    [0.0, 0.1, 0.3],
+    [0.9, 0.98],
+))).T
+
+RIDGE_LAGS = (1, 2, 3, 7, 14)
+RIDGE_PENALTY = 0.01
+RIDGE_SPREAD_CAP = 14
+
+
+def resolve_metric(module, metric):
+    """Facts column and divisor for a module metric, or None if unsupported"""
+    return FORECAST_METRICS.get(module, {}).get(metric)
+
+
+def weekday_series(start_date, n):
+    """Weekday index (Monday=0) for n consecutive days from start_date"""
+    return (np.arange(n) + start_date.weekday()) % SEASON
+
+
+# Holt-Winters
+
+def _hw_recurse(y, weekdays, alpha, beta, gamma, phi, level, trend, season):
+    """Run the damped additive recursion for every candidate column at once"""
+    sse = np.zeros_like(level)
+    for value, weekday in zip(y, weekdays):
+        seasonal = season[:, weekday]
+        damped = phi * trend
+        error = value - (level + damped + seasonal)
+        sse += error * error
+        new_level = alpha * (value - seasonal) + (1 - alpha) * (level + damped)
+        trend = beta * (new_level - level) + (1 - beta) * damped
+        season[:, weekday] = gamma * (value - new_level) + (1 - gamma) * seasonal
+        level = new_level
+    return level, trend, season, sse
+
+
+def _fit_holt_winters(y, weekdays):
+    alpha, beta, gamma, phi = HW_GRID
+    candidates = alpha.size
+    first, second = y[:SEASON], y[SEASON:2 * SEASON]
+    level = np.full(candidates, first.mean())
+    trend = np.full(candidates, (second.mean() - first.mean()) / SEASON)
+    season = np.zeros((candidates, SEASON))
+    season[:, weekdays[:SEASON]] = first - first.mean()
+
+    level, trend, season, sse = _hw_recurse(
+        y[SEASON:], weekdays[SEASON:], alpha, beta, gamma, phi, level, trend, season
+    )
+    best = int(np.argmin(sse))
+    return {
+        'params': {
+            'alpha': float(alpha[best]),
+            'beta': float(beta[best]),
+            'gamma': float(gamma[best]),
+            'phi': float(phi[best]),
+        },
+        'state': {
+            'level': float(level[best]),
+            'trend': float(trend[best]),
+            'season': season[best].tolist(),
+        },
+        'sse': float(sse[best]),
+        'count': len(y) - SEASON,
+    }
+
+
+def _update_holt_winters(params, state, y, weekdays):
+    level, trend, season, sse = _hw_recurse(
+        y,
+        weekdays,
+        *(np.array([params[key]]) for key in ('alpha', 'beta', 'gamma', 'phi')),
+        np.array([state['level']]),
+        np.array([state['trend']]),
+        np.array([state['season']], dtype=float),
+    )
+    return {
+        'params': params,
+        'state': {'level': float(level[0]), 'trend': float(trend[0]), 'season': season[0].tolist()},
+        'sse': float(sse[0]),
+        'count': len(y),
+    }
+
+
+def _predict_holt_winters(params, state, weekdays):
+    steps = np.arange(1, len(weekdays) + 1)
+    damping = np.cumsum(params['phi'] ** steps)
+    mean = state['level'] + damping * state['trend'] + np.asarray(state['season'])[weekdays]
+    spread = np.sqrt(1 + (steps - 1) * params['alpha'] ** 2)
+    return mean, spread
+
+
+# Ridge regression on lagged features
+
+def _ridge_row(tail, weekday):
+    row = np.zeros(1 + len(RIDGE_LAGS) + SEASON - 1)
+    row[0] = 1
+    for i, lag in enumerate(RIDGE_LAGS, 1):
+        row[i] = tail[-lag]
+    if weekday:
+        row[len(RIDGE_LAGS) + weekday] = 1
+    return row
+
+
+def _ridge_design(y, weekdays):
+    """Design matrix for every day with a full lag history"""
+    start = max(RIDGE_LAGS)
+    rows = len(y) - start
+    X = np.zeros((rows, 1 + len(RIDGE_LAGS) + SEASON - 1))
+    X[:, 0] = 1
+    for i, lag in enumerate(RIDGE_LAGS, 1):
+        X[:, i] = y[start - lag:len(y) - lag]
+    weekday = weekdays[start:]
+    has_column = weekday > 0
+    X[np.nonzero(has_column)[0], len(RIDGE_LAGS) + weekday[has_column]] = 1
+    return X, y[start:]
+
+
+def _ridge_solve(xtx, xty):
+    penalty = np.eye(len(xtx)) * RIDGE_PENALTY * np.trace(xtx) / len(xtx)
+    penalty[0, 0] = 0
+    return np.linalg.solve(xtx + penalty, xty)
+
+
+def _fit_ridge(y, weekdays):
+    X, target = _ridge_design(y, weekdays)
+    xtx = X.T @ X
+    xty = X.T @ target
+    weights = _ridge_solve(xtx, xty)
+    residuals = target - X @ weights
+    return {
+        'params': {'weights': weights.tolist()},
+        'state': {'xtx': xtx.tolist(), 'xty': xty.tolist(), 'tail': y[-max(RIDGE_LAGS):].tolist()},
+        'sse': float(residuals @ residuals),
+        'count': len(target),
+    }
+
+
+def _update_ridge(params, state, y, weekdays):
+    weights = np.asarray(params['weights'])
+    xtx = np.asarray(state['xtx'])
+    xty = np.asarray(state['xty'])
+    tail = list(state['tail'])
+    sse = 0.0
+    for value, weekday in zip(y, weekdays):
+        row = _ridge_row(tail, weekday)
+        error = value - row @ weights
+        sse += error * error
+        xtx += np.outer(row, row)
+        xty += row * value
+        tail = tail[1:] + [float(value)]
+    return {
+        'params': {'weights': _ridge_solve(xtx, xty).tolist()},
+        'state': {'xtx': xtx.tolist(), 'xty': xty.tolist(), 'tail': tail},
+        'sse': float(sse),
+        'count': len(y),
+    }
+
+
+def _predict_ridge(params, state, weekdays):
+    weights = np.asarray(params['weights'])
+    tail = list(state['tail'])
+    mean = np.empty(len(weekdays))
+    for i, weekday in enumerate(weekdays):
+        mean[i] = _ridge_row(tail, weekday) @ weights
+        tail = tail[1:] + [mean[i]]
+    steps = np.arange(1, len(weekdays) + 1)
+    return mean, np.sqrt(np.minimum(steps, RIDGE_SPREAD_CAP))
+
+
+# method -> (fit, update, predict, minimum history in days)
+MODELS = {
+    'holt_winters': (_fit_holt_winters, _update_holt_winters, _predict_holt_winters, 2 * SEASON),
+    'ridge': (_fit_ridge, _update_ridge, _predict_ridge, 2 * max(RIDGE_LAGS)),
+}
+METHODS = list(MODELS)
+
+
+# Series loading
+
+def load_series(user_id, column, start_date, end_date, last_value=None):
+    """Daily values for a facts column with gaps filled.
+
+    Missing counts are zero. Nullable columns (mood, sleep) are interpolated
+    between recorded days, or carried forward from ``last_value`` when it is
+    given (incremental updates).
+    """
+    days = (end_date - start_date).days + 1
+    values = np.full(max(days, 0), np.nan)
+    rows = DailyUserFacts.objects.filter(
+        user_id=user_id,
+        date__gte=start_date,
+        date__lte=end_date
+    ).values_list('date', column)
+    for day, value in rows:
+        if value is not None:
+            values[(day - start_date).days] = float(value)
+
+    if not DailyUserFacts._meta.get_field(column).null:
+        return np.nan_to_num(values)
+
+    missing = np.isnan(values)
+    if last_value is not None:
+        # Carry the last recorded value forward over gaps
+        index = np.where(missing, 0, np.arange(len(values)))
+        np.maximum.accumulate(index, out=index)
+        filled = values[index]
+        filled[np.isnan(filled)] = last_value
+        return filled
+    if missing.all():
+        return values
+    recorded = np.nonzero(~missing)[0]
+    values[missing] = np.interp(np.nonzero(missing)[0], recorded, values[recorded])
+    return values
+
+
+def load_history(user_id, column, end_date, days=HISTORY_DAYS):
+    """History window ending on end_date, trimmed to the first recorded day"""
+    start_date = end_date - timedelta(days=days - 1)
+    raw = load_series(user_id, column, start_date, end_date)
+    recorded = np.nonzero(~np.isnan(raw) & (raw != 0))[0]
+    if not len(recorded):
+        return start_date, raw[:0]
+    first = int(recorded[0])
+    return start_date + timedelta(days=first), raw[first:]
+
+
+# Fitted model cache
+
+def _apply_fit(model, result):
+    model.params = result['params']
+    model.state = {**result['state'], 'last_value': model.state.get('last_value')}
+
+
+def refresh_forecast_model(user_id, module, metric, method, today=None):
+    """Bring the cached model for a metric up to yesterday.
+
+    Returns None when there is not enough history for the method.
+    """
+    column, _ = resolve_metric(module, metric)
+    fit, update, _, min_history = MODELS[method]
+    end_date = (today or timezone.now().date()) - timedelta(days=1)
+    model = ForecastModel.objects.filter(
+        user_id=user_id,
+        module=module,
+        metric_name=metric,
+        method=method
+    ).first()
+    if model and model.last_date >= end_date:
+        return model
+
+    if model and model.observations - model.observations_at_fit < REFIT_AFTER:
+        start_date = model.last_date + timedelta(days=1)
+        values = load_series(user_id, column, start_date, end_date, last_value=model.state.get('last_value'))
+        result = update(model.params, model.state, values, weekday_series(start_date, len(values)))
+        _apply_fit(model, result)
+        model.observations += len(values)
+        model.residual_sse += result['sse']
+        model.residual_count += result['count']
+    else:
+        start_date, values = load_history(user_id, column, end_date)
+        if len(values) < min_history:
+            return None
+        result = fit(values, weekday_series(start_date, len(values)))
+        model = model or ForecastModel(user_id=user_id, module=module, metric_name=metric, method=method)
+        _apply_fit(model, result)
+        model.observations = model.observations_at_fit = len(values)
+        model.residual_sse = result['sse']
+        model.residual_count = result['count']
+        model.fitted_at = timezone.now()
+
+    model.state['last_value'] = float(values[-1])
+    model.last_date = end_date
+    model.save()
+    return model
+
+
+def predict(model, end_date):
+    """Forecast rows for each day after the model's last day up to end_date"""
+    _, _, predict_fn, _ = MODELS[model.method]
+    _, divisor = resolve_metric(model.module, model.metric_name)
+    steps = (end_date - model.last_date).days
+    start_date = model.last_date + timedelta(days=1)
+    mean, spread = predict_fn(model.params, model.state, weekday_series(start_date, steps))
+
+    sigma = math.sqrt(model.residual_sse / model.residual_count) if model.residual_count else 0.0
+    margin = 1.96 * sigma * spread
+    low = np.maximum(mean - margin, 0) / divisor
+    high = np.maximum(mean + margin, 0) / divisor
+    mean = np.maximum(mean, 0) / divisor
+    return [
+        {
+            'date': str(start_date + timedelta(days=i)),
+            'predicted_value': round(float(mean[i]), 2),
+            'confidence_low': round(float(low[i]), 2),
+            'confidence_high': round(float(high[i]), 2),
+        }
+        for i in range(steps)
+    ]
+
+
+def select_method(user_id, module, metric):
+    """Method with the lowest backtest error so far (Holt-Winters until backtested)"""
+    best = ForecastModel.objects.filter(
+        user_id=user_id,
+        module=module,
+        metric_name=metric,
+        backtest_wape__isnull=False
+    ).order_by('backtest_wape').values_list('method', flat=True).first()
+    return best or 'holt_winters'
+
+
+def backtest(model, horizon=BACKTEST_HORIZON, origins=BACKTEST_ORIGINS):
+    """Rolling-origin evaluation of the model's method on its own history.
+
+    The model is refit on every prefix ending at an origin and scored on the
+    following ``horizon`` days; origins step back ``BACKTEST_STEP`` days from
+    the most recent one.
+    """
+    column, _ = resolve_metric(model.module, model.metric_name)
+    fit, _, predict_fn, min_history = MODELS[model.method]
+    start_date, values = load_history(model.user_id, column, model.last_date)
+    weekdays = weekday_series(start_date, len(values))
+
+    errors = []
+    actuals = []
+    for origin in range(len(values) - horizon, min_history - 1, -BACKTEST_STEP)[:origins]:
+        fitted = fit(values[:origin], weekdays[:origin])
+        mean, _ = predict_fn(fitted['params'], fitted['state'], weekdays[origin:origin + horizon])
+        actual = values[origin:origin + horizon]
+        errors.append(np.abs(actual - np.maximum(mean, 0)))
+        actuals.append(np.abs(actual))
+    if not errors:
+        return model
+
+    errors = np.concatenate(errors)
+    total = np.concatenate(actuals).sum()
+    model.backtest_mae = float(errors.mean())
+    model.backtest_wape = float(errors.sum() / total) if total else None
+    model.backtested_at = timezone.now()
+    model.save(update_fields=['backtest_mae', 'backtest_wape', 'backtested_at', 'updated_at'])
+    return model
+
+
+def needs_backtest(model):
+    return model.backtested_at is None or timezone.now() - model.backtested_at > BACKTEST_MAX_AGE
@@ -0,0 +1,51 @@
+import time
+from datetime import date
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from apps.analytics.forecasting import MODELS, weekday_series
+
+
+class Command(BaseCommand):
+    help = 'Benchmark per-user forecast fit, incremental update and predict latency on synthetic series'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=365, help='History length per user')
+        parser.add_argument('--users', type=int, default=200, help='Synthetic users to fit')
+        parser.add_argument('--horizon', type=int, default=30, help='Days forecast per user')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        days = options['days']
+        start = date(2024, 1, 1)
+        weekdays = weekday_series(start, days + 1)
+        future = weekday_series(start, days + 1 + options['horizon'])[days + 1:]
+
+        weekly = np.array([0, 0.5, 0.4, 0.3, 0.2, -0.6, -0.8])
+        series = [
+            6 + weekly[weekdays] + 0.002 * np.arange(days + 1) + rng.normal(0, 0.7, days + 1)
+            for _ in range(options['users'])
+        ]
+
+        self.stdout.write(f"{options['users']} users x {days} days, {options['horizon']}-day horizon")
+        for method, (fit, update, predict, _) in MODELS.items():
+            fit_ms, update_ms, predict_ms = [], [], []
+            for y in series:
+                t0 = time.perf_counter()
+                fitted = fit(y[:days], weekdays[:days])
+                t1 = time.perf_counter()
+                updated = update(fitted['params'], fitted['state'], y[days:], weekdays[days:])
+                t2 = time.perf_counter()
+                predict(updated['params'], updated['state'], future)
+                t3 = time.perf_counter()
+                fit_ms.append((t1 - t0) * 1000)
+                update_ms.append((t2 - t1) * 1000)
+                predict_ms.append((t3 - t2) * 1000)
+
+            self.stdout.write(
+                f'{method:>13}: fit p50={np.median(fit_ms):.2f}ms p95={np.percentile(fit_ms, 95):.2f}ms | '
+                f'update p50={np.median(update_ms):.3f}ms | '
+                f'predict p50={np.median(predict_ms):.3f}ms'
+            )
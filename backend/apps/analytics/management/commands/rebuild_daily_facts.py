@@ -0,0 +1,41 @@
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.analytics.facts import FACT_MODULES, refresh_daily_facts
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the DailyUserFacts table from source modules in chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Only rebuild facts for this user email')
+        parser.add_argument('--start', type=date.fromisoformat, help='First day to rebuild (YYYY-MM-DD)')
+        parser.add_argument('--end', type=date.fromisoformat, help='Last day to rebuild (YYYY-MM-DD)')
+        parser.add_argument('--chunk-days', type=int, default=90, help='Days aggregated per query batch')
+        parser.add_argument('--module', action='append', choices=list(FACT_MODULES), help='Limit to a module (repeatable)')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        users = User.objects.order_by('pk')
+        if options['user']:
+            users = users.filter(email=options['user'])
+
+        end = options['end'] or timezone.now().date()
+        chunk = timedelta(days=max(1, options['chunk_days']))
+        total_rows = 0
+
+        for user in users.iterator(chunk_size=500):
+            start = options['start'] or user.date_joined.date()
+            rows = 0
+            chunk_start = start
+            while chunk_start <= end:
+                chunk_end = min(chunk_start + chunk - timedelta(days=1), end)
+                rows += refresh_daily_facts(user.pk, chunk_start, chunk_end, modules=options['module'])
+                chunk_start = chunk_end + timedelta(days=1)
+            total_rows += rows
+            self.stdout.write(f'{user.email}: {rows} days')
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {total_rows} daily fact rows'))
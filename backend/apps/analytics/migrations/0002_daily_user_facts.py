@@ -0,0 +1,47 @@
+# Generated by Django 5.0.14 on 2026-10-19 05:33
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyUserFacts',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('mood_avg', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('mood_min', models.SmallIntegerField(blank=True, null=True)),
+                ('mood_max', models.SmallIntegerField(blank=True, null=True)),
+                ('mood_entries', models.PositiveIntegerField(default=0)),
+                ('sleep_minutes', models.PositiveIntegerField(blank=True, null=True)),
+                ('sleep_quality', models.DecimalField(blank=True, decimal_places=2, max_digits=4, null=True)),
+                ('tasks_created', models.PositiveIntegerField(default=0)),
+                ('tasks_completed', models.PositiveIntegerField(default=0)),
+                ('habit_completions', models.PositiveIntegerField(default=0)),
+                ('habits_due', models.PositiveIntegerField(default=0)),
+                ('focus_minutes', models.PositiveIntegerField(default=0)),
+                ('exercise_minutes', models.PositiveIntegerField(default=0)),
+                ('journal_words', models.PositiveIntegerField(default=0)),
+                ('spending', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('water_ml', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_facts', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Daily User Facts',
+                'verbose_name_plural': 'Daily User Facts',
+                'ordering': ['date'],
+                'unique_together': {('user', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.0.14 on 2026-10-19 05:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0003_report_sections'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='anomalydetection',
+            unique_together={('user', 'module', 'metric_name', 'detected_date')},
+        ),
+        migrations.CreateModel(
+            name='AnomalyBaseline',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('module', models.CharField(max_length=50)),
+                ('metric_name', models.CharField(max_length=100)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('mean', models.FloatField(default=0)),
+                ('m2', models.FloatField(default=0, help_text='Sum of squared deviations from the mean')),
+                ('weekday_stats', models.JSONField(blank=True, default=list)),
+                ('recent_values', models.JSONField(blank=True, default=list)),
+                ('watermark', models.DateField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='anomaly_baselines', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'module', 'metric_name')},
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.0.14 on 2026-10-19 05:45
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0004_anomaly_baselines'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ForecastModel',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('module', models.CharField(max_length=50)),
+                ('metric_name', models.CharField(max_length=100)),
+                ('method', models.CharField(choices=[('holt_winters', 'Holt-Winters (weekly seasonality)'), ('ridge', 'Ridge Regression on Lags')], max_length=20)),
+                ('params', models.JSONField(default=dict)),
+                ('state', models.JSONField(default=dict)),
+                ('last_date', models.DateField(help_text='Last day folded into the model')),
+                ('observations', models.PositiveIntegerField(default=0)),
+                ('observations_at_fit', models.PositiveIntegerField(default=0, help_text='Observations when parameters were last estimated')),
+                ('residual_sse', models.FloatField(default=0)),
+                ('residual_count', models.PositiveIntegerField(default=0)),
+                ('backtest_mae', models.FloatField(blank=True, null=True)),
+                ('backtest_wape', models.FloatField(blank=True, help_text='Weighted absolute percentage error', null=True)),
+                ('backtested_at', models.DateTimeField(blank=True, null=True)),
+                ('fitted_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='forecast_models', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'module', 'metric_name', 'method')},
+            },
+        ),
+    ]
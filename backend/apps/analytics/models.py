@@ -273,6 +273,7 @@ class AnomalyDetection(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        unique_together = ['user', 'module', 'metric_name', 'detected_date']
         indexes = [
             models.Index(fields=['user', 'module', '-created_at']),
             models.Index(fields=['user', 'severity', '-created_at']),
@@ -782,3 +783,154 @@ class UserAnalyticsProfile(models.Model):
     
     def __str__(self):
         return f"Analytics Profile for {self.user.email}"
+
+
+class DailyUserFacts(models.Model):
+    """One row per user per day of cross-module metrics, maintained from source writes"""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='daily_facts')
+    date = models.DateField()
+    
+    # Mood
+    mood_avg = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    mood_min = models.SmallIntegerField(null=True, blank=True)
+    mood_max = models.SmallIntegerField(null=True, blank=True)
+    mood_entries = models.PositiveIntegerField(default=0)
+    
+    # Sleep
+    sleep_minutes = models.PositiveIntegerField(null=True, blank=True)
+    sleep_quality = models.DecimalField(max_digits=4, decimal_places=2, null=True, blank=True)
+    
+    # Tasks
+    tasks_created = models.PositiveIntegerField(default=0)
+    tasks_completed = models.PositiveIntegerField(default=0)
+    
+    # Habits
+    habit_completions = models.PositiveIntegerField(default=0)
+    habits_due = models.PositiveIntegerField(default=0)
+    
+    # Focus, exercise and journal
+    focus_minutes = models.PositiveIntegerField(default=0)
+    exercise_minutes = models.PositiveIntegerField(default=0)
+    journal_words = models.PositiveIntegerField(default=0)
+    
+    # Finance and hydration
+    spending = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    water_ml = models.PositiveIntegerField(default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['date']
+        unique_together = ['user', 'date']
+        verbose_name = 'Daily User Facts'
+        verbose_name_plural = 'Daily User Facts'
+    
+    def __str__(self):
+        return f"Facts for {self.user_id} on {self.date}"
+
+
+class AnalyticsDataVersion(models.Model):
+    """Per-user, per-module counter bumped whenever that module's source data changes"""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='analytics_data_versions')
+    module = models.CharField(max_length=50)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['user', 'module']
+    
+    def __str__(self):
+        return f"{self.module} v{self.version}"
+
+
+class ReportSectionCache(models.Model):
+    """Intermediate module summary reused across report generations while its data version holds"""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='report_section_cache')
+    module = models.CharField(max_length=50)
+    start_date = models.DateField()
+    end_date = models.DateField()
+    data_version = models.PositiveBigIntegerField(default=0)
+    
+    summary = models.JSONField(default=dict, blank=True)
+    
+    computed_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['user', 'module', 'start_date', 'end_date']
+    
+    def __str__(self):
+        return f"{self.module} section {self.start_date} to {self.end_date} (v{self.data_version})"
+
+
+class AnomalyBaseline(models.Model):
+    """Rolling per-user metric statistics used by the incremental anomaly scanner"""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='anomaly_baselines')
+    module = models.CharField(max_length=50)
+    metric_name = models.CharField(max_length=100)
+    
+    # Welford running statistics
+    count = models.PositiveIntegerField(default=0)
+    mean = models.FloatField(default=0)
+    m2 = models.FloatField(default=0, help_text="Sum of squared deviations from the mean")
+    
+    # Seasonal baseline: [count, mean, m2] per weekday (Monday=0)
+    weekday_stats = models.JSONField(default=list, blank=True)
+    
+    # Most recent values for robust median/MAD baselines
+    recent_values = models.JSONField(default=list, blank=True)
+    
+    # Last day folded into the statistics; later days are re-scored
+    watermark = models.DateField(null=True, blank=True)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['user', 'module', 'metric_name']
+    
+    def __str__(self):
+        return f"{self.module}.{self.metric_name} baseline (n={self.count})"
+
+
+class ForecastModel(models.Model):
+    """Fitted forecasting model for one user metric, refreshed incrementally"""
+    METHODS = [
+        ('holt_winters', 'Holt-Winters (weekly seasonality)'),
+        ('ridge', 'Ridge Regression on Lags'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='forecast_models')
+    module = models.CharField(max_length=50)
+    metric_name = models.CharField(max_length=100)
+    method = models.CharField(max_length=20, choices=METHODS)
+    
+    # Fitted parameters and the state needed to continue the fit
+    params = models.JSONField(default=dict)
+    state = models.JSONField(default=dict)
+    
+    # Fit coverage
+    last_date = models.DateField(help_text="Last day folded into the model")
+    observations = models.PositiveIntegerField(default=0)
+    observations_at_fit = models.PositiveIntegerField(default=0, help_text="Observations when parameters were last estimated")
+    residual_sse = models.FloatField(default=0)
+    residual_count = models.PositiveIntegerField(default=0)
+    
+    # Rolling-origin backtest
+    backtest_mae = models.FloatField(null=True, blank=True)
+    backtest_wape = models.FloatField(null=True, blank=True, help_text="Weighted absolute percentage error")
+    backtested_at = models.DateTimeField(null=True, blank=True)
+    
+    fitted_at = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['user', 'module', 'metric_name', 'method']
+    
+    def __str__(self):
+        return f"{self.module}.{self.metric_name} {self.method} model"
+    
+    @property
+    def accuracy(self):
+        if self.backtest_wape is None:
+            return None
+        return max(0.0, 1 - self.backtest_wape)
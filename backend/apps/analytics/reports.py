@@ -0,0 +1,201 @@
+"""Automated report building shared by the API and the Celery report pipeline.
+
+A report is split into one section per module. Each section summarizes the
+module over the report period and the preceding period of equal length, and
+is cached in ``ReportSectionCache`` under the module's data version so that
+regenerating an overlapping report only recomputes modules whose data
+changed since.
+"""
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .facts import get_data_versions, summarize_facts
+from .models import ReportSectionCache
+
+DEFAULT_REPORT_MODULES = ['tasks', 'habits', 'mood', 'sleep', 'exercise', 'journal', 'finance']
+
+REPORT_PERIOD_DAYS = {'weekly': 7, 'monthly': 30, 'quarterly': 90}
+
+# module -> [(metric name, facts total key, value transform, higher is better)]
+REPORT_METRICS = {
+    'tasks': [
+        ('tasks_created', 'tasks_created', int, True),
+        ('tasks_completed', 'tasks_completed', int, True),
+    ],
+    'habits': [
+        ('habit_completions', 'habit_completions', int, True),
+    ],
+    'mood': [
+        ('average_mood', 'mood_avg', lambda v: round(v, 2), True),
+    ],
+    'sleep': [
+        ('average_sleep_hours', 'sleep_minutes_avg', lambda v: round(float(v) / 60, 1), True),
+    ],
+    'exercise': [
+        ('total_exercise_minutes', 'exercise_minutes', int, True),
+    ],
+    'journal': [
+        ('journal_words', 'journal_words', int, True),
+    ],
+    'finance': [
+        ('total_spending', 'spending', lambda v: round(float(v), 2), False),
+    ],
+}
+
+TREND_THRESHOLD_PCT = 5
+
+
+def default_period(report_type, end_date):
+    """Start date for a report type ending on end_date"""
+    return end_date - timedelta(days=REPORT_PERIOD_DAYS.get(report_type, 30))
+
+
+def _metric(name, current, previous, higher_is_better):
+    metric = {'name': name, 'value': current, 'previous_value': previous}
+    if current is None or previous in (None, 0):
+        return metric
+    change = (current - previous) / abs(previous) * 100
+    metric['change_percentage'] = round(change, 1)
+    if abs(change) < TREND_THRESHOLD_PCT:
+        metric['trend'] = 'stable'
+    elif (change > 0) == higher_is_better:
+        metric['trend'] = 'improving'
+    else:
+        metric['trend'] = 'declining'
+    return metric
+
+
+def compute_module_section(user_id, module, start_date, end_date):
+    """Summarize one module over the period and compare with the previous one"""
+    if module not in REPORT_METRICS:
+        return None
+    length = (end_date - start_date).days + 1
+    current = summarize_facts(user_id, start_date, end_date)
+    previous = summarize_facts(
+        user_id,
+        start_date - timedelta(days=length),
+        start_date - timedelta(days=1)
+    )
+
+    metrics = []
+    for name, key, transform, higher_is_better in REPORT_METRICS[module]:
+        now_value = transform(current[key]) if current[key] is not None else None
+        before_value = transform(previous[key]) if previous[key] is not None else None
+        metrics.append(_metric(name, now_value, before_value, higher_is_better))
+    return {'module': module, 'metrics': metrics}
+
+
+def get_module_section(user_id, module, start_date, end_date):
+    """Module section reused from cache unless the module's data changed"""
+    version = get_data_versions(user_id, [module])[module]
+    cached = ReportSectionCache.objects.filter(
+        user_id=user_id,
+        module=module,
+        start_date=start_date,
+        end_date=end_date,
+        data_version=version
+    ).values_list('summary', flat=True).first()
+    if cached is not None:
+        return cached or None
+
+    summary = compute_module_section(user_id, module, start_date, end_date)
+    ReportSectionCache.objects.update_or_create(
+        user_id=user_id,
+        module=module,
+        start_date=start_date,
+        end_date=end_date,
+        defaults={'data_version': version, 'summary': summary or {}},
+    )
+    return summary
+
+
+def assemble_report(report, sections):
+    """Fill a report from its module sections and mark it ready"""
+    module_summaries = {}
+    comparison_data = {}
+    improving = []
+    declining = []
+    stable = []
+
+    for section in sections:
+        if not section:
+            continue
+        module = section['module']
+        module_summaries[module] = section
+
+        for metric in section.get('metrics', []):
+            comparison_data.setdefault(module, {})[metric['name']] = {
+                'current': metric['value'],
+                'previous': metric.get('previous_value'),
+                'change_percentage': metric.get('change_percentage'),
+            }
+            trend = metric.get('trend')
+            if trend == 'improving':
+                improving.append({
+                    'module': module,
+                    'metric': metric['name'],
+                    'change': metric['change_percentage']
+                })
+            elif trend == 'declining':
+                declining.append({
+                    'module': module,
+                    'metric': metric['name'],
+                    'change': metric['change_percentage']
+                })
+            else:
+                stable.append({
+                    'module': module,
+                    'metric': metric['name']
+                })
+
+    # Generate highlights and lowlights
+    highlights = sorted(improving, key=lambda x: abs(x['change']), reverse=True)[:5]
+    lowlights = sorted(declining, key=lambda x: abs(x['change']), reverse=True)[:5]
+
+    report.module_summaries = module_summaries
+    report.comparison_data = comparison_data
+    report.improving_metrics = improving
+    report.declining_metrics = declining
+    report.stable_metrics = stable
+    report.key_highlights = highlights
+    report.key_lowlights = lowlights
+    report.summary_text = generate_summary_text(report.report_type, highlights, lowlights, module_summaries)
+    report.recommendations = generate_recommendations(improving, declining, module_summaries)
+    report.status = 'ready'
+    report.generated_at = timezone.now()
+    report.save()
+    return report
+
+
+def generate_summary_text(report_type, highlights, lowlights, module_summaries):
+    """Generate human-readable summary"""
+    parts = []
+
+    if highlights:
+        parts.append(f"Great progress! Your {highlights[0]['metric']} improved by {abs(highlights[0]['change']):.1f}%.")
+
+    if lowlights:
+        parts.append(f"Watch out: {lowlights[0]['metric']} declined by {abs(lowlights[0]['change']):.1f}%.")
+
+    active_modules = len(module_summaries)
+    parts.append(f"You were active in {active_modules} different areas this period.")
+
+    return " ".join(parts)
+
+
+def generate_recommendations(improving, declining, module_summaries):
+    """Generate personalized recommendations"""
+    recommendations = []
+
+    if declining:
+        for item in declining[:3]:
+            recommendations.append(f"Focus on improving your {item['metric']} in {item['module']}.")
+
+    if not any(m['module'] == 'sleep' for m in improving + declining):
+        recommendations.append("Consider tracking your sleep more consistently for better insights.")
+
+    if len(module_summaries) < 3:
+        recommendations.append("Try exploring more modules to get a fuller picture of your wellbeing.")
+
+    return recommendations
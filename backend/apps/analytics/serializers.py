@@ -443,4 +443,5 @@ class ForecastRequestSerializer(serializers.Serializer):
     module = serializers.CharField(max_length=50)
     metric = serializers.CharField(max_length=100)
     period = serializers.ChoiceField(choices=['7d', '30d', '90d', '6m'])
+    model = serializers.ChoiceField(choices=['auto', 'holt_winters', 'ridge'], default='auto')
     include_confidence_interval = serializers.BooleanField(default=True)
@@ -0,0 +1,116 @@
+"""Keep ``DailyUserFacts`` in sync with writes to the source modules."""
+from django.apps import apps
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from django.utils import timezone
+
+from .facts import as_date, refresh_activity_profile, refresh_daily_facts, refresh_days
+
+
+def _habit_completion_user(instance):
+    from apps.habits.models import Habit
+    return Habit.objects.filter(pk=instance.habit_id).values_list('user_id', flat=True).first()
+
+
+# model label -> (facts module, user id getter, affected days getter)
+FACT_SOURCES = {
+    'mood.MoodEntry': ('mood', lambda obj: obj.user_id, lambda obj: [obj.entry_date]),
+    'health.SleepLog': ('sleep', lambda obj: obj.user_id, lambda obj: [obj.date]),
+    'tasks.Task': ('tasks', lambda obj: obj.user_id, lambda obj: [obj.created_at, obj.completed_at]),
+    'habits.HabitCompletion': ('habits', _habit_completion_user, lambda obj: [obj.date]),
+    'pomodoro.PomodoroSession': ('pomodoro', lambda obj: obj.user_id, lambda obj: [obj.started_at]),
+    'health.WorkoutLog': ('exercise', lambda obj: obj.user_id, lambda obj: [obj.date]),
+    'journal.JournalEntry': ('journal', lambda obj: obj.user_id, lambda obj: [obj.entry_date]),
+    'finance.Transaction': ('finance', lambda obj: obj.user_id, lambda obj: [obj.date]),
+    'health.WaterLog': ('water', lambda obj: obj.user_id, lambda obj: [obj.date]),
+}
+
+
+def _days(getter, instance):
+    return {as_date(value) for value in getter(instance) if value is not None}
+
+
+def fact_days(queryset):
+    """(facts module, days) the rows of a fact source count towards; None for other models"""
+    source = FACT_SOURCES.get(queryset.model._meta.label)
+    if source is None:
+        return None
+    module, _, days_of = source
+    return module, set().union(*(_days(days_of, obj) for obj in queryset))
+
+
+# Habit fields that decide on which days it is due
+HABIT_SCHEDULE_FIELDS = ['user', 'frequency', 'target_weekdays', 'custom_interval_days', 'is_archived']
+
+
+def _refresh(user_id, module, days, create=True):
+    if user_id is None or not days:
+        return
+    refresh_days(user_id, days, modules=[module])
+    refresh_activity_profile(user_id, create=create)
+
+
+def _capture_previous_days(sender, instance, **kwargs):
+    """Remember the days an existing row belonged to before it is updated"""
+    if instance._state.adding or kwargs.get('raw'):
+        return
+    _, _, days_of = FACT_SOURCES[sender._meta.label]
+    previous = sender.objects.filter(pk=instance.pk).first()
+    instance._facts_previous_days = _days(days_of, previous) if previous else set()
+
+
+def _refresh_on_save(sender, instance, **kwargs):
+    if kwargs.get('raw'):
+        return
+    module, user_of, days_of = FACT_SOURCES[sender._meta.label]
+    days = _days(days_of, instance) | getattr(instance, '_facts_previous_days', set())
+    _refresh(user_of(instance), module, days)
+
+
+def _refresh_on_delete(sender, instance, **kwargs):
+    module, user_of, days_of = FACT_SOURCES[sender._meta.label]
+    _refresh(user_of(instance), module, _days(days_of, instance), create=False)
+
+
+def _habit_schedule(habit):
+    return tuple(getattr(habit, habit._meta.get_field(field).attname) for field in HABIT_SCHEDULE_FIELDS)
+
+
+def _refresh_habits_due(habit):
+    """Recount habits_due for every day since the habit was created"""
+    start = as_date(habit.created_at)
+    today = timezone.now().date()
+    if start is None or start > today:
+        return
+    refresh_daily_facts(habit.user_id, start, today, modules=['habits'])
+
+
+def _capture_previous_schedule(sender, instance, **kwargs):
+    instance._facts_previous_schedule = None
+    if instance._state.adding or kwargs.get('raw'):
+        return
+    instance._facts_previous_schedule = sender.objects.filter(pk=instance.pk).values_list(*HABIT_SCHEDULE_FIELDS).first()
+
+
+def _refresh_on_habit_save(sender, instance, **kwargs):
+    # Stat updates from completions leave the schedule as it was
+    if kwargs.get('raw') or getattr(instance, '_facts_previous_schedule', None) == _habit_schedule(instance):
+        return
+    _refresh_habits_due(instance)
+
+
+def _refresh_on_habit_delete(sender, instance, **kwargs):
+    _refresh_habits_due(instance)
+
+
+def connect_fact_signals():
+    for label in FACT_SOURCES:
+        model = apps.get_model(label)
+        uid = f'daily_facts:{label}'
+        pre_save.connect(_capture_previous_days, sender=model, dispatch_uid=uid)
+        post_save.connect(_refresh_on_save, sender=model, dispatch_uid=uid)
+        post_delete.connect(_refresh_on_delete, sender=model, dispatch_uid=uid)
+    habit = apps.get_model('habits.Habit')
+    pre_save.connect(_capture_previous_schedule, sender=habit, dispatch_uid='daily_facts:habits.Habit')
+    post_save.connect(_refresh_on_habit_save, sender=habit, dispatch_uid='daily_facts:habits.Habit')
+    post_delete.connect(_refresh_on_habit_delete, sender=habit, dispatch_uid='daily_facts:habits.Habit')
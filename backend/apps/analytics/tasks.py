@@ -0,0 +1,154 @@
+from datetime import date, timedelta
+
+from celery import chord, shared_task
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+from django.utils import timezone
+
+from .anomalies import scan_user_anomalies
+from .facts import refresh_activity_profile, refresh_daily_facts
+from .forecasting import BACKTEST_MAX_AGE, backtest
+from .models import AutomatedReport, ForecastModel
+from .reports import DEFAULT_REPORT_MODULES, assemble_report, default_period, get_module_section
+
+
+@shared_task(bind=True)
+def refresh_recent_daily_facts(self, days=2):
+    """Refresh the trailing days of DailyUserFacts for every active user.
+
+    Signals keep rows current on writes; this nightly pass also materializes
+    rows for days with no writes (e.g. habits that were due but skipped) and
+    rolls each user's streak over to the new day.
+    """
+    end_date = timezone.now().date()
+    start_date = end_date - timedelta(days=days - 1)
+    users = get_user_model().objects.filter(is_active=True).values_list('pk', flat=True)
+    refreshed = 0
+    for user_id in users.iterator(chunk_size=500):
+        refresh_daily_facts(user_id, start_date, end_date)
+        refresh_activity_profile(user_id, today=end_date)
+        refreshed += 1
+    return {'users': refreshed}
+
+
+@shared_task
+def build_report_section(user_id, module, start_date, end_date):
+    """Compute (or reuse) one module section of a report"""
+    return get_module_section(
+        user_id,
+        module,
+        date.fromisoformat(start_date),
+        date.fromisoformat(end_date)
+    )
+
+
+@shared_task
+def finalize_report(sections, report_id):
+    """Chord callback: assemble collected module sections into the report"""
+    report = AutomatedReport.objects.filter(pk=report_id).first()
+    if report is None:
+        return None
+    assemble_report(report, sections)
+    return str(report.pk)
+
+
+def enqueue_report(report, modules=None):
+    """Fan the report's module sections out to parallel subtasks"""
+    modules = modules or DEFAULT_REPORT_MODULES
+    header = [
+        build_report_section.s(str(report.user_id), module, report.start_date.isoformat(), report.end_date.isoformat())
+        for module in modules
+    ]
+    return chord(header)(finalize_report.s(str(report.pk)))
+
+
+def create_report(user, report_type, start_date, end_date):
+    return AutomatedReport.objects.create(
+        user=user,
+        report_type=report_type,
+        title=f"{report_type.title()} Report: {start_date} to {end_date}",
+        start_date=start_date,
+        end_date=end_date,
+        status='generating'
+    )
+
+
+@shared_task(bind=True)
+def pregenerate_periodic_reports(self, report_type='weekly', chunk_size=500):
+    """Queue the latest weekly/monthly report for every user during off-peak hours.
+
+    Weekly reports skip users who disabled them in their analytics profile;
+    monthly reports have no opt-out. Users that already have a report for the
+    same period are skipped.
+    """
+    end_date = timezone.now().date() - timedelta(days=1)
+    start_date = default_period(report_type, end_date)
+
+    users = get_user_model().objects.filter(is_active=True).order_by('pk')
+    if report_type == 'weekly':
+        users = users.exclude(analytics_profile__weekly_reports_enabled=False)
+    already_generated = set(
+        AutomatedReport.objects.filter(
+            report_type=report_type,
+            start_date=start_date,
+            end_date=end_date
+        ).values_list('user_id', flat=True)
+    )
+    queued = 0
+    for user in users.iterator(chunk_size=chunk_size):
+        if user.pk in already_generated:
+            continue
+        enqueue_report(create_report(user, report_type, start_date, end_date))
+        queued += 1
+    return {'report_type': report_type, 'queued': queued}
+
+
+@shared_task
+def scan_anomalies_for_users(user_ids, method='zscore'):
+    """Incrementally scan a chunk of users for anomalies"""
+    flagged = 0
+    for user_id in user_ids:
+        flagged += scan_user_anomalies(user_id, method=method)
+    return flagged
+
+
+@shared_task(bind=True)
+def scan_anomalies_nightly(self, method='zscore', chunk_size=200):
+    """Fan the nightly anomaly scan out to one subtask per chunk of users"""
+    users = get_user_model().objects.filter(is_active=True).order_by('pk').values_list('pk', flat=True)
+    chunk = []
+    chunks = 0
+    for user_id in users.iterator(chunk_size=chunk_size):
+        chunk.append(str(user_id))
+        if len(chunk) == chunk_size:
+            scan_anomalies_for_users.delay(chunk, method)
+            chunk = []
+            chunks += 1
+    if chunk:
+        scan_anomalies_for_users.delay(chunk, method)
+        chunks += 1
+    return {'chunks': chunks}
+
+
+@shared_task
+def backtest_forecast(model_id):
+    """Rolling-origin backtest for one fitted forecast model"""
+    model = ForecastModel.objects.filter(pk=model_id).first()
+    if model is None:
+        return None
+    backtest(model)
+    return model.backtest_wape
+
+
+@shared_task(bind=True)
+def backtest_stale_forecasts(self, chunk_size=500):
+    """Queue backtests for models whose accuracy is missing or out of date"""
+    cutoff = timezone.now() - BACKTEST_MAX_AGE
+    stale = ForecastModel.objects.filter(
+        Q(backtested_at__isnull=True) | Q(backtested_at__lt=cutoff)
+    ).values_list('pk', flat=True)
+    queued = 0
+    for model_id in stale.iterator(chunk_size=chunk_size):
+        backtest_forecast.delay(str(model_id))
+        queued += 1
+    return {'queued': queued}
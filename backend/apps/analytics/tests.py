@@ -0,0 +1,334 @@
+from datetime import timedelta
+from decimal import Decimal
+
+import numpy as np
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.automation.models import BatchOperation
+from apps.habits.models import Habit
+from apps.mood.models import MoodEntry
+from apps.tasks.models import Task
+
+from .anomalies import LOOKBACK_DAYS, scan_user_anomalies
+from .facts import get_data_versions, summarize_facts
+from .forecasting import MODELS, backtest, refresh_forecast_model, weekday_series
+from .models import (
+    AnomalyBaseline,
+    AnomalyDetection,
+    AutomatedReport,
+    DailyUserFacts,
+    ForecastModel,
+    ReportSectionCache,
+    UserAnalyticsProfile,
+)
+from .reports import DEFAULT_REPORT_MODULES
+from .tasks import create_report, enqueue_report, pregenerate_periodic_reports, refresh_recent_daily_facts
+
+User = get_user_model()
+
+
+class DailyUserFactsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='facts',
+            email='facts@example.com',
+            password='testpass123'
+        )
+        self.today = timezone.now().date()
+
+    def test_signals_maintain_mood_columns(self):
+        MoodEntry.objects.create(user=self.user, mood_value=4, entry_date=self.today)
+        entry = MoodEntry.objects.create(user=self.user, mood_value=8, entry_date=self.today)
+
+        facts = DailyUserFacts.objects.get(user=self.user, date=self.today)
+        self.assertEqual(facts.mood_entries, 2)
+        self.assertEqual(facts.mood_avg, Decimal('6.00'))
+        self.assertEqual(facts.mood_min, 4)
+        self.assertEqual(facts.mood_max, 8)
+
+        # Moving an entry to another day refreshes both days
+        yesterday = self.today - timedelta(days=1)
+        entry.entry_date = yesterday
+        entry.save()
+        self.assertEqual(DailyUserFacts.objects.get(user=self.user, date=self.today).mood_entries, 1)
+        self.assertEqual(DailyUserFacts.objects.get(user=self.user, date=yesterday).mood_max, 8)
+
+        entry.delete()
+        facts = DailyUserFacts.objects.get(user=self.user, date=yesterday)
+        self.assertEqual(facts.mood_entries, 0)
+        self.assertIsNone(facts.mood_avg)
+
+    def test_task_completion_updates_completed_day(self):
+        task = Task.objects.create(user=self.user, title='Write report')
+        self.assertEqual(DailyUserFacts.objects.get(user=self.user, date=self.today).tasks_created, 1)
+
+        task.status = 'completed'
+        task.completed_at = timezone.now()
+        task.save()
+        self.assertEqual(DailyUserFacts.objects.get(user=self.user, date=self.today).tasks_completed, 1)
+
+    def test_batch_updates_refresh_facts(self):
+        tasks = [Task.objects.create(user=self.user, title=f'Task {n}') for n in range(2)]
+        habit = Habit.objects.create(user=self.user, name='Read')
+        version = get_data_versions(self.user.pk, ['tasks'])['tasks']
+        for target_type, action_type, ids, payload in (
+            ('tasks', 'update', [t.pk for t in tasks], {'status': 'completed', 'completed_at': timezone.now().isoformat()}),
+            ('habits', 'archive', [habit.pk], {}),
+        ):
+            BatchOperation.objects.create(
+                user=self.user, target_type=target_type, action_type=action_type,
+                target_ids=[str(pk) for pk in ids], payload=payload,
+            ).apply()
+        facts = DailyUserFacts.objects.get(user=self.user, date=self.today)
+        self.assertEqual((facts.tasks_completed, facts.habits_due), (2, 0))
+        self.assertGreater(get_data_versions(self.user.pk, ['tasks'])['tasks'], version)
+
+    def test_rebuild_matches_incremental(self):
+        for offset, value in enumerate([3, 5, 7]):
+            MoodEntry.objects.create(
+                user=self.user,
+                mood_value=value,
+                entry_date=self.today - timedelta(days=offset)
+            )
+        incremental = list(DailyUserFacts.objects.filter(user=self.user).values_list('date', 'mood_avg'))
+
+        DailyUserFacts.objects.all().delete()
+        call_command(
+            'rebuild_daily_facts',
+            start=self.today - timedelta(days=10),
+            chunk_days=2,
+            stdout=open('/dev/null', 'w')
+        )
+        rebuilt = list(DailyUserFacts.objects.filter(user=self.user).values_list('date', 'mood_avg'))
+        self.assertEqual(incremental, rebuilt)
+
+    def test_summary_weights_mood_by_entries(self):
+        yesterday = self.today - timedelta(days=1)
+        MoodEntry.objects.create(user=self.user, mood_value=2, entry_date=yesterday)
+        MoodEntry.objects.create(user=self.user, mood_value=8, entry_date=self.today)
+        MoodEntry.objects.create(user=self.user, mood_value=8, entry_date=self.today)
+
+        totals = summarize_facts(self.user, yesterday, self.today)
+        self.assertAlmostEqual(totals['mood_avg'], 6.0)
+        self.assertEqual(totals['mood_entries'], 3)
+
+    def test_signals_maintain_streak_and_summary_is_read_only(self):
+        for offset in range(3):
+            MoodEntry.objects.create(user=self.user, mood_value=5, entry_date=self.today - timedelta(days=offset))
+        profile = UserAnalyticsProfile.objects.get(user=self.user)
+        self.assertEqual((profile.current_streak_days, profile.longest_streak_days), (3, 3))
+        self.assertEqual(profile.overall_consistency_score, 10)
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            summary = client.get('/api/v1/analytics/dashboard/summary/').data
+        self.assertEqual(summary['current_streak_days'], 3)
+        self.assertFalse([q for q in queries if not q['sql'].lstrip().upper().startswith('SELECT')])
+
+        MoodEntry.objects.filter(user=self.user, entry_date=self.today - timedelta(days=1)).first().delete()
+        profile.refresh_from_db()
+        self.assertEqual((profile.current_streak_days, profile.longest_streak_days), (1, 3))
+
+    def test_habit_schedule_edits_refresh_habits_due(self):
+        habit = Habit.objects.create(user=self.user, name='Read')
+        self.assertEqual(DailyUserFacts.objects.get(user=self.user, date=self.today).habits_due, 1)
+
+        habit.frequency = 'weekly'
+        habit.target_weekdays = [(self.today.weekday() + 1) % 7]
+        habit.save()
+        self.assertEqual(DailyUserFacts.objects.get(user=self.user, date=self.today).habits_due, 0)
+
+        habit.frequency = 'daily'
+        habit.save()
+        habit.delete()
+        self.assertEqual(DailyUserFacts.objects.get(user=self.user, date=self.today).habits_due, 0)
+
+
+class AutomatedReportPipelineTests(TestCase):
+    def setUp(self):
+        from celery import current_app
+        current_app.conf.task_always_eager = True
+        self.addCleanup(setattr, current_app.conf, 'task_always_eager', False)
+
+        self.user = User.objects.create_user(
+            username='reports',
+            email='reports@example.com',
+            password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.today = timezone.now().date()
+        for offset in range(14):
+            MoodEntry.objects.create(
+                user=self.user,
+                mood_value=8 if offset < 7 else 4,
+                entry_date=self.today - timedelta(days=offset)
+            )
+
+    def test_generate_runs_pipeline_and_compares_periods(self):
+        response = self.client.post('/api/v1/analytics/reports/automated/generate/', {'report_type': 'weekly'}, format='json')
+        self.assertEqual(response.status_code, 202)
+
+        report = AutomatedReport.objects.get(pk=response.data['id'])
+        self.assertEqual(report.status, 'ready')
+        self.assertIn('mood', report.module_summaries)
+        self.assertIn('average_mood', [m['metric'] for m in report.improving_metrics])
+
+        latest = self.client.get('/api/v1/analytics/reports/automated/latest/?report_type=weekly')
+        self.assertEqual(latest.data['id'], str(report.pk))
+
+    def test_sections_reused_until_module_data_changes(self):
+        start = self.today - timedelta(days=7)
+        for _ in range(2):
+            enqueue_report(create_report(self.user, 'weekly', start, self.today))
+        sections = ReportSectionCache.objects.filter(user=self.user)
+        self.assertEqual(sections.count(), len(DEFAULT_REPORT_MODULES))
+        mood_version = sections.get(module='mood').data_version
+        tasks_computed = sections.get(module='tasks').computed_at
+
+        MoodEntry.objects.create(user=self.user, mood_value=1, entry_date=self.today)
+        enqueue_report(create_report(self.user, 'weekly', start, self.today))
+
+        self.assertGreater(sections.get(module='mood').data_version, mood_version)
+        self.assertEqual(sections.get(module='tasks').computed_at, tasks_computed)
+
+    def test_fact_rebuilds_invalidate_sections(self):
+        start = self.today - timedelta(days=7)
+        enqueue_report(create_report(self.user, 'weekly', start, self.today))
+        section = ReportSectionCache.objects.get(user=self.user, module='mood')
+
+        call_command('rebuild_daily_facts', module=['mood'], stdout=open('/dev/null', 'w'))
+        self.assertGreater(get_data_versions(self.user.pk, ['mood'])['mood'], section.data_version)
+        version = get_data_versions(self.user.pk, ['tasks'])['tasks']
+        refresh_recent_daily_facts()
+        self.assertGreater(get_data_versions(self.user.pk, ['tasks'])['tasks'], version)
+
+    def test_monthly_pregeneration_ignores_weekly_opt_out(self):
+        UserAnalyticsProfile.objects.filter(user=self.user).update(weekly_reports_enabled=False)
+        self.assertEqual(pregenerate_periodic_reports(report_type='weekly')['queued'], 0)
+        self.assertEqual(pregenerate_periodic_reports(report_type='monthly')['queued'], 1)
+
+
+class AnomalyScanTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='anomalies',
+            email='anomalies@example.com',
+            password='testpass123'
+        )
+        self.today = timezone.now().date()
+        for offset in range(2, 22):
+            MoodEntry.objects.create(
+                user=self.user,
+                mood_value=6 + offset % 2,
+                entry_date=self.today - timedelta(days=offset)
+            )
+
+    def test_incremental_scan_flags_new_day_once(self):
+        self.assertEqual(scan_user_anomalies(self.user.pk, end_date=self.today - timedelta(days=2)), 0)
+        baseline = AnomalyBaseline.objects.get(user=self.user, module='mood')
+        # The last LOOKBACK_DAYS are scored but not folded in yet
+        self.assertEqual(baseline.count, 20 - LOOKBACK_DAYS)
+
+        MoodEntry.objects.create(user=self.user, mood_value=1, entry_date=self.today - timedelta(days=1))
+        self.assertEqual(scan_user_anomalies(self.user.pk), 1)
+        anomaly = AnomalyDetection.objects.get(user=self.user)
+        self.assertEqual(anomaly.anomaly_type, 'drop')
+        self.assertEqual(anomaly.detected_date, self.today - timedelta(days=1))
+
+        # Days already flagged are not flagged again
+        self.assertEqual(scan_user_anomalies(self.user.pk), 0)
+        rescanned = AnomalyBaseline.objects.get(pk=baseline.pk)
+        self.assertEqual(rescanned.count, 21 - LOOKBACK_DAYS)
+        self.assertGreater(rescanned.updated_at, baseline.updated_at)
+
+    def test_late_entries_in_lookback_are_scored(self):
+        scan_user_anomalies(self.user.pk)
+        late_day = self.today - timedelta(days=4)
+        MoodEntry.objects.create(user=self.user, mood_value=1, entry_date=late_day)
+        self.assertEqual(scan_user_anomalies(self.user.pk), 1)
+        self.assertEqual(AnomalyDetection.objects.get(user=self.user).detected_date, late_day)
+
+    def test_zero_values_count_towards_baseline(self):
+        scan_user_anomalies(self.user.pk)
+        # Every mood day completed no tasks
+        self.assertEqual(AnomalyBaseline.objects.get(user=self.user, module='tasks').count, 21 - LOOKBACK_DAYS)
+        self.assertEqual(AnomalyBaseline.objects.get(user=self.user, module='tasks').mean, 0)
+
+
+class ForecastingTests(TestCase):
+    def setUp(self):
+        from celery import current_app
+        current_app.conf.task_always_eager = True
+        self.addCleanup(setattr, current_app.conf, 'task_always_eager', False)
+
+        self.user = User.objects.create_user(
+            username='forecasts',
+            email='forecasts@example.com',
+            password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.today = timezone.now().date()
+        DailyUserFacts.objects.bulk_create([
+            DailyUserFacts(
+                user=self.user,
+                date=self.today - timedelta(days=offset),
+                tasks_completed=3 + (offset % 7 == 0) * 4 + offset % 2,
+                sleep_minutes=420 + (offset % 3) * 20,
+            )
+            for offset in range(1, 91)
+        ])
+
+    def test_incremental_ridge_update_matches_full_fit(self):
+        rng = np.random.default_rng(1)
+        y = rng.normal(5, 1, 120)
+        weekdays = weekday_series(self.today, len(y))
+        fit, update, _, _ = MODELS['ridge']
+
+        full = fit(y, weekdays)
+        partial = fit(y[:100], weekdays[:100])
+        updated = update(partial['params'], partial['state'], y[100:], weekdays[100:])
+        np.testing.assert_allclose(updated['params']['weights'], full['params']['weights'])
+
+    def test_model_is_cached_and_advanced_incrementally(self):
+        model = refresh_forecast_model(self.user.pk, 'tasks', 'completed', 'holt_winters', today=self.today - timedelta(days=3))
+        params = model.params
+
+        model = refresh_forecast_model(self.user.pk, 'tasks', 'completed', 'holt_winters', today=self.today)
+        self.assertEqual(model.params, params)
+        self.assertEqual(model.last_date, self.today - timedelta(days=1))
+        self.assertEqual(model.observations, model.observations_at_fit + 3)
+        self.assertEqual(ForecastModel.objects.filter(user=self.user).count(), 1)
+
+    def test_generate_uses_backtested_model(self):
+        response = self.client.post(
+            '/api/v1/analytics/forecasts/generate/',
+            {'module': 'sleep', 'metric': 'duration', 'period': '7d', 'model': 'ridge'},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['forecast_values']), 7)
+        self.assertEqual(response.data['forecast_values'][0]['date'], str(self.today + timedelta(days=1)))
+        self.assertLess(response.data['forecast_values'][0]['predicted_value'], 9)
+
+        model = ForecastModel.objects.get(user=self.user, method='ridge')
+        self.assertIsNotNone(model.backtest_wape)
+        self.assertEqual(backtest(model).backtest_wape, model.backtest_wape)
+
+    def test_unsupported_metric_is_rejected(self):
+        response = self.client.post(
+            '/api/v1/analytics/forecasts/generate/',
+            {'module': 'mood', 'metric': 'nonsense', 'period': '7d'},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('tasks', response.data['supported'])
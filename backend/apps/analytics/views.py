@@ -3,11 +3,11 @@ import json
 import io
 from datetime import datetime, timedelta, date
 from decimal import Decimal
-from statistics import mean, stdev
+from statistics import mean
 from collections import defaultdict
 
 from django.http import HttpResponse, JsonResponse
-from django.db.models import Avg, Sum, Count, StdDev, Min, Max, Q
+from django.db.models import Avg, Count, StdDev, Min, Max, Q
 from django.db.models.functions import TruncDate, TruncWeek, TruncMonth
 from django.utils import timezone
 from rest_framework import viewsets, status
@@ -30,6 +30,7 @@ from .models import (
     AnalyticsExport,
     AnalyticsInsight,
     UserAnalyticsProfile,
+    DailyUserFacts,
 )
 from .serializers import (
     CrossModuleCorrelationSerializer,
@@ -54,6 +55,11 @@ from .serializers import (
     PeriodComparisonRequestSerializer,
     ForecastRequestSerializer,
 )
+from .facts import facts_range, summarize_facts
+from .reports import default_period
+from .anomalies import METHODS as ANOMALY_METHODS, scan_user_anomalies
+from .forecasting import FORECAST_METRICS, needs_backtest, predict, refresh_forecast_model, resolve_metric, select_method
+from .tasks import backtest_forecast, create_report, enqueue_report
 
 
 class CrossModuleCorrelationViewSet(viewsets.ReadOnlyModelViewSet):
@@ -400,206 +406,30 @@ class AutomatedReportViewSet(viewsets.ReadOnlyModelViewSet):
             end_date = today
         
         if not start_date:
-            if report_type == 'weekly':
-                start_date = end_date - timedelta(days=7)
-            elif report_type == 'monthly':
-                start_date = end_date - timedelta(days=30)
-            elif report_type == 'quarterly':
-                start_date = end_date - timedelta(days=90)
-            else:
-                start_date = end_date - timedelta(days=30)
+            start_date = default_period(report_type, end_date)
         
-        report = self._generate_report(request.user, report_type, start_date, end_date, modules)
+        # Module sections are built in parallel by the report pipeline
+        report = create_report(request.user, report_type, start_date, end_date)
+        enqueue_report(report, modules)
+        report.refresh_from_db()
         
         return Response(
             AutomatedReportDetailSerializer(report).data,
-            status=status.HTTP_201_CREATED
-        )
-    
-    def _generate_report(self, user, report_type, start_date, end_date, modules):
-        """Generate comprehensive report"""
-        report = AutomatedReport.objects.create(
-            user=user,
-            report_type=report_type,
-            title=f"{report_type.title()} Report: {start_date} to {end_date}",
-            start_date=start_date,
-            end_date=end_date,
-            status='generating'
+            status=status.HTTP_202_ACCEPTED
         )
-        
-        module_summaries = {}
-        improving = []
-        declining = []
-        stable = []
-        
-        # Collect data from each module
-        all_modules = modules or ['tasks', 'habits', 'mood', 'sleep', 'exercise', 'journal', 'finance']
-        
-        for module in all_modules:
-            summary = self._get_module_summary(user, module, start_date, end_date)
-            if summary:
-                module_summaries[module] = summary
-                
-                # Categorize trends
-                for metric in summary.get('metrics', []):
-                    trend = metric.get('trend')
-                    if trend == 'improving':
-                        improving.append({
-                            'module': module,
-                            'metric': metric['name'],
-                            'change': metric['change_percentage']
-                        })
-                    elif trend == 'declining':
-                        declining.append({
-                            'module': module,
-                            'metric': metric['name'],
-                            'change': metric['change_percentage']
-                        })
-                    else:
-                        stable.append({
-                            'module': module,
-                            'metric': metric['name']
-                        })
-        
-        # Generate highlights and lowlights
-        highlights = sorted(improving, key=lambda x: x['change'], reverse=True)[:5]
-        lowlights = sorted(declining, key=lambda x: x['change'])[:5]
-        
-        # Generate summary text
-        summary_text = self._generate_summary_text(report_type, highlights, lowlights, module_summaries)
-        
-        # Generate recommendations
-        recommendations = self._generate_recommendations(improving, declining, module_summaries)
-        
-        # Update report
-        report.module_summaries = module_summaries
-        report.improving_metrics = improving
-        report.declining_metrics = declining
-        report.stable_metrics = stable
-        report.key_highlights = highlights
-        report.key_lowlights = lowlights
-        report.summary_text = summary_text
-        report.recommendations = recommendations
-        report.status = 'ready'
-        report.generated_at = timezone.now()
-        report.save()
-        
-        return report
     
-    def _get_module_summary(self, user, module, start_date, end_date):
-        """Get summary for a specific module"""
-        summary = {'module': module, 'metrics': []}
-        
-        if module == 'tasks':
-            try:
-                from apps.tasks.models import Task
-                created = Task.objects.filter(
-                    user=user,
-                    created_at__date__gte=start_date,
-                    created_at__date__lte=end_date
-                ).count()
-                completed = Task.objects.filter(
-                    user=user,
-                    status='completed',
-                    completed_at__date__gte=start_date,
-                    completed_at__date__lte=end_date
-                ).count()
-                summary['metrics'] = [
-                    {'name': 'tasks_created', 'value': created},
-                    {'name': 'tasks_completed', 'value': completed},
-                ]
-            except ImportError:
-                pass
-        
-        elif module == 'habits':
-            try:
-                from apps.habits.models import HabitCompletion
-                completions = HabitCompletion.objects.filter(
-                    habit__user=user,
-                    date__gte=start_date,
-                    date__lte=end_date,
-                    completed=True
-                ).count()
-                summary['metrics'] = [
-                    {'name': 'habit_completions', 'value': completions},
-                ]
-            except ImportError:
-                pass
-        
-        elif module == 'mood':
-            try:
-                from apps.mood.models import MoodEntry
-                avg_mood = MoodEntry.objects.filter(
-                    user=user,
-                    entry_date__gte=start_date,
-                    entry_date__lte=end_date
-                ).aggregate(avg=Avg('mood_value'))['avg']
-                summary['metrics'] = [
-                    {'name': 'average_mood', 'value': round(avg_mood, 2) if avg_mood else None},
-                ]
-            except ImportError:
-                pass
-        
-        elif module == 'sleep':
-            try:
-                from apps.health.models import SleepLog
-                avg_duration = SleepLog.objects.filter(
-                    user=user,
-                    date__gte=start_date,
-                    date__lte=end_date
-                ).aggregate(avg=Avg('duration_minutes'))['avg']
-                summary['metrics'] = [
-                    {'name': 'average_sleep_hours', 'value': round(avg_duration / 60, 1) if avg_duration else None},
-                ]
-            except ImportError:
-                pass
-        
-        elif module == 'exercise':
-            try:
-                from apps.health.models import WorkoutLog
-                total_minutes = WorkoutLog.objects.filter(
-                    user=user,
-                    date__gte=start_date,
-                    date__lte=end_date
-                ).aggregate(total=Sum('duration_minutes'))['total']
-                summary['metrics'] = [
-                    {'name': 'total_exercise_minutes', 'value': total_minutes or 0},
-                ]
-            except ImportError:
-                pass
-        
-        return summary if summary['metrics'] else None
-    
-    def _generate_summary_text(self, report_type, highlights, lowlights, module_summaries):
-        """Generate human-readable summary"""
-        parts = []
-        
-        if highlights:
-            parts.append(f"Great progress! Your {highlights[0]['metric']} improved by {highlights[0]['change']:.1f}%.")
-        
-        if lowlights:
-            parts.append(f"Watch out: {lowlights[0]['metric']} declined by {abs(lowlights[0]['change']):.1f}%.")
-        
-        active_modules = len(module_summaries)
-        parts.append(f"You were active in {active_modules} different areas this period.")
-        
-        return " ".join(parts)
-    
-    def _generate_recommendations(self, improving, declining, module_summaries):
-        """Generate personalized recommendations"""
-        recommendations = []
-        
-        if declining:
-            for item in declining[:3]:
-                recommendations.append(f"Focus on improving your {item['metric']} in {item['module']}.")
-        
-        if not any(m['module'] == 'sleep' for m in improving + declining):
-            recommendations.append("Consider tracking your sleep more consistently for better insights.")
-        
-        if len(module_summaries) < 3:
-            recommendations.append("Try exploring more modules to get a fuller picture of your wellbeing.")
-        
-        return recommendations
+    @action(detail=False, methods=['get'])
+    def latest(self, request):
+        """Get the most recent ready report, optionally of a given type"""
+        reports = self.get_queryset().filter(status='ready')
+        report_type = request.query_params.get('report_type')
+        if report_type:
+            reports = reports.filter(report_type=report_type)
+        
+        report = reports.order_by('-end_date', '-created_at').first()
+        if not report:
+            return Response({'error': 'No report available yet'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(AutomatedReportDetailSerializer(report).data)
     
     @action(detail=True, methods=['post'])
     def mark_read(self, request, pk=None):
@@ -636,8 +466,10 @@ class TrendDetectionViewSet(viewsets.ReadOnlyModelViewSet):
         # Detect trends for each metric
         modules_to_check = [module] if module else ['tasks', 'habits', 'mood', 'sleep', 'exercise']
         
+        facts = list(facts_range(request.user, start_date, end_date))
+        
         for mod in modules_to_check:
-            module_trends = self._detect_module_trends(request.user, mod, start_date, end_date, period)
+            module_trends = self._detect_module_trends(request.user, mod, facts, start_date, end_date, period)
             trends.extend(module_trends)
         
         # Sort by significance
@@ -648,100 +480,55 @@ class TrendDetectionViewSet(viewsets.ReadOnlyModelViewSet):
             'trends': TrendDetectionSerializer(trends, many=True).data
         })
     
-    def _detect_module_trends(self, user, module, start_date, end_date, period):
-        """Detect trends for a specific module"""
+    # module -> (facts column, metric name, display name, unit divisor)
+    TREND_METRICS = {
+        'mood': ('mood_avg', 'average_mood', 'Average Mood', 1),
+        'sleep': ('sleep_minutes', 'sleep_duration', 'Sleep Duration', 60),
+    }
+    
+    def _detect_module_trends(self, user, module, facts, start_date, end_date, period):
+        """Detect trends for a specific module from daily facts"""
         trends = []
+        if module not in self.TREND_METRICS:
+            return trends
         
-        if module == 'mood':
-            try:
-                from apps.mood.models import MoodEntry
-                entries = MoodEntry.objects.filter(
-                    user=user,
-                    entry_date__gte=start_date,
-                    entry_date__lte=end_date
-                ).order_by('entry_date')
-                
-                if entries.count() >= 5:
-                    # Split into first and second half
-                    mid_point = entries.count() // 2
-                    first_half = entries[:mid_point]
-                    second_half = entries[mid_point:]
-                    
-                    first_avg = sum(e.mood_value for e in first_half) / len(first_half)
-                    second_avg = sum(e.mood_value for e in second_half) / len(second_half)
-                    
-                    change_pct = ((second_avg - first_avg) / first_avg * 100) if first_avg else 0
-                    
-                    direction = 'stable'
-                    if change_pct > 5:
-                        direction = 'improving'
-                    elif change_pct < -5:
-                        direction = 'declining'
-                    
-                    trend = TrendDetection.objects.create(
-                        user=user,
-                        module='mood',
-                        metric_name='average_mood',
-                        metric_display_name='Average Mood',
-                        trend_direction=direction,
-                        trend_period=period,
-                        start_value=Decimal(str(first_avg)),
-                        end_value=Decimal(str(second_avg)),
-                        change_absolute=Decimal(str(second_avg - first_avg)),
-                        change_percentage=Decimal(str(change_pct)),
-                        confidence_score=Decimal('0.7'),
-                        start_date=start_date,
-                        end_date=end_date,
-                        is_significant=abs(change_pct) > 10,
-                    )
-                    trends.append(trend)
-            except ImportError:
-                pass
+        column, metric_name, display_name, divisor = self.TREND_METRICS[module]
+        values = [float(getattr(f, column)) for f in facts if getattr(f, column) is not None]
         
-        elif module == 'sleep':
-            try:
-                from apps.health.models import SleepLog
-                logs = SleepLog.objects.filter(
-                    user=user,
-                    date__gte=start_date,
-                    date__lte=end_date
-                ).order_by('date')
-                
-                if logs.count() >= 5:
-                    mid_point = logs.count() // 2
-                    first_half = logs[:mid_point]
-                    second_half = logs[mid_point:]
-                    
-                    first_avg = sum(l.duration_minutes for l in first_half) / len(first_half)
-                    second_avg = sum(l.duration_minutes for l in second_half) / len(second_half)
-                    
-                    change_pct = ((second_avg - first_avg) / first_avg * 100) if first_avg else 0
-                    
-                    direction = 'stable'
-                    if change_pct > 5:
-                        direction = 'improving'
-                    elif change_pct < -5:
-                        direction = 'declining'
-                    
-                    trend = TrendDetection.objects.create(
-                        user=user,
-                        module='sleep',
-                        metric_name='sleep_duration',
-                        metric_display_name='Sleep Duration',
-                        trend_direction=direction,
-                        trend_period=period,
-                        start_value=Decimal(str(first_avg / 60)),
-                        end_value=Decimal(str(second_avg / 60)),
-                        change_absolute=Decimal(str((second_avg - first_avg) / 60)),
-                        change_percentage=Decimal(str(change_pct)),
-                        confidence_score=Decimal('0.7'),
-                        start_date=start_date,
-                        end_date=end_date,
-                        is_significant=abs(change_pct) > 10,
-                    )
-                    trends.append(trend)
-            except ImportError:
-                pass
+        if len(values) >= 5:
+            # Split into first and second half
+            mid_point = len(values) // 2
+            first_half = values[:mid_point]
+            second_half = values[mid_point:]
+            
+            first_avg = sum(first_half) / len(first_half)
+            second_avg = sum(second_half) / len(second_half)
+            
+            change_pct = ((second_avg - first_avg) / first_avg * 100) if first_avg else 0
+            
+            direction = 'stable'
+            if change_pct > 5:
+                direction = 'improving'
+            elif change_pct < -5:
+                direction = 'declining'
+            
+            trend = TrendDetection.objects.create(
+                user=user,
+                module=module,
+                metric_name=metric_name,
+                metric_display_name=display_name,
+                trend_direction=direction,
+                trend_period=period,
+                start_value=Decimal(str(first_avg / divisor)),
+                end_value=Decimal(str(second_avg / divisor)),
+                change_absolute=Decimal(str((second_avg - first_avg) / divisor)),
+                change_percentage=Decimal(str(change_pct)),
+                confidence_score=Decimal('0.7'),
+                start_date=start_date,
+                end_date=end_date,
+                is_significant=abs(change_pct) > 10,
+            )
+            trends.append(trend)
         
         return trends
     
@@ -764,168 +551,28 @@ class AnomalyDetectionViewSet(viewsets.ReadOnlyModelViewSet):
     
     @action(detail=False, methods=['get'])
     def scan(self, request):
-        """Run anomaly detection scan"""
+        """Score days added since the last scan against rolling baselines.
+
+        ``days`` is the history a metric's baseline is seeded from on its first
+        scan; later scans cover the days since then, whatever ``days`` is.
+        """
         days = int(request.query_params.get('days', 30))
-        end_date = timezone.now().date()
-        start_date = end_date - timedelta(days=days)
-        
-        anomalies = []
+        method = request.query_params.get('method', 'zscore')
+        if method not in ANOMALY_METHODS:
+            return Response(
+                {'error': f"method must be one of {', '.join(ANOMALY_METHODS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        # Scan each module
-        anomalies.extend(self._scan_mood_anomalies(request.user, start_date, end_date))
-        anomalies.extend(self._scan_sleep_anomalies(request.user, start_date, end_date))
-        anomalies.extend(self._scan_task_anomalies(request.user, start_date, end_date))
+        scan_started = timezone.now()
+        scan_user_anomalies(request.user.pk, method=method, seed_days=days)
+        anomalies = AnomalyDetection.objects.filter(user=request.user, created_at__gte=scan_started)
         
         return Response({
             'anomalies_found': len(anomalies),
             'anomalies': AnomalyDetectionSerializer(anomalies, many=True).data
         })
     
-    def _scan_mood_anomalies(self, user, start_date, end_date):
-        """Scan for mood anomalies"""
-        anomalies = []
-        try:
-            from apps.mood.models import MoodEntry
-            entries = MoodEntry.objects.filter(
-                user=user,
-                entry_date__gte=start_date,
-                entry_date__lte=end_date
-            ).order_by('entry_date')
-            
-            if entries.count() >= 7:
-                values = [e.mood_value for e in entries]
-                avg = mean(values)
-                std = stdev(values) if len(values) > 1 else 1
-                
-                for entry in entries:
-                    z_score = (entry.mood_value - avg) / std if std > 0 else 0
-                    
-                    if abs(z_score) > 2:  # More than 2 standard deviations
-                        anomaly_type = 'spike' if z_score > 0 else 'drop'
-                        severity = 'high' if abs(z_score) > 3 else 'medium'
-                        
-                        anomaly, created = AnomalyDetection.objects.get_or_create(
-                            user=user,
-                            module='mood',
-                            metric_name='mood_rating',
-                            detected_date=entry.entry_date,
-                            defaults={
-                                'anomaly_type': anomaly_type,
-                                'severity': severity,
-                                'expected_value': Decimal(str(avg)),
-                                'actual_value': Decimal(str(entry.mood_value)),
-                                'deviation_percentage': Decimal(str(z_score * 10)),
-                                'baseline_average': Decimal(str(avg)),
-                                'baseline_std_dev': Decimal(str(std)),
-                                'title': f"Unusual {'High' if z_score > 0 else 'Low'} Mood",
-                                'description': f"Your mood rating was {entry.mood_value}, which is unusual compared to your average of {avg:.1f}.",
-                            }
-                        )
-                        if created:
-                            anomalies.append(anomaly)
-        except ImportError:
-            pass
-        
-        return anomalies
-    
-    def _scan_sleep_anomalies(self, user, start_date, end_date):
-        """Scan for sleep anomalies"""
-        anomalies = []
-        try:
-            from apps.health.models import SleepLog
-            logs = SleepLog.objects.filter(
-                user=user,
-                date__gte=start_date,
-                date__lte=end_date
-            ).order_by('date')
-            
-            if logs.count() >= 7:
-                durations = [l.duration_minutes for l in logs]
-                avg = mean(durations)
-                std = stdev(durations) if len(durations) > 1 else 1
-                
-                for log in logs:
-                    z_score = (log.duration_minutes - avg) / std if std > 0 else 0
-                    
-                    if abs(z_score) > 2:
-                        anomaly_type = 'outlier'
-                        severity = 'medium'
-                        
-                        anomaly, created = AnomalyDetection.objects.get_or_create(
-                            user=user,
-                            module='sleep',
-                            metric_name='sleep_duration',
-                            detected_date=log.date,
-                            defaults={
-                                'anomaly_type': anomaly_type,
-                                'severity': severity,
-                                'expected_value': Decimal(str(avg)),
-                                'actual_value': Decimal(str(log.duration_minutes)),
-                                'deviation_percentage': Decimal(str(z_score * 10)),
-                                'baseline_average': Decimal(str(avg)),
-                                'baseline_std_dev': Decimal(str(std)),
-                                'title': f"Unusual Sleep Duration",
-                                'description': f"You slept {log.duration_minutes / 60:.1f} hours, which differs from your average of {avg / 60:.1f} hours.",
-                            }
-                        )
-                        if created:
-                            anomalies.append(anomaly)
-        except ImportError:
-            pass
-        
-        return anomalies
-    
-    def _scan_task_anomalies(self, user, start_date, end_date):
-        """Scan for task completion anomalies"""
-        anomalies = []
-        try:
-            from apps.tasks.models import Task
-            
-            # Check for unusually low completion days
-            daily_completions = defaultdict(int)
-            tasks = Task.objects.filter(
-                user=user,
-                status='completed',
-                completed_at__date__gte=start_date,
-                completed_at__date__lte=end_date
-            )
-            
-            for task in tasks:
-                daily_completions[task.completed_at.date()] += 1
-            
-            if len(daily_completions) >= 7:
-                values = list(daily_completions.values())
-                avg = mean(values)
-                std = stdev(values) if len(values) > 1 else 1
-                
-                for date_val, count in daily_completions.items():
-                    z_score = (count - avg) / std if std > 0 else 0
-                    
-                    if z_score > 2:
-                        anomaly, created = AnomalyDetection.objects.get_or_create(
-                            user=user,
-                            module='tasks',
-                            metric_name='tasks_completed',
-                            detected_date=date_val,
-                            defaults={
-                                'anomaly_type': 'spike',
-                                'severity': 'low',
-                                'expected_value': Decimal(str(avg)),
-                                'actual_value': Decimal(str(count)),
-                                'deviation_percentage': Decimal(str(z_score * 10)),
-                                'baseline_average': Decimal(str(avg)),
-                                'baseline_std_dev': Decimal(str(std)),
-                                'title': 'High Productivity Day',
-                                'description': f"You completed {count} tasks, which is above your average of {avg:.1f}.",
-                            }
-                        )
-                        if created:
-                            anomalies.append(anomaly)
-        except ImportError:
-            pass
-        
-        return anomalies
-    
     @action(detail=True, methods=['post'])
     def dismiss(self, request, pk=None):
         """Dismiss an anomaly"""
@@ -1104,27 +751,48 @@ class PredictiveForecastViewSet(viewsets.ReadOnlyModelViewSet):
         module = serializer.validated_data['module']
         metric = serializer.validated_data['metric']
         period = serializer.validated_data['period']
+        method = serializer.validated_data['model']
+        
+        resolved = resolve_metric(module, metric)
+        if resolved is None:
+            return Response(
+                {'error': 'Unsupported metric', 'supported': {m: list(metrics) for m, metrics in FORECAST_METRICS.items()}},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        column, divisor = resolved
         
         # Calculate forecast dates
         today = timezone.now().date()
         days_map = {'7d': 7, '30d': 30, '90d': 90, '6m': 180}
         forecast_days = days_map.get(period, 30)
         
-        # Get historical data
-        historical = self._get_historical_data(request.user, module, metric, 60)
-        
-        if len(historical) < 7:
+        if method == 'auto':
+            method = select_method(request.user.pk, module, metric)
+        model = refresh_forecast_model(request.user.pk, module, metric, method, today=today)
+        if model is None:
             return Response(
                 {'error': 'Insufficient historical data for forecasting'},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        if needs_backtest(model):
+            backtest_forecast.delay(str(model.pk))
         
-        # Simple linear trend forecast
-        forecast_values = self._generate_forecast(historical, forecast_days)
+        forecast_values = [
+            row for row in predict(model, today + timedelta(days=forecast_days))
+            if row['date'] > str(today)
+        ]
         
-        # Calculate trend direction
-        first_val = historical[0]['value'] if historical else 0
-        last_val = historical[-1]['value'] if historical else 0
+        # Calculate trend direction against the recent history
+        historical = list(
+            DailyUserFacts.objects.filter(
+                user=request.user,
+                date__gte=today - timedelta(days=60),
+                date__lt=today
+            ).exclude(**{f'{column}__isnull': True}).order_by('date').values_list(column, flat=True)
+        )
+        values = [float(v) / divisor for v in historical] or [model.state['last_value'] / divisor]
+        first_val = values[0]
+        last_val = values[-1]
         forecast_last = forecast_values[-1]['predicted_value'] if forecast_values else 0
         
         if forecast_last > last_val * 1.05:
@@ -1134,10 +802,9 @@ class PredictiveForecastViewSet(viewsets.ReadOnlyModelViewSet):
         else:
             trend_direction = 'stable'
         
-        # Calculate historical stats
-        values = [h['value'] for h in historical]
         historical_avg = mean(values)
-        historical_trend = (last_val - first_val) / len(historical) if len(historical) > 1 else 0
+        historical_trend = (last_val - first_val) / len(values) if len(values) > 1 else 0
+        accuracy = model.accuracy
         
         forecast = PredictiveForecast.objects.create(
             user=request.user,
@@ -1146,10 +813,10 @@ class PredictiveForecastViewSet(viewsets.ReadOnlyModelViewSet):
             forecast_period=period,
             forecast_values=forecast_values,
             trend_direction=trend_direction,
-            model_accuracy=Decimal('0.75'),  # Placeholder
-            confidence_score=Decimal('0.7'),
-            historical_average=Decimal(str(historical_avg)),
-            historical_trend=Decimal(str(historical_trend)),
+            model_accuracy=Decimal(str(round(accuracy, 2))) if accuracy is not None else None,
+            confidence_score=Decimal(str(round(accuracy, 2))) if accuracy is not None else Decimal('0.5'),
+            historical_average=Decimal(str(round(historical_avg, 4))),
+            historical_trend=Decimal(str(round(historical_trend, 4))),
             forecast_start_date=today,
             forecast_end_date=today + timedelta(days=forecast_days),
             expires_at=timezone.now() + timedelta(days=7),
@@ -1158,87 +825,6 @@ class PredictiveForecastViewSet(viewsets.ReadOnlyModelViewSet):
         )
         
         return Response(PredictiveForecastSerializer(forecast).data)
-    
-    def _get_historical_data(self, user, module, metric, days):
-        """Get historical data for forecasting"""
-        end_date = timezone.now().date()
-        start_date = end_date - timedelta(days=days)
-        data = []
-        
-        if module == 'mood' and metric == 'average':
-            try:
-                from apps.mood.models import MoodEntry
-                entries = MoodEntry.objects.filter(
-                    user=user,
-                    entry_date__gte=start_date,
-                    entry_date__lte=end_date
-                ).order_by('entry_date')
-                
-                for entry in entries:
-                    data.append({
-                        'date': str(entry.entry_date),
-                        'value': entry.mood_value
-                    })
-            except ImportError:
-                pass
-        
-        elif module == 'sleep' and metric == 'duration':
-            try:
-                from apps.health.models import SleepLog
-                logs = SleepLog.objects.filter(
-                    user=user,
-                    date__gte=start_date,
-                    date__lte=end_date
-                ).order_by('date')
-                
-                for log in logs:
-                    data.append({
-                        'date': str(log.date),
-                        'value': log.duration_minutes / 60
-                    })
-            except ImportError:
-                pass
-        
-        return data
-    
-    def _generate_forecast(self, historical, forecast_days):
-        """Generate forecast values using simple linear regression"""
-        if not historical:
-            return []
-        
-        n = len(historical)
-        x_vals = list(range(n))
-        y_vals = [h['value'] for h in historical]
-        
-        # Calculate slope and intercept
-        mean_x = sum(x_vals) / n
-        mean_y = sum(y_vals) / n
-        
-        numerator = sum((x - mean_x) * (y - mean_y) for x, y in zip(x_vals, y_vals))
-        denominator = sum((x - mean_x) ** 2 for x in x_vals)
-        
-        slope = numerator / denominator if denominator != 0 else 0
-        intercept = mean_y - slope * mean_x
-        
-        # Generate forecasts
-        forecasts = []
-        today = timezone.now().date()
-        
-        for i in range(forecast_days):
-            x = n + i
-            predicted = slope * x + intercept
-            
-            # Calculate confidence interval (simple approach)
-            std_error = 0.1 * predicted  # 10% margin
-            
-            forecasts.append({
-                'date': str(today + timedelta(days=i + 1)),
-                'predicted_value': round(predicted, 2),
-                'confidence_low': round(predicted - std_error, 2),
-                'confidence_high': round(predicted + std_error, 2),
-            })
-        
-        return forecasts
 
 
 class PeriodComparisonViewSet(viewsets.ModelViewSet):
@@ -1296,56 +882,31 @@ class PeriodComparisonViewSet(viewsets.ModelViewSet):
         p1_start, p1_end = period1
         p2_start, p2_end = period2
         
+        p1 = summarize_facts(user, p1_start, p1_end)
+        p2 = summarize_facts(user, p2_start, p2_end)
+        
         # Compare tasks
-        try:
-            from apps.tasks.models import Task
-            p1_completed = Task.objects.filter(
-                user=user,
-                status='completed',
-                completed_at__date__gte=p1_start,
-                completed_at__date__lte=p1_end
-            ).count()
-            p2_completed = Task.objects.filter(
-                user=user,
-                status='completed',
-                completed_at__date__gte=p2_start,
-                completed_at__date__lte=p2_end
-            ).count()
-            
-            data['tasks'] = {
-                'completed': {
-                    'period1': p1_completed,
-                    'period2': p2_completed,
-                    'difference': p1_completed - p2_completed,
-                    'change_percentage': round((p1_completed - p2_completed) / p2_completed * 100, 1) if p2_completed else 0
-                }
+        p1_completed = p1['tasks_completed']
+        p2_completed = p2['tasks_completed']
+        data['tasks'] = {
+            'completed': {
+                'period1': p1_completed,
+                'period2': p2_completed,
+                'difference': p1_completed - p2_completed,
+                'change_percentage': round((p1_completed - p2_completed) / p2_completed * 100, 1) if p2_completed else 0
             }
-        except ImportError:
-            pass
+        }
         
         # Compare mood
-        try:
-            from apps.mood.models import MoodEntry
-            p1_avg = MoodEntry.objects.filter(
-                user=user,
-                entry_date__gte=p1_start,
-                entry_date__lte=p1_end
-            ).aggregate(avg=Avg('mood_value'))['avg']
-            p2_avg = MoodEntry.objects.filter(
-                user=user,
-                entry_date__gte=p2_start,
-                entry_date__lte=p2_end
-            ).aggregate(avg=Avg('mood_value'))['avg']
-            
-            data['mood'] = {
-                'average': {
-                    'period1': round(p1_avg, 2) if p1_avg else None,
-                    'period2': round(p2_avg, 2) if p2_avg else None,
-                    'difference': round(p1_avg - p2_avg, 2) if p1_avg and p2_avg else None,
-                }
+        p1_avg = p1['mood_avg']
+        p2_avg = p2['mood_avg']
+        data['mood'] = {
+            'average': {
+                'period1': round(p1_avg, 2) if p1_avg else None,
+                'period2': round(p2_avg, 2) if p2_avg else None,
+                'difference': round(p1_avg - p2_avg, 2) if p1_avg and p2_avg else None,
             }
-        except ImportError:
-            pass
+        }
         
         # Determine winner
         scores = {'period1': 0, 'period2': 0}
@@ -1780,8 +1341,9 @@ class AnalyticsDashboardViewSet(viewsets.ViewSet):
         """Get analytics dashboard summary"""
         user = request.user
         
-        # Get or create profile
-        profile, _ = UserAnalyticsProfile.objects.get_or_create(user=user)
+        # Streak and consistency are kept current by the daily facts signals
+        # and the nightly refresh; reads never write the profile
+        profile = UserAnalyticsProfile.objects.filter(user=user).first() or UserAnalyticsProfile(user=user)
         
         # Count achievements
         total_achievements = UserAchievement.objects.filter(user=user, is_earned=True).count()
@@ -2,6 +2,7 @@ import uuid
 from django.apps import apps as django_apps
 from django.conf import settings
 from django.db import models
+from django.db.models import Min
 from django.utils import timezone
 
 
@@ -205,6 +206,8 @@ class BatchOperation(models.Model):
             raise ValueError('No target IDs provided')
         queryset = model.objects.filter(user=self.user, id__in=self.target_ids)
         result = {'action': self.action_type, 'target_type': self.target_type}
+        # Deletes send per-row signals; bulk updates need the rows' derived state rebuilt
+        before = self._derived_state(queryset) if self.action_type != 'delete' else None
 
         if self.action_type == 'delete':
             deleted_count, _ = queryset.delete()
@@ -225,9 +228,65 @@ class BatchOperation(models.Model):
         else:
             raise ValueError('Unsupported action type')
 
+        if before is not None:
+            self._rebuild_derived(before, self._derived_state(queryset))
+
         self.status = 'completed'
         self.completed_at = timezone.now()
         self.result_summary = result
         self.error_message = ''
         self.save(update_fields=['status', 'completed_at', 'result_summary', 'error_message'])
         return result
+
+    def _derived_state(self, queryset):
+        """Fact days and ledger accounts the targeted rows count towards"""
+        from apps.analytics.signals import fact_days
+
+        state = {'facts': fact_days(queryset), 'accounts': set()}
+        if self.target_type == 'finance_transactions':
+            state['accounts'] = set(queryset.values_list('account_id', flat=True))
+        return state
+
+    def _rebuild_derived(self, before, after):
+        """Rebuild what per-row signals maintain, since bulk ``update()`` sends none"""
+        from apps.analytics.facts import refresh_activity_profile, refresh_days
+
+        if before['facts'] is not None:
+            # Rows count towards the days they covered before the update and after it
+            module, days = before['facts']
+            refresh_days(self.user_id, days | after['facts'][1], modules=[module])
+            refresh_activity_profile(self.user_id)
+
+        if self.target_type == 'tasks':
+            from apps.tasks.models import Task
+            from apps.tasks.recurrence import materialize_occurrences
+            from apps.tasks.rollups import rebuild_task_rollups
+
+            rebuild_task_rollups(self.user_id)
+            for task in Task.objects.filter(user=self.user, id__in=self.target_ids):
+                materialize_occurrences(task)
+        elif self.target_type == 'finance_transactions':
+            from apps.finance.budget_spend import rebuild_budget_spend
+            from apps.finance.cash_flow import bump_finance_data_version
+            from apps.finance.ledger import rebuild_account_ledger
+
+            for account_id in sorted(pk for pk in before['accounts'] | after['accounts'] if pk is not None):
+                rebuild_account_ledger(account_id)
+            rebuild_budget_spend(self.user_id)
+            bump_finance_data_version(self.user_id)
+        elif self.target_type == 'journal_entries':
+            from apps.journal.search import index_entries
+
+            index_entries(self.target_ids)
+        elif self.target_type == 'habits':
+            from apps.analytics.facts import as_date, refresh_daily_facts
+            from apps.habits.models import Habit
+
+            # Archiving or rescheduling changes habits_due on every day since the habit began
+            start = as_date(Habit.objects.filter(
+                user=self.user, id__in=self.target_ids,
+            ).aggregate(start=Min('created_at'))['start'])
+            today = timezone.now().date()
+            if start is not None and start <= today:
+                refresh_daily_facts(self.user_id, start, today, modules=['habits'])
+                refresh_activity_profile(self.user_id)
@@ -555,14 +555,15 @@ class CalendarEventViewSet(viewsets.ModelViewSet):
             status='confirmed'
         )
         
-        # Get tasks with due dates in range
+        # Get tasks with due dates in range, and projected recurring ones
         from apps.tasks.models import Task
-        tasks = Task.objects.filter(
-            user=self.request.user,
-            due_date__gte=start_date,
-            due_date__lte=end_date,
-            status__in=['inbox', 'active']
-        ).select_related('project')
+        from apps.tasks.recurrence import tasks_in_range
+        tasks = tasks_in_range(
+            Task.objects.filter(user=self.request.user, status__in=['inbox', 'active']).annotate(
+                project_name=F('project__name'),
+            ),
+            self.request.user.pk, start_date, end_date,
+        )
         
         # Get habits
         from apps.habits.models import Habit
@@ -583,10 +584,11 @@ class CalendarEventViewSet(viewsets.ModelViewSet):
             tasks_data.append({
                 'id': str(task.id),
                 'title': task.title,
-                'due_date': task.due_date,
+                'due_date': task.occurrence_date,
                 'status': task.status,
                 'priority': task.priority,
-                'project': task.project.name if task.project else None,
+                'project': task.project_name,
+                'is_projected': task.is_projected,
                 'type': 'task',
             })
         
@@ -0,0 +1,60 @@
+"""Date-aligned joins of per-day metric series across apps.
+
+Each side of a join is described by a queryset, the date (or datetime)
+field to group on and named aggregates. Both sides are fetched with one
+grouped range query each and merged on date with dictionary lookups, so
+comparing two metrics costs two queries regardless of the window length.
+"""
+from datetime import timedelta
+
+from django.db.models import DateTimeField, F
+from django.db.models.functions import TruncDate
+
+
+def _resolve_field(model, path):
+    for part in path.split('__'):
+        field = model._meta.get_field(part)
+        model = field.related_model
+    return field
+
+
+def daily_series(queryset, date_field, aggregates, start_date, end_date):
+    """{date: {name: value}} from one grouped query over [start_date, end_date]"""
+    if isinstance(_resolve_field(queryset.model, date_field), DateTimeField):
+        rows = queryset.filter(**{
+            f'{date_field}__date__gte': start_date,
+            f'{date_field}__date__lte': end_date,
+        }).values(day=TruncDate(date_field))
+    else:
+        rows = queryset.filter(**{
+            f'{date_field}__gte': start_date,
+            f'{date_field}__lte': end_date,
+        }).values(day=F(date_field))
+    rows = rows.annotate(**aggregates).order_by()
+    return {row.pop('day'): row for row in rows}
+
+
+def date_aligned_join(left, right, start_date, end_date, offset_days=0, how='inner', fill=None):
+    """Join two daily series on date.
+
+    ``left`` and ``right`` are ``(queryset, date_field, aggregates)`` tuples.
+    The right value paired with a left day ``d`` is the one recorded on
+    ``d + offset_days``; e.g. ``offset_days=-1`` pairs next-day mood (left)
+    with the previous night's sleep (right). With ``how='left'`` every left
+    day is kept and missing right values are taken from ``fill``.
+
+    Returns ``[(day, left_values, right_values), ...]`` in date order.
+    """
+    offset = timedelta(days=offset_days)
+    left_series = daily_series(*left, start_date, end_date)
+    right_series = daily_series(*right, start_date + offset, end_date + offset)
+
+    joined = []
+    for day in sorted(left_series):
+        right_values = right_series.get(day + offset)
+        if right_values is None:
+            if how != 'left':
+                continue
+            right_values = dict(fill or {})
+        joined.append((day, left_series[day], right_values))
+    return joined
@@ -2,20 +2,30 @@ from django.contrib import admin
 
 from .models import (
     Account,
+    AccountDailyBalance,
     Category,
     IncomeSource,
     Transaction,
     Budget,
+    BudgetPeriodSpend,
     Goal,
     RecurringTransaction,
     InvestmentHolding,
     NetWorthSnapshot,
+    MerchantRule,
+    TransactionImport,
 )
 
 
 @admin.register(Account)
 class AccountAdmin(admin.ModelAdmin):
-    list_display = ('name', 'user', 'account_type', 'balance')
+    list_display = ('name', 'user', 'account_type', 'opening_balance', 'balance', 'ledger_dirty_from')
+    readonly_fields = ('balance',)
+
+
+@admin.register(AccountDailyBalance)
+class AccountDailyBalanceAdmin(admin.ModelAdmin):
+    list_display = ('account', 'user', 'date', 'change', 'closing_balance')
 
 
 @admin.register(Category)
@@ -31,13 +41,13 @@ class IncomeSourceAdmin(admin.ModelAdmin):
 
 @admin.register(Transaction)
 class TransactionAdmin(admin.ModelAdmin):
-    list_display = ('user', 'account', 'amount', 'currency', 'type', 'date')
+    list_display = ('user', 'account', 'amount', 'currency', 'type', 'date', 'running_balance')
     list_filter = ('type', 'currency')
 
 
 @admin.register(Budget)
 class BudgetAdmin(admin.ModelAdmin):
-    list_display = ('name', 'user', 'amount', 'start_date', 'end_date')
+    list_display = ('name', 'user', 'amount', 'start_date', 'end_date', 'period')
 
 
 @admin.register(Goal)
@@ -60,3 +70,20 @@ class InvestmentHoldingAdmin(admin.ModelAdmin):
 class NetWorthSnapshotAdmin(admin.ModelAdmin):
     list_display = ('user', 'date', 'assets', 'liabilities', 'net_worth')
     ordering = ('-date',)
+
+
+@admin.register(MerchantRule)
+class MerchantRuleAdmin(admin.ModelAdmin):
+    list_display = ('pattern', 'user', 'match_type', 'category', 'priority')
+    list_filter = ('match_type',)
+
+
+@admin.register(TransactionImport)
+class TransactionImportAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'account', 'file_format', 'status', 'imported', 'duplicates', 'skipped', 'created_at')
+    list_filter = ('status', 'file_format')
+
+
+@admin.register(BudgetPeriodSpend)
+class BudgetPeriodSpendAdmin(admin.ModelAdmin):
+    list_display = ('budget', 'period_start', 'period_end', 'spent')
@@ -5,3 +5,9 @@ class FinanceConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.finance'
     verbose_name = 'Finance'
+
+    def ready(self):
+        from .signals import connect_budget_spend_signals, connect_finance_signals, connect_ledger_signals
+        connect_finance_signals()
+        connect_ledger_signals()
+        connect_budget_spend_signals()
@@ -0,0 +1,138 @@
+"""Per-period budget spend maintained from transaction writes.
+
+Every budget has a ``BudgetPeriodSpend`` row for its current period (and keeps
+the rows of periods it has rolled past). An expense counts towards a budget
+when its category is the budget's category or a descendant of it; budgets
+without a category count all spending. Routing uses ``Category.path``: the
+budgets a transaction feeds are those whose category is in the transaction
+category's ancestry, so a write is one ``UPDATE ... SET spent = spent + delta``
+across all of them.
+
+Changes that move many transactions at once (category re-parenting or
+deletion, bulk imports) rebuild the user's rows instead, and
+``rebuild_budget_spend`` is also the nightly reconciliation.
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from dateutil.relativedelta import relativedelta
+from django.db import transaction
+from django.db.models import DecimalField, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Budget, BudgetPeriodSpend, Category, Transaction
+
+ZERO = Decimal('0.00')
+
+PERIOD_STEPS = {
+    'weekly': relativedelta(weeks=1),
+    'monthly': relativedelta(months=1),
+    'yearly': relativedelta(years=1),
+}
+
+
+def spend_contribution(tx):
+    """(user_id, category_id, local date, amount) an expense adds to budgets, or None"""
+    if tx.type != 'expense':
+        return None
+    return tx.user_id, tx.category_id, timezone.localdate(tx.date), Decimal(tx.amount)
+
+
+def _day_range(start, end):
+    return (
+        timezone.make_aware(datetime.combine(start, time.min)),
+        timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min)),
+    )
+
+
+def compute_period_spend(budget, start, end):
+    """Expense total for ``budget`` between two dates, straight from transactions"""
+    since, until = _day_range(start, end)
+    txs = Transaction.objects.filter(user_id=budget.user_id, type='expense', date__gte=since, date__lt=until)
+    if budget.category_id:
+        category = budget.category
+        txs = txs.filter(Q(category_id=category.pk) | Q(category__path__startswith=f'{category.path}{category.pk}/'))
+    return txs.aggregate(total=Sum('amount'))['total'] or ZERO
+
+
+def _apply(contribution, sign):
+    user_id, category_id, day, amount = contribution
+    budgets = Q(budget__category__isnull=True)
+    if category_id:
+        path = Category.objects.filter(pk=category_id).values_list('path', flat=True).first() or ''
+        budgets |= Q(budget__category_id__in=[category_id, *(int(pk) for pk in path.split('/') if pk)])
+    BudgetPeriodSpend.objects.filter(
+        budgets, budget__user_id=user_id, period_start__lte=day, period_end__gte=day,
+    ).update(spent=F('spent') + sign * amount)
+
+
+def apply_spend_change(before=None, after=None):
+    """Move one transaction's contribution from ``before`` to ``after`` (either may be None)"""
+    if before == after:
+        return
+    if before is not None:
+        _apply(before, -1)
+    if after is not None:
+        _apply(after, 1)
+
+
+def refresh_budget_spend(budget):
+    """Recompute the row of the budget's current period"""
+    BudgetPeriodSpend.objects.update_or_create(
+        budget=budget,
+        period_start=budget.start_date,
+        defaults={
+            'period_end': budget.end_date,
+            'spent': compute_period_spend(budget, budget.start_date, budget.end_date),
+        },
+    )
+
+
+def rebuild_budget_spend(user_id=None):
+    """Recompute every period row (of one user, or everyone); returns rows written"""
+    budgets = Budget.objects.select_related('category').order_by('pk')
+    if user_id is not None:
+        budgets = budgets.filter(user_id=user_id)
+    written = 0
+    for budget in budgets.iterator(chunk_size=500):
+        with transaction.atomic():
+            rows = list(BudgetPeriodSpend.objects.select_for_update().filter(budget=budget))
+            for row in rows:
+                row.spent = compute_period_spend(budget, row.period_start, row.period_end)
+            BudgetPeriodSpend.objects.bulk_update(rows, ['spent'])
+            if not any(row.period_start == budget.start_date for row in rows):
+                refresh_budget_spend(budget)
+                written += 1
+        written += len(rows)
+    return written
+
+
+def with_current_spend(budgets):
+    """Annotate ``actual``, the stored spend of each budget's current period"""
+    current = BudgetPeriodSpend.objects.filter(budget=OuterRef('pk'), period_start=OuterRef('start_date'))
+    return budgets.annotate(actual=Coalesce(
+        Subquery(current.values('spent')[:1]), Value(ZERO), output_field=DecimalField(max_digits=16, decimal_places=2),
+    ))
+
+
+def next_period(budget):
+    """(start, end) of the period after the budget's current one"""
+    start = budget.end_date + timedelta(days=1)
+    return start, start + PERIOD_STEPS[budget.period] - timedelta(days=1)
+
+
+def roll_budget_periods(today=None):
+    """Advance recurring budgets whose period has ended and open their new spend rows"""
+    today = today or timezone.localdate()
+    rolled = 0
+    due = Budget.objects.filter(end_date__lt=today).exclude(period='none').select_related('category')
+    for budget in due.iterator(chunk_size=500):
+        while budget.end_date < today:
+            budget.start_date, budget.end_date = next_period(budget)
+        with transaction.atomic():
+            # Queryset update: the save signal would treat this as an edit of the current period
+            Budget.objects.filter(pk=budget.pk).update(start_date=budget.start_date, end_date=budget.end_date)
+            refresh_budget_spend(budget)
+        rolled += 1
+    return rolled
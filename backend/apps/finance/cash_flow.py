@@ -0,0 +1,76 @@
+"""Cash-flow Sankey graph aggregated in the database and cached per period.
+
+All links come from one grouped query over the window: income flows from
+its IncomeSource into the account, expenses flow from the account into the
+top-level category (via ``Category.root``), transfers flow from the account
+into a single "Transfers" node. The graph is cached per (user, start date)
+under the user's finance data version, which is replaced whenever a
+transaction, account, category or income source changes.
+"""
+import uuid
+from datetime import datetime, time
+
+from django.core.cache import cache
+from django.db.models import Sum
+from django.db.models.functions import Abs, Coalesce
+from django.utils import timezone
+
+from .models import Transaction
+
+CASH_FLOW_TIMEOUT = 60 * 60 * 24
+
+
+def _version_key(user_id):
+    return f'finance_data_version:{user_id}'
+
+
+def get_finance_data_version(user_id):
+    return cache.get_or_set(_version_key(user_id), uuid.uuid4().hex, None)
+
+
+def bump_finance_data_version(user_id):
+    """Invalidate every cached finance aggregate for a user"""
+    cache.set(_version_key(user_id), uuid.uuid4().hex, None)
+
+
+def _link_names(row):
+    account = row['account__name'] or 'Account'
+    if row['type'] == 'income':
+        return row['income_source__name'] or 'Income', account
+    if row['type'] == 'expense':
+        return account, row['category_name'] or 'Uncategorized'
+    return account, 'Transfers'
+
+
+def build_cash_flow(user_id, start_date):
+    """Sankey nodes and links for transactions dated on or after ``start_date``"""
+    since = timezone.make_aware(datetime.combine(start_date, time.min))
+    rows = Transaction.objects.filter(user_id=user_id, date__gte=since).values(
+        'type',
+        'account__name',
+        'income_source__name',
+        category_name=Coalesce('category__root__name', 'category__name'),
+    ).annotate(total=Sum(Abs('amount'))).order_by('-total')
+
+    nodes = {}
+    links = {}
+    for row in rows:
+        source, target = (nodes.setdefault(name, len(nodes)) for name in _link_names(row))
+        links[(source, target)] = links.get((source, target), 0) + float(row['total'])
+
+    return {
+        'nodes': [{'name': name} for name in nodes],
+        'links': [
+            {'source': source, 'target': target, 'value': round(value, 2)}
+            for (source, target), value in links.items()
+        ],
+    }
+
+
+def get_cash_flow(user_id, start_date):
+    key = f'finance_cash_flow:{user_id}:{get_finance_data_version(user_id)}:{start_date.isoformat()}'
+    graph = cache.get(key)
+    if graph is None:
+        graph = build_cash_flow(user_id, start_date)
+        cache.set(key, graph, CASH_FLOW_TIMEOUT)
+    return graph
@@ -0,0 +1,309 @@
+"""Bulk import of bank statements (CSV or OFX) into an account.
+
+The uploaded file is streamed row by row and never held in memory. Rows are
+parsed into unsaved ``Transaction`` objects and flushed in chunks of
+``CHUNK_SIZE``. Each flush makes one ``external_id__in`` lookup to drop rows
+already in the account, and one ``bulk_create`` for the rest. Earlier chunks
+are committed first, so a repeat inside the same file is caught by the next
+lookup. Rows without a bank-supplied id get a deterministic one hashed from
+their content, so re-importing the same statement adds nothing.
+
+``bulk_create`` sends no signals. Once the file is done, the account ledger is
+posted in one pass from the earliest imported day (see
+``ledger.post_imported_transactions``). After that the user's budget spend
+rows are rebuilt, the cached finance aggregates are invalidated and the
+imported days are refreshed in ``DailyUserFacts``.
+"""
+import csv
+import hashlib
+import io
+import re
+from collections import Counter
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal, InvalidOperation
+
+from dateutil import parser as date_parser
+from django.utils import timezone
+
+from apps.analytics.facts import refresh_activity_profile, refresh_daily_facts
+
+from .budget_spend import rebuild_budget_spend
+from .cash_flow import bump_finance_data_version
+from .ledger import post_imported_transactions
+from .models import MerchantRule, Transaction
+
+CHUNK_SIZE = 5000
+
+# Rows whose errors are kept on the import for display
+MAX_REPORTED_ERRORS = 20
+
+# Fields a CSV column can be mapped to, with the headers recognised when unmapped
+DEFAULT_HEADERS = {
+    'date': ('date', 'posted date', 'transaction date', 'posting date'),
+    'amount': ('amount', 'transaction amount'),
+    'description': ('description', 'memo', 'payee', 'name', 'details'),
+    'external_id': ('id', 'transaction id', 'fitid', 'reference'),
+    'type': ('type', 'transaction type'),
+    'currency': ('currency',),
+}
+REQUIRED_FIELDS = ('date', 'amount')
+
+# OFX TRNTYPE values that are neither plain debits nor credits
+OFX_TRANSFER_TYPES = {'XFER'}
+
+# Descriptions memoised by the merchant matcher before its cache is reset
+MATCH_CACHE_SIZE = 50_000
+
+
+class MerchantMatcher:
+    """A user's merchant rules, compiled once per import.
+
+    Rules are tried in priority order; a single alternation of all patterns
+    rejects non-matching descriptions in one regex pass, and results are
+    memoised per description because statements repeat merchants heavily.
+    """
+
+    def __init__(self, rules):
+        self.rules = [
+            (re.compile(rule.pattern if rule.match_type == 'regex' else re.escape(rule.pattern), re.IGNORECASE), rule.category_id)
+            for rule in rules
+        ]
+        try:
+            self.any_rule = re.compile('|'.join(f'(?:{pattern.pattern})' for pattern, _ in self.rules), re.IGNORECASE)
+        except re.error:
+            # Numbered backreferences do not survive being combined
+            self.any_rule = None
+        self.cache = {}
+
+    @classmethod
+    def for_user(cls, user_id):
+        return cls(MerchantRule.objects.filter(user_id=user_id).order_by('-priority', 'id'))
+
+    def match(self, description):
+        """Category id of the first rule matching ``description``, or None"""
+        if not self.rules or not description:
+            return None
+        if description in self.cache:
+            return self.cache[description]
+        category_id = None
+        if self.any_rule is None or self.any_rule.search(description):
+            category_id = next((category for pattern, category in self.rules if pattern.search(description)), None)
+        if len(self.cache) >= MATCH_CACHE_SIZE:
+            self.cache.clear()
+        self.cache[description] = category_id
+        return category_id
+
+
+def resolve_columns(headers, mapping):
+    """Transaction field -> CSV header, from the explicit mapping then known header names"""
+    by_name = {header.strip().lower(): header for header in headers if header}
+    columns = {}
+    for field, aliases in DEFAULT_HEADERS.items():
+        header = mapping.get(field)
+        if header is None:
+            header = next((by_name[alias] for alias in aliases if alias in by_name), None)
+        elif header not in headers:
+            raise ValueError(f'Column "{header}" mapped to {field} is not in the file')
+        if header is not None:
+            columns[field] = header
+    missing = [field for field in REQUIRED_FIELDS if field not in columns]
+    if missing:
+        raise ValueError(f'No column found for: {", ".join(missing)}')
+    return columns
+
+
+def read_csv_rows(stream, mapping):
+    """Yield ``(row number, raw fields)`` from a CSV text stream"""
+    reader = csv.DictReader(stream)
+    columns = resolve_columns(reader.fieldnames or [], mapping)
+    for number, row in enumerate(reader, start=2):
+        yield number, {field: (row.get(header) or '').strip() for field, header in columns.items()}
+
+
+_OFX_TAG = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<]*)')
+
+
+def read_ofx_rows(stream):
+    """Yield ``(transaction number, raw fields)`` from an OFX (SGML or XML) text stream"""
+    current, number = None, 0
+    for line in stream:
+        for closing, tag, value in _OFX_TAG.findall(line):
+            tag = tag.upper()
+            if tag == 'STMTTRN':
+                if current:
+                    number += 1
+                    yield number, _ofx_fields(current)
+                current = None if closing else {}
+            elif tag == 'BANKTRANLIST' and closing:
+                # SGML statements may leave the last STMTTRN unclosed
+                if current:
+                    number += 1
+                    yield number, _ofx_fields(current)
+                current = None
+            elif current is not None and not closing:
+                current[tag] = value.strip()
+    if current:
+        yield number + 1, _ofx_fields(current)
+
+
+def _ofx_fields(tags):
+    description = tags.get('NAME', '')
+    if tags.get('MEMO') and tags['MEMO'] != description:
+        description = f"{description} {tags['MEMO']}".strip()
+    trntype = tags.get('TRNTYPE', '').upper()
+    return {
+        'date': tags.get('DTPOSTED', ''),
+        'amount': tags.get('TRNAMT', ''),
+        'description': description,
+        'external_id': tags.get('FITID', ''),
+        'type': 'transfer' if trntype in OFX_TRANSFER_TYPES else '',
+        'currency': tags.get('CURRENCY', ''),
+    }
+
+
+_OFX_DATE = re.compile(r'^(\d{8})(\d{6})?(?:\.\d+)?(?:\[([+-]?\d+(?:\.\d+)?)(?::\w+)?\])?')
+_AMOUNT_NOISE = re.compile(r'[^\d.\-()]')
+
+
+def parse_date(value, date_format=None):
+    """Aware datetime from an ISO, OFX (``20240131120000[-5:EST]``), ``date_format`` or free-form date"""
+    ofx = _OFX_DATE.match(value)
+    if ofx and not date_format:
+        parsed = datetime.strptime(ofx.group(1) + (ofx.group(2) or '000000'), '%Y%m%d%H%M%S')
+        if ofx.group(3):
+            return parsed.replace(tzinfo=dt_timezone(timedelta(hours=float(ofx.group(3)))))
+        return timezone.make_aware(parsed)
+    if date_format:
+        parsed = datetime.strptime(value, date_format)
+    else:
+        try:
+            parsed = datetime.fromisoformat(value)
+        except ValueError:
+            parsed = date_parser.parse(value)
+    return parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed)
+
+
+def parse_amount(value):
+    """Decimal from a bank amount such as ``-1,234.50``, ``$12.00`` or ``(12.00)``"""
+    cleaned = _AMOUNT_NOISE.sub('', value)
+    negative = cleaned.startswith('(') and cleaned.endswith(')')
+    try:
+        amount = Decimal(cleaned.strip('()'))
+    except InvalidOperation:
+        raise ValueError(f'Invalid amount "{value}"')
+    return -amount if negative else amount
+
+
+def parse_row(raw, account, matcher, date_format=None):
+    """Unsaved Transaction for one row of raw fields"""
+    if not raw.get('date') or not raw.get('amount'):
+        raise ValueError('Missing date or amount')
+    amount = parse_amount(raw['amount'])
+    tx_type = raw.get('type', '').lower()
+    if tx_type not in ('expense', 'income', 'transfer'):
+        # Statements sign money leaving the account as negative
+        tx_type = 'expense' if amount < 0 else 'income'
+    description = raw.get('description', '')
+    return Transaction(
+        user_id=account.user_id,
+        account_id=account.pk,
+        amount=abs(amount),
+        currency=(raw.get('currency') or account.currency)[:3].upper(),
+        type=tx_type,
+        category_id=matcher.match(description),
+        memo=description,
+        date=parse_date(raw['date'], date_format),
+        external_id=raw.get('external_id') or None,
+    )
+
+
+def content_external_id(account_id, tx, occurrence):
+    """Deterministic id for a row the bank gave none, so re-imports deduplicate"""
+    key = f'{account_id}|{tx.date.isoformat()}|{tx.type}|{tx.amount}|{tx.memo}|{occurrence}'
+    return 'import:' + hashlib.sha1(key.encode()).hexdigest()
+
+
+def _insert_chunk(account, chunk):
+    """Insert the rows of ``chunk`` not yet in the account; returns (inserted, duplicates)"""
+    unique = list({tx.external_id: tx for tx in reversed(chunk)}.values())
+    # Filtering on external_id alone keeps the planner on the (external_id, account) index
+    # rather than range-scanning the whole account through (account, date, id)
+    existing = {
+        external_id
+        for external_id, account_id in Transaction.objects.filter(
+            external_id__in=[tx.external_id for tx in unique],
+        ).values_list('external_id', 'account_id')
+        if account_id == account.pk
+    }
+    new = [tx for tx in unique if tx.external_id not in existing]
+    Transaction.objects.bulk_create(new, batch_size=CHUNK_SIZE)
+    return new, len(chunk) - len(new)
+
+
+def _open_text(job):
+    job.file.open('rb')
+    return io.TextIOWrapper(job.file.file, encoding='utf-8-sig', errors='replace', newline='')
+
+
+def run_import(job):
+    """Import ``job.file`` into ``job.account``, recording progress on the job"""
+    account = job.account
+    matcher = MerchantMatcher.for_user(job.user_id)
+    mapping = dict(job.column_mapping or {})
+    date_format = mapping.pop('date_format', None)
+    job.status, job.started_at = 'processing', timezone.now()
+    job.rows_read = job.imported = job.duplicates = job.skipped = 0
+    job.errors = []
+    job.save()
+
+    earliest, occurrences, chunk = None, Counter(), []
+
+    def flush():
+        nonlocal earliest, chunk
+        inserted, duplicates = _insert_chunk(account, chunk)
+        job.imported += len(inserted)
+        job.duplicates += duplicates
+        if inserted:
+            first = min(tx.date for tx in inserted)
+            earliest = first if earliest is None else min(earliest, first)
+        chunk = []
+        job.save(update_fields=['rows_read', 'imported', 'duplicates', 'skipped', 'errors'])
+
+    stream = _open_text(job)
+    try:
+        rows = read_ofx_rows(stream) if job.file_format == 'ofx' else read_csv_rows(stream, mapping)
+        for number, raw in rows:
+            job.rows_read += 1
+            try:
+                tx = parse_row(raw, account, matcher, date_format)
+            except (ValueError, OverflowError) as exc:
+                job.skipped += 1
+                if len(job.errors) < MAX_REPORTED_ERRORS:
+                    job.errors.append({'row': number, 'error': str(exc)})
+                continue
+            if not tx.external_id:
+                digest = hashlib.sha1(f'{tx.date.isoformat()}|{tx.amount}|{tx.memo}'.encode()).digest()
+                occurrences[digest] += 1
+                tx.external_id = content_external_id(account.pk, tx, occurrences[digest])
+            chunk.append(tx)
+            if len(chunk) >= CHUNK_SIZE:
+                flush()
+        if chunk:
+            flush()
+        job.status = 'completed'
+    except Exception as exc:
+        job.status, job.error_message = 'failed', str(exc)
+        if not isinstance(exc, (ValueError, csv.Error)):
+            raise
+    finally:
+        stream.close()
+        # Whatever made it in is posted, even when a later chunk failed
+        if earliest is not None:
+            post_imported_transactions(account.pk, earliest)
+            rebuild_budget_spend(job.user_id)
+            bump_finance_data_version(job.user_id)
+            refresh_daily_facts(job.user_id, timezone.localdate(earliest), timezone.localdate(), modules=['finance'])
+            refresh_activity_profile(job.user_id)
+        job.completed_at = timezone.now()
+        job.save()
+    return job
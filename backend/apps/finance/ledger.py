@@ -0,0 +1,370 @@
+"""Running-balance ledger for accounts.
+
+Transactions of an account are ordered by ``(date, id)`` and each carries the
+account balance after it (``running_balance``). Writes are applied under a
+``SELECT ... FOR UPDATE`` lock on the account row:
+
+* an insert takes its predecessor's running balance (or the opening balance)
+  and shifts every later row by its signed amount with one ``UPDATE``,
+* a delete shifts the later rows back, an edit is a delete plus an insert,
+* a backdated write that would shift more than ``RESEQUENCE_LIMIT`` later rows
+  instead records ``Account.ledger_dirty_from`` and leaves the tail to
+  ``resequence_account_ledger``, which walks it in keyset chunks,
+* rows bulk-inserted without signals (statement imports) are posted with
+  ``post_imported_transactions``, one resequence from the earliest new day.
+
+``Account.balance`` and the per-day ``AccountDailyBalance`` rollup are
+adjusted by the same delta on every write, so they never wait for a
+resequence. Amounts are stored unsigned by some importers, so the sign comes
+from the transaction type: income raises an asset account, expenses and
+outgoing transfers lower it. Liability accounts hold the amount owed and move
+the other way.
+"""
+from collections import defaultdict
+from datetime import datetime, time
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Case, F, OuterRef, Q, Subquery, When
+from django.utils import timezone
+
+from .models import Account, AccountDailyBalance, Transaction
+
+# Later rows a single write may shift inline before deferring to a resequence
+RESEQUENCE_LIMIT = 500
+
+# Rows read per batch when walking an account's ledger
+CHUNK_SIZE = 5000
+
+
+ZERO = Decimal('0.00')
+
+
+def signed_amount(account_type, tx_type, amount):
+    """Change a transaction makes to the balance of an account of ``account_type``"""
+    amount = abs(Decimal(amount))
+    delta = amount if tx_type == 'income' else -amount
+    return -delta if account_type in Account.LIABILITY_TYPES else delta
+
+
+def ledger_entry(tx):
+    """(account_id, date, id, type, amount) recorded for one transaction"""
+    return tx.account_id, tx.date, tx.pk, tx.type, tx.amount
+
+
+def _after(date, pk):
+    return Q(date__gt=date) | Q(date=date, id__gt=pk)
+
+
+def _before(date, pk):
+    return Q(date__lt=date) | Q(date=date, id__lt=pk)
+
+
+def _mark_dirty(account, date):
+    if account.ledger_dirty_from is None or date < account.ledger_dirty_from:
+        account.ledger_dirty_from = date
+        Account.objects.filter(pk=account.pk).update(ledger_dirty_from=date)
+        # Imported here: the task module imports this one
+        from .tasks import resequence_ledger
+        transaction.on_commit(lambda: resequence_ledger.delay(account.pk))
+
+
+def _in_dirty_tail(account, date):
+    return account.ledger_dirty_from is not None and date >= account.ledger_dirty_from
+
+
+def _shift_later(account, date, pk, delta):
+    """Shift running balances after ``(date, pk)`` inline, or defer when there are too many"""
+    later = Transaction.objects.filter(_after(date, pk), account_id=account.pk).exclude(pk=pk)
+    if later.order_by()[:RESEQUENCE_LIMIT + 1].count() > RESEQUENCE_LIMIT:
+        _mark_dirty(account, date)
+        return False
+    later.update(running_balance=F('running_balance') + delta)
+    return True
+
+
+def _apply_daily(account, day, delta):
+    """Add ``delta`` to the rollup row for ``day`` and every closing balance after it"""
+    if not delta:
+        return
+    previous = AccountDailyBalance.objects.filter(
+        account_id=account.pk, date__lt=day
+    ).order_by('-date').values_list('closing_balance', flat=True).first()
+    opening = account.opening_balance if previous is None else previous
+    AccountDailyBalance.objects.bulk_create(
+        [AccountDailyBalance(user_id=account.user_id, account_id=account.pk, date=day, change=ZERO, closing_balance=opening)],
+        ignore_conflicts=True,
+    )
+    AccountDailyBalance.objects.filter(account_id=account.pk, date__gte=day).update(
+        closing_balance=F('closing_balance') + delta,
+        change=Case(When(date=day, then=F('change') + delta), default=F('change')),
+    )
+    # The rollup only keeps days on which the balance moved
+    AccountDailyBalance.objects.filter(account_id=account.pk, date=day, change=0).delete()
+
+
+def _post(account, entry):
+    _, date, pk, tx_type, amount = entry
+    delta = signed_amount(account.account_type, tx_type, amount)
+    if _in_dirty_tail(account, date) or not _shift_later(account, date, pk, delta):
+        Transaction.objects.filter(pk=pk).update(running_balance=None)
+    else:
+        previous = Transaction.objects.filter(
+            _before(date, pk), account_id=account.pk
+        ).order_by('-date', '-id').values_list('running_balance', flat=True).first()
+        # Missing predecessor -> opening balance; a pending predecessor cannot happen outside the dirty tail
+        base = account.opening_balance if previous is None else previous
+        Transaction.objects.filter(pk=pk).update(running_balance=base + delta)
+    _apply_delta(account, date, delta)
+
+
+def _unpost(account, entry):
+    _, date, pk, tx_type, amount = entry
+    delta = signed_amount(account.account_type, tx_type, amount)
+    if not _in_dirty_tail(account, date):
+        _shift_later(account, date, pk, -delta)
+    _apply_delta(account, date, -delta)
+
+
+def _apply_delta(account, date, delta):
+    Account.objects.filter(pk=account.pk).update(balance=F('balance') + delta)
+    _apply_daily(account, timezone.localdate(date), delta)
+
+
+def _lock_accounts(*account_ids):
+    ids = sorted({pk for pk in account_ids if pk is not None})
+    # Lock in primary key order so concurrent writers cannot deadlock
+    accounts = Account.objects.select_for_update().filter(pk__in=ids).order_by('pk')
+    return {account.pk: account for account in accounts}
+
+
+def apply_transaction_change(before=None, after=None):
+    """Move a transaction's ledger entry from ``before`` to ``after`` (either may be None)"""
+    with transaction.atomic():
+        accounts = _lock_accounts(before and before[0], after and after[0])
+        # Entries of accounts deleted along with them have nothing left to maintain
+        if before is not None and before[0] in accounts:
+            _unpost(accounts[before[0]], before)
+        if after is not None and after[0] in accounts:
+            _post(accounts[after[0]], after)
+
+
+def _balance_before(account, since):
+    previous = Transaction.objects.filter(account_id=account.pk, date__lt=since).order_by(
+        '-date', '-id'
+    ).values_list('running_balance', flat=True).first()
+    return account.opening_balance if previous is None else previous
+
+
+def _walk(account, since=None, balance=None):
+    """Yield ``(transaction rows, running balances)`` chunks from ``since`` on, keyset-paginated"""
+    rows = Transaction.objects.filter(account_id=account.pk).values_list(
+        'id', 'date', 'type', 'amount', 'running_balance', named=True,
+    )
+    if balance is None:
+        balance = account.opening_balance if since is None else _balance_before(account, since)
+    if since is not None:
+        rows = rows.filter(date__gte=since)
+    rows = rows.order_by('date', 'id')
+    cursor = None
+    while True:
+        # The plain lower bound lets the (account, date, id) index seek past the OR
+        chunk = list((rows.filter(_after(*cursor), date__gte=cursor[0]) if cursor else rows)[:CHUNK_SIZE])
+        if not chunk:
+            return
+        balances = []
+        for tx in chunk:
+            balance += signed_amount(account.account_type, tx.type, tx.amount)
+            balances.append(balance)
+        yield chunk, balances
+        cursor = chunk[-1].date, chunk[-1].id
+
+
+def _write_running_balances(rows):
+    """Store ``(transaction row, running balance)`` pairs.
+
+    One parameterised ``UPDATE`` per row through ``executemany``: ``bulk_update``
+    builds a ``CASE WHEN`` expression per row, which dominated resequencing
+    large imports.
+    """
+    table = connection.ops.quote_name(Transaction._meta.db_table)
+    column = connection.ops.quote_name(Transaction._meta.get_field('running_balance').column)
+    pk = connection.ops.quote_name(Transaction._meta.pk.column)
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'UPDATE {table} SET {column} = %s WHERE {pk} = %s',
+            [(connection.ops.adapt_decimalfield_value(balance, 16, 2), tx.id) for tx, balance in rows],
+        )
+
+
+def _resequence(account, rebuild_daily=False):
+    """Rewrite running balances from ``ledger_dirty_from`` on (caller holds the account lock).
+
+    With ``rebuild_daily`` the rollup rows from that day on are rebuilt from the
+    same walk, which is only exact when ``ledger_dirty_from`` is a day boundary.
+    """
+    since = account.ledger_dirty_from
+    balance = _balance_before(account, since)
+    rewritten, changes = 0, defaultdict(Decimal)
+    previous = balance
+    for chunk, balances in _walk(account, since, balance):
+        if rebuild_daily:
+            for tx, running in zip(chunk, balances):
+                changes[timezone.localdate(tx.date)] += running - previous
+                previous = running
+        _write_running_balances(zip(chunk, balances))
+        rewritten += len(chunk)
+    updates = {'ledger_dirty_from': None}
+    if rebuild_daily:
+        AccountDailyBalance.objects.filter(account_id=account.pk, date__gte=timezone.localdate(since)).delete()
+        rows, closing = [], balance
+        for day in sorted(changes):
+            if changes[day]:
+                closing += changes[day]
+                rows.append(AccountDailyBalance(
+                    user_id=account.user_id, account_id=account.pk, date=day, change=changes[day], closing_balance=closing,
+                ))
+        AccountDailyBalance.objects.bulk_create(rows, batch_size=CHUNK_SIZE)
+        updates['balance'] = previous
+    Account.objects.filter(pk=account.pk).update(**updates)
+    return rewritten
+
+
+def resequence_account_ledger(account_id):
+    """Recompute the pending running balances of one account; returns rows rewritten"""
+    with transaction.atomic():
+        account = Account.objects.select_for_update().filter(pk=account_id).first()
+        if account is None or account.ledger_dirty_from is None:
+            return 0
+        return _resequence(account)
+
+
+def post_imported_transactions(account_id, since):
+    """Post transactions bulk-inserted on or after ``since`` without per-row signals.
+
+    The ledger is resequenced from the start of that day in one chunked walk,
+    which also rebuilds the daily rollup and sets the balance once.
+    """
+    with transaction.atomic():
+        account = Account.objects.select_for_update().filter(pk=account_id).first()
+        if account is None:
+            return 0
+        if account.ledger_dirty_from is not None:
+            since = min(since, account.ledger_dirty_from)
+        account.ledger_dirty_from = timezone.make_aware(datetime.combine(timezone.localdate(since), time.min))
+        return _resequence(account, rebuild_daily=True)
+
+
+def _expected_ledger(account):
+    """Walk the whole ledger: (running balance mismatches, final balance, per-day changes)"""
+    mismatched, balance, changes = [], account.opening_balance, defaultdict(Decimal)
+    for chunk, balances in _walk(account):
+        for tx, expected in zip(chunk, balances):
+            if tx.running_balance != expected:
+                mismatched.append((tx, expected))
+            changes[timezone.localdate(tx.date)] += expected - balance
+            balance = expected
+    return mismatched, balance, changes
+
+
+def _expected_daily(account, changes):
+    closing, rows = account.opening_balance, {}
+    for day in sorted(changes):
+        if changes[day]:
+            closing += changes[day]
+            rows[day] = (changes[day], closing)
+    return rows
+
+
+def rebuild_account_ledger(account_id):
+    """Rewrite running balances, the balance and the daily rollup of one account from scratch"""
+    with transaction.atomic():
+        account = Account.objects.select_for_update().filter(pk=account_id).first()
+        if account is None:
+            return None
+        mismatched, balance, changes = _expected_ledger(account)
+        _write_running_balances(mismatched)
+        AccountDailyBalance.objects.filter(account_id=account.pk).delete()
+        AccountDailyBalance.objects.bulk_create([
+            AccountDailyBalance(user_id=account.user_id, account_id=account.pk, date=day, change=change, closing_balance=closing)
+            for day, (change, closing) in _expected_daily(account, changes).items()
+        ], batch_size=CHUNK_SIZE)
+        Account.objects.filter(pk=account.pk).update(balance=balance, ledger_dirty_from=None)
+    return balance
+
+
+def check_account_ledger(account):
+    """Problems found in one account's ledger, as human-readable strings"""
+    problems = []
+    mismatched, balance, changes = _expected_ledger(account)
+    if mismatched:
+        tx, expected = mismatched[0]
+        problems.append(
+            f'{len(mismatched)} running balance(s) off, first: transaction {tx.id} '
+            f'has {tx.running_balance}, expected {expected}'
+        )
+    if account.balance != balance:
+        problems.append(f'balance is {account.balance}, ledger gives {balance}')
+    expected_daily = _expected_daily(account, changes)
+    stored_daily = {
+        row['date']: (row['change'], row['closing_balance'])
+        for row in AccountDailyBalance.objects.filter(account_id=account.pk).values('date', 'change', 'closing_balance')
+    }
+    bad_days = sorted(day for day in expected_daily.keys() | stored_daily.keys()
+                      if expected_daily.get(day) != stored_daily.get(day))
+    if bad_days:
+        problems.append(f'{len(bad_days)} daily balance row(s) off, first: {bad_days[0]}')
+    return problems
+
+
+def shift_opening_balance(account_id, delta):
+    """Carry a change of opening balance through running balances, the balance and the rollup"""
+    if not delta:
+        return
+    with transaction.atomic():
+        Account.objects.select_for_update().filter(pk=account_id).first()
+        Transaction.objects.filter(account_id=account_id).update(running_balance=F('running_balance') + delta)
+        AccountDailyBalance.objects.filter(account_id=account_id).update(closing_balance=F('closing_balance') + delta)
+        Account.objects.filter(pk=account_id).update(balance=F('balance') + delta)
+
+
+def net_worth_history(accounts, start, end):
+    """Daily assets / liabilities / net worth of ``accounts`` between ``start`` and ``end``.
+
+    Each account's balance going into ``start`` is its last rollup closing
+    balance before it (or the opening balance), found with one seek per
+    account; only the rollup rows of ``[start, end]`` are then scanned in order.
+    The series starts at ``start`` and has a point for every day any balance moved.
+    """
+    carried = AccountDailyBalance.objects.filter(account_id=OuterRef('pk'), date__lt=start).order_by('-date')
+    closing_before = dict(Account.objects.filter(pk__in=[account.pk for account in accounts]).annotate(
+        carried=Subquery(carried.values('closing_balance')[:1]),
+    ).values_list('pk', 'carried'))
+    latest = {
+        account.pk: account.opening_balance if closing_before.get(account.pk) is None else closing_before[account.pk]
+        for account in accounts
+    }
+    liability = {account.pk for account in accounts if account.is_liability}
+    rows = AccountDailyBalance.objects.filter(
+        account_id__in=list(latest), date__gte=start, date__lte=end,
+    ).order_by('date', 'account_id')
+
+    def point(day):
+        assets = sum((v for pk, v in latest.items() if pk not in liability), ZERO)
+        liabilities = sum((v for pk, v in latest.items() if pk in liability), ZERO)
+        return {'date': day, 'assets': assets, 'liabilities': liabilities, 'net_worth': assets - liabilities}
+
+    history, current = [], None
+    for day, account_id, closing in rows.values_list('date', 'account_id', 'closing_balance').iterator(chunk_size=CHUNK_SIZE):
+        if day != current:
+            if current is not None:
+                history.append(point(current))
+            elif day > start:
+                history.append(point(start))
+            current = day
+        latest[account_id] = closing
+    if current is not None:
+        history.append(point(current))
+    elif latest:
+        history.append(point(start))
+    return history
@@ -0,0 +1,88 @@
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from apps.finance.cash_flow import build_cash_flow, get_cash_flow
+from apps.finance.models import Account, Category, IncomeSource, Transaction
+
+
+def per_transaction_cash_flow(user_id, start_date):
+    """The previous implementation: one Python pass over every transaction"""
+    txs = Transaction.objects.filter(user_id=user_id, date__date__gte=start_date).select_related(
+        'account', 'category', 'income_source'
+    )
+    nodes, links = {}, {}
+    for tx in txs:
+        if tx.type == 'income':
+            names = (tx.income_source.name if tx.income_source else 'Income', tx.account.name)
+        elif tx.type == 'expense':
+            names = (tx.account.name, tx.category.name if tx.category else 'Uncategorized')
+        else:
+            names = (tx.account.name, 'Transfers')
+        key = tuple(nodes.setdefault(name, len(nodes)) for name in names)
+        links[key] = links.get(key, 0) + abs(float(tx.amount))
+    return nodes, links
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the cash-flow Sankey aggregation on a synthetic user'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--transactions', type=int, default=200_000)
+        parser.add_argument('--days', type=int, default=365, help='Window the transactions are spread over')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        # Everything happens in a rolled-back transaction
+        with transaction.atomic():
+            self.run(options)
+            transaction.set_rollback(True)
+
+    def run(self, options):
+        User = get_user_model()
+        user = User.objects.create_user(username='bench-cash-flow', email='bench-cash-flow@example.com', password='x')
+        accounts = [Account.objects.create(user=user, name=f'Account {i}') for i in range(4)]
+        sources = [IncomeSource.objects.create(user=user, name=f'Source {i}') for i in range(3)]
+        roots = [Category.objects.create(user=user, name=f'Category {i}') for i in range(8)]
+        categories = roots + [
+            Category.objects.create(user=user, name=f'{root.name}.{i}', parent=root) for root in roots for i in range(4)
+        ]
+
+        now = timezone.now()
+        rows = []
+        for _ in range(options['transactions']):
+            kind = random.choices(['expense', 'income', 'transfer'], weights=[85, 10, 5])[0]
+            rows.append(Transaction(
+                user=user,
+                account=random.choice(accounts),
+                amount=Decimal(random.randint(100, 50_000)) / 100,
+                type=kind,
+                category=random.choice(categories) if kind == 'expense' else None,
+                income_source=random.choice(sources) if kind == 'income' else None,
+                date=now - timedelta(days=random.randint(0, options['days'] - 1), minutes=random.randint(0, 1439)),
+            ))
+        Transaction.objects.bulk_create(rows, batch_size=5000)
+        start = timezone.localdate() - timedelta(days=options['days'])
+        self.stdout.write(f"{options['transactions']} transactions over {options['days']} days")
+
+        for label, run in [
+            ('per-transaction', lambda: per_transaction_cash_flow(user.pk, start)),
+            ('grouped query', lambda: build_cash_flow(user.pk, start)),
+            ('cached', lambda: get_cash_flow(user.pk, start)),
+        ]:
+            run()
+            timings = []
+            for _ in range(options['repeat']):
+                t0 = time.perf_counter()
+                run()
+                timings.append((time.perf_counter() - t0) * 1000)
+            self.stdout.write(f'{label:>15}: p50={np.median(timings):.2f}ms max={max(timings):.2f}ms')
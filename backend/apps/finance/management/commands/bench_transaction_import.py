@@ -0,0 +1,83 @@
+import csv
+import random
+import resource
+import tempfile
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from apps.finance.importer import run_import
+from apps.finance.ledger import check_account_ledger
+from apps.finance.models import Account, Category, MerchantRule, TransactionImport
+
+MERCHANTS = ['STARBUCKS #{}', 'SHELL OIL {}', 'AMAZON MKTPLACE {}', 'WHOLE FOODS {}', 'UBER TRIP {}', 'NETFLIX.COM', 'ACME PAYROLL']
+
+
+class Command(BaseCommand):
+    help = 'Benchmark importing a synthetic bank CSV (twice, to time the duplicate path)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000)
+        parser.add_argument('--days', type=int, default=3650, help='Window the rows are spread over')
+        parser.add_argument('--rules', type=int, default=50, help='Merchant rules to compile')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        with tempfile.NamedTemporaryFile('w+', suffix='.csv', newline='') as statement:
+            self.write_statement(statement, options)
+            # Everything happens in a rolled-back transaction
+            with transaction.atomic():
+                self.run(statement, options)
+                transaction.set_rollback(True)
+
+    def write_statement(self, statement, options):
+        t0 = time.perf_counter()
+        now = timezone.now()
+        writer = csv.writer(statement)
+        writer.writerow(['Date', 'Description', 'Amount', 'Transaction ID'])
+        for i in range(options['rows']):
+            merchant = random.choice(MERCHANTS).format(random.randint(1, 500))
+            amount = random.randint(100, 300_000) if merchant == 'ACME PAYROLL' else -random.randint(100, 20_000)
+            when = now - timedelta(days=random.randint(0, options['days'] - 1), minutes=random.randint(0, 1439))
+            writer.writerow([when.isoformat(), merchant, f'{amount / 100:.2f}', f'T{i}'])
+        statement.flush()
+        statement.seek(0)
+        self.stdout.write(f"wrote {options['rows']} rows in {time.perf_counter() - t0:.1f}s")
+
+    def run(self, statement, options):
+        User = get_user_model()
+        user = User.objects.create_user(username='bench-import', email='bench-import@example.com', password='x')
+        account = Account.objects.create(user=user, name='Checking', opening_balance=1000)
+        categories = [Category.objects.create(user=user, name=f'Category {i}') for i in range(10)]
+        MerchantRule.objects.bulk_create([
+            MerchantRule(user=user, pattern=f'{random.choice(MERCHANTS).split()[0]} {i}', category=random.choice(categories))
+            for i in range(options['rules'])
+        ] + [MerchantRule(user=user, pattern=r'^uber\b', match_type='regex', category=categories[0], priority=1)])
+
+        for label in ('first import', 're-import'):
+            job = TransactionImport(user=user, account=account)
+            job.file.save('bench.csv', File(statement), save=True)
+            statement.seek(0)
+            try:
+                t0 = time.perf_counter()
+                run_import(job)
+                elapsed = time.perf_counter() - t0
+            finally:
+                job.file.delete(save=False)
+            self.stdout.write(
+                f'{label:>12}: {elapsed:.1f}s ({job.rows_read / elapsed:,.0f} rows/s) '
+                f'imported={job.imported} duplicates={job.duplicates} skipped={job.skipped} status={job.status}'
+            )
+
+        account.refresh_from_db()
+        t0 = time.perf_counter()
+        problems = check_account_ledger(account)
+        self.stdout.write(f'ledger check: {time.perf_counter() - t0:.1f}s, problems={problems or "none"}')
+        peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        self.stdout.write(f'peak RSS: {peak_mb:.0f} MB, balance={account.balance}')
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from apps.finance.ledger import check_account_ledger, rebuild_account_ledger
+from apps.finance.models import Account
+
+
+class Command(BaseCommand):
+    help = 'Verify running balances, account balances and daily balance rows, one account at a time'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Only check accounts of this user email')
+        parser.add_argument('--repair', action='store_true', help='Rebuild the ledger of inconsistent accounts')
+
+    def handle(self, *args, **options):
+        accounts = Account.objects.order_by('pk')
+        if options['user']:
+            accounts = accounts.filter(user__email=options['user'])
+
+        checked = inconsistent = 0
+        for account in accounts.iterator(chunk_size=500):
+            checked += 1
+            if account.ledger_dirty_from is not None:
+                # Pending resequence: the tail is expected to be stale until the task runs
+                self.stdout.write(f'{account.pk} {account.name}: resequence pending from {account.ledger_dirty_from}')
+                continue
+            problems = check_account_ledger(account)
+            if not problems:
+                continue
+            inconsistent += 1
+            for problem in problems:
+                self.stdout.write(self.style.WARNING(f'{account.pk} {account.name}: {problem}'))
+            if options['repair']:
+                rebuild_account_ledger(account.pk)
+                self.stdout.write(f'{account.pk} {account.name}: rebuilt')
+
+        style = self.style.SUCCESS if not inconsistent else self.style.ERROR
+        self.stdout.write(style(f'Checked {checked} accounts, {inconsistent} inconsistent'))
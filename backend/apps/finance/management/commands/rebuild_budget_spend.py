@@ -0,0 +1,25 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from apps.finance.budget_spend import rebuild_budget_spend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild BudgetPeriodSpend rows from transactions, one user at a time'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Only rebuild budget spend for this user email')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        users = User.objects.filter(budgets__isnull=False).distinct().order_by('pk')
+        if options['user']:
+            users = users.filter(email=options['user'])
+
+        total_rows = 0
+        for user in users.iterator(chunk_size=500):
+            rows = rebuild_budget_spend(user.pk)
+            total_rows += rows
+            self.stdout.write(f'{user.email}: {rows} period rows')
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {total_rows} budget period spend rows'))
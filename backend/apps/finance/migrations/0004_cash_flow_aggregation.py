@@ -0,0 +1,45 @@
+# Generated by Django 5.0.14 on 2026-10-19 06:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_ancestry(apps, schema_editor):
+    Category = apps.get_model('finance', 'Category')
+    parents = dict(Category.objects.values_list('pk', 'parent_id'))
+    updated = []
+    for category in Category.objects.only('pk'):
+        ancestors = []
+        parent_id = parents[category.pk]
+        while parent_id is not None and parent_id not in ancestors:
+            ancestors.insert(0, parent_id)
+            parent_id = parents.get(parent_id)
+        category.path = ''.join(f'{pk}/' for pk in ancestors)
+        category.root_id = ancestors[0] if ancestors else None
+        updated.append(category)
+    Category.objects.bulk_update(updated, ['path', 'root'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0003_alter_transaction_date'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='root',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='finance.category'),
+        ),
+        migrations.RunPython(backfill_ancestry, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', 'date'], name='finance_tra_user_id_3294c0_idx'),
+        ),
+    ]
@@ -0,0 +1,111 @@
+# Generated by Django 5.0.14 on 2026-10-19 06:29
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+from django.db.models.functions import Abs
+from django.utils import timezone
+
+LIABILITY_TYPES = {'credit', 'loan', 'liability'}
+
+
+def _signed(account_type, tx_type, amount):
+    delta = abs(amount) if tx_type == 'income' else -abs(amount)
+    return -delta if account_type in LIABILITY_TYPES else delta
+
+
+def backfill_ledger(apps, schema_editor):
+    """Derive opening balances from the current ones and post every existing transaction"""
+    Account = apps.get_model('finance', 'Account')
+    Transaction = apps.get_model('finance', 'Transaction')
+    AccountDailyBalance = apps.get_model('finance', 'AccountDailyBalance')
+    for account in Account.objects.iterator(chunk_size=500):
+        txs = Transaction.objects.filter(account_id=account.pk)
+        totals = txs.values('type').annotate(total=Sum(Abs('amount'))).order_by()
+        net = sum((_signed(account.account_type, row['type'], row['total']) for row in totals), Decimal('0.00'))
+        account.opening_balance = account.balance - net
+        account.save(update_fields=['opening_balance'])
+
+        balance, batch, days = account.opening_balance, [], {}
+        for tx in txs.order_by('date', 'id').only('id', 'date', 'type', 'amount').iterator(chunk_size=5000):
+            balance += _signed(account.account_type, tx.type, tx.amount)
+            tx.running_balance = balance
+            batch.append(tx)
+            days[timezone.localdate(tx.date)] = balance
+            if len(batch) == 5000:
+                Transaction.objects.bulk_update(batch, ['running_balance'])
+                batch = []
+        Transaction.objects.bulk_update(batch, ['running_balance'])
+
+        rows, previous = [], account.opening_balance
+        for day in sorted(days):
+            if days[day] != previous:
+                rows.append(AccountDailyBalance(
+                    user_id=account.user_id, account_id=account.pk, date=day,
+                    change=days[day] - previous, closing_balance=days[day],
+                ))
+            previous = days[day]
+        AccountDailyBalance.objects.bulk_create(rows, batch_size=5000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0004_cash_flow_aggregation'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccountDailyBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('change', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=16)),
+                ('closing_balance', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=16)),
+            ],
+            options={
+                'ordering': ['date'],
+            },
+        ),
+        migrations.AddField(
+            model_name='account',
+            name='ledger_dirty_from',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='account',
+            name='opening_balance',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='running_balance',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=16, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['account', 'date', 'id'], name='finance_tra_account_133aeb_idx'),
+        ),
+        migrations.AddField(
+            model_name='accountdailybalance',
+            name='account',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_balances', to='finance.account'),
+        ),
+        migrations.AddField(
+            model_name='accountdailybalance',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='account_daily_balances', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='accountdailybalance',
+            index=models.Index(fields=['user', 'date'], name='finance_acc_user_id_2bb117_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='accountdailybalance',
+            constraint=models.UniqueConstraint(fields=('account', 'date'), name='unique_account_daily_balance'),
+        ),
+        migrations.RunPython(backfill_ledger, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.0.14 on 2026-10-19 06:59
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0005_account_ledger'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MerchantRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pattern', models.CharField(max_length=255)),
+                ('match_type', models.CharField(choices=[('contains', 'Contains'), ('regex', 'Regular expression')], default='contains', max_length=10)),
+                ('priority', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-priority', 'id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TransactionImport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file', models.FileField(upload_to='transaction_imports/%Y/%m/')),
+                ('file_format', models.CharField(choices=[('csv', 'CSV'), ('ofx', 'OFX')], default='csv', max_length=3)),
+                ('column_mapping', models.JSONField(blank=True, default=dict)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('rows_read', models.PositiveIntegerField(default=0)),
+                ('imported', models.PositiveIntegerField(default=0)),
+                ('duplicates', models.PositiveIntegerField(default=0)),
+                ('skipped', models.PositiveIntegerField(default=0)),
+                ('errors', models.JSONField(blank=True, default=list)),
+                ('error_message', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['external_id', 'account'], name='finance_tra_externa_4da74b_idx'),
+        ),
+        migrations.AddField(
+            model_name='merchantrule',
+            name='category',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='merchant_rules', to='finance.category'),
+        ),
+        migrations.AddField(
+            model_name='merchantrule',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='merchant_rules', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='transactionimport',
+            name='account',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='imports', to='finance.account'),
+        ),
+        migrations.AddField(
+            model_name='transactionimport',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transaction_imports', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
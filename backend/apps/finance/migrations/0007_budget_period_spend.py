@@ -0,0 +1,68 @@
+# Generated by Django 5.0.14 on 2026-10-19 07:16
+
+import django.db.models.deletion
+from decimal import Decimal
+from datetime import datetime, time, timedelta
+
+from django.db import migrations, models
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+
+def backfill_budget_spend(apps, schema_editor):
+    """Open a spend row for the current period of every existing budget"""
+    Budget = apps.get_model('finance', 'Budget')
+    BudgetPeriodSpend = apps.get_model('finance', 'BudgetPeriodSpend')
+    Transaction = apps.get_model('finance', 'Transaction')
+    rows = []
+    for budget in Budget.objects.select_related('category').iterator(chunk_size=500):
+        txs = Transaction.objects.filter(
+            user_id=budget.user_id,
+            type='expense',
+            date__gte=timezone.make_aware(datetime.combine(budget.start_date, time.min)),
+            date__lt=timezone.make_aware(datetime.combine(budget.end_date + timedelta(days=1), time.min)),
+        )
+        if budget.category_id:
+            prefix = f'{budget.category.path}{budget.category_id}/'
+            txs = txs.filter(Q(category_id=budget.category_id) | Q(category__path__startswith=prefix))
+        rows.append(BudgetPeriodSpend(
+            budget_id=budget.pk,
+            period_start=budget.start_date,
+            period_end=budget.end_date,
+            spent=txs.aggregate(total=Sum('amount'))['total'] or Decimal('0.00'),
+        ))
+    BudgetPeriodSpend.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0006_transaction_import'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='budget',
+            name='period',
+            field=models.CharField(choices=[('none', 'One-off'), ('weekly', 'Weekly'), ('monthly', 'Monthly'), ('yearly', 'Yearly')], default='none', max_length=10),
+        ),
+        migrations.CreateModel(
+            name='BudgetPeriodSpend',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period_start', models.DateField()),
+                ('period_end', models.DateField()),
+                ('spent', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=16)),
+                ('budget', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='period_spends', to='finance.budget')),
+            ],
+            options={
+                'ordering': ['period_start'],
+                'indexes': [models.Index(fields=['period_start', 'period_end'], name='finance_bud_period__647db5_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='budgetperiodspend',
+            constraint=models.UniqueConstraint(fields=('budget', 'period_start'), name='unique_budget_period_spend'),
+        ),
+        migrations.RunPython(backfill_budget_spend, migrations.RunPython.noop),
+    ]
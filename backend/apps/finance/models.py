@@ -1,7 +1,10 @@
 from decimal import Decimal
 
 from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models import Value
+from django.db.models.functions import Concat, Substr
 from django.utils import timezone
 
 
@@ -9,21 +12,63 @@ class Account(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='accounts')
     name = models.CharField(max_length=200)
     account_type = models.CharField(max_length=50, default='bank')
+    # Balance before any transaction; ``balance`` is maintained from the ledger
+    opening_balance = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
     balance = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
     currency = models.CharField(max_length=3, default='USD')
+    # Running balances from this point on are pending a background resequence
+    ledger_dirty_from = models.DateTimeField(null=True, blank=True, editable=False)
+
+    LIABILITY_TYPES = {'credit', 'loan', 'liability'}
 
     def __str__(self):
         return f"{self.name} ({self.currency})"
 
+    @property
+    def is_liability(self):
+        return self.account_type in self.LIABILITY_TYPES
+
 
 class Category(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='finance_categories')
     name = models.CharField(max_length=200)
     parent = models.ForeignKey('self', null=True, blank=True, on_delete=models.CASCADE, related_name='children')
+    # Ancestry, maintained on save: ancestor ids from the top level down ("3/8/")
+    # and the top-level ancestor (null for top-level categories themselves)
+    path = models.CharField(max_length=255, blank=True, default='', editable=False, db_index=True)
+    root = models.ForeignKey('self', null=True, blank=True, on_delete=models.CASCADE, related_name='+', editable=False)
 
     def __str__(self):
         return self.name
 
+    @property
+    def ancestor_ids(self):
+        return [int(pk) for pk in self.path.split('/') if pk]
+
+    def descendants(self):
+        return Category.objects.filter(path__startswith=f'{self.path}{self.pk}/')
+
+    def save(self, *args, **kwargs):
+        old_prefix = f'{self.path}{self.pk}/' if self.pk else None
+        if self.parent_id:
+            parent = Category.objects.only('path', 'root_id').get(pk=self.parent_id)
+            if self.pk and (parent.pk == self.pk or self.pk in parent.ancestor_ids):
+                raise ValidationError('A category cannot be nested under itself or its descendants.')
+            self.path = f'{parent.path}{parent.pk}/'
+            self.root_id = parent.root_id or parent.pk
+        else:
+            self.path = ''
+            self.root_id = None
+        super().save(*args, **kwargs)
+
+        new_prefix = f'{self.path}{self.pk}/'
+        if old_prefix and old_prefix != new_prefix:
+            # Re-home the whole subtree in one statement
+            Category.objects.filter(path__startswith=old_prefix).update(
+                path=Concat(Value(new_prefix), Substr('path', len(old_prefix) + 1)),
+                root_id=self.root_id or self.pk,
+            )
+
 
 class IncomeSource(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='income_sources')
@@ -56,29 +101,140 @@ class Transaction(models.Model):
     memo = models.TextField(blank=True)
     date = models.DateTimeField(default=timezone.now)
     external_id = models.CharField(max_length=255, blank=True, null=True)
+    # Account balance after this transaction in (date, id) order; null while pending a resequence
+    running_balance = models.DecimalField(max_digits=16, decimal_places=2, null=True, blank=True, editable=False)
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-date']
+        indexes = [
+            models.Index(fields=['user', 'date']),
+            models.Index(fields=['account', 'date', 'id']),
+            models.Index(fields=['external_id', 'account']),
+        ]
 
     def __str__(self):
         return f"{self.type} {self.amount} {self.currency}"
 
 
+class MerchantRule(models.Model):
+    """Categorizes imported transactions whose description matches ``pattern``"""
+    MATCH_CHOICES = (('contains', 'Contains'), ('regex', 'Regular expression'))
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='merchant_rules')
+    pattern = models.CharField(max_length=255)
+    match_type = models.CharField(max_length=10, choices=MATCH_CHOICES, default='contains')
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='merchant_rules')
+    # Higher priority rules are tried first
+    priority = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-priority', 'id']
+
+    def __str__(self):
+        return f"{self.pattern} -> {self.category_id}"
+
+
+class TransactionImport(models.Model):
+    """One uploaded bank statement and the progress of importing it into an account"""
+    FORMAT_CHOICES = (('csv', 'CSV'), ('ofx', 'OFX'))
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    )
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='transaction_imports')
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='imports')
+    file = models.FileField(upload_to='transaction_imports/%Y/%m/')
+    file_format = models.CharField(max_length=3, choices=FORMAT_CHOICES, default='csv')
+    # Transaction field -> CSV header, e.g. {"date": "Posted Date", "amount": "Amount"}
+    column_mapping = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    rows_read = models.PositiveIntegerField(default=0)
+    imported = models.PositiveIntegerField(default=0)
+    duplicates = models.PositiveIntegerField(default=0)
+    skipped = models.PositiveIntegerField(default=0)
+    # First few rows that could not be parsed: [{"row": 12, "error": "..."}]
+    errors = models.JSONField(default=list, blank=True)
+    error_message = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Import {self.pk} into {self.account_id} ({self.status})"
+
+
+class AccountDailyBalance(models.Model):
+    """Net change and closing balance of an account on each day its balance moved"""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='account_daily_balances')
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='daily_balances')
+    date = models.DateField()
+    change = models.DecimalField(max_digits=16, decimal_places=2, default=Decimal('0.00'))
+    closing_balance = models.DecimalField(max_digits=16, decimal_places=2, default=Decimal('0.00'))
+
+    class Meta:
+        ordering = ['date']
+        constraints = [
+            models.UniqueConstraint(fields=['account', 'date'], name='unique_account_daily_balance'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'date']),
+        ]
+
+    def __str__(self):
+        return f"{self.account_id} {self.date} {self.closing_balance}"
+
+
 class Budget(models.Model):
+    PERIOD_CHOICES = (
+        ('none', 'One-off'),
+        ('weekly', 'Weekly'),
+        ('monthly', 'Monthly'),
+        ('yearly', 'Yearly'),
+    )
+
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='budgets')
     name = models.CharField(max_length=200)
     category = models.ForeignKey(Category, null=True, blank=True, on_delete=models.SET_NULL, related_name='budgets')
     amount = models.DecimalField(max_digits=14, decimal_places=2)
+    # Current period; recurring budgets are rolled forward once it has ended
     start_date = models.DateField()
     end_date = models.DateField()
+    period = models.CharField(max_length=10, choices=PERIOD_CHOICES, default='none')
 
     def __str__(self):
         return self.name
 
 
+class BudgetPeriodSpend(models.Model):
+    """Expense total of one budget period, kept current from transaction writes"""
+    budget = models.ForeignKey(Budget, on_delete=models.CASCADE, related_name='period_spends')
+    period_start = models.DateField()
+    period_end = models.DateField()
+    spent = models.DecimalField(max_digits=16, decimal_places=2, default=Decimal('0.00'))
+
+    class Meta:
+        ordering = ['period_start']
+        constraints = [
+            models.UniqueConstraint(fields=['budget', 'period_start'], name='unique_budget_period_spend'),
+        ]
+        indexes = [
+            models.Index(fields=['period_start', 'period_end']),
+        ]
+
+    def __str__(self):
+        return f"{self.budget_id} {self.period_start}: {self.spent}"
+
+
 class Goal(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='goals')
     name = models.CharField(max_length=200)
@@ -1,3 +1,6 @@
+import os
+import re
+
 from rest_framework import serializers
 
 from .models import (
@@ -10,14 +13,18 @@ from .models import (
     RecurringTransaction,
     InvestmentHolding,
     NetWorthSnapshot,
+    MerchantRule,
+    TransactionImport,
 )
+from .importer import DEFAULT_HEADERS
 
 
 class AccountSerializer(serializers.ModelSerializer):
     class Meta:
         model = Account
         fields = '__all__'
-        read_only_fields = ('user',)
+        # Maintained from the transaction ledger; set ``opening_balance`` instead
+        read_only_fields = ('user', 'balance')
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -26,6 +33,11 @@ class CategorySerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ('user',)
 
+    def validate_parent(self, parent):
+        if parent and self.instance and (parent.pk == self.instance.pk or self.instance.pk in parent.ancestor_ids):
+            raise serializers.ValidationError('A category cannot be nested under itself or its descendants.')
+        return parent
+
 
 class IncomeSourceSerializer(serializers.ModelSerializer):
     class Meta:
@@ -78,3 +90,55 @@ class NetWorthSnapshotSerializer(serializers.ModelSerializer):
         model = NetWorthSnapshot
         fields = '__all__'
         read_only_fields = ('user', 'net_worth')
+
+
+class MerchantRuleSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = MerchantRule
+        fields = '__all__'
+        read_only_fields = ('user', 'created_at')
+
+    def validate_category(self, category):
+        if category.user_id != self.context['request'].user.pk:
+            raise serializers.ValidationError('Unknown category.')
+        return category
+
+    def validate(self, attrs):
+        match_type = attrs.get('match_type', getattr(self.instance, 'match_type', 'contains'))
+        if match_type == 'regex':
+            try:
+                re.compile(attrs.get('pattern', getattr(self.instance, 'pattern', '')))
+            except re.error as exc:
+                raise serializers.ValidationError({'pattern': f'Invalid regular expression: {exc}'})
+        return attrs
+
+
+class TransactionImportSerializer(serializers.ModelSerializer):
+    file_format = serializers.ChoiceField(choices=TransactionImport.FORMAT_CHOICES, required=False)
+
+    class Meta:
+        model = TransactionImport
+        fields = '__all__'
+        read_only_fields = (
+            'user', 'status', 'rows_read', 'imported', 'duplicates', 'skipped', 'errors', 'error_message',
+            'created_at', 'started_at', 'completed_at',
+        )
+
+    def validate_account(self, account):
+        if account.user_id != self.context['request'].user.pk:
+            raise serializers.ValidationError('Unknown account.')
+        return account
+
+    def validate_column_mapping(self, mapping):
+        if not isinstance(mapping, dict):
+            raise serializers.ValidationError('Expected an object of field -> column header.')
+        unknown = set(mapping) - set(DEFAULT_HEADERS) - {'date_format'}
+        if unknown:
+            raise serializers.ValidationError(f'Unknown fields: {", ".join(sorted(unknown))}')
+        return mapping
+
+    def validate(self, attrs):
+        if 'file_format' not in attrs:
+            extension = os.path.splitext(attrs['file'].name)[1].lower()
+            attrs['file_format'] = 'ofx' if extension in ('.ofx', '.qfx') else 'csv'
+        return attrs
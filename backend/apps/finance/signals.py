@@ -0,0 +1,154 @@
+"""Keep derived finance data in step with its source rows.
+
+* cached aggregates are invalidated through a per-user version token,
+* transaction writes are posted to the account ledger (see ``ledger.py``),
+* account edits that change the opening balance or flip between asset and
+  liability carry through to the ledger,
+* expenses are routed to the spend rows of matching budgets (see
+  ``budget_spend.py``); category moves and deletes rebuild the user's rows.
+"""
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from .budget_spend import apply_spend_change, rebuild_budget_spend, refresh_budget_spend, spend_contribution
+from .cash_flow import bump_finance_data_version
+from .ledger import apply_transaction_change, ledger_entry, rebuild_account_ledger, shift_opening_balance
+from .models import Account, Budget, BudgetPeriodSpend, Category, IncomeSource, Transaction
+
+# Models whose writes change cached finance aggregates (names appear in graphs)
+VERSIONED_MODELS = [Transaction, Account, Category, IncomeSource]
+
+
+def _bump_finance_version(sender, instance, **kwargs):
+    bump_finance_data_version(instance.user_id)
+
+
+def connect_finance_signals():
+    for model in VERSIONED_MODELS:
+        post_save.connect(_bump_finance_version, sender=model, dispatch_uid=f'finance_version:{model.__name__}:save')
+        post_delete.connect(_bump_finance_version, sender=model, dispatch_uid=f'finance_version:{model.__name__}:delete')
+
+
+def _remember_previous_transaction(sender, instance, **kwargs):
+    # Shared by the ledger and budget spend handlers
+    previous = None
+    if instance.pk:
+        previous = Transaction.objects.filter(pk=instance.pk).only(
+            'user_id', 'account_id', 'category_id', 'date', 'type', 'amount',
+        ).first()
+    instance._previous_entry = ledger_entry(previous) if previous else None
+    instance._previous_spend = spend_contribution(previous) if previous else None
+
+
+def _post_transaction(sender, instance, **kwargs):
+    before = getattr(instance, '_previous_entry', None)
+    after = ledger_entry(instance)
+    if before != after:
+        apply_transaction_change(before, after)
+    instance._previous_entry = after
+
+
+def _unpost_transaction(sender, instance, origin=None, **kwargs):
+    # Deleting the user or the account removes the whole ledger anyway
+    if getattr(origin, 'model', type(origin)) in (get_user_model(), Account):
+        return
+    apply_transaction_change(before=ledger_entry(instance))
+
+
+def _remember_previous_account(sender, instance, **kwargs):
+    if instance._state.adding:
+        # The ledger starts from the opening balance; older callers pass ``balance``
+        if not instance.opening_balance and instance.balance:
+            instance.opening_balance = instance.balance
+        instance.balance = instance.opening_balance
+        instance._previous_ledger_terms = None
+    else:
+        previous = Account.objects.filter(pk=instance.pk).values_list('opening_balance', 'account_type', 'balance').first()
+        if previous:
+            # ``balance`` belongs to the ledger; never write back a stale in-memory value
+            instance.balance = previous[2]
+        instance._previous_ledger_terms = previous and previous[:2]
+
+
+def _carry_account_change(sender, instance, created=False, **kwargs):
+    previous = getattr(instance, '_previous_ledger_terms', None)
+    if created or previous is None:
+        return
+    opening, account_type = previous
+    if (account_type in Account.LIABILITY_TYPES) != instance.is_liability:
+        rebuild_account_ledger(instance.pk)
+    elif opening != instance.opening_balance:
+        shift_opening_balance(instance.pk, instance.opening_balance - opening)
+    else:
+        return
+    instance.refresh_from_db(fields=['balance'])
+
+
+def connect_ledger_signals():
+    pre_save.connect(_remember_previous_transaction, sender=Transaction, dispatch_uid='ledger:transaction:pre_save')
+    post_save.connect(_post_transaction, sender=Transaction, dispatch_uid='ledger:transaction:save')
+    post_delete.connect(_unpost_transaction, sender=Transaction, dispatch_uid='ledger:transaction:delete')
+    pre_save.connect(_remember_previous_account, sender=Account, dispatch_uid='ledger:account:pre_save')
+    post_save.connect(_carry_account_change, sender=Account, dispatch_uid='ledger:account:save')
+
+
+def _route_spend(sender, instance, **kwargs):
+    after = spend_contribution(instance)
+    apply_spend_change(getattr(instance, '_previous_spend', None), after)
+    instance._previous_spend = after
+
+
+def _unroute_spend(sender, instance, origin=None, **kwargs):
+    # The user's budgets go with them
+    if getattr(origin, 'model', type(origin)) is get_user_model():
+        return
+    apply_spend_change(before=spend_contribution(instance))
+
+
+def _remember_previous_budget(sender, instance, **kwargs):
+    instance._previous_start = None
+    if instance.pk:
+        instance._previous_start = Budget.objects.filter(pk=instance.pk).values_list('start_date', flat=True).first()
+
+
+def _refresh_budget(sender, instance, **kwargs):
+    previous_start = getattr(instance, '_previous_start', None)
+    if previous_start and previous_start != instance.start_date:
+        # An edited period replaces the old row rather than adding history
+        BudgetPeriodSpend.objects.filter(budget=instance, period_start=previous_start).delete()
+    refresh_budget_spend(instance)
+
+
+def _remember_previous_parent(sender, instance, **kwargs):
+    instance._previous_parent_id = None
+    if instance.pk:
+        instance._previous_parent_id = Category.objects.filter(pk=instance.pk).values_list('parent_id', flat=True).first()
+
+
+def _rebuild_spend_after_move(sender, instance, created=False, **kwargs):
+    if not created and instance._previous_parent_id != instance.parent_id:
+        # Category.save re-homes the subtree's paths after this signal has fired
+        user_id = instance.user_id
+        transaction.on_commit(lambda: rebuild_budget_spend(user_id))
+
+
+def _rebuild_spend_after_delete(sender, instance, origin=None, **kwargs):
+    # Transactions and budgets lose the category through SET_NULL, which sends no signals.
+    # Those updates run before any row is deleted, so one rebuild from the deleted
+    # category itself covers its cascaded subcategories too.
+    if getattr(origin, 'model', type(origin)) is get_user_model():
+        return
+    if isinstance(origin, Category) and origin.pk != instance.pk:
+        return
+    rebuild_budget_spend(instance.user_id)
+
+
+def connect_budget_spend_signals():
+    post_save.connect(_route_spend, sender=Transaction, dispatch_uid='budget_spend:transaction:save')
+    post_delete.connect(_unroute_spend, sender=Transaction, dispatch_uid='budget_spend:transaction:delete')
+    pre_save.connect(_remember_previous_budget, sender=Budget, dispatch_uid='budget_spend:budget:pre_save')
+    post_save.connect(_refresh_budget, sender=Budget, dispatch_uid='budget_spend:budget:save')
+    pre_save.connect(_remember_previous_parent, sender=Category, dispatch_uid='budget_spend:category:pre_save')
+    post_save.connect(_rebuild_spend_after_move, sender=Category, dispatch_uid='budget_spend:category:save')
+    post_delete.connect(_rebuild_spend_after_delete, sender=Category, dispatch_uid='budget_spend:category:delete')
@@ -4,7 +4,10 @@ from celery import shared_task
 from django.utils import timezone
 from dateutil.relativedelta import relativedelta
 
-from .models import RecurringTransaction, Transaction
+from .budget_spend import rebuild_budget_spend, roll_budget_periods
+from .importer import run_import
+from .ledger import resequence_account_ledger
+from .models import RecurringTransaction, Transaction, TransactionImport
 
 
 @shared_task(bind=True)
@@ -48,3 +51,31 @@ def process_recurring_transactions(self):
         created += 1
 
     return {'created': created}
+
+
+@shared_task
+def resequence_ledger(account_id):
+    """Recompute running balances left pending by a large backdated write"""
+    return resequence_account_ledger(account_id)
+
+
+@shared_task
+def import_transactions(import_id):
+    """Stream an uploaded statement into its account"""
+    job = TransactionImport.objects.select_related('account').filter(pk=import_id, status='pending').first()
+    if job is None:
+        return None
+    job = run_import(job)
+    return {'status': job.status, 'imported': job.imported, 'duplicates': job.duplicates, 'skipped': job.skipped}
+
+
+@shared_task
+def rollover_budget_periods():
+    """Move recurring budgets whose period ended into their next period"""
+    return {'rolled': roll_budget_periods()}
+
+
+@shared_task
+def reconcile_budget_spend():
+    """Recompute every budget period spend row from transactions"""
+    return {'rows': rebuild_budget_spend()}
@@ -0,0 +1,398 @@
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+
+from celery import current_app
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.analytics.models import DailyUserFacts
+from apps.automation.models import BatchOperation
+
+from . import ledger
+from .budget_spend import compute_period_spend, rebuild_budget_spend, roll_budget_periods
+from .models import (
+    Account, AccountDailyBalance, Budget, BudgetPeriodSpend, Category, IncomeSource, MerchantRule, Transaction,
+    TransactionImport,
+)
+
+User = get_user_model()
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class CategoryAncestryTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='ancestry', email='ancestry@example.com', password='testpass123')
+
+    def test_path_and_root_follow_reparenting(self):
+        food = Category.objects.create(user=self.user, name='Food')
+        dining = Category.objects.create(user=self.user, name='Dining', parent=food)
+        coffee = Category.objects.create(user=self.user, name='Coffee', parent=dining)
+        self.assertEqual(coffee.ancestor_ids, [food.pk, dining.pk])
+        self.assertEqual(coffee.root_id, food.pk)
+        self.assertEqual(set(food.descendants()), {dining, coffee})
+
+        leisure = Category.objects.create(user=self.user, name='Leisure')
+        dining.parent = leisure
+        dining.save()
+        coffee.refresh_from_db()
+        self.assertEqual(coffee.path, f'{leisure.pk}/{dining.pk}/')
+        self.assertEqual(coffee.root_id, leisure.pk)
+
+        dining.parent = None
+        dining.save()
+        coffee.refresh_from_db()
+        self.assertEqual((coffee.path, coffee.root_id), (f'{dining.pk}/', dining.pk))
+
+    def test_cycles_rejected(self):
+        food = Category.objects.create(user=self.user, name='Food')
+        dining = Category.objects.create(user=self.user, name='Dining', parent=food)
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.patch(f'/api/v1/finance/categories/{food.pk}/', {'parent': dining.pk}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class CashFlowTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='cashflow', email='cashflow@example.com', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.checking = Account.objects.create(user=self.user, name='Checking')
+        self.salary = IncomeSource.objects.create(user=self.user, name='Salary')
+        self.food = Category.objects.create(user=self.user, name='Food')
+        self.coffee = Category.objects.create(
+            user=self.user, name='Coffee', parent=Category.objects.create(user=self.user, name='Dining', parent=self.food)
+        )
+        self.transact('income', '3000', income_source=self.salary)
+        self.transact('expense', '4.50', category=self.coffee)
+        self.transact('expense', '-95.50', category=self.food)
+        self.transact('expense', '20')
+        self.transact('transfer', '500')
+        self.transact('expense', '1000', days_ago=200, category=self.food)
+
+    def transact(self, kind, amount, days_ago=1, **kwargs):
+        return Transaction.objects.create(
+            user=self.user, account=self.checking, type=kind, amount=Decimal(amount),
+            date=timezone.now() - timedelta(days=days_ago), **kwargs
+        )
+
+    def graph(self):
+        data = self.client.get('/api/v1/finance/analytics/cash_flow/').data
+        names = [node['name'] for node in data['nodes']]
+        return {(names[link['source']], names[link['target']]): link['value'] for link in data['links']}
+
+    def test_links_grouped_by_source_and_top_level_category(self):
+        self.assertEqual(self.graph(), {
+            ('Salary', 'Checking'): 3000.0,
+            ('Checking', 'Food'): 100.0,
+            ('Checking', 'Uncategorized'): 20.0,
+            ('Checking', 'Transfers'): 500.0,
+        })
+
+    def test_graph_cached_until_transactions_change(self):
+        self.graph()
+        with self.assertNumQueries(0):
+            self.client.get('/api/v1/finance/analytics/cash_flow/')
+
+        self.transact('expense', '50', category=self.coffee)
+        self.assertEqual(self.graph()[('Checking', 'Food')], 150.0)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class AccountLedgerTest(TestCase):
+    def setUp(self):
+        current_app.conf.task_always_eager = True
+        self.addCleanup(setattr, current_app.conf, 'task_always_eager', False)
+        self.user = User.objects.create_user(username='ledger', email='ledger@example.com', password='testpass123')
+        self.checking = Account.objects.create(user=self.user, name='Checking', opening_balance=Decimal('100.00'))
+        self.card = Account.objects.create(user=self.user, name='Card', account_type='credit')
+        self.now = timezone.now()
+
+    def transact(self, kind, amount, days_ago, account=None):
+        return Transaction.objects.create(
+            user=self.user, account=account or self.checking, type=kind, amount=Decimal(amount),
+            date=self.now - timedelta(days=days_ago),
+        )
+
+    def running(self, account=None):
+        return list(Transaction.objects.filter(account=account or self.checking).order_by('date', 'id').values_list(
+            'running_balance', flat=True
+        ))
+
+    def assertConsistent(self, account=None):
+        account = account or self.checking
+        account.refresh_from_db()
+        self.assertEqual(ledger.check_account_ledger(account), [])
+        return account
+
+    def test_out_of_order_inserts_resequence_later_rows(self):
+        self.transact('income', '50', days_ago=1)
+        self.transact('expense', '30', days_ago=3)
+        self.transact('expense', '-20', days_ago=2)
+        self.assertEqual(self.running(), [Decimal('70'), Decimal('50'), Decimal('100')])
+        self.assertEqual(self.assertConsistent().balance, Decimal('100'))
+
+    def test_updates_and_deletes_keep_ledger_consistent(self):
+        first = self.transact('expense', '40', days_ago=5)
+        second = self.transact('income', '10', days_ago=4)
+        self.transact('expense', '5', days_ago=1)
+        second.amount = Decimal('25')
+        second.date = self.now - timedelta(days=6)
+        second.save()
+        self.assertEqual(self.running(), [Decimal('125'), Decimal('85'), Decimal('80')])
+        first.delete()
+        self.assertEqual(self.running(), [Decimal('125'), Decimal('120')])
+        self.assertEqual(self.assertConsistent().balance, Decimal('120'))
+
+        second.account = self.card
+        second.save()
+        self.assertEqual(self.assertConsistent().balance, Decimal('95'))
+        self.assertEqual(self.assertConsistent(self.card).balance, Decimal('-25'))
+
+    def test_large_backdated_write_is_resequenced_in_the_background(self):
+        for days_ago in range(4):
+            self.transact('expense', '1', days_ago=days_ago)
+        with self.captureOnCommitCallbacks(execute=True):
+            original, ledger.RESEQUENCE_LIMIT = ledger.RESEQUENCE_LIMIT, 2
+            try:
+                self.transact('income', '10', days_ago=10)
+                self.assertIsNotNone(Account.objects.get(pk=self.checking.pk).ledger_dirty_from)
+            finally:
+                ledger.RESEQUENCE_LIMIT = original
+        self.assertEqual(self.running(), [Decimal('110'), Decimal('109'), Decimal('108'), Decimal('107'), Decimal('106')])
+        account = self.assertConsistent()
+        self.assertIsNone(account.ledger_dirty_from)
+
+    def test_checker_detects_and_repairs_drift(self):
+        self.transact('expense', '10', days_ago=2)
+        self.transact('expense', '10', days_ago=1)
+        Transaction.objects.filter(account=self.checking).update(running_balance=Decimal('0'))
+        Account.objects.filter(pk=self.checking.pk).update(balance=Decimal('1'))
+        self.checking.refresh_from_db()
+        self.assertEqual(len(ledger.check_account_ledger(self.checking)), 2)
+        ledger.rebuild_account_ledger(self.checking.pk)
+        self.assertEqual(self.assertConsistent().balance, Decimal('80'))
+
+    def test_batch_updates_repost_ledger(self):
+        first = self.transact('expense', '10', days_ago=2)
+        second = self.transact('income', '40', days_ago=1)
+        BatchOperation.objects.create(
+            user=self.user, target_type='finance_transactions', action_type='update',
+            target_ids=[str(first.pk), str(second.pk)], payload={'amount': '25.00'},
+        ).apply()
+        self.assertEqual(self.assertConsistent().balance, Decimal('100'))
+
+        BatchOperation.objects.create(
+            user=self.user, target_type='finance_transactions', action_type='update',
+            target_ids=[str(second.pk)], payload={'account_id': str(self.card.pk)},
+        ).apply()
+        self.assertEqual(self.assertConsistent().balance, Decimal('75'))
+        self.assertEqual(self.assertConsistent(self.card).balance, Decimal('-25'))
+
+    def test_net_worth_history_from_daily_rollup(self):
+        self.transact('income', '50', days_ago=3)
+        self.transact('expense', '30', days_ago=3, account=self.card)
+        self.transact('expense', '20', days_ago=1)
+        Account.objects.create(user=self.user, name='Savings', opening_balance=Decimal('1000'))
+        self.checking.opening_balance = Decimal('200')
+        self.checking.save()
+        self.assertEqual(AccountDailyBalance.objects.filter(account=self.checking).count(), 2)
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with self.assertNumQueries(3):
+            data = client.get('/api/v1/finance/analytics/net_worth/', {'days': 5}).data
+        self.assertEqual((data['assets'], data['liabilities'], data['net_worth']), (1230.0, 30.0, 1200.0))
+        today = timezone.localdate()
+        self.assertEqual([(point['date'], point['net_worth']) for point in data['history']], [
+            ((today - timedelta(days=5)).isoformat(), '1200.00'),
+            ((today - timedelta(days=3)).isoformat(), '1220.00'),
+            ((today - timedelta(days=1)).isoformat(), '1200.00'),
+        ])
+
+        # Closing balances from before the window are carried into its first point
+        data = client.get('/api/v1/finance/analytics/net_worth/', {'days': 2}).data
+        self.assertEqual([(point['date'], point['net_worth']) for point in data['history']], [
+            ((today - timedelta(days=2)).isoformat(), '1220.00'),
+            ((today - timedelta(days=1)).isoformat(), '1200.00'),
+        ])
+
+
+STATEMENT_CSV = """Posted Date,Description,Amount,Ref
+2024-03-01,STARBUCKS #123,-4.50,
+2024-03-02,ACME PAYROLL,"2,500.00",
+2024-03-02,Shell Oil 555,($40.00),
+not a date,Broken row,-1.00,
+2024-03-01,STARBUCKS #123,-4.50,
+"""
+
+STATEMENT_OFX = """OFXHEADER:100
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><CURDEF>USD<BANKTRANLIST>
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20240305120000[-5:EST]<TRNAMT>-12.00<FITID>A1<NAME>UBER TRIP
+<STMTTRN><TRNTYPE>XFER<DTPOSTED>20240306<TRNAMT>-100.00<FITID>A2<NAME>To savings
+</BANKTRANLIST><LEDGERBAL><BALAMT>388.00<DTASOF>20240306</LEDGERBAL></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    MEDIA_ROOT=tempfile.mkdtemp(),
+)
+class TransactionImportTest(TestCase):
+    def setUp(self):
+        current_app.conf.task_always_eager = True
+        self.addCleanup(setattr, current_app.conf, 'task_always_eager', False)
+        self.user = User.objects.create_user(username='importer', email='importer@example.com', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.account = Account.objects.create(user=self.user, name='Checking', opening_balance=Decimal('500'))
+        self.coffee = Category.objects.create(user=self.user, name='Coffee')
+        self.fuel = Category.objects.create(user=self.user, name='Fuel')
+        MerchantRule.objects.create(user=self.user, pattern='starbucks', category=self.coffee)
+        MerchantRule.objects.create(user=self.user, pattern=r'^shell\b', match_type='regex', category=self.fuel, priority=5)
+
+    def upload(self, name, content, **data):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/v1/finance/imports/', {
+                'account': self.account.pk, 'file': SimpleUploadedFile(name, content.encode()), **data,
+            }, format='multipart')
+        self.assertEqual(response.status_code, 201, response.data)
+        return TransactionImport.objects.get(pk=response.data['id'])
+
+    def test_csv_import_categorizes_dedupes_and_posts_ledger(self):
+        job = self.upload('statement.csv', STATEMENT_CSV, column_mapping='{"external_id": "Ref"}')
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual((job.rows_read, job.imported, job.duplicates, job.skipped), (5, 4, 0, 1))
+        self.assertEqual(job.errors[0]['row'], 5)
+        by_memo = {tx.memo: tx for tx in Transaction.objects.filter(account=self.account)}
+        self.assertEqual(by_memo['STARBUCKS #123'].category, self.coffee)
+        self.assertEqual(by_memo['Shell Oil 555'].category, self.fuel)
+        self.assertEqual((by_memo['Shell Oil 555'].type, by_memo['Shell Oil 555'].amount), ('expense', Decimal('40.00')))
+        self.assertEqual(by_memo['ACME PAYROLL'].type, 'income')
+
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, Decimal('2951.00'))
+        self.assertEqual(ledger.check_account_ledger(self.account), [])
+
+        # Posted days reach the daily facts even though bulk_create sends no signals
+        facts = DailyUserFacts.objects.filter(user=self.user, spending__gt=0).order_by('date')
+        self.assertEqual([(f.date.isoformat(), f.spending) for f in facts], [
+            ('2024-03-01', Decimal('9.00')), ('2024-03-02', Decimal('40.00')),
+        ])
+
+        again = self.upload('statement.csv', STATEMENT_CSV)
+        self.assertEqual((again.imported, again.duplicates), (0, 4))
+        self.assertEqual(Transaction.objects.filter(account=self.account).count(), 4)
+
+    def test_ofx_import_uses_fitid(self):
+        Transaction.objects.create(
+            user=self.user, account=self.account, type='expense', amount=Decimal('12.00'), external_id='A1',
+        )
+        job = self.upload('statement.ofx', STATEMENT_OFX)
+        self.assertEqual((job.file_format, job.imported, job.duplicates), ('ofx', 1, 1))
+        transfer = Transaction.objects.get(external_id='A2')
+        self.assertEqual((transfer.type, transfer.amount, transfer.memo), ('transfer', Decimal('100.00'), 'To savings'))
+        self.account.refresh_from_db()
+        self.assertEqual(ledger.check_account_ledger(self.account), [])
+
+    def test_unknown_mapped_column_fails_the_import(self):
+        job = self.upload('statement.csv', STATEMENT_CSV, column_mapping='{"amount": "Value"}')
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('Value', job.error_message)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class BudgetPeriodSpendTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='budgets', email='budgets@example.com', password='testpass123')
+        self.account = Account.objects.create(user=self.user, name='Checking')
+        self.food = Category.objects.create(user=self.user, name='Food')
+        self.dining = Category.objects.create(user=self.user, name='Dining', parent=self.food)
+        self.coffee = Category.objects.create(user=self.user, name='Coffee', parent=self.dining)
+        self.rent = Category.objects.create(user=self.user, name='Rent')
+        self.today = timezone.localdate()
+        start, end = self.today - timedelta(days=10), self.today + timedelta(days=10)
+        self.budgets = [
+            Budget.objects.create(user=self.user, name=name, category=category, amount=Decimal('100'), start_date=start, end_date=end)
+            for name, category in [('Food', self.food), ('Coffee', self.coffee), ('Rent', self.rent), ('All', None)]
+        ]
+
+    def transact(self, amount, category, days_ago=1, kind='expense'):
+        return Transaction.objects.create(
+            user=self.user, account=self.account, type=kind, amount=Decimal(amount), category=category,
+            date=timezone.now() - timedelta(days=days_ago),
+        )
+
+    def spent(self):
+        return {
+            row.budget.name: row.spent
+            for row in BudgetPeriodSpend.objects.filter(budget__user=self.user, period_start=self.today - timedelta(days=10))
+            .select_related('budget')
+        }
+
+    def assertMatchesTransactions(self):
+        for row in BudgetPeriodSpend.objects.filter(budget__user=self.user).select_related('budget__category'):
+            self.assertEqual(row.spent, compute_period_spend(row.budget, row.period_start, row.period_end), row.budget.name)
+
+    def test_writes_route_to_every_budget_in_the_category_ancestry(self):
+        latte = self.transact('4.50', self.coffee)
+        self.transact('30', self.dining)
+        self.transact('900', self.rent)
+        self.transact('15', None)
+        self.transact('2000', None, kind='income')
+        self.transact('99', self.coffee, days_ago=40)
+        self.assertEqual(self.spent(), {
+            'Food': Decimal('34.50'), 'Coffee': Decimal('4.50'), 'Rent': Decimal('900'), 'All': Decimal('949.50'),
+        })
+
+        latte.category = self.rent
+        latte.amount = Decimal('5')
+        latte.save()
+        self.assertEqual(self.spent()['Coffee'], Decimal('0'))
+        self.assertEqual(self.spent()['Rent'], Decimal('905'))
+        latte.delete()
+        self.assertMatchesTransactions()
+
+    def test_category_moves_and_deletes_rebuild(self):
+        self.transact('4.50', self.coffee)
+        self.dining.parent = self.rent
+        with self.captureOnCommitCallbacks(execute=True):
+            self.dining.save()
+        self.assertEqual((self.spent()['Food'], self.spent()['Rent']), (Decimal('0'), Decimal('4.50')))
+        self.coffee.delete()
+        self.assertMatchesTransactions()
+        self.assertEqual(self.spent()['Rent'], Decimal('0'))
+
+    def test_endpoints_read_stored_spend(self):
+        self.transact('50', self.coffee)
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with self.assertNumQueries(1):
+            rows = client.get('/api/v1/finance/analytics/budget_vs_actual/').data
+        self.assertEqual({row['name']: row['actual'] for row in rows}, {'Food': 50.0, 'Coffee': 50.0, 'Rent': 0.0, 'All': 50.0})
+        score = client.get('/api/v1/finance/analytics/health_score/').data
+        # Food, Coffee and All are half spent, Rent untouched
+        self.assertEqual(score['budget_score'], 62.5)
+
+    def test_rollover_opens_next_period_and_keeps_history(self):
+        budget = Budget.objects.create(
+            user=self.user, name='Monthly food', category=self.food, amount=Decimal('300'), period='monthly',
+            start_date=self.today - timedelta(days=70), end_date=self.today - timedelta(days=40),
+        )
+        self.transact('20', self.coffee, days_ago=1)
+        self.transact('7', self.coffee, days_ago=50)
+        self.assertEqual(roll_budget_periods(), 1)
+        budget.refresh_from_db()
+        self.assertTrue(budget.start_date <= self.today <= budget.end_date)
+        history = list(budget.period_spends.values_list('spent', flat=True))
+        self.assertEqual(history[0], Decimal('7'))
+        self.assertEqual(history[-1], compute_period_spend(budget, budget.start_date, budget.end_date))
+
+        BudgetPeriodSpend.objects.update(spent=Decimal('0'))
+        rebuild_budget_spend(self.user.pk)
+        self.assertMatchesTransactions()
@@ -6,6 +6,8 @@ from .views import (
     CategoryViewSet,
     IncomeSourceViewSet,
     TransactionViewSet,
+    MerchantRuleViewSet,
+    TransactionImportViewSet,
     BudgetViewSet,
     GoalViewSet,
     RecurringTransactionViewSet,
@@ -19,6 +21,8 @@ router.register(r'accounts', AccountViewSet, basename='finance-account')
 router.register(r'categories', CategoryViewSet, basename='finance-category')
 router.register(r'income-sources', IncomeSourceViewSet, basename='finance-income-source')
 router.register(r'transactions', TransactionViewSet, basename='finance-transaction')
+router.register(r'merchant-rules', MerchantRuleViewSet, basename='finance-merchant-rule')
+router.register(r'imports', TransactionImportViewSet, basename='finance-import')
 router.register(r'budgets', BudgetViewSet, basename='finance-budget')
 router.register(r'goals', GoalViewSet, basename='finance-goal')
 router.register(r'recurring', RecurringTransactionViewSet, basename='finance-recurring')
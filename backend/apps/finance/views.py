@@ -1,11 +1,12 @@
 from collections import defaultdict
 from datetime import timedelta
 
+from django.db import transaction
 from django.db.models import Sum
 from django.db.models.functions import TruncDate
 from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import viewsets, permissions, filters
+from rest_framework import mixins, viewsets, permissions, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
@@ -19,6 +20,8 @@ from .models import (
     RecurringTransaction,
     InvestmentHolding,
     NetWorthSnapshot,
+    MerchantRule,
+    TransactionImport,
 )
 from .serializers import (
     AccountSerializer,
@@ -30,8 +33,13 @@ from .serializers import (
     RecurringTransactionSerializer,
     InvestmentHoldingSerializer,
     NetWorthSnapshotSerializer,
+    MerchantRuleSerializer,
+    TransactionImportSerializer,
 )
-from .tasks import process_recurring_transactions
+from .budget_spend import with_current_spend
+from .cash_flow import get_cash_flow
+from .ledger import net_worth_history
+from .tasks import import_transactions, process_recurring_transactions
 
 
 class IsOwnerMixin:
@@ -87,6 +95,34 @@ class TransactionViewSet(IsOwnerMixin, viewsets.ModelViewSet):
         return Transaction.objects.filter(user=self.request.user).select_related('account', 'category', 'income_source')
 
 
+class MerchantRuleViewSet(IsOwnerMixin, viewsets.ModelViewSet):
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = MerchantRuleSerializer
+
+    def get_queryset(self):
+        return MerchantRule.objects.filter(user=self.request.user)
+
+
+class TransactionImportViewSet(
+    IsOwnerMixin,
+    mixins.CreateModelMixin,
+    mixins.ListModelMixin,
+    mixins.RetrieveModelMixin,
+    viewsets.GenericViewSet,
+):
+    """Upload a CSV or OFX statement; the import runs in the background"""
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = TransactionImportSerializer
+
+    def get_queryset(self):
+        return TransactionImport.objects.filter(user=self.request.user)
+
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        import_id = serializer.instance.pk
+        transaction.on_commit(lambda: import_transactions.delay(import_id))
+
+
 class BudgetViewSet(IsOwnerMixin, viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = BudgetSerializer
@@ -152,13 +188,6 @@ class NetWorthSnapshotViewSet(IsOwnerMixin, viewsets.ModelViewSet):
 class FinanceAnalyticsViewSet(viewsets.ViewSet):
     permission_classes = [permissions.IsAuthenticated]
 
-    def _get_category_descendants(self, category):
-        descendants = [category.id]
-        children = Category.objects.filter(parent=category)
-        for child in children:
-            descendants.extend(self._get_category_descendants(child))
-        return descendants
-
     @action(detail=False, methods=['get'])
     def spending_trends(self, request):
         days = int(request.query_params.get('days', 90))
@@ -214,56 +243,14 @@ class FinanceAnalyticsViewSet(viewsets.ViewSet):
     def cash_flow(self, request):
         days = int(request.query_params.get('days', 90))
         start = timezone.localdate() - timedelta(days=days)
-        txs = Transaction.objects.filter(user=request.user, date__date__gte=start).select_related(
-            'account', 'category', 'income_source'
-        )
-
-        nodes = {}
-        links = defaultdict(float)
-
-        def node_index(name):
-            if name not in nodes:
-                nodes[name] = len(nodes)
-            return nodes[name]
-
-        for tx in txs:
-            amount = float(tx.amount)
-            if tx.type == 'income':
-                source_name = tx.income_source.name if tx.income_source else 'Income'
-                target_name = tx.account.name if tx.account else 'Account'
-            elif tx.type == 'expense':
-                source_name = tx.account.name if tx.account else 'Account'
-                target_name = tx.category.name if tx.category else 'Uncategorized'
-            else:
-                source_name = tx.account.name if tx.account else 'Account'
-                target_name = 'Transfers'
-            source_idx = node_index(source_name)
-            target_idx = node_index(target_name)
-            links[(source_idx, target_idx)] += abs(amount)
-
-        return Response({
-            'nodes': [{'name': name} for name, _ in sorted(nodes.items(), key=lambda item: item[1])],
-            'links': [
-                {'source': source, 'target': target, 'value': value}
-                for (source, target), value in links.items()
-            ],
-        })
+        return Response(get_cash_flow(request.user.pk, start))
 
     @action(detail=False, methods=['get'])
     def budget_vs_actual(self, request):
-        budgets = Budget.objects.filter(user=request.user).select_related('category')
+        budgets = with_current_spend(Budget.objects.filter(user=request.user).select_related('category'))
         results = []
         for budget in budgets:
-            txs = Transaction.objects.filter(
-                user=request.user,
-                type='expense',
-                date__date__gte=budget.start_date,
-                date__date__lte=budget.end_date,
-            )
-            if budget.category:
-                category_ids = self._get_category_descendants(budget.category)
-                txs = txs.filter(category_id__in=category_ids)
-            actual = txs.aggregate(total=Sum('amount'))['total'] or 0
+            actual = budget.actual
             percent_used = float(actual) / float(budget.amount) * 100 if budget.amount else 0
             results.append({
                 'id': budget.id,
@@ -281,30 +268,35 @@ class FinanceAnalyticsViewSet(viewsets.ViewSet):
 
     @action(detail=False, methods=['get'])
     def net_worth(self, request):
-        accounts = Account.objects.filter(user=request.user)
-        liability_types = {'credit', 'loan', 'liability'}
-        assets = sum(
-            float(a.balance) for a in accounts if a.account_type not in liability_types
-        )
-        liabilities = sum(
-            float(a.balance) for a in accounts if a.account_type in liability_types
-        )
+        accounts = list(Account.objects.filter(user=request.user))
+        assets = sum(float(a.balance) for a in accounts if not a.is_liability)
+        liabilities = sum(float(a.balance) for a in accounts if a.is_liability)
         net_worth = assets - liabilities
 
+        today = timezone.localdate()
         if request.query_params.get('snapshot') == 'true':
-            today = timezone.localdate()
             NetWorthSnapshot.objects.update_or_create(
                 user=request.user,
                 date=today,
                 defaults={'assets': assets, 'liabilities': liabilities},
             )
 
-        history = NetWorthSnapshot.objects.filter(user=request.user).order_by('date')
+        # Daily history comes from the ledger rollup: one ordered scan, no per-day queries
+        days = int(request.query_params.get('days', 365))
+        history = net_worth_history(accounts, today - timedelta(days=days), today)
         return Response({
             'assets': assets,
             'liabilities': liabilities,
             'net_worth': net_worth,
-            'history': NetWorthSnapshotSerializer(history, many=True).data,
+            'history': [
+                {
+                    'date': point['date'].isoformat(),
+                    'assets': str(point['assets']),
+                    'liabilities': str(point['liabilities']),
+                    'net_worth': str(point['net_worth']),
+                }
+                for point in history
+            ],
             'accounts': AccountSerializer(accounts, many=True).data,
         })
 
@@ -319,28 +311,14 @@ class FinanceAnalyticsViewSet(viewsets.ViewSet):
         savings_rate = (float(income_total) - float(expense_total)) / float(income_total) if income_total else 0
         savings_score = max(0, min(100, savings_rate * 100))
 
-        budgets = Budget.objects.filter(user=request.user, end_date__gte=start)
-        budget_percents = []
-        for budget in budgets:
-            txs_budget = Transaction.objects.filter(
-                user=request.user,
-                type='expense',
-                date__date__gte=budget.start_date,
-                date__date__lte=budget.end_date,
-            )
-            if budget.category:
-                category_ids = self._get_category_descendants(budget.category)
-                txs_budget = txs_budget.filter(category_id__in=category_ids)
-            actual = txs_budget.aggregate(total=Sum('amount'))['total'] or 0
-            if budget.amount:
-                budget_percents.append(float(actual) / float(budget.amount))
+        budgets = with_current_spend(Budget.objects.filter(user=request.user, end_date__gte=start))
+        budget_percents = [float(budget.actual) / float(budget.amount) for budget in budgets if budget.amount]
         avg_budget = sum(budget_percents) / len(budget_percents) if budget_percents else 0
         budget_score = max(0, min(100, 100 - (avg_budget * 100)))
 
         accounts = Account.objects.filter(user=request.user)
-        liability_types = {'credit', 'loan', 'liability'}
-        assets = sum(float(a.balance) for a in accounts if a.account_type not in liability_types)
-        liabilities = sum(float(a.balance) for a in accounts if a.account_type in liability_types)
+        assets = sum(float(a.balance) for a in accounts if not a.is_liability)
+        liabilities = sum(float(a.balance) for a in accounts if a.is_liability)
         debt_ratio = liabilities / assets if assets else 0
         debt_score = max(0, min(100, 100 - (debt_ratio * 100)))
 
@@ -20,11 +20,13 @@ from .models import (
     Workout,
     WorkoutExercise,
     ExerciseSet,
+    MuscleGroupVolumeDaily,
     WorkoutLog,
     WorkoutPlan,
     WorkoutPlanWeek,
     WorkoutPlanDay,
     PersonalRecord,
+    BestLift,
     FitnessGoal,
     RestDay,
     ExerciseStats,
@@ -165,6 +167,13 @@ class ExerciseSetAdmin(admin.ModelAdmin):
     date_hierarchy = 'completed_at'
 
 
+@admin.register(MuscleGroupVolumeDaily)
+class MuscleGroupVolumeDailyAdmin(admin.ModelAdmin):
+    list_display = ['user', 'date', 'muscle_group', 'sets', 'reps', 'volume']
+    list_filter = ['muscle_group']
+    date_hierarchy = 'date'
+
+
 @admin.register(WorkoutLog)
 class WorkoutLogAdmin(admin.ModelAdmin):
     list_display = ['user', 'name', 'date', 'duration_minutes', 'intensity', 'total_volume_kg']
@@ -197,6 +206,12 @@ class PersonalRecordAdmin(admin.ModelAdmin):
     date_hierarchy = 'date'
 
 
+@admin.register(BestLift)
+class BestLiftAdmin(admin.ModelAdmin):
+    list_display = ['user', 'exercise', 'rep_range', 'weight_kg', 'reps', 'epley_1rm', 'date']
+    list_filter = ['rep_range']
+
+
 @admin.register(FitnessGoal)
 class FitnessGoalAdmin(admin.ModelAdmin):
     list_display = ['user', 'title', 'goal_type', 'status', 'start_date', 'target_date', 'is_achieved']
@@ -4,3 +4,15 @@ from django.apps import AppConfig
 class HealthConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.health'
+
+    def ready(self):
+        from .signals import (
+            connect_best_lift_signals,
+            connect_exercise_stats_signals,
+            connect_sleep_signals,
+            connect_workout_signals,
+        )
+        connect_sleep_signals()
+        connect_workout_signals()
+        connect_exercise_stats_signals()
+        connect_best_lift_signals()
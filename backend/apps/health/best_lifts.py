@@ -0,0 +1,126 @@
+"""Per-(user, exercise, rep range) best lifts maintained from ExerciseSet writes.
+
+A working set (not a warm-up, with reps and weight) is offered to its rep
+range row with an insert-if-missing followed by a single compare-and-swap
+``UPDATE ... WHERE weight_kg < new`` (reps break ties), so concurrent writers can only ever
+raise the stored best. Estimated one-rep maxes (Epley and Brzycki) are
+computed once here, at write time. When the set holding a best is edited
+down or deleted, only that one row is rebuilt from the user's sets.
+"""
+from decimal import ROUND_FLOOR, Decimal
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import BestLift, ExerciseSet
+
+TWO_PLACES = Decimal('0.01')
+
+# (rep range, lowest reps, highest reps)
+REP_RANGE_BOUNDS = [('1', 1, 1), ('2-3', 2, 3), ('4-6', 4, 6), ('7-10', 7, 10), ('11-15', 11, 15), ('16+', 16, None)]
+
+
+def rep_range(reps):
+    for name, low, high in REP_RANGE_BOUNDS:
+        if reps >= low and (high is None or reps <= high):
+            return name
+    return None
+
+
+def epley_1rm(weight, reps):
+    return weight if reps == 1 else weight * (1 + Decimal(reps) / 30)
+
+
+def brzycki_1rm(weight, reps):
+    # Undefined from 37 reps on; cap the divisor so very long sets stay finite
+    return weight * 36 / max(37 - reps, 1)
+
+
+def lift_key(exercise_set):
+    """(user_id, exercise_id, rep range) a set competes in, or None if it is not a working set"""
+    if exercise_set.is_warmup or not exercise_set.exercise_id or not exercise_set.reps or not exercise_set.weight_kg:
+        return None
+    return exercise_set.user_id, exercise_set.exercise_id, rep_range(exercise_set.reps)
+
+
+def _lift_values(exercise_set):
+    weight = Decimal(exercise_set.weight_kg)
+    reps = exercise_set.reps
+    return {
+        'weight_kg': weight,
+        'reps': reps,
+        'epley_1rm': epley_1rm(weight, reps).quantize(TWO_PLACES),
+        'brzycki_1rm': brzycki_1rm(weight, reps).quantize(TWO_PLACES),
+        'exercise_set_id': exercise_set.pk,
+        'date': timezone.localdate(exercise_set.completed_at),
+    }
+
+
+def offer_set(exercise_set):
+    """Record a set as the best in its rep range if it beats the stored lift"""
+    key = lift_key(exercise_set)
+    if key is None:
+        return False
+    user_id, exercise_id, range_name = key
+    values = _lift_values(exercise_set)
+    BestLift.objects.bulk_create(
+        [BestLift(user_id=user_id, exercise_id=exercise_id, rep_range=range_name, **values)],
+        ignore_conflicts=True,
+    )
+    # Heavier wins; at equal weight more reps win; full ties keep the earlier set
+    return bool(BestLift.objects.filter(
+        Q(weight_kg__lt=values['weight_kg']) | Q(weight_kg=values['weight_kg'], reps__lt=values['reps']),
+        user_id=user_id,
+        exercise_id=exercise_id,
+        rep_range=range_name,
+    ).update(**values))
+
+
+def rebuild_best_lift(user_id, exercise_id, range_name):
+    """Recompute one rep range row from the user's working sets"""
+    low, high = next((low, high) for name, low, high in REP_RANGE_BOUNDS if name == range_name)
+    sets = ExerciseSet.objects.filter(
+        user_id=user_id, exercise_id=exercise_id, is_warmup=False, reps__gte=low, weight_kg__gt=0,
+    )
+    if high is not None:
+        sets = sets.filter(reps__lte=high)
+    best = sets.order_by('-weight_kg', '-reps', 'completed_at').first()
+    lifts = BestLift.objects.filter(user_id=user_id, exercise_id=exercise_id, rep_range=range_name)
+    if best is None:
+        lifts.delete()
+    else:
+        BestLift.objects.update_or_create(
+            user_id=user_id, exercise_id=exercise_id, rep_range=range_name, defaults=_lift_values(best),
+        )
+
+
+def rebuild_best_lifts(user_id):
+    """Recompute every best lift row for a user"""
+    BestLift.objects.filter(user_id=user_id).delete()
+    sets = ExerciseSet.objects.filter(
+        user_id=user_id, is_warmup=False, exercise__isnull=False, reps__gt=0, weight_kg__gt=0,
+    ).order_by('-weight_kg', '-reps', 'completed_at')
+    best = {}
+    for exercise_set in sets.iterator(chunk_size=2000):
+        best.setdefault(lift_key(exercise_set), exercise_set)
+    BestLift.objects.bulk_create([
+        BestLift(user_id=user_id, exercise_id=exercise_id, rep_range=range_name, **_lift_values(exercise_set))
+        for (_, exercise_id, range_name), exercise_set in best.items()
+    ], batch_size=1000)
+    return len(best)
+
+
+def estimated_1rm(lifts):
+    """Best Epley/Brzycki estimates across an exercise's rep range rows"""
+    if not lifts:
+        return None
+    return {
+        'epley': float(max(lift.epley_1rm for lift in lifts)),
+        'brzycki': float(max(lift.brzycki_1rm for lift in lifts)),
+    }
+
+
+def suggested_weight(one_rep_max, reps, increment=Decimal('2.5')):
+    """Working weight for ``reps`` from an Epley 1RM, rounded down to the plate increment"""
+    weight = Decimal(one_rep_max) / (1 + Decimal(reps) / 30)
+    return (weight / increment).to_integral_value(rounding=ROUND_FLOOR) * increment
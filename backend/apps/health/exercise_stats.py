@@ -0,0 +1,268 @@
+"""Incremental maintenance of ExerciseStats from WorkoutLog and ExerciseSet writes.
+
+Each workout contributes ``(date, duration, calories)``, and its sets add
+their reps x weight volume on the workout's date. Saving or deleting a log
+or a set applies the difference between its old and new contribution:
+
+* running totals are adjusted by the delta,
+* workout days are kept as sorted ``[first, last]`` ordinal run intervals, so
+  current and best streaks and the last workout date are read off the runs,
+* the last ``WINDOW_DAYS`` days of per-day totals live in a fixed ring buffer
+  (slot ``ordinal % WINDOW_DAYS``) from which the 30-day averages are derived.
+
+The ring buffer is exact up to ``window_synced_on``. Changes dated after it
+(workouts logged ahead) are left out, and when the calendar moves on the days
+that entered the window are recomputed from the database before anything
+else is applied, so future-dated workouts join the window on their date.
+
+``recompute_exercise_stats`` builds the same state from scratch and is the
+reference the incremental path is tested against.
+"""
+from bisect import bisect_right
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import ExerciseSet, ExerciseStats, WorkoutLog
+
+# Ring buffer covering today and the 30 days before it
+WINDOW_DAYS = 31
+
+# Ring slot layout: [ordinal, workouts, duration_sum, duration_count, volume_sum]
+EMPTY_SLOT = [0, 0, 0, 0, '0']
+
+SET_VOLUME = Coalesce(
+    Sum(ExpressionWrapper(F('reps') * F('weight_kg'), output_field=DecimalField())),
+    Value(Decimal('0')),
+    output_field=DecimalField(),
+)
+
+
+def workout_contribution(log):
+    """(date, duration or None, calories) counted for one WorkoutLog"""
+    return log.date, log.duration_minutes, log.calories_burned or 0
+
+
+def set_volume(exercise_set):
+    """Volume one set adds to its workout, matching ``SET_VOLUME``"""
+    return Decimal(str(round(exercise_set.calculate_volume(), 2)))
+
+
+def add_run_day(runs, ordinal):
+    """Insert a workout day into sorted run intervals, merging neighbours"""
+    i = bisect_right(runs, [ordinal, float('inf')])
+    if i and runs[i - 1][1] >= ordinal:
+        return
+    joins_left = i and runs[i - 1][1] == ordinal - 1
+    joins_right = i < len(runs) and runs[i][0] == ordinal + 1
+    if joins_left and joins_right:
+        runs[i - 1][1] = runs.pop(i)[1]
+    elif joins_left:
+        runs[i - 1][1] = ordinal
+    elif joins_right:
+        runs[i][0] = ordinal
+    else:
+        runs.insert(i, [ordinal, ordinal])
+
+
+def remove_run_day(runs, ordinal):
+    """Remove a day that no longer has workouts, splitting its run if needed"""
+    i = bisect_right(runs, [ordinal, float('inf')]) - 1
+    if i < 0 or runs[i][1] < ordinal:
+        return
+    start, end = runs[i]
+    replacement = []
+    if start < ordinal:
+        replacement.append([start, ordinal - 1])
+    if ordinal < end:
+        replacement.append([ordinal + 1, end])
+    runs[i:i + 1] = replacement
+
+
+def runs_from_days(ordinals):
+    """Run intervals for an ascending sequence of distinct day ordinals"""
+    runs = []
+    for ordinal in ordinals:
+        if runs and runs[-1][1] == ordinal - 1:
+            runs[-1][1] = ordinal
+        else:
+            runs.append([ordinal, ordinal])
+    return runs
+
+
+def _in_window(ordinal, today):
+    return today.toordinal() - WINDOW_DAYS < ordinal <= today.toordinal()
+
+
+def _add_to_window(window, day, workouts, duration, volume, today):
+    ordinal = day.toordinal()
+    if not _in_window(ordinal, today):
+        return
+    slot = window[ordinal % WINDOW_DAYS]
+    if slot[0] != ordinal:
+        slot[:] = [ordinal, *EMPTY_SLOT[1:]]
+    slot[1] += workouts
+    if duration is not None:
+        slot[2] += workouts * duration
+        slot[3] += workouts
+    slot[4] = str(Decimal(slot[4]) + volume)
+
+
+def _window_slots(user_id, after, through):
+    """{ordinal: slot} for the user's workout days in (after, through], from two grouped queries"""
+    slots = {}
+    logs = WorkoutLog.objects.filter(user_id=user_id, date__gt=after, date__lte=through)
+    for row in logs.values('date').annotate(
+        workouts=Count('id'),
+        duration_sum=Sum('duration_minutes'),
+        duration_count=Count('duration_minutes'),
+    ).order_by():
+        ordinal = row['date'].toordinal()
+        slots[ordinal] = [ordinal, row['workouts'], row['duration_sum'] or 0, row['duration_count'], '0']
+    volumes = ExerciseSet.objects.filter(
+        workout_log__user_id=user_id, workout_log__date__gt=after, workout_log__date__lte=through
+    ).values('workout_log__date').annotate(volume=SET_VOLUME).order_by()
+    for row in volumes:
+        slots[row['workout_log__date'].toordinal()][4] = str(row['volume'])
+    return slots
+
+
+def _roll_window(stats, today):
+    """Recompute the slots of days that entered the window since it was synced.
+
+    Returns the ordinals recomputed; they already reflect the database, so
+    changes on those days must not be applied again.
+    """
+    synced = stats.window_synced_on
+    if synced is not None and synced >= today:
+        return set()
+    after = today - timedelta(days=WINDOW_DAYS)
+    if synced is not None:
+        after = max(after, synced)
+    fresh = _window_slots(stats.user_id, after, today)
+    rolled = set(range(after.toordinal() + 1, today.toordinal() + 1))
+    for ordinal in rolled:
+        stats.daily_window[ordinal % WINDOW_DAYS] = fresh.get(ordinal, [ordinal, *EMPTY_SLOT[1:]])
+    stats.window_synced_on = today
+    return rolled
+
+
+def _derive(stats, today):
+    runs = stats.streak_runs
+    today_ordinal = today.toordinal()
+    stats.last_workout_date = date.fromordinal(runs[-1][1]) if runs else None
+    stats.best_streak = max((end - start + 1 for start, end in runs), default=0)
+    i = bisect_right(runs, [today_ordinal, float('inf')]) - 1
+    stats.current_streak = today_ordinal - runs[i][0] + 1 if i >= 0 and runs[i][1] >= today_ordinal else 0
+
+    live = [slot for slot in stats.daily_window if _in_window(slot[0], today) and slot[1]]
+    workouts = sum(slot[1] for slot in live)
+    duration_count = sum(slot[3] for slot in live)
+    stats.avg_duration_30d = round(sum(slot[2] for slot in live) / duration_count) if duration_count else None
+    volume = sum((Decimal(slot[4]) for slot in live), Decimal('0'))
+    stats.avg_volume_30d = (volume / workouts).quantize(Decimal('0.01')) if workouts else None
+
+
+def derive_exercise_stats(stats):
+    """Roll the window forward and re-derive streaks and 30-day averages for today without saving"""
+    today = timezone.localdate()
+    _roll_window(stats, today)
+    _derive(stats, today)
+    return stats
+
+
+def recompute_exercise_stats(stats):
+    """Rebuild totals, streak runs and the 30-day window from all WorkoutLogs and their sets"""
+    today = timezone.localdate()
+    logs = WorkoutLog.objects.filter(user_id=stats.user_id)
+
+    totals = logs.aggregate(
+        workouts=Count('id'),
+        duration=Sum('duration_minutes'),
+        calories=Sum('calories_burned'),
+    )
+    stats.total_workouts = totals['workouts']
+    stats.total_duration_minutes = totals['duration'] or 0
+    stats.total_volume_kg = ExerciseSet.objects.filter(workout_log__user_id=stats.user_id).aggregate(
+        volume=SET_VOLUME
+    )['volume']
+    stats.total_calories_burned = totals['calories'] or 0
+
+    days = logs.order_by('date').values_list('date', flat=True).distinct()
+    stats.streak_runs = runs_from_days(day.toordinal() for day in days)
+
+    stats.daily_window = [list(EMPTY_SLOT) for _ in range(WINDOW_DAYS)]
+    stats.window_synced_on = None
+    _roll_window(stats, today)
+    stats.tracking_initialized = True
+
+    _derive(stats, today)
+    stats.save()
+    return stats
+
+
+def workout_volume(workout_log_id):
+    """Volume of the sets currently recorded against one WorkoutLog"""
+    return ExerciseSet.objects.filter(workout_log_id=workout_log_id).aggregate(volume=SET_VOLUME)['volume']
+
+
+def apply_workout_change(user_id, before=None, after=None, volume=Decimal('0')):
+    """Apply one WorkoutLog's change (contribution ``before`` -> ``after``) to ExerciseStats.
+
+    ``volume`` is what the log's sets still carry: it moves with the log to a
+    new date and leaves with it on delete. Set writes against an existing log
+    go through ``apply_volume_change``.
+    """
+    with transaction.atomic():
+        stats = ExerciseStats.objects.select_for_update().filter(user_id=user_id).first()
+        if stats is None or not stats.tracking_initialized:
+            # Deletes cascading from the user must not recreate the row
+            if after is not None:
+                stats = stats or ExerciseStats.objects.get_or_create(user_id=user_id)[0]
+                recompute_exercise_stats(stats)
+            return stats
+
+        today = timezone.localdate()
+        rolled = _roll_window(stats, today)
+        for contribution, sign in ((before, -1), (after, 1)):
+            if contribution is None:
+                continue
+            day, duration, calories = contribution
+            stats.total_workouts += sign
+            stats.total_duration_minutes += sign * (duration or 0)
+            stats.total_volume_kg = Decimal(stats.total_volume_kg) + sign * volume
+            stats.total_calories_burned += sign * calories
+            if day.toordinal() not in rolled:
+                _add_to_window(stats.daily_window, day, sign, duration, sign * volume, today)
+
+        if before is not None and (after is None or before[0] != after[0]):
+            if not WorkoutLog.objects.filter(user_id=user_id, date=before[0]).exists():
+                remove_run_day(stats.streak_runs, before[0].toordinal())
+        if after is not None:
+            add_run_day(stats.streak_runs, after[0].toordinal())
+
+        _derive(stats, today)
+        stats.save()
+    return stats
+
+
+def apply_volume_change(user_id, day, volume):
+    """Add a signed set volume on ``day`` to ExerciseStats; rows are never created here"""
+    with transaction.atomic():
+        stats = ExerciseStats.objects.select_for_update().filter(user_id=user_id).first()
+        if stats is None or not stats.tracking_initialized:
+            return stats
+
+        today = timezone.localdate()
+        rolled = _roll_window(stats, today)
+        stats.total_volume_kg = Decimal(stats.total_volume_kg) + volume
+        if day.toordinal() not in rolled:
+            _add_to_window(stats.daily_window, day, 0, None, volume, today)
+
+        _derive(stats, today)
+        stats.save()
+    return stats
@@ -0,0 +1,97 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.utils import timezone
+
+from apps.health.models import ExerciseStats, WorkoutLog
+from apps.health.signals import connect_exercise_stats_signals
+
+
+@contextmanager
+def full_recompute_writes():
+    """Swap the incremental signal handlers for a full recompute after each write"""
+    pre_save.disconnect(sender=WorkoutLog, dispatch_uid='exercise_stats:pre_save')
+    post_save.disconnect(sender=WorkoutLog, dispatch_uid='exercise_stats:save')
+    post_delete.disconnect(sender=WorkoutLog, dispatch_uid='exercise_stats:delete')
+    try:
+        yield
+    finally:
+        connect_exercise_stats_signals()
+
+
+class Command(BaseCommand):
+    help = 'Benchmark WorkoutLog write latency with incremental vs full ExerciseStats maintenance'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=730, help='Days of workout history')
+        parser.add_argument('--writes', type=int, default=200, help='Writes timed per mode')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        # Everything happens in a rolled-back transaction
+        with transaction.atomic():
+            self.run(options)
+            transaction.set_rollback(True)
+
+    def run(self, options):
+        User = get_user_model()
+        user = User.objects.create_user(username='bench-exercise-stats', email='bench-exercise-stats@example.com', password='x')
+        today = timezone.localdate()
+        start = timezone.now()
+        history = [
+            WorkoutLog(
+                user=user, name='Workout', workout_type='strength', date=today - timedelta(days=offset),
+                start_time=start, duration_minutes=random.randint(20, 90), total_volume_kg=random.randint(0, 8000),
+                calories_burned=random.randint(100, 600),
+            )
+            for offset in range(options['days'])
+            if random.random() < 0.8
+        ]
+        WorkoutLog.objects.bulk_create(history, batch_size=1000)
+        stats, _ = ExerciseStats.objects.get_or_create(user=user)
+        stats.update_stats()
+
+        self.stdout.write(f"{len(history)} workouts over {options['days']} days, {options['writes']} writes per mode")
+        with full_recompute_writes():
+            self.report('full', self.time_writes(user, options['writes'], recompute=stats.update_stats))
+        self.report('incremental', self.time_writes(user, options['writes']))
+
+    def time_writes(self, user, writes, recompute=None):
+        timings = {'create': [], 'update': [], 'delete': []}
+        today = timezone.localdate()
+        for _ in range(writes):
+            t0 = time.perf_counter()
+            log = WorkoutLog.objects.create(
+                user=user, name='Workout', workout_type='strength',
+                date=today - timedelta(days=random.randint(0, 60)), start_time=timezone.now(),
+                duration_minutes=45, total_volume_kg=1200, calories_burned=300,
+            )
+            if recompute:
+                recompute()
+            t1 = time.perf_counter()
+            log.duration_minutes = 60
+            log.save()
+            if recompute:
+                recompute()
+            t2 = time.perf_counter()
+            log.delete()
+            if recompute:
+                recompute()
+            t3 = time.perf_counter()
+            timings['create'].append((t1 - t0) * 1000)
+            timings['update'].append((t2 - t1) * 1000)
+            timings['delete'].append((t3 - t2) * 1000)
+        return timings
+
+    def report(self, mode, timings):
+        self.stdout.write(f'{mode:>11}: ' + ' | '.join(
+            f'{op} p50={np.median(ms):.2f}ms p95={np.percentile(ms, 95):.2f}ms' for op, ms in timings.items()
+        ))
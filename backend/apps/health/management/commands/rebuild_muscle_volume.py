@@ -0,0 +1,25 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from apps.health.workout_rollups import rebuild_muscle_volume
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the MuscleGroupVolumeDaily rollup from ExerciseSet rows, one user at a time'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Only rebuild the rollup for this user email')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        users = User.objects.filter(exercise_sets__isnull=False).distinct().order_by('pk')
+        if options['user']:
+            users = users.filter(email=options['user'])
+
+        total_rows = 0
+        for user in users.iterator(chunk_size=500):
+            rows = rebuild_muscle_volume(user.pk)
+            total_rows += rows
+            self.stdout.write(f'{user.email}: {rows} rows')
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {total_rows} muscle volume rows'))
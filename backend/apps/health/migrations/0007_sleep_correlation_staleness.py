@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-19 05:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('health', '0006_alter_equipment_options_alter_exercise_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sleepcorrelation',
+            name='stale_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.0.14 on 2026-10-19 06:02
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('health', '0007_sleep_correlation_staleness'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MuscleGroupVolumeDaily',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('date', models.DateField()),
+                ('sets', models.PositiveIntegerField(default=0)),
+                ('reps', models.PositiveIntegerField(default=0)),
+                ('volume', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('muscle_group', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='daily_volume', to='health.musclegroup')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='muscle_volume_daily', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['user', 'date'], name='health_musc_user_id_2a1a1d_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='musclegroupvolumedaily',
+            constraint=models.UniqueConstraint(condition=models.Q(('muscle_group__isnull', False)), fields=('user', 'date', 'muscle_group'), name='unique_muscle_volume_per_day'),
+        ),
+        migrations.AddConstraint(
+            model_name='musclegroupvolumedaily',
+            constraint=models.UniqueConstraint(condition=models.Q(('muscle_group__isnull', True)), fields=('user', 'date'), name='unique_total_volume_per_day'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.14 on 2026-10-19 06:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('health', '0008_muscle_group_volume_daily'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exercisestats',
+            name='daily_window',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='exercisestats',
+            name='streak_runs',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='exercisestats',
+            name='tracking_initialized',
+            field=models.BooleanField(default=False),
+        ),
+    ]
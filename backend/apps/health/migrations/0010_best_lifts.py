@@ -0,0 +1,36 @@
+# Generated by Django 5.0.14 on 2026-10-19 06:11
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('health', '0009_exercise_stats_incremental'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BestLift',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('rep_range', models.CharField(choices=[('1', '1 rep'), ('2-3', '2-3 reps'), ('4-6', '4-6 reps'), ('7-10', '7-10 reps'), ('11-15', '11-15 reps'), ('16+', '16+ reps')], max_length=5)),
+                ('weight_kg', models.DecimalField(decimal_places=2, max_digits=6)),
+                ('reps', models.PositiveIntegerField()),
+                ('epley_1rm', models.DecimalField(decimal_places=2, max_digits=7)),
+                ('brzycki_1rm', models.DecimalField(decimal_places=2, max_digits=7)),
+                ('date', models.DateField()),
+                ('exercise', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='best_lifts', to='health.exercise')),
+                ('exercise_set', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='health.exerciseset')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='best_lifts', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['exercise', 'rep_range'],
+                'unique_together': {('user', 'exercise', 'rep_range')},
+            },
+        ),
+    ]
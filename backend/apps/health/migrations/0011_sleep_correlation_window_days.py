@@ -0,0 +1,43 @@
+from django.db import migrations, models
+
+
+def key_rows_by_window(apps, schema_editor):
+    """Set window_days from each row's dates and keep only the newest row per window"""
+    SleepCorrelation = apps.get_model('health', 'SleepCorrelation')
+    seen, superseded, windows = set(), [], {}
+    rows = SleepCorrelation.objects.order_by('-end_date', '-computed_at').values_list(
+        'id', 'user_id', 'correlation_type', 'start_date', 'end_date'
+    )
+    for pk, user_id, correlation_type, start_date, end_date in rows.iterator(chunk_size=2000):
+        window_days = (end_date - start_date).days
+        key = (user_id, correlation_type, window_days)
+        if key in seen:
+            superseded.append(pk)
+        else:
+            seen.add(key)
+            windows.setdefault(window_days, []).append(pk)
+    for start in range(0, len(superseded), 1000):
+        SleepCorrelation.objects.filter(pk__in=superseded[start:start + 1000]).delete()
+    for window_days, pks in windows.items():
+        for start in range(0, len(pks), 1000):
+            SleepCorrelation.objects.filter(pk__in=pks[start:start + 1000]).update(window_days=window_days)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('health', '0010_best_lifts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sleepcorrelation',
+            name='window_days',
+            field=models.PositiveIntegerField(default=30),
+        ),
+        migrations.RunPython(key_rows_by_window, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='sleepcorrelation',
+            unique_together={('user', 'correlation_type', 'window_days')},
+        ),
+    ]
@@ -0,0 +1,23 @@
+from django.db import migrations, models
+
+
+def reset_incremental_state(apps, schema_editor):
+    """Rebuild stats on next use: volume now comes from sets and the window needs a sync date"""
+    ExerciseStats = apps.get_model('health', 'ExerciseStats')
+    ExerciseStats.objects.filter(tracking_initialized=True).update(tracking_initialized=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('health', '0011_sleep_correlation_window_days'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exercisestats',
+            name='window_synced_on',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.RunPython(reset_incremental_state, migrations.RunPython.noop),
+    ]
@@ -4,7 +4,7 @@ from datetime import timedelta, date
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.utils import timezone
-from django.db.models import Avg, Sum, Count, StdDev, F, ExpressionWrapper, DurationField
+from django.db.models import Avg, Count, StdDev, F, ExpressionWrapper, DurationField
 
 User = get_user_model()
 
@@ -500,7 +500,8 @@ class SleepCorrelation(models.Model):
     quality_correlation = models.DecimalField(max_digits=4, decimal_places=3, null=True, blank=True)
     score_correlation = models.DecimalField(max_digits=4, decimal_places=3, null=True, blank=True)
 
-    # Time period
+    # Time period; each window length keeps one row per type, moved forward on refresh
+    window_days = models.PositiveIntegerField(default=30)
     start_date = models.DateField()
     end_date = models.DateField()
 
@@ -511,10 +512,12 @@ class SleepCorrelation(models.Model):
     insights = models.JSONField(default=dict, blank=True)
 
     computed_at = models.DateTimeField(auto_now_add=True)
+    # Set when source data changes after computation; null while fresh
+    stale_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         ordering = ['-computed_at']
-        unique_together = ['user', 'correlation_type', 'start_date', 'end_date']
+        unique_together = ['user', 'correlation_type', 'window_days']
 
     def __str__(self):
         return f"{self.get_correlation_type_display()} correlation for {self.user.email}"
@@ -840,6 +843,43 @@ class ExerciseSet(models.Model):
         return 0
 
 
+class MuscleGroupVolumeDaily(models.Model):
+    """Per-day training totals by muscle group, maintained from ExerciseSet writes.
+
+    A set counts toward every muscle group its exercise trains. The row with
+    no muscle group holds the day's totals over all sets, counted once.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='muscle_volume_daily')
+    date = models.DateField()
+    muscle_group = models.ForeignKey(MuscleGroup, on_delete=models.CASCADE, null=True, blank=True, related_name='daily_volume')
+
+    sets = models.PositiveIntegerField(default=0)
+    reps = models.PositiveIntegerField(default=0)
+    volume = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['-date']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'date', 'muscle_group'],
+                condition=models.Q(muscle_group__isnull=False),
+                name='unique_muscle_volume_per_day',
+            ),
+            models.UniqueConstraint(
+                fields=['user', 'date'],
+                condition=models.Q(muscle_group__isnull=True),
+                name='unique_total_volume_per_day',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'date']),
+        ]
+
+    def __str__(self):
+        return f"{self.user.email} {self.date} {self.muscle_group or 'all'}"
+
+
 class WorkoutLog(models.Model):
     INTENSITY_RATINGS = [(i, str(i)) for i in range(1, 11)]
 
@@ -999,6 +1039,39 @@ class PersonalRecord(models.Model):
         return f"{self.exercise.name} - {self.get_record_type_display()} - {self.date}"
 
 
+class BestLift(models.Model):
+    """Heaviest working set per (user, exercise, rep range), kept current on ExerciseSet writes"""
+    REP_RANGES = [
+        ('1', '1 rep'),
+        ('2-3', '2-3 reps'),
+        ('4-6', '4-6 reps'),
+        ('7-10', '7-10 reps'),
+        ('11-15', '11-15 reps'),
+        ('16+', '16+ reps'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='best_lifts')
+    exercise = models.ForeignKey(Exercise, on_delete=models.CASCADE, related_name='best_lifts')
+    rep_range = models.CharField(max_length=5, choices=REP_RANGES)
+
+    weight_kg = models.DecimalField(max_digits=6, decimal_places=2)
+    reps = models.PositiveIntegerField()
+    # Estimated one-rep max of this set, computed at write time
+    epley_1rm = models.DecimalField(max_digits=7, decimal_places=2)
+    brzycki_1rm = models.DecimalField(max_digits=7, decimal_places=2)
+
+    exercise_set = models.ForeignKey(ExerciseSet, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    date = models.DateField()
+
+    class Meta:
+        ordering = ['exercise', 'rep_range']
+        unique_together = ['user', 'exercise', 'rep_range']
+
+    def __str__(self):
+        return f"{self.exercise.name} {self.rep_range}: {self.weight_kg}kg x {self.reps}"
+
+
 class FitnessGoal(models.Model):
     GOAL_TYPES = [
         ('weight_loss', 'Weight Loss'),
@@ -1119,6 +1192,12 @@ class ExerciseStats(models.Model):
     exercise_counts = models.JSONField(default=dict, blank=True)
     muscle_group_balance = models.JSONField(default=dict, blank=True)
 
+    # Incremental state: workout-day run intervals and a ring buffer of daily totals
+    streak_runs = models.JSONField(default=list, blank=True)
+    daily_window = models.JSONField(default=list, blank=True)
+    window_synced_on = models.DateField(null=True, blank=True)
+    tracking_initialized = models.BooleanField(default=False)
+
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
@@ -1128,33 +1207,9 @@ class ExerciseStats(models.Model):
         return f"Exercise stats for {self.user.email}"
 
     def update_stats(self):
-        from django.db.models import Sum, Count, Avg
-
-        logs = WorkoutLog.objects.filter(user=self.user)
-        self.total_workouts = logs.count()
-
-        last_30_days = timezone.now().date() - timedelta(days=30)
-        recent_logs = logs.filter(date__gte=last_30_days)
-
-        if recent_logs.exists():
-            self.avg_duration_30d = recent_logs.aggregate(avg=Avg('duration_minutes'))['avg']
-
-        self.total_calories_burned = logs.aggregate(total=Sum('calories_burned'))['total'] or 0
-
-        last_log = logs.order_by('-date').first()
-        if last_log:
-            self.last_workout_date = last_log.date
-
-        # Calculate streak
-        streak = 0
-        check_date = timezone.now().date()
-        while logs.filter(date=check_date).exists():
-            streak += 1
-            check_date -= timedelta(days=1)
-        self.current_streak = streak
-        self.best_streak = max(self.best_streak, streak)
-
-        self.save()
+        """Full recompute; WorkoutLog writes keep the stats current incrementally"""
+        from .exercise_stats import recompute_exercise_stats
+        recompute_exercise_stats(self)
 
 
 class ProgressiveOverload(models.Model):
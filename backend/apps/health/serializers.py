@@ -27,6 +27,7 @@ from .models import (
     WorkoutPlanWeek,
     WorkoutPlanDay,
     PersonalRecord,
+    BestLift,
     FitnessGoal,
     RestDay,
     ExerciseStats,
@@ -345,8 +346,9 @@ class SleepCorrelationSerializer(serializers.ModelSerializer):
             'data_points',
             'insights',
             'computed_at',
+            'stale_at',
         ]
-        read_only_fields = ['id', 'computed_at']
+        read_only_fields = ['id', 'computed_at', 'stale_at']
 
 
 class SleepInsightSerializer(serializers.ModelSerializer):
@@ -682,6 +684,24 @@ class PersonalRecordSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at']
 
 
+class BestLiftSerializer(serializers.ModelSerializer):
+    rep_range_label = serializers.CharField(source='get_rep_range_display', read_only=True)
+
+    class Meta:
+        model = BestLift
+        fields = [
+            'rep_range',
+            'rep_range_label',
+            'weight_kg',
+            'reps',
+            'epley_1rm',
+            'brzycki_1rm',
+            'exercise_set',
+            'date',
+        ]
+        read_only_fields = fields
+
+
 class FitnessGoalSerializer(serializers.ModelSerializer):
     goal_type_label = serializers.CharField(source='get_goal_type_display', read_only=True)
     status_label = serializers.CharField(source='get_status_display', read_only=True)
@@ -0,0 +1,200 @@
+"""Keep derived health data in step with its source rows."""
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+
+from .best_lifts import lift_key, offer_set, rebuild_best_lift
+from .exercise_stats import (
+    apply_volume_change, apply_workout_change, set_volume, workout_contribution, workout_volume,
+)
+from .models import BestLift, Exercise, ExerciseSet, SleepLog, WorkoutLog
+from .sleep_analytics import bump_sleep_data_version
+from .sleep_correlations import mark_correlations_stale
+from .workout_rollups import apply_set_delta, exercise_set_days, rebuild_muscle_volume, set_contribution
+
+# Models whose writes make stored sleep correlations stale
+CORRELATION_SOURCES = ['health.SleepLog', 'health.ExerciseLog', 'journal.JournalMood', 'pomodoro.PomodoroSession']
+
+
+def _bump_sleep_version(sender, instance, **kwargs):
+    bump_sleep_data_version(instance.user_id)
+
+
+def _mark_correlations_stale(sender, instance, **kwargs):
+    mark_correlations_stale(instance.user_id)
+
+
+def connect_sleep_signals():
+    post_save.connect(_bump_sleep_version, sender=SleepLog, dispatch_uid='sleep_analytics:save')
+    post_delete.connect(_bump_sleep_version, sender=SleepLog, dispatch_uid='sleep_analytics:delete')
+    for label in CORRELATION_SOURCES:
+        model = apps.get_model(label)
+        post_save.connect(_mark_correlations_stale, sender=model, dispatch_uid=f'sleep_correlations:{label}')
+        post_delete.connect(_mark_correlations_stale, sender=model, dispatch_uid=f'sleep_correlations:{label}')
+
+
+def _remember_previous_set(sender, instance, raw=False, **kwargs):
+    # Shared by the muscle volume rollup and best lift handlers
+    instance._previous_row = None
+    if not raw and not instance._state.adding:
+        instance._previous_row = ExerciseSet.objects.filter(pk=instance.pk).first()
+
+
+def _apply_set_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    user_id, day, group_ids, reps, volume = set_contribution(instance)
+    previous_row = getattr(instance, '_previous_row', None)
+    previous = set_contribution(previous_row) if previous_row is not None else None
+    if previous is not None:
+        if previous[:3] == (user_id, day, group_ids):
+            if (reps, volume) != previous[3:]:
+                apply_set_delta(user_id, day, group_ids, 0, reps - previous[3], volume - previous[4])
+            return
+        apply_set_delta(*previous[:3], -1, -previous[3], -previous[4])
+    apply_set_delta(user_id, day, group_ids, 1, reps, volume)
+
+
+def _apply_set_deleted(sender, instance, **kwargs):
+    user_id, day, group_ids, reps, volume = set_contribution(instance)
+    apply_set_delta(user_id, day, group_ids, -1, -reps, -volume)
+
+
+def _rebuild_for_exercises(exercise_ids):
+    for user_id, days in exercise_set_days(exercise_ids).items():
+        rebuild_muscle_volume(user_id, days)
+
+
+def _muscle_groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        _rebuild_for_exercises([instance.pk])
+    elif pk_set:
+        _rebuild_for_exercises(pk_set)
+
+
+def _remember_exercise_days(sender, instance, **kwargs):
+    instance._rollup_days = exercise_set_days([instance.pk])
+
+
+def _rebuild_after_exercise_deleted(sender, instance, origin=None, **kwargs):
+    # Sets were detached from the exercise (SET_NULL) without set signals; when
+    # the exercise goes as part of a user delete the rollup is removed too
+    if getattr(origin, 'model', type(origin)) is not Exercise:
+        return
+    for user_id, days in getattr(instance, '_rollup_days', {}).items():
+        rebuild_muscle_volume(user_id, days)
+
+
+def connect_workout_signals():
+    pre_save.connect(_remember_previous_set, sender=ExerciseSet, dispatch_uid='exercise_set:pre_save')
+    post_save.connect(_apply_set_saved, sender=ExerciseSet, dispatch_uid='muscle_volume:save')
+    post_delete.connect(_apply_set_deleted, sender=ExerciseSet, dispatch_uid='muscle_volume:delete')
+    m2m_changed.connect(_muscle_groups_changed, sender=Exercise.muscle_groups.through, dispatch_uid='muscle_volume:m2m')
+    pre_delete.connect(_remember_exercise_days, sender=Exercise, dispatch_uid='muscle_volume:exercise_pre_delete')
+    post_delete.connect(_rebuild_after_exercise_deleted, sender=Exercise, dispatch_uid='muscle_volume:exercise_delete')
+
+
+def _remember_previous_workout(sender, instance, raw=False, **kwargs):
+    instance._stats_previous = None
+    if raw or instance._state.adding:
+        return
+    previous = WorkoutLog.objects.filter(pk=instance.pk).first()
+    if previous is not None:
+        instance._stats_previous = workout_contribution(previous)
+
+
+def _apply_workout_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    before = getattr(instance, '_stats_previous', None)
+    after = workout_contribution(instance)
+    if before != after:
+        # The log's sets move with it to the new date
+        volume = workout_volume(instance.pk) if before is not None and before[0] != after[0] else 0
+        apply_workout_change(instance.user_id, before=before, after=after, volume=volume)
+
+
+def _apply_workout_deleted(sender, instance, **kwargs):
+    # Cascaded sets not yet deleted leave with the log; any already gone were
+    # counted by their own handler while the log still existed
+    apply_workout_change(instance.user_id, before=workout_contribution(instance), volume=workout_volume(instance.pk))
+
+
+def _workout_volume_state(exercise_set):
+    return exercise_set.workout_log_id, set_volume(exercise_set)
+
+
+def _apply_volume(workout_log_id, volume):
+    if workout_log_id is None or not volume:
+        return
+    workout = WorkoutLog.objects.filter(pk=workout_log_id).values_list('user_id', 'date').first()
+    if workout is not None:
+        apply_volume_change(*workout, volume)
+
+
+def _apply_set_volume_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous_row = getattr(instance, '_previous_row', None)
+    previous = _workout_volume_state(previous_row) if previous_row is not None else (None, 0)
+    current = _workout_volume_state(instance)
+    if previous == current:
+        return
+    if previous[0] == current[0]:
+        _apply_volume(current[0], current[1] - previous[1])
+        return
+    _apply_volume(previous[0], -previous[1])
+    _apply_volume(*current)
+
+
+def _apply_set_volume_deleted(sender, instance, **kwargs):
+    workout_log_id, volume = _workout_volume_state(instance)
+    _apply_volume(workout_log_id, -volume)
+
+
+def connect_exercise_stats_signals():
+    pre_save.connect(_remember_previous_workout, sender=WorkoutLog, dispatch_uid='exercise_stats:pre_save')
+    post_save.connect(_apply_workout_saved, sender=WorkoutLog, dispatch_uid='exercise_stats:save')
+    post_delete.connect(_apply_workout_deleted, sender=WorkoutLog, dispatch_uid='exercise_stats:delete')
+    pre_save.connect(_remember_previous_set, sender=ExerciseSet, dispatch_uid='exercise_set:pre_save')
+    post_save.connect(_apply_set_volume_saved, sender=ExerciseSet, dispatch_uid='exercise_stats:set_save')
+    post_delete.connect(_apply_set_volume_deleted, sender=ExerciseSet, dispatch_uid='exercise_stats:set_delete')
+
+
+def _lift_state(exercise_set):
+    return lift_key(exercise_set), exercise_set.weight_kg, exercise_set.reps
+
+
+def _offer_saved_set(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous_row = getattr(instance, '_previous_row', None)
+    previous = _lift_state(previous_row) if previous_row is not None else None
+    if previous and previous != _lift_state(instance) and previous[0]:
+        # The edited set may have held a best it no longer earns
+        if BestLift.objects.filter(exercise_set_id=instance.pk).exists():
+            rebuild_best_lift(*previous[0])
+    offer_set(instance)
+
+
+def _remember_held_lifts(sender, instance, **kwargs):
+    instance._held_lifts = list(
+        BestLift.objects.filter(exercise_set_id=instance.pk).values_list('user_id', 'exercise_id', 'rep_range')
+    )
+
+
+def _rebuild_held_lifts(sender, instance, origin=None, **kwargs):
+    # Deleting the user or the exercise removes its best lifts as well
+    if getattr(origin, 'model', type(origin)) in (get_user_model(), Exercise):
+        return
+    for key in getattr(instance, '_held_lifts', []):
+        rebuild_best_lift(*key)
+
+
+def connect_best_lift_signals():
+    pre_save.connect(_remember_previous_set, sender=ExerciseSet, dispatch_uid='exercise_set:pre_save')
+    post_save.connect(_offer_saved_set, sender=ExerciseSet, dispatch_uid='best_lifts:save')
+    pre_delete.connect(_remember_held_lifts, sender=ExerciseSet, dispatch_uid='best_lifts:pre_delete')
+    post_delete.connect(_rebuild_held_lifts, sender=ExerciseSet, dispatch_uid='best_lifts:delete')
@@ -0,0 +1,231 @@
+"""Memoized sleep analytics for the SleepLogViewSet insight endpoints.
+
+The user's sleep history is fetched once as ``(date, bed minute, wake
+minute, duration, quality, score)`` rows into NumPy arrays; bed and wake
+times are converted to local minute-of-day in the database. Every derived
+result is memoized in the cache under the user's sleep data version, a
+random token replaced on each SleepLog write, so reads stay cache hits until
+the history actually changes.
+"""
+import math
+import uuid
+
+import numpy as np
+from django.core.cache import cache
+from django.db.models.functions import ExtractHour, ExtractMinute
+
+from .models import SleepLog
+
+MINUTES_PER_DAY = 24 * 60
+RESULT_TIMEOUT = 60 * 60 * 24
+
+# Optimal window search: bed-time histogram resolution and window width
+WINDOW_BIN_MINUTES = 15
+WINDOW_MINUTES = 60
+WINDOW_MIN_POINTS = 3
+
+
+def _version_key(user_id):
+    return f'sleep_data_version:{user_id}'
+
+
+def get_sleep_data_version(user_id):
+    return cache.get_or_set(_version_key(user_id), uuid.uuid4().hex, None)
+
+
+def bump_sleep_data_version(user_id):
+    """Invalidate every memoized sleep result for a user"""
+    cache.set(_version_key(user_id), uuid.uuid4().hex, None)
+
+
+def _score(value):
+    return None if np.isnan(value) or not value else float(value)
+
+
+def _format_minutes(minutes):
+    minutes = int(round(minutes)) % MINUTES_PER_DAY
+    return f'{minutes // 60:02d}:{minutes % 60:02d}'
+
+
+def circular_stats(minutes):
+    """Circular mean (minute of day) and standard deviation (hours) of clock times.
+
+    Times are mapped onto the unit circle so 23:30 and 00:30 average to
+    midnight instead of noon.
+    """
+    if not len(minutes):
+        return None, 0.0
+    angles = minutes * (2 * np.pi / MINUTES_PER_DAY)
+    sin_mean = np.sin(angles).mean()
+    cos_mean = np.cos(angles).mean()
+    mean_minutes = (math.atan2(sin_mean, cos_mean) % (2 * np.pi)) * MINUTES_PER_DAY / (2 * np.pi)
+    resultant = min(1.0, math.hypot(sin_mean, cos_mean))
+    if len(minutes) < 2 or resultant >= 1.0:
+        return mean_minutes, 0.0
+    std_hours = math.sqrt(-2 * math.log(resultant)) * 24 / (2 * np.pi)
+    return mean_minutes, std_hours
+
+
+def circular_difference(minutes, target):
+    """Absolute minute-of-day distance to a target, wrapping around midnight"""
+    return np.abs((minutes - target + MINUTES_PER_DAY / 2) % MINUTES_PER_DAY - MINUTES_PER_DAY / 2)
+
+
+class SleepAnalyticsCache:
+    """Per-user sleep history arrays and memoized derived results"""
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.version = get_sleep_data_version(user_id)
+        self._arrays = None
+
+    def _key(self, name, *params):
+        return ':'.join(['sleep_analytics', str(self.user_id), self.version, name, *map(str, params)])
+
+    def memoize(self, name, params, compute):
+        key = self._key(name, *params)
+        result = cache.get(key)
+        if result is None:
+            result = compute()
+            cache.set(key, result, RESULT_TIMEOUT)
+        return result
+
+    @property
+    def arrays(self):
+        if self._arrays is None:
+            self._arrays = self.memoize('arrays', (), self._fetch)
+        return self._arrays
+
+    def _fetch(self):
+        rows = list(
+            SleepLog.objects.filter(user_id=self.user_id).order_by('date').values_list(
+                'date',
+                ExtractHour('bed_time'),
+                ExtractMinute('bed_time'),
+                ExtractHour('wake_time'),
+                ExtractMinute('wake_time'),
+                'duration_minutes',
+                'quality',
+                'sleep_score',
+            )
+        )
+        if not rows:
+            columns = [[]] * 8
+        else:
+            columns = list(zip(*rows))
+        return {
+            'date': np.array(columns[0], dtype='datetime64[D]'),
+            'bed': np.array(columns[1], dtype=float) * 60 + np.array(columns[2], dtype=float),
+            'wake': np.array(columns[3], dtype=float) * 60 + np.array(columns[4], dtype=float),
+            'duration': np.array(columns[5], dtype=float),
+            'quality': np.array(columns[6], dtype=float),
+            'score': np.array([np.nan if s is None else float(s) for s in columns[7]], dtype=float),
+        }
+
+    def _since(self, start_date):
+        return self.arrays['date'] >= np.datetime64(start_date, 'D')
+
+    def heatmap(self, start_date):
+        def compute():
+            a = self.arrays
+            rows = np.nonzero(self._since(start_date))[0][::-1]
+            return [
+                {
+                    'date': str(a['date'][i]),
+                    'duration_hours': round(a['duration'][i] / 60, 1),
+                    'quality': int(a['quality'][i]),
+                    'sleep_score': _score(a['score'][i]),
+                }
+                for i in rows
+            ]
+        return self.memoize('heatmap', (start_date,), compute)
+
+    def trends(self, start_date):
+        def compute():
+            a = self.arrays
+            rows = np.nonzero(self._since(start_date))[0]
+            dates = [str(d) for d in a['date'][rows]]
+            hours = np.round(a['duration'][rows] / 60, 1)
+            scores = a['score'][rows]
+            return {
+                'duration': [{'date': d, 'duration_hours': float(h)} for d, h in zip(dates, hours)],
+                'quality': [{'date': d, 'quality': int(q)} for d, q in zip(dates, a['quality'][rows])],
+                'score': [{'date': d, 'score': _score(s)} for d, s in zip(dates, scores)],
+            }
+        return self.memoize('trends', (start_date,), compute)
+
+    def consistency(self, start_date, goals):
+        targets = (goals.target_bed_time, goals.target_wake_time, goals.bed_time_window_minutes, goals.wake_time_window_minutes)
+
+        def compute():
+            mask = self._since(start_date)
+            bed = self.arrays['bed'][mask]
+            wake = self.arrays['wake'][mask]
+            total = int(mask.sum())
+
+            bed_mean, bed_std = circular_stats(bed)
+            wake_mean, wake_std = circular_stats(wake)
+            consistency_score = 0
+            if total:
+                # Consistency score: lower spread = higher consistency
+                consistency_score = (max(0, 100 - bed_std * 10) + max(0, 100 - wake_std * 10)) / 2
+
+            days_on_schedule = 0
+            if goals.target_bed_time and goals.target_wake_time:
+                target_bed = goals.target_bed_time.hour * 60 + goals.target_bed_time.minute
+                target_wake = goals.target_wake_time.hour * 60 + goals.target_wake_time.minute
+                on_schedule = (
+                    (circular_difference(bed, target_bed) <= goals.bed_time_window_minutes)
+                    & (circular_difference(wake, target_wake) <= goals.wake_time_window_minutes)
+                )
+                days_on_schedule = int(on_schedule.sum())
+
+            return {
+                'consistency_score': round(consistency_score, 1),
+                'schedule_compliance': round(days_on_schedule / total * 100, 1) if total else 0,
+                'days_on_schedule': days_on_schedule,
+                'total_days': total,
+                'average_bed_time': _format_minutes(bed_mean) if bed_mean is not None else None,
+                'average_wake_time': _format_minutes(wake_mean) if wake_mean is not None else None,
+                'bed_time_std_hours': round(bed_std, 2),
+                'wake_time_std_hours': round(wake_std, 2),
+            }
+        return self.memoize('consistency', (start_date, *targets), compute)
+
+    def optimal_window(self):
+        """Best-scoring bed time window from a circular histogram of scored nights.
+
+        Bed times are binned every ``WINDOW_BIN_MINUTES``; score sums and
+        counts are summed over every ``WINDOW_MINUTES`` wide window (wrapping
+        past midnight) and the window with the highest average score among
+        those with enough nights wins.
+        """
+        def compute():
+            a = self.arrays
+            if len(a['date']) < 7:
+                return {'error': 'Need at least 7 sleep logs'}
+            scored = np.nan_to_num(a['score']) > 0
+            bins = MINUTES_PER_DAY // WINDOW_BIN_MINUTES
+            width = WINDOW_MINUTES // WINDOW_BIN_MINUTES
+            index = (a['bed'][scored] // WINDOW_BIN_MINUTES).astype(int) % bins
+            sums = np.bincount(index, weights=a['score'][scored], minlength=bins)
+            counts = np.bincount(index, minlength=bins)
+
+            wrapped_sums = np.concatenate([sums, sums[:width - 1]])
+            wrapped_counts = np.concatenate([counts, counts[:width - 1]])
+            window_sums = np.convolve(wrapped_sums, np.ones(width), 'valid')
+            window_counts = np.convolve(wrapped_counts, np.ones(width), 'valid')
+
+            eligible = window_counts >= WINDOW_MIN_POINTS
+            if not eligible.any():
+                return {'error': 'Insufficient data'}
+            averages = np.where(eligible, window_sums / np.maximum(window_counts, 1), -np.inf)
+            best = int(np.argmax(averages))
+            start = best * WINDOW_BIN_MINUTES
+            return {
+                'optimal_bed_time_start': _format_minutes(start),
+                'optimal_bed_time_end': _format_minutes(start + WINDOW_MINUTES),
+                'avg_score': round(float(averages[best]), 2),
+                'data_points': int(window_counts[best]),
+            }
+        return self.memoize('optimal_window', (), compute)
@@ -0,0 +1,180 @@
+"""Batch correlation of sleep with mood, energy, stress, productivity, focus and exercise.
+
+Each module is read with one grouped daily query and laid out in a dense
+``(days, metrics)`` NumPy matrix. Pearson coefficients for every (sleep
+metric, target metric) pair are computed at once for the same day and for
+the following day, with Fisher-z 95% confidence intervals. Results are
+stored in ``SleepCorrelation``, one row per type and window length that is
+moved forward on every refresh, and marked stale by signals when any source
+module receives new data. Windows nobody has refreshed for
+``PRUNE_AFTER_DAYS`` are deleted.
+"""
+from datetime import timedelta
+
+import numpy as np
+from django.db.models import Avg, Q, Sum
+from django.utils import timezone
+
+from apps.core.series import daily_series
+
+from .models import ExerciseLog, SleepCorrelation, SleepLog
+
+MIN_SLEEP_LOGS = 5
+MIN_PAIRS = 3
+Z_95 = 1.959964
+
+MAX_WINDOW_DAYS = 365
+PRUNE_AFTER_DAYS = 30
+
+SLEEP_COLUMNS = ['duration', 'quality', 'score']
+
+
+def _sources(user_id):
+    """(queryset, date field, aggregates) per source module"""
+    from apps.journal.models import JournalMood
+    from apps.pomodoro.models import PomodoroSession
+    return [
+        (
+            SleepLog.objects.filter(user_id=user_id),
+            'date',
+            {'duration': Sum('duration_minutes'), 'quality': Avg('quality'), 'score': Avg('sleep_score')},
+        ),
+        (
+            JournalMood.objects.filter(user_id=user_id),
+            'date',
+            {'mood': Avg('mood'), 'energy': Avg('energy_level'), 'stress': Avg('stress_level')},
+        ),
+        (
+            PomodoroSession.objects.filter(user_id=user_id),
+            'started_at',
+            {
+                'productivity': Avg('productivity_score'),
+                'focus': Sum('duration', filter=Q(session_type='work', completed=True)),
+            },
+        ),
+        (
+            ExerciseLog.objects.filter(user_id=user_id),
+            'date',
+            {'exercise': Sum('duration_minutes')},
+        ),
+    ]
+
+
+TARGET_COLUMNS = ['mood', 'energy', 'stress', 'productivity', 'focus', 'exercise']
+
+
+def load_matrix(user_id, start_date, end_date):
+    """Dense (days, sleep + target columns) matrix with NaN for missing days.
+
+    Target columns extend one day past ``end_date`` so next-day pairs of the
+    last night are available when the data exists.
+    """
+    columns = SLEEP_COLUMNS + TARGET_COLUMNS
+    days = (end_date - start_date).days + 2
+    matrix = np.full((days, len(columns)), np.nan)
+    index = {name: i for i, name in enumerate(columns)}
+    for queryset, date_field, aggregates in _sources(user_id):
+        series = daily_series(queryset, date_field, aggregates, start_date, end_date + timedelta(days=1))
+        for day, values in series.items():
+            row = (day - start_date).days
+            for name, value in values.items():
+                if value is not None:
+                    matrix[row, index[name]] = float(value)
+    return matrix
+
+
+def pairwise_correlations(X, Y):
+    """Pearson r, pair counts and 95% CIs for every column of X against every column of Y.
+
+    Rows where either value is NaN are excluded pair by pair.
+    """
+    valid = ~np.isnan(X)[:, :, None] & ~np.isnan(Y)[:, None, :]
+    x = np.where(valid, np.nan_to_num(X)[:, :, None], 0.0)
+    y = np.where(valid, np.nan_to_num(Y)[:, None, :], 0.0)
+    n = valid.sum(axis=0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sx, sy = x.sum(axis=0), y.sum(axis=0)
+        cov = (x * y).sum(axis=0) - sx * sy / n
+        var_x = (x * x).sum(axis=0) - sx * sx / n
+        var_y = (y * y).sum(axis=0) - sy * sy / n
+        r = cov / np.sqrt(var_x * var_y)
+        r = np.where((n >= MIN_PAIRS) & (var_x > 1e-12) & (var_y > 1e-12), np.clip(r, -1, 1), np.nan)
+
+        z = np.arctanh(np.clip(r, -0.999999, 0.999999))
+        margin = Z_95 / np.sqrt(n - 3)
+        has_ci = ~np.isnan(r) & (n > 3)
+        low = np.where(has_ci, np.tanh(z - margin), np.nan)
+        high = np.where(has_ci, np.tanh(z + margin), np.nan)
+    return r, n, low, high
+
+
+def _round(value):
+    return None if np.isnan(value) else round(float(value), 3)
+
+
+def compute_sleep_correlations(user_id, window_days, end_date=None):
+    """Compute and store correlations for the ``window_days`` before ``end_date``.
+
+    Returns None, and drops the window's stored rows, if there are too few
+    sleep logs.
+    """
+    end_date = end_date or timezone.localdate()
+    start_date = end_date - timedelta(days=window_days)
+    stored = SleepCorrelation.objects.filter(user_id=user_id)
+    stored.filter(end_date__lt=end_date - timedelta(days=PRUNE_AFTER_DAYS)).delete()
+
+    matrix = load_matrix(user_id, start_date, end_date)
+    sleep = matrix[:-1, :len(SLEEP_COLUMNS)]
+    if (~np.isnan(sleep[:, 0])).sum() < MIN_SLEEP_LOGS:
+        stored.filter(window_days=window_days).delete()
+        return None
+
+    targets = matrix[:, len(SLEEP_COLUMNS):]
+    results = {
+        'same_day': pairwise_correlations(sleep, targets[:-1]),
+        'next_day': pairwise_correlations(sleep, targets[1:]),
+    }
+
+    rows = []
+    for j, target in enumerate(TARGET_COLUMNS):
+        insights = {}
+        for lag, (r, n, low, high) in results.items():
+            insights[lag] = {
+                column: {
+                    'coefficient': _round(r[i, j]),
+                    'confidence_interval': [_round(low[i, j]), _round(high[i, j])],
+                    'data_points': int(n[i, j]),
+                }
+                for i, column in enumerate(SLEEP_COLUMNS)
+            }
+        r, n, _, _ = results['same_day']
+        rows.append(SleepCorrelation(
+            user_id=user_id,
+            correlation_type=target,
+            duration_correlation=_round(r[0, j]),
+            quality_correlation=_round(r[1, j]),
+            score_correlation=_round(r[2, j]),
+            window_days=window_days,
+            start_date=start_date,
+            end_date=end_date,
+            data_points=int(n[2, j]),
+            insights=insights,
+            stale_at=None,
+        ))
+
+    SleepCorrelation.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=['user', 'correlation_type', 'window_days'],
+        update_fields=[
+            'duration_correlation', 'quality_correlation', 'score_correlation',
+            'start_date', 'end_date', 'data_points', 'insights', 'computed_at', 'stale_at',
+        ],
+    )
+    return rows
+
+
+def mark_correlations_stale(user_id):
+    """Flag a user's stored correlations for recomputation"""
+    SleepCorrelation.objects.filter(user_id=user_id, stale_at__isnull=True).update(stale_at=timezone.now())
@@ -0,0 +1,29 @@
+from celery import shared_task
+from django.core.cache import cache
+
+from .sleep_correlations import compute_sleep_correlations
+
+# Longest a queued refresh blocks the next one if the worker never clears it
+REFRESH_LOCK_TIMEOUT = 60 * 10
+
+
+def _refresh_lock_key(user_id, window_days):
+    return f'sleep_correlations:refresh:{user_id}:{window_days}'
+
+
+def queue_correlation_refresh(user_id, window_days):
+    """Queue a refresh unless one is already in flight for this user and window"""
+    if cache.add(_refresh_lock_key(user_id, window_days), True, REFRESH_LOCK_TIMEOUT):
+        refresh_sleep_correlations.delay(user_id, window_days)
+        return True
+    return False
+
+
+@shared_task
+def refresh_sleep_correlations(user_id, window_days):
+    """Recompute a user's stored sleep correlations for one window length"""
+    try:
+        rows = compute_sleep_correlations(user_id, window_days)
+    finally:
+        cache.delete(_refresh_lock_key(user_id, window_days))
+    return len(rows) if rows else 0
@@ -0,0 +1,457 @@
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.journal.models import JournalMood
+
+from .best_lifts import rebuild_best_lifts
+from .exercise_stats import add_run_day, derive_exercise_stats, remove_run_day
+from .models import (
+    BestLift,
+    Exercise,
+    ExerciseSet,
+    ExerciseStats,
+    MuscleGroup,
+    MuscleGroupVolumeDaily,
+    ProgressiveOverload,
+    SleepCorrelation,
+    SleepGoal,
+    SleepLog,
+    WorkoutLog,
+)
+from .sleep_analytics import circular_stats
+from .workout_rollups import rebuild_muscle_volume
+
+User = get_user_model()
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class SleepAnalyticsCacheTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='sleeper',
+            email='sleeper@example.com',
+            password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.today = timezone.localdate()
+        # Bed times alternate around midnight: 23:40, 00:20
+        for offset in range(1, 11):
+            wake_day = self.today - timedelta(days=offset)
+            bed = datetime.combine(wake_day, time(0, 20)) - timedelta(minutes=40 * (offset % 2))
+            self.log_night(bed, hours=8, quality=5 + offset % 2 * 3)
+
+    def log_night(self, bed, hours, quality):
+        bed = timezone.make_aware(bed)
+        return SleepLog.objects.create(
+            user=self.user,
+            bed_time=bed,
+            wake_time=bed + timedelta(hours=hours),
+            duration_minutes=hours * 60,
+            quality=quality,
+        )
+
+    def test_circular_mean_wraps_midnight(self):
+        mean, std = circular_stats(np.array([23 * 60 + 30, 30]))
+        self.assertAlmostEqual(min(mean, 1440 - mean), 0, places=6)
+        self.assertLess(std, 1)
+
+    def test_consistency_handles_midnight_and_goal_windows(self):
+        SleepGoal.objects.create(user=self.user, target_bed_time=time(0, 0), target_wake_time=time(8, 0), bed_time_window_minutes=30)
+        data = self.client.get('/api/v1/health/sleep/logs/consistency/').data
+        self.assertEqual(data['average_bed_time'], '00:00')
+        self.assertGreater(data['consistency_score'], 90)
+        self.assertEqual(data['days_on_schedule'], 10)
+
+    def test_results_memoized_until_sleep_logs_change(self):
+        self.client.get('/api/v1/health/sleep/logs/trends/')
+        with self.assertNumQueries(0):
+            trends = self.client.get('/api/v1/health/sleep/logs/trends/').data
+        self.assertEqual(len(trends['duration']), 10)
+
+        self.log_night(datetime.combine(self.today, time(0, 0)) - timedelta(hours=1), hours=7, quality=6)
+        trends = self.client.get('/api/v1/health/sleep/logs/trends/').data
+        self.assertEqual(len(trends['duration']), 11)
+
+    def test_optimal_window_prefers_best_scoring_bed_times(self):
+        data = self.client.get('/api/v1/health/sleep/logs/optimal_window/').data
+        # Only the higher-quality 23:40 nights fall inside the winning window
+        self.assertTrue(data['optimal_bed_time_start'] <= '23:40' < data['optimal_bed_time_end'])
+        self.assertEqual(data['data_points'], 5)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class SleepCorrelationTest(TestCase):
+    def setUp(self):
+        from celery import current_app
+        current_app.conf.task_always_eager = True
+        self.addCleanup(setattr, current_app.conf, 'task_always_eager', False)
+
+        self.user = User.objects.create_user(
+            username='correlated',
+            email='correlated@example.com',
+            password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.today = timezone.localdate()
+        for offset in range(1, 11):
+            hours = 6 + offset % 3
+            wake = timezone.make_aware(datetime.combine(self.today - timedelta(days=offset), time(7, 0)))
+            SleepLog.objects.create(
+                user=self.user,
+                bed_time=wake - timedelta(hours=hours),
+                wake_time=wake,
+                duration_minutes=hours * 60,
+                quality=7,
+            )
+            # Mood tracks the same night's sleep; energy tracks the previous night's
+            JournalMood.objects.create(user=self.user, date=wake.date(), mood=hours, energy_level=3 + (offset + 1) % 3)
+
+    def test_same_day_and_next_day_correlations_stored(self):
+        response = self.client.get('/api/v1/health/sleep/logs/correlations/')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.data['stale'])
+
+        mood = response.data['mood']['same_day']['duration']
+        self.assertAlmostEqual(mood['coefficient'], 1.0)
+        self.assertEqual(mood['data_points'], 10)
+        low, high = mood['confidence_interval']
+        self.assertTrue(low <= 1.0 <= high)
+        self.assertAlmostEqual(response.data['energy']['next_day']['duration']['coefficient'], 1.0)
+        self.assertEqual(SleepCorrelation.objects.filter(user=self.user).count(), 6)
+
+        with self.assertNumQueries(1):
+            self.client.get('/api/v1/health/sleep/logs/correlations/')
+
+    def test_source_writes_mark_rows_stale_and_refresh(self):
+        self.client.get('/api/v1/health/sleep/logs/correlations/')
+        JournalMood.objects.create(user=self.user, date=self.today - timedelta(days=3), mood=1)
+        self.assertFalse(SleepCorrelation.objects.filter(user=self.user, stale_at__isnull=True).exists())
+
+        response = self.client.get('/api/v1/health/sleep/logs/correlations/')
+        self.assertTrue(response.data['stale'])
+        # The eager refresh recomputed and cleared the staleness marker
+        self.assertFalse(SleepCorrelation.objects.filter(user=self.user, stale_at__isnull=False).exists())
+        self.assertLess(
+            SleepCorrelation.objects.get(user=self.user, correlation_type='mood').insights['same_day']['duration']['coefficient'],
+            1.0,
+        )
+
+    def test_rolled_window_refreshes_in_place_once(self):
+        url = '/api/v1/health/sleep/logs/correlations/'
+        self.client.get(url)
+        yesterday = self.today - timedelta(days=1)
+        SleepCorrelation.objects.filter(user=self.user).update(end_date=yesterday)
+
+        # A refresh already in flight holds the lock, so none is queued
+        cache.add(f'sleep_correlations:refresh:{self.user.pk}:30', True)
+        self.assertTrue(self.client.get(url).data['stale'])
+        self.assertEqual(SleepCorrelation.objects.get(user=self.user, correlation_type='mood').end_date, yesterday)
+
+        cache.clear()
+        self.assertTrue(self.client.get(url).data['stale'])
+        self.assertEqual(SleepCorrelation.objects.get(user=self.user, correlation_type='mood').end_date, self.today)
+        self.assertEqual(SleepCorrelation.objects.filter(user=self.user).count(), 6)
+        self.assertFalse(self.client.get(url).data['stale'])
+
+    def test_unviewed_windows_are_pruned(self):
+        self.client.get('/api/v1/health/sleep/logs/correlations/', {'days': 7})
+        SleepCorrelation.objects.filter(user=self.user).update(end_date=self.today - timedelta(days=40))
+        self.client.get('/api/v1/health/sleep/logs/correlations/')
+        self.assertEqual(
+            set(SleepCorrelation.objects.filter(user=self.user).values_list('window_days', flat=True)), {30}
+        )
+
+    def test_requires_five_sleep_logs(self):
+        SleepLog.objects.filter(user=self.user, date__lt=self.today - timedelta(days=4)).delete()
+        response = self.client.get('/api/v1/health/sleep/logs/correlations/')
+        self.assertEqual(response.status_code, 400)
+
+
+class MuscleGroupVolumeRollupTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='lifter',
+            email='lifter@example.com',
+            password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        chest, _ = MuscleGroup.objects.get_or_create(name='chest', defaults={'display_name': 'Chest'})
+        triceps, _ = MuscleGroup.objects.get_or_create(name='triceps', defaults={'display_name': 'Triceps'})
+        quads, _ = MuscleGroup.objects.get_or_create(name='quads', defaults={'display_name': 'Quadriceps'})
+        self.bench = Exercise.objects.create(user=self.user, name='Bench Press', category='strength')
+        self.bench.muscle_groups.set([chest, triceps])
+        self.squat = Exercise.objects.create(user=self.user, name='Squat', category='strength')
+        self.squat.muscle_groups.set([quads])
+        self.quads = quads
+
+        self.sets = []
+        for number in range(1, 4):
+            self.sets.append(self.log_set(self.bench, number, reps=10, weight='60.5'))
+            self.sets.append(self.log_set(self.squat, number, reps=5, weight='100'))
+
+    def log_set(self, exercise, number, reps, weight):
+        return ExerciseSet.objects.create(
+            user=self.user, exercise=exercise, set_number=number, reps=reps, weight_kg=Decimal(weight)
+        )
+
+    def snapshot(self):
+        return sorted(
+            MuscleGroupVolumeDaily.objects.filter(user=self.user).values_list(
+                'date', 'muscle_group__name', 'sets', 'reps', 'volume'
+            ),
+            key=str,
+        )
+
+    def assert_matches_rebuild(self):
+        maintained = self.snapshot()
+        rebuild_muscle_volume(self.user.pk)
+        self.assertEqual(maintained, self.snapshot())
+
+    def test_signals_match_bulk_rebuild(self):
+        self.assert_matches_rebuild()
+
+        edited = self.sets[0]
+        edited.reps = 8
+        edited.save()
+        moved = self.sets[1]
+        moved.exercise = self.bench
+        moved.save()
+        self.sets[2].delete()
+        self.assert_matches_rebuild()
+
+        self.squat.muscle_groups.remove(self.quads)
+        self.assert_matches_rebuild()
+        self.bench.delete()
+        self.assert_matches_rebuild()
+
+    def test_balance_is_single_grouped_read(self):
+        with self.assertNumQueries(1):
+            data = self.client.get('/api/v1/health/workout-logs/muscle_group_balance/').data
+        by_group = {row['muscle_group']: row for row in data}
+        self.assertEqual(by_group['Chest']['workout_count'], 3)
+        self.assertEqual(by_group['Chest']['percentage'], 50.0)
+        self.assertEqual(by_group['Quadriceps']['total_volume'], 1500.0)
+
+        data = self.client.get('/api/v1/health/workout-logs/volume_over_time/').data
+        self.assertEqual(data, [{
+            'date': timezone.localdate().isoformat(),
+            'total_volume': 3315.0,
+            'set_count': 6,
+            'total_reps': 45,
+        }])
+
+
+class IncrementalExerciseStatsTest(TestCase):
+    FIELDS = [
+        'total_workouts', 'total_duration_minutes', 'total_volume_kg', 'total_calories_burned',
+        'current_streak', 'best_streak', 'last_workout_date', 'avg_duration_30d', 'avg_volume_30d', 'streak_runs',
+    ]
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='athlete',
+            email='athlete@example.com',
+            password='testpass123'
+        )
+        self.today = timezone.localdate()
+        self.squat = Exercise.objects.create(user=self.user, name='Squat', category='strength')
+        ExerciseStats.objects.create(user=self.user).update_stats()
+
+    def log(self, days_ago, duration=45, volume='1000', calories=300):
+        log = WorkoutLog.objects.create(
+            user=self.user, name='Workout', workout_type='strength',
+            date=self.today - timedelta(days=days_ago), start_time=timezone.now(),
+            duration_minutes=duration, calories_burned=calories,
+        )
+        if Decimal(volume):
+            ExerciseSet.objects.create(
+                user=self.user, exercise=self.squat, workout_log=log, set_number=1,
+                reps=5, weight_kg=Decimal(volume) / 5,
+            )
+        return log
+
+    def assert_matches_full_recompute(self):
+        incremental = ExerciseStats.objects.get(user=self.user)
+        expected = ExerciseStats.objects.get(user=self.user)
+        expected.update_stats()
+        for field in self.FIELDS:
+            self.assertEqual(getattr(incremental, field), getattr(expected, field), field)
+
+    def test_run_intervals_merge_and_split(self):
+        runs = []
+        for day in (5, 7, 6, 1, 2):
+            add_run_day(runs, day)
+        self.assertEqual(runs, [[1, 2], [5, 7]])
+        remove_run_day(runs, 6)
+        self.assertEqual(runs, [[1, 2], [5, 5], [7, 7]])
+        remove_run_day(runs, 1)
+        self.assertEqual(runs, [[2, 2], [5, 5], [7, 7]])
+
+    def test_writes_match_full_recompute(self):
+        logs = [self.log(days_ago) for days_ago in (0, 1, 2, 4, 5, 6, 7, 40, 41)]
+        self.log(1, duration=None, volume='0')
+        self.assert_matches_full_recompute()
+        stats = ExerciseStats.objects.get(user=self.user)
+        self.assertEqual((stats.current_streak, stats.best_streak), (3, 4))
+
+        logs[4].delete()
+        logs[0].date = self.today - timedelta(days=3)
+        logs[0].save()
+        logs[7].duration_minutes = 90
+        logs[7].save()
+        logs[1].calories_burned = 10
+        logs[1].total_volume_kg = Decimal('99999')
+        logs[1].save()
+        exercise_set = logs[1].exercise_sets.get()
+        exercise_set.weight_kg = Decimal('50.1')
+        exercise_set.save()
+        moved = logs[2].exercise_sets.get()
+        moved.workout_log = logs[8]
+        moved.save()
+        logs[3].exercise_sets.get().delete()
+        self.assert_matches_full_recompute()
+        stats = ExerciseStats.objects.get(user=self.user)
+        self.assertEqual((stats.current_streak, stats.best_streak), (0, 4))
+        self.assertEqual(stats.total_volume_kg, Decimal('6250.50'))
+
+    def test_randomized_writes_match_full_recompute(self):
+        import random
+        rng = random.Random(7)
+        logs = []
+        for _ in range(60):
+            action = rng.random()
+            if logs and action < 0.25:
+                logs.pop(rng.randrange(len(logs))).delete()
+            elif logs and action < 0.5:
+                log = rng.choice(logs)
+                log.date = self.today - timedelta(days=rng.randint(0, 45))
+                log.duration_minutes = rng.choice([None, 30, 75])
+                log.save()
+            else:
+                logs.append(self.log(rng.randint(0, 45), duration=rng.choice([None, 20, 60]), volume=str(rng.randint(0, 5000))))
+        self.assert_matches_full_recompute()
+
+    def test_write_cost_independent_of_history(self):
+        def queries_for_update(log):
+            with CaptureQueriesContext(connection) as context:
+                log.duration_minutes = 50
+                log.save()
+            return len(context.captured_queries)
+
+        short = queries_for_update(self.log(0))
+        for days_ago in range(1, 60):
+            self.log(days_ago)
+        self.assertEqual(queries_for_update(self.log(0)), short)
+
+    def test_future_workout_joins_window_on_its_date(self):
+        # UTC-12 and UTC+14 are always at least one calendar day apart
+        with timezone.override('Etc/GMT+12'):
+            self.today = timezone.localdate()
+            ExerciseStats.objects.get(user=self.user).update_stats()
+            ahead = self.log(-1, volume='500')
+            stats = ExerciseStats.objects.get(user=self.user)
+            self.assertEqual((stats.total_workouts, stats.total_volume_kg), (1, Decimal('500')))
+            self.assertIsNone(stats.avg_volume_30d)
+
+        with timezone.override('Pacific/Kiritimati'):
+            stats = ExerciseStats.objects.get(user=self.user)
+            self.assertEqual(derive_exercise_stats(stats).avg_volume_30d, Decimal('500'))
+            ahead.duration_minutes = 60
+            ahead.save()
+            self.assert_matches_full_recompute()
+            ahead.exercise_sets.get().delete()
+            ahead.delete()
+            self.assert_matches_full_recompute()
+            stats = ExerciseStats.objects.get(user=self.user)
+            self.assertEqual((stats.total_workouts, stats.total_volume_kg), (0, Decimal('0')))
+            self.assertTrue(all(slot[1] == 0 for slot in stats.daily_window))
+
+
+class BestLiftTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='presser',
+            email='presser@example.com',
+            password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.bench = Exercise.objects.create(user=self.user, name='Bench Press', category='strength')
+        self.row = Exercise.objects.create(user=self.user, name='Row', category='strength')
+
+    def lift(self, exercise, reps, weight, warmup=False):
+        return ExerciseSet.objects.create(
+            user=self.user, exercise=exercise, set_number=1, reps=reps, weight_kg=Decimal(weight), is_warmup=warmup
+        )
+
+    def snapshot(self):
+        return sorted(BestLift.objects.filter(user=self.user).values_list(
+            'exercise_id', 'rep_range', 'weight_kg', 'reps', 'epley_1rm', 'brzycki_1rm', 'exercise_set_id'
+        ), key=str)
+
+    def assert_matches_rebuild(self):
+        maintained = self.snapshot()
+        rebuild_best_lifts(self.user.pk)
+        self.assertEqual(maintained, self.snapshot())
+
+    def test_best_per_rep_range_with_estimated_1rm(self):
+        self.lift(self.bench, 5, '80')
+        self.lift(self.bench, 5, '85')
+        self.lift(self.bench, 4, '82.5')
+        self.lift(self.bench, 1, '120', warmup=True)
+        self.lift(self.bench, 10, '60')
+
+        lift = BestLift.objects.get(user=self.user, exercise=self.bench, rep_range='4-6')
+        self.assertEqual((lift.weight_kg, lift.reps), (Decimal('85'), 5))
+        self.assertEqual(lift.epley_1rm, Decimal('99.17'))
+        self.assertEqual(lift.brzycki_1rm, Decimal('95.62'))
+        self.assertFalse(BestLift.objects.filter(rep_range='1').exists())
+        self.assert_matches_rebuild()
+
+    def test_edits_and_deletes_of_the_best_set_fall_back(self):
+        sets = [self.lift(self.bench, reps, weight) for reps, weight in [(5, '80'), (6, '90'), (5, '90'), (8, '70')]]
+        sets.append(self.lift(self.row, 3, '100'))
+        self.assertEqual(BestLift.objects.get(exercise=self.bench, rep_range='4-6').exercise_set_id, sets[1].pk)
+
+        sets[1].weight_kg = Decimal('75')
+        sets[1].save()
+        self.assertEqual(BestLift.objects.get(exercise=self.bench, rep_range='4-6').exercise_set_id, sets[2].pk)
+        self.assert_matches_rebuild()
+
+        sets[2].delete()
+        sets[3].reps = 2
+        sets[3].save()
+        sets[4].exercise = self.bench
+        sets[4].save()
+        self.assert_matches_rebuild()
+        self.assertFalse(BestLift.objects.filter(exercise=self.row).exists())
+
+    def test_by_exercise_and_suggestions_are_indexed_reads(self):
+        for weight in ('60', '70', '80'):
+            self.lift(self.bench, 5, weight)
+            self.lift(self.row, 8, weight)
+        ProgressiveOverload.objects.create(
+            user=self.user, exercise=self.bench, baseline_weight_kg=Decimal('60'), baseline_date=timezone.localdate()
+        )
+
+        with self.assertNumQueries(2):
+            data = self.client.get('/api/v1/health/personal-records/by_exercise/').data
+        bench = next(entry for entry in data if entry['exercise_name'] == 'Bench Press')
+        self.assertEqual(bench['best_lifts'][0]['weight_kg'], '80.00')
+        self.assertAlmostEqual(bench['estimated_1rm']['epley'], 93.33)
+
+        with self.assertNumQueries(2):
+            data = self.client.get('/api/v1/health/progressive-overload/suggestions/?reps=3').data
+        self.assertEqual(data[0]['suggested_weight_kg'], 82.5)
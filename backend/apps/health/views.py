@@ -1,4 +1,4 @@
-from datetime import timedelta, datetime
+from datetime import timedelta
 from math import sqrt
 from collections import defaultdict
 
@@ -42,6 +42,8 @@ from .models import (
     RestDay,
     ExerciseStats,
     ProgressiveOverload,
+    MuscleGroupVolumeDaily,
+    BestLift,
 )
 from .serializers import (
     WaterIntakeSettingsSerializer,
@@ -73,10 +75,16 @@ from .serializers import (
     RestDaySerializer,
     ExerciseStatsSerializer,
     ProgressiveOverloadSerializer,
+    BestLiftSerializer,
     WorkoutHeatmapEntry,
     ExerciseVolumeData,
     MuscleGroupBalanceData,
 )
+from .best_lifts import estimated_1rm, suggested_weight
+from .exercise_stats import derive_exercise_stats
+from .sleep_analytics import SleepAnalyticsCache
+from .sleep_correlations import MAX_WINDOW_DAYS, compute_sleep_correlations
+from .tasks import queue_correlation_refresh
 
 
 def _calculate_pearson(pairs):
@@ -441,226 +449,63 @@ class SleepLogViewSet(viewsets.ModelViewSet):
         """Get calendar heatmap data for sleep duration and quality"""
         days = int(request.query_params.get('days', 90))
         start_date = timezone.localdate() - timedelta(days=days)
-
-        logs = self.get_queryset().filter(date__gte=start_date).order_by('-date')
-
-        heatmap_data = [
-            {
-                'date': log.date.isoformat(),
-                'duration_hours': round(log.duration_minutes / 60, 1),
-                'quality': log.quality,
-                'sleep_score': float(log.sleep_score) if log.sleep_score else None,
-            }
-            for log in logs
-        ]
-
-        return Response(heatmap_data)
+        return Response(SleepAnalyticsCache(request.user.pk).heatmap(start_date))
 
     @action(detail=False, methods=['get'])
     def trends(self, request):
         """Get sleep duration and quality trends over time"""
         days = int(request.query_params.get('days', 30))
         start_date = timezone.localdate() - timedelta(days=days)
-
-        logs = self.get_queryset().filter(date__gte=start_date).order_by('date')
-
-        duration_data = [
-            {
-                'date': log.date.isoformat(),
-                'duration_hours': round(log.duration_minutes / 60, 1),
-            }
-            for log in logs
-        ]
-
-        quality_data = [
-            {
-                'date': log.date.isoformat(),
-                'quality': log.quality,
-            }
-            for log in logs
-        ]
-
-        score_data = [
-            {
-                'date': log.date.isoformat(),
-                'score': float(log.sleep_score) if log.sleep_score else None,
-            }
-            for log in logs
-        ]
-
-        return Response({
-            'duration': duration_data,
-            'quality': quality_data,
-            'score': score_data,
-        })
+        return Response(SleepAnalyticsCache(request.user.pk).trends(start_date))
 
     @action(detail=False, methods=['get'])
     def consistency(self, request):
         """Calculate sleep schedule consistency metrics"""
         days = int(request.query_params.get('days', 30))
         start_date = timezone.localdate() - timedelta(days=days)
-
-        logs = self.get_queryset().filter(date__gte=start_date)
-
-        # Calculate average bed time and wake time
-        bed_hours = []
-        wake_hours = []
-
-        for log in logs:
-            bed_time = timezone.localtime(log.bed_time)
-            wake_time = timezone.localtime(log.wake_time)
-            bed_hours.append(bed_time.hour + bed_time.minute / 60)
-            wake_hours.append(wake_time.hour + wake_time.minute / 60)
-
-        consistency_score = 0
-        if bed_hours and wake_hours:
-            # Calculate standard deviation
-            import statistics
-            bed_stddev = statistics.stdev(bed_hours) if len(bed_hours) > 1 else 0
-            wake_stddev = statistics.stdev(wake_hours) if len(wake_hours) > 1 else 0
-
-            # Consistency score: lower stddev = higher consistency
-            bed_consistency = max(0, 100 - (bed_stddev * 10))
-            wake_consistency = max(0, 100 - (wake_stddev * 10))
-            consistency_score = (bed_consistency + wake_consistency) / 2
-
-        # Calculate days meeting schedule goals
         goals, _ = SleepGoal.objects.get_or_create(user=request.user)
-        days_on_schedule = 0
-
-        for log in logs:
-            if goals.target_bed_time and goals.target_wake_time:
-                bed_time = timezone.localtime(log.bed_time)
-                wake_time = timezone.localtime(log.wake_time)
-
-                target_bed = datetime.combine(log.date, goals.target_bed_time)
-                target_wake = datetime.combine(log.date, goals.target_wake_time)
-
-                bed_diff = abs((bed_time - target_bed).total_seconds() / 60)
-                wake_diff = abs((wake_time - target_wake).total_seconds() / 60)
-
-                if bed_diff <= goals.bed_time_window_minutes and wake_diff <= goals.wake_time_window_minutes:
-                    days_on_schedule += 1
-
-        schedule_compliance = (days_on_schedule / logs.count() * 100) if logs.count() > 0 else 0
-
-        return Response({
-            'consistency_score': round(consistency_score, 1),
-            'schedule_compliance': round(schedule_compliance, 1),
-            'days_on_schedule': days_on_schedule,
-            'total_days': logs.count(),
-        })
+        return Response(SleepAnalyticsCache(request.user.pk).consistency(start_date, goals))
 
     @action(detail=False, methods=['get'])
     def optimal_window(self, request):
         """Find optimal sleep window based on quality data"""
-        logs = self.get_queryset()
-
-        if logs.count() < 7:
-            return Response({'error': 'Need at least 7 sleep logs'}, status=status.HTTP_400_BAD_REQUEST)
-
-        # Group logs by bed time hour
-        hour_scores = defaultdict(list)
-        for log in logs:
-            if log.sleep_score:
-                bed_hour = timezone.localtime(log.bed_time).hour
-                hour_scores[bed_hour].append(log.sleep_score)
-
-        # Find best hour
-        best_hour = None
-        best_avg = 0
-
-        for hour, scores in hour_scores.items():
-            if len(scores) >= 3:  # Need at least 3 data points
-                avg_score = sum(scores) / len(scores)
-                if avg_score > best_avg:
-                    best_avg = avg_score
-                    best_hour = hour
-
-        if best_hour is not None:
-            return Response({
-                'optimal_bed_time_start': f"{best_hour:02d}:00",
-                'optimal_bed_time_end': f"{best_hour + 1:02d}:00",
-                'avg_score': round(best_avg, 2),
-                'data_points': len(hour_scores[best_hour]),
-            })
-
-        return Response({'error': 'Insufficient data'}, status=status.HTTP_400_BAD_REQUEST)
+        result = SleepAnalyticsCache(request.user.pk).optimal_window()
+        if 'error' in result:
+            return Response(result, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result)
 
     @action(detail=False, methods=['get'])
     def correlations(self, request):
-        """Calculate correlations between sleep and other metrics"""
-        days = int(request.query_params.get('days', 30))
-        start_date = timezone.localdate() - timedelta(days=days)
-
-        logs = self.get_queryset().filter(date__gte=start_date)
-        if logs.count() < 5:
-            return Response({'error': 'Need at least 5 sleep logs'}, status=status.HTTP_400_BAD_REQUEST)
-
-        # Prepare sleep data by date
-        sleep_by_date = {log.date: log for log in logs}
-
-        # Correlate with mood
-        mood_entries = JournalMood.objects.filter(
-            user=request.user,
-            date__gte=start_date
-        ).values('date', 'mood', 'energy_level')
-
-        mood_pairs = []
-        energy_pairs = []
-
-        for entry in mood_entries:
-            log = sleep_by_date.get(entry['date'])
-            if log and log.sleep_score and entry['mood']:
-                mood_pairs.append((float(log.sleep_score), entry['mood']))
-            if log and log.sleep_score and entry.get('energy_level'):
-                energy_pairs.append((float(log.sleep_score), entry['energy_level']))
-
-        # Correlate with productivity (Pomodoro)
-        pomodoro_sessions = PomodoroSession.objects.filter(
-            user=request.user,
-            started_at__date__gte=start_date
-        ).values('started_at__date').annotate(
-            avg_productivity=Avg('productivity_score'),
-            total_minutes=Sum('duration_minutes')
-        )
+        """Correlations between sleep and other metrics, served from stored results.
 
-        productivity_pairs = []
-        for session in pomodoro_sessions:
-            log = sleep_by_date.get(session['started_at__date'])
-            if log and log.sleep_score and session['avg_productivity']:
-                productivity_pairs.append((float(log.sleep_score), float(session['avg_productivity'])))
-
-        # Correlate with exercise
-        exercise_logs = ExerciseLog.objects.filter(
-            user=request.user,
-            date__gte=start_date
-        ).values('date').annotate(total_duration=Sum('duration_minutes'))
-
-        exercise_pairs = []
-        for ex in exercise_logs:
-            log = sleep_by_date.get(ex['date'])
-            if log and log.sleep_score:
-                exercise_pairs.append((float(log.sleep_score), ex['total_duration'] or 0))
+        Stored rows are recomputed synchronously only when the window length
+        has none yet. Rows marked stale by new source data, or computed before
+        today, are returned as-is while a single background refresh runs.
+        """
+        days = min(max(int(request.query_params.get('days', 30)), 1), MAX_WINDOW_DAYS)
+        today = timezone.localdate()
 
-        return Response({
-            'mood': {
-                'coefficient': _calculate_pearson(mood_pairs),
-                'data_points': len(mood_pairs),
-            },
-            'energy': {
-                'coefficient': _calculate_pearson(energy_pairs),
-                'data_points': len(energy_pairs),
-            },
-            'productivity': {
-                'coefficient': _calculate_pearson(productivity_pairs),
-                'data_points': len(productivity_pairs),
-            },
-            'exercise': {
-                'coefficient': _calculate_pearson(exercise_pairs),
-                'data_points': len(exercise_pairs),
-            },
-        })
+        rows = list(SleepCorrelation.objects.filter(user=request.user, window_days=days))
+        if not rows:
+            rows = compute_sleep_correlations(request.user.pk, days, today)
+            if rows is None:
+                return Response({'error': 'Need at least 5 sleep logs'}, status=status.HTTP_400_BAD_REQUEST)
+
+        stale = any(row.stale_at or row.end_date < today for row in rows)
+        if stale:
+            queue_correlation_refresh(request.user.pk, days)
+
+        result = {
+            row.correlation_type: {
+                'coefficient': float(row.score_correlation) if row.score_correlation is not None else None,
+                'data_points': row.data_points,
+                'same_day': row.insights.get('same_day', {}),
+                'next_day': row.insights.get('next_day', {}),
+            }
+            for row in rows
+        }
+        result['stale'] = stale
+        return Response(result)
 
     @action(detail=False, methods=['get'])
     def insights(self, request):
@@ -959,26 +804,9 @@ class WorkoutLogViewSet(viewsets.ModelViewSet):
         return WorkoutLog.objects.filter(user=self.request.user)
 
     def perform_create(self, serializer):
+        # ExerciseStats follow WorkoutLog writes through signals
         serializer.save(user=self.request.user)
 
-        # Update stats
-        stats, _ = ExerciseStats.objects.get_or_create(user=self.request.user)
-        stats.update_stats()
-
-    def perform_update(self, serializer):
-        serializer.save()
-
-        # Update stats
-        stats, _ = ExerciseStats.objects.get_or_create(user=self.request.user)
-        stats.update_stats()
-
-    def perform_destroy(self, instance):
-        instance.delete()
-
-        # Update stats
-        stats, _ = ExerciseStats.objects.get_or_create(user=self.request.user)
-        stats.update_stats()
-
     @action(detail=False, methods=['get'])
     def heatmap(self, request):
         """Get workout heatmap data for visualization"""
@@ -1001,49 +829,56 @@ class WorkoutLogViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def volume_over_time(self, request):
-        """Get exercise volume trends over time"""
+        """Get daily exercise volume trends from the muscle group rollup"""
         days = int(request.query_params.get('days', 30))
         start_date = timezone.localdate() - timedelta(days=days)
 
-        logs = self.get_queryset().filter(date__gte=start_date).order_by('date')
+        totals = MuscleGroupVolumeDaily.objects.filter(
+            user=request.user,
+            muscle_group__isnull=True,
+            date__gte=start_date
+        ).order_by('date').values('date', 'sets', 'reps', 'volume')
 
         volume_data = [
             {
-                'date': log.date.isoformat(),
-                'total_volume': float(log.total_volume_kg) if log.total_volume_kg else 0,
-                'exercise_count': log.total_exercises or 0,
+                'date': row['date'].isoformat(),
+                'total_volume': float(row['volume']),
+                'set_count': row['sets'],
+                'total_reps': row['reps'],
             }
-            for log in logs
+            for row in totals
         ]
 
         return Response(volume_data)
 
     @action(detail=False, methods=['get'])
     def muscle_group_balance(self, request):
-        """Get muscle group training balance"""
+        """Get muscle group training balance from the daily rollup"""
         days = int(request.query_params.get('days', 30))
         start_date = timezone.localdate() - timedelta(days=days)
 
-        sets = ExerciseSet.objects.filter(
+        rows = MuscleGroupVolumeDaily.objects.filter(
             user=request.user,
-            completed_at__date__gte=start_date
-        ).select_related('exercise')
-
-        muscle_counts = {}
-        total_sets = sets.count()
+            date__gte=start_date
+        ).values('muscle_group', 'muscle_group__display_name').annotate(
+            set_count=Sum('sets'),
+            total_reps=Sum('reps'),
+            total_volume=Sum('volume')
+        ).order_by('-set_count')
 
-        for exercise_set in sets:
-            if exercise_set.exercise:
-                for muscle in exercise_set.exercise.muscle_groups.all():
-                    muscle_counts[muscle.display_name] = muscle_counts.get(muscle.display_name, 0) + 1
+        # The row without a muscle group carries the total over all sets
+        groups = [row for row in rows if row['muscle_group'] is not None]
+        total_sets = sum(row['set_count'] for row in rows if row['muscle_group'] is None)
 
         balance_data = [
             {
-                'muscle_group': muscle,
-                'workout_count': count,
-                'percentage': round((count / total_sets * 100), 2) if total_sets > 0 else 0,
+                'muscle_group': row['muscle_group__display_name'],
+                'workout_count': row['set_count'],
+                'percentage': round((row['set_count'] / total_sets * 100), 2) if total_sets > 0 else 0,
+                'total_reps': row['total_reps'],
+                'total_volume': float(row['total_volume']),
             }
-            for muscle, count in muscle_counts.items()
+            for row in groups
         ]
 
         return Response(balance_data)
@@ -1110,19 +945,31 @@ class PersonalRecordViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def by_exercise(self, request):
-        """Get personal records grouped by exercise"""
+        """Get personal records and best lifts per rep range grouped by exercise"""
         records = self.get_queryset().filter(is_active=True).select_related('exercise')
+        lifts = BestLift.objects.filter(user=request.user).select_related('exercise')
 
         grouped = {}
-        for record in records:
-            exercise_id = str(record.exercise.id)
+
+        def group(exercise):
+            exercise_id = str(exercise.id)
             if exercise_id not in grouped:
                 grouped[exercise_id] = {
                     'exercise_id': exercise_id,
-                    'exercise_name': record.exercise.name,
+                    'exercise_name': exercise.name,
                     'records': [],
+                    'best_lifts': [],
                 }
-            grouped[exercise_id]['records'].append(PersonalRecordSerializer(record).data)
+            return grouped[exercise_id]
+
+        for record in records:
+            group(record.exercise)['records'].append(PersonalRecordSerializer(record).data)
+        best_by_exercise = defaultdict(list)
+        for lift in lifts:
+            group(lift.exercise)['best_lifts'].append(BestLiftSerializer(lift).data)
+            best_by_exercise[str(lift.exercise_id)].append(lift)
+        for exercise_id, entry in grouped.items():
+            entry['estimated_1rm'] = estimated_1rm(best_by_exercise.get(exercise_id))
 
         return Response(list(grouped.values()))
 
@@ -1189,6 +1036,11 @@ class ExerciseStatsViewSet(viewsets.ReadOnlyModelViewSet):
 
     def get_object(self):
         obj, _ = ExerciseStats.objects.get_or_create(user=self.request.user)
+        if obj.tracking_initialized:
+            # Streaks and 30-day averages move with the calendar between writes
+            derive_exercise_stats(obj)
+        else:
+            obj.update_stats()
         self.check_object_permissions(self.request, obj)
         return obj
 
@@ -1210,3 +1062,30 @@ class ProgressiveOverloadViewSet(viewsets.ModelViewSet):
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
+
+    @action(detail=False, methods=['get'])
+    def suggestions(self, request):
+        """Next working weights per tracked exercise from the best lift table"""
+        target_reps = int(request.query_params.get('reps', 8))
+        overloads = self.get_queryset().select_related('exercise')
+        lifts = defaultdict(list)
+        for lift in BestLift.objects.filter(user=request.user, exercise__in=[o.exercise_id for o in overloads]):
+            lifts[lift.exercise_id].append(lift)
+
+        suggestions = []
+        for overload in overloads:
+            one_rep_max = estimated_1rm(lifts[overload.exercise_id])
+            best = max(lifts[overload.exercise_id], key=lambda lift: lift.epley_1rm, default=None)
+            suggestions.append({
+                'exercise_id': str(overload.exercise_id),
+                'exercise_name': overload.exercise.name,
+                'estimated_1rm': one_rep_max,
+                'best_set': BestLiftSerializer(best).data if best else None,
+                'target_reps': target_reps,
+                'suggested_weight_kg': (
+                    float(suggested_weight(one_rep_max['epley'], target_reps)) if one_rep_max else None
+                ),
+                'baseline_weight_kg': float(overload.baseline_weight_kg) if overload.baseline_weight_kg else None,
+            })
+
+        return Response(suggestions)
@@ -0,0 +1,113 @@
+"""Daily muscle group volume rollup maintained from ExerciseSet writes.
+
+Saving or deleting a set applies its contribution (one set, its reps and
+``calculate_volume()``) as an ``F()`` delta to the day's rows for each muscle
+group its exercise trains, plus the day's all-sets row. Changes that bypass
+set signals (editing an exercise's muscle groups, deleting an exercise) rebuild
+the affected days from a grouped aggregate, as does the
+``rebuild_muscle_volume`` command.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .models import Exercise, ExerciseSet, MuscleGroupVolumeDaily
+
+MuscleGroupLink = Exercise.muscle_groups.through
+
+
+def muscle_group_ids(exercise_id):
+    if exercise_id is None:
+        return []
+    return list(MuscleGroupLink.objects.filter(exercise_id=exercise_id).values_list('musclegroup_id', flat=True))
+
+
+def set_contribution(exercise_set):
+    """(user_id, day, muscle group ids, reps, volume) counted for one set"""
+    return (
+        exercise_set.user_id,
+        timezone.localdate(exercise_set.completed_at),
+        muscle_group_ids(exercise_set.exercise_id),
+        exercise_set.reps or 0,
+        Decimal(str(round(exercise_set.calculate_volume(), 2))),
+    )
+
+
+def apply_set_delta(user_id, day, group_ids, sets, reps, volume):
+    """Add a signed contribution to the day's total row and its muscle group rows.
+
+    Rows are only created for added sets; removals and in-place edits update
+    the rows that counted the set, so cascading deletes never re-insert them.
+    """
+    if sets > 0:
+        MuscleGroupVolumeDaily.objects.bulk_create(
+            [MuscleGroupVolumeDaily(user_id=user_id, date=day, muscle_group_id=key) for key in [None, *group_ids]],
+            ignore_conflicts=True,
+        )
+    rows = MuscleGroupVolumeDaily.objects.filter(
+        Q(muscle_group__isnull=True) | Q(muscle_group_id__in=group_ids),
+        user_id=user_id,
+        date=day,
+    )
+    rows.update(sets=F('sets') + sets, reps=F('reps') + reps, volume=F('volume') + volume)
+    if sets < 0:
+        rows.filter(sets__lte=0).delete()
+
+
+def aggregate_rollup_rows(sets):
+    """MuscleGroupVolumeDaily rows for an ExerciseSet queryset, from two grouped queries"""
+    volume = Coalesce(
+        Sum(ExpressionWrapper(F('reps') * F('weight_kg'), output_field=DecimalField())),
+        Value(Decimal('0')),
+        output_field=DecimalField(),
+    )
+    totals = dict(sets=Count('id'), total_reps=Coalesce(Sum('reps'), 0), total_volume=volume)
+    sets = sets.annotate(day=TruncDate('completed_at')).order_by()
+
+    rows = [
+        MuscleGroupVolumeDaily(
+            user_id=row['user_id'], date=row['day'], muscle_group_id=None,
+            sets=row['sets'], reps=row['total_reps'], volume=row['total_volume'],
+        )
+        for row in sets.values('user_id', 'day').annotate(**totals)
+    ]
+    rows += [
+        MuscleGroupVolumeDaily(
+            user_id=row['user_id'], date=row['day'], muscle_group_id=row['exercise__muscle_groups'],
+            sets=row['sets'], reps=row['total_reps'], volume=row['total_volume'],
+        )
+        for row in sets.filter(exercise__muscle_groups__isnull=False).values(
+            'user_id', 'day', 'exercise__muscle_groups'
+        ).annotate(**totals)
+    ]
+    return rows
+
+
+def rebuild_muscle_volume(user_id, dates=None):
+    """Replace a user's rollup rows (optionally only for some days) from ExerciseSet"""
+    sets = ExerciseSet.objects.filter(user_id=user_id)
+    rollups = MuscleGroupVolumeDaily.objects.filter(user_id=user_id)
+    if dates is not None:
+        dates = list(dates)
+        sets = sets.filter(completed_at__date__in=dates)
+        rollups = rollups.filter(date__in=dates)
+
+    rows = aggregate_rollup_rows(sets)
+    with transaction.atomic():
+        rollups.delete()
+        MuscleGroupVolumeDaily.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def exercise_set_days(exercise_ids):
+    """{user_id: {day, ...}} on which the given exercises have logged sets"""
+    days = {}
+    rows = ExerciseSet.objects.filter(exercise_id__in=exercise_ids).annotate(
+        day=TruncDate('completed_at')
+    ).values_list('user_id', 'day').distinct().order_by()
+    for user_id, day in rows:
+        days.setdefault(user_id, set()).add(day)
+    return days
@@ -0,0 +1,148 @@
+"""Journal activity for ``JournalStatsViewSet``, built from one query.
+
+The consistency grid, the weekday, hour and word-count patterns and the mood
+series all come from a single ``UNION ALL``. It holds one row per entry
+(date, word count, creation time, id) and one row per JournalMood (date and
+ratings) in the window. Everything else is computed in memory.
+
+Results are cached per user and window. The key holds the user's latest
+entry and mood timestamps and counts, read in one more query, so any write or
+delete moves the key. It also holds the date, because the window moves at
+midnight.
+"""
+from collections import Counter
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Count, DateTimeField, F, IntegerField, Max, OuterRef, Subquery, UUIDField, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import JournalEntry, JournalMood
+
+ACTIVITY_TIMEOUT = 60 * 60 * 24
+
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+WORD_RANGES = [
+    ('0-100', 0, 100),
+    ('100-500', 100, 500),
+    ('500-1000', 500, 1000),
+    ('1000+', 1000, None),
+]
+
+
+def _null(field):
+    return Value(None, output_field=field)
+
+
+def _activity_rows(user_id, since):
+    """(date, word count, created at, entry id, mood, energy, stress, sleep) rows; entries have no mood values"""
+    # Only expressions: a union lines columns up by SELECT position, and Django
+    # selects plain fields ahead of expressions
+    entries = JournalEntry.objects.filter(user_id=user_id).values_list(
+        F('entry_date'), F('word_count'), F('created_at'), F('id'),
+        _null(IntegerField()), _null(IntegerField()), _null(IntegerField()), _null(IntegerField()),
+    )
+    moods = JournalMood.objects.filter(user_id=user_id).values_list(
+        F('date'), _null(IntegerField()), _null(DateTimeField()), _null(UUIDField()),
+        F('mood'), F('energy_level'), F('stress_level'), F('sleep_quality'),
+    )
+    if since is not None:
+        entries = entries.filter(entry_date__gte=since)
+        moods = moods.filter(date__gte=since)
+    # Unions drop the models' default ordering
+    return entries.order_by().union(moods.order_by(), all=True)
+
+
+def build_journal_activity(user_id, today, days=None):
+    """Activity over the last ``days`` days up to ``today``, or all time"""
+    since = today - timedelta(days=days) if days is not None else None
+    entries, moods = {}, []
+    for day, word_count, created_at, entry_id, mood, energy, stress, sleep in _activity_rows(user_id, since):
+        if entry_id is not None:
+            entries[day] = (entry_id, word_count, timezone.localtime(created_at).hour)
+        else:
+            moods.append((day, mood, energy, stress, sleep))
+
+    if since is None:
+        since = min(entries, default=today)
+    calendar = []
+    day = since
+    while day <= today:
+        calendar.append({'date': day.strftime('%Y-%m-%d'), 'has_entry': day in entries})
+        day += timedelta(days=1)
+    days_with_entries = sum(1 for day in calendar if day['has_entry'])
+
+    weekdays = Counter(day.weekday() for day in entries)
+    hours = Counter(hour for _, _, hour in entries.values())
+    word_counts = [word_count for _, word_count, _ in entries.values()]
+
+    mood_series = []
+    for day, mood, energy, stress, sleep in sorted(moods, key=lambda row: row[0]):
+        entry_id, word_count, _ = entries.get(day, (None, 0, None))
+        mood_series.append({
+            'date': day.strftime('%Y-%m-%d'),
+            'mood': mood,
+            'energy_level': energy,
+            'stress_level': stress,
+            'sleep_quality': sleep,
+            'has_entry': entry_id is not None,
+            'entry_id': str(entry_id) if entry_id else None,
+            'word_count': word_count,
+        })
+
+    return {
+        'consistency': {
+            'data': calendar,
+            'consistency_percent': round(days_with_entries / len(calendar) * 100, 1) if calendar else 0,
+            'days_with_entries': days_with_entries,
+            'total_days': len(calendar),
+        },
+        'mood_series': mood_series,
+        'day_distribution': [
+            {'day': name, 'count': weekdays[index]} for index, name in enumerate(DAY_NAMES) if weekdays[index]
+        ],
+        'hour_distribution': [{'hour': hour, 'count': hours[hour]} for hour in sorted(hours)],
+        'word_distribution': [
+            {'range': label, 'count': sum(1 for n in word_counts if n >= low and (high is None or n < high))}
+            for label, low, high in WORD_RANGES
+        ],
+    }
+
+
+def _latest(queryset, field):
+    return Subquery(queryset.values('user').annotate(latest=Max(field)).values('latest')[:1])
+
+
+def _count(queryset):
+    return Coalesce(Subquery(queryset.values('user').annotate(n=Count('id')).values('n')[:1]), 0)
+
+
+def _activity_marker(user_id):
+    """Latest write time and row count of the user's entries and moods, in one query"""
+    entries = JournalEntry.objects.filter(user=OuterRef('pk'))
+    moods = JournalMood.objects.filter(user=OuterRef('pk'))
+    marker = get_user_model().objects.filter(pk=user_id).values(
+        latest_entry=_latest(entries, 'updated_at'),
+        entry_count=_count(entries),
+        latest_mood=_latest(moods, 'updated_at'),
+        mood_count=_count(moods),
+    ).get()
+    return ':'.join(
+        value.isoformat() if hasattr(value, 'isoformat') else str(value)
+        for value in (marker['latest_entry'], marker['entry_count'], marker['latest_mood'], marker['mood_count'])
+    )
+
+
+def get_journal_activity(user_id, days=None):
+    """Cached ``build_journal_activity`` for today"""
+    today = timezone.now().date()
+    window = days if days is not None else 'all'
+    key = f'journal_activity:{user_id}:{window}:{today.isoformat()}:{_activity_marker(user_id)}'
+    activity = cache.get(key)
+    if activity is None:
+        activity = build_journal_activity(user_id, today, days)
+        cache.set(key, activity, ACTIVITY_TIMEOUT)
+    return activity
@@ -5,3 +5,7 @@ class JournalConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.journal'
     verbose_name = 'Journal'
+
+    def ready(self):
+        from .signals import connect_search_signals
+        connect_search_signals()
@@ -0,0 +1,87 @@
+import time
+from datetime import timedelta
+
+from dateutil.relativedelta import relativedelta
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from apps.automation.models import SmartNotification
+from apps.journal.models import JournalEntry, JournalReminder
+from apps.journal.reminders import process_due_reminders
+
+STEPS = {
+    'daily': relativedelta(days=1),
+    'weekly': relativedelta(weeks=1),
+    'monthly': relativedelta(months=1),
+    'yearly': relativedelta(years=1),
+}
+
+
+def legacy_process(now):
+    """The process_due loop, plus the per-row notification and reschedule it lacked"""
+    today = now.date()
+    due = JournalReminder.objects.filter(
+        next_reminder_date__lte=today, is_sent=False, is_dismissed=False,
+    ).select_related('entry')
+    processed = 0
+    for reminder in due:
+        SmartNotification.objects.create(
+            user=reminder.user, title=reminder.entry.title, message=reminder.reflection_question,
+            context_type='journal_reminder', scheduled_for=now,
+        )
+        while reminder.next_reminder_date <= today:
+            reminder.next_reminder_date += STEPS[reminder.reminder_type]
+        reminder.sent_at = now
+        reminder.save()
+        processed += 1
+    return processed
+
+
+class Command(BaseCommand):
+    help = 'Benchmark due JournalReminder processing: per-row saves vs chunked bulk writes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--reminders', type=int, default=50, help='Due reminders per user')
+
+    def handle(self, *args, **options):
+        # Everything happens in a rolled-back transaction
+        with transaction.atomic():
+            self.run(options)
+            transaction.set_rollback(True)
+
+    def run(self, options):
+        User = get_user_model()
+        now = timezone.now()
+        today = now.date()
+        types = list(STEPS)
+        reminders = []
+        for i in range(options['users']):
+            user = User.objects.create_user(
+                username=f'bench-reminders-{i}', email=f'bench-reminders-{i}@example.com', password='x',
+            )
+            entry = JournalEntry.objects.create(user=user, title='Looking back', content='...', entry_date=today)
+            reminders += [
+                JournalReminder(
+                    user=user, entry=entry, reminder_type=types[r % len(types)],
+                    next_reminder_date=today - timedelta(days=r % 90), reflection_question='What changed?',
+                )
+                for r in range(options['reminders'])
+            ]
+        JournalReminder.objects.bulk_create(reminders, batch_size=1000)
+        self.stdout.write(f'{len(reminders)} due reminders for {options["users"]} users')
+
+        for label, process in (('per-row', legacy_process), ('chunked', lambda now: process_due_reminders(now=now))):
+            savepoint = transaction.savepoint()
+            statements = []
+            with connection.execute_wrapper(lambda execute, sql, *args: statements.append(sql) or execute(sql, *args)):
+                t0 = time.perf_counter()
+                processed = process(now)
+                elapsed = time.perf_counter() - t0
+            assert processed == len(reminders), processed
+            transaction.savepoint_rollback(savepoint)
+            self.stdout.write(
+                f'  {label:>7}: {elapsed * 1000:8.0f}ms  {processed / elapsed:8.0f} reminders/s  {len(statements)} statements'
+            )
@@ -0,0 +1,95 @@
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models.signals import post_init
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.journal.memory_lane import on_this_day, sample_entries
+from apps.journal.models import JournalEntry
+
+
+class Command(BaseCommand):
+    help = 'Benchmark memory_lane sampling and "on this day" over years of daily journal entries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--years', type=int, default=10)
+        parser.add_argument('--users', type=int, default=5, help='Users with a full history each')
+        parser.add_argument('--count', type=int, default=5, help='Entries sampled per call')
+        parser.add_argument('--content-size', type=int, default=2000)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        # Everything happens in a rolled-back transaction
+        with transaction.atomic():
+            self.run(options)
+            transaction.set_rollback(True)
+
+    def run(self, options):
+        User = get_user_model()
+        today = timezone.now().date()
+        days = options['years'] * 365
+        content = ('Dear diary, today was a day. ' * (options['content_size'] // 29 + 1))[:options['content_size']]
+        users = [
+            User.objects.create_user(username=f'bench-lane-{i}', email=f'bench-lane-{i}@example.com', password='x')
+            for i in range(options['users'])
+        ]
+        for user in users:
+            JournalEntry.objects.bulk_create([
+                JournalEntry(user=user, content=content, entry_date=today - timedelta(days=n))
+                for n in range(days)
+            ], batch_size=1000)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        entries = JournalEntry.objects.filter(user=users[0])
+        self.stdout.write(f'{days} daily entries for each of {len(users)} users')
+
+        for window in (365, days):
+            since = today - timedelta(days=window)
+
+            def before():
+                return random.sample(list(entries.filter(entry_date__gte=since)), options['count'])
+
+            def after():
+                return sample_entries(entries, since, today, options['count'])
+
+            self.stdout.write(f'memory_lane, {window}-day window:')
+            self.report('random.sample', before, options['repeat'])
+            self.report('sample_entries', after, options['repeat'])
+
+        # The date lookups bind the part name, so no expression index can match them
+        unindexed = entries.filter(
+            entry_date__month=today.month, entry_date__day=today.day, entry_date__lt=today,
+        ).order_by('-entry_date')
+        self.stdout.write('on this day:')
+        self.report('__month/__day', lambda: list(unindexed.all()), options['repeat'])
+        self.report('month/day index', lambda: list(on_this_day(entries, today)), options['repeat'])
+        self.stdout.write(f'  before plan: {unindexed.explain()}')
+        self.stdout.write(f'  after plan: {on_this_day(entries, today).explain()}')
+
+    def report(self, label, fn, repeat):
+        built = {'instances': 0}
+
+        def count(sender, **kwargs):
+            built['instances'] += 1
+
+        fn()
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        elapsed = (time.perf_counter() - t0) / repeat
+        post_init.connect(count, weak=False)
+        try:
+            with CaptureQueriesContext(connection) as queries:
+                fn()
+        finally:
+            post_init.disconnect(count)
+        self.stdout.write(
+            f'  {label:>17}: {elapsed * 1000:8.2f}ms  {len(queries)} queries  {built["instances"]} instances'
+        )
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.journal.models import JournalEntry
+from apps.journal.search import index_entries
+
+
+class Command(BaseCommand):
+    help = 'Rewrite the full-text search documents of journal entries, in keyset chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Only rebuild the entries of this user email')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Entries per chunk')
+
+    def handle(self, *args, **options):
+        entry_ids = JournalEntry.objects.order_by('pk').values_list('pk', flat=True)
+        if options['user']:
+            entry_ids = entry_ids.filter(user__email=options['user'])
+
+        total = 0
+        last_id = None
+        while True:
+            chunk = list((entry_ids if last_id is None else entry_ids.filter(pk__gt=last_id))[:options['chunk_size']])
+            if not chunk:
+                break
+            with transaction.atomic():
+                index_entries(chunk)
+            total += len(chunk)
+            last_id = chunk[-1]
+            self.stdout.write(f'{total} entries')
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt the search documents of {total} entries'))
@@ -0,0 +1,77 @@
+"""Random and "on this day" journal entries without loading every entry.
+
+A user has at most one entry per date, so within a user's entries the date
+is an ordinal with an index behind it: (user, entry_date). ``sample_entries``
+draws random dates from the window and fetches them with one indexed
+``IN``. Dates without an entry are misses; the next round redraws only as
+many dates as are still needed, scaled by the window's entry density.
+Windows too sparse for that (a handful of entries over years) take random
+offsets into the same index instead. Either way only the sampled rows are
+loaded.
+
+``on_this_day`` finds the entries written on today's month and day in
+earlier years through the (user, month, day) expression index.
+"""
+import math
+import random
+from datetime import timedelta
+
+from .models import EntryDay, EntryMonth
+
+# Redrawing rounds before falling back to offsets
+MAX_DRAW_ROUNDS = 4
+
+# Extra dates drawn per round, over the expected number needed
+OVERSAMPLE = 1.5
+
+# Below this share of days with an entry, offsets are cheaper than redrawing
+MIN_DRAW_DENSITY = 0.1
+
+
+def _sample_by_offset(window, total, k, rng):
+    ids = window.order_by('entry_date').values_list('pk', flat=True)
+    picked = [ids[offset] for offset in rng.sample(range(total), k)]
+    rows = window.in_bulk(picked)
+    return [rows[pk] for pk in picked]
+
+
+def sample_entries(queryset, since, until, k, rng=random):
+    """Up to ``k`` entries of ``queryset`` dated ``since`` to ``until``, uniformly at random"""
+    window = queryset.filter(entry_date__range=(since, until))
+    days = (until - since).days + 1
+    total = window.count()
+    if total <= k:
+        entries = list(window)
+        rng.shuffle(entries)
+        return entries
+    density = total / days
+    if density < MIN_DRAW_DENSITY:
+        return _sample_by_offset(window, total, k, rng)
+
+    picked, tried = [], set()
+    for _ in range(MAX_DRAW_ROUNDS):
+        need = k - len(picked)
+        untried = days - len(tried)
+        draw = min(untried, math.ceil(need / density * OVERSAMPLE))
+        offsets = []
+        while len(offsets) < draw:
+            offset = rng.randrange(days)
+            if offset not in tried:
+                tried.add(offset)
+                offsets.append(offset)
+        dates = [since + timedelta(days=offset) for offset in offsets]
+        found = {entry.entry_date: entry for entry in window.filter(entry_date__in=dates)}
+        # In draw order, so the entries kept from an oversized draw are random too
+        picked.extend(found[day] for day in dates if day in found)
+        if len(picked) >= k:
+            return picked[:k]
+    # Unlucky draws: take the rest by offset, excluding what is already picked
+    rest = window.exclude(pk__in=[entry.pk for entry in picked])
+    return picked + _sample_by_offset(rest, total - len(picked), k - len(picked), rng)
+
+
+def on_this_day(queryset, day):
+    """Entries of ``queryset`` written on ``day``'s month and day in earlier years, newest first"""
+    return queryset.annotate(
+        entry_month=EntryMonth('entry_date'), entry_day=EntryDay('entry_date'),
+    ).filter(entry_month=day.month, entry_day=day.day, entry_date__lt=day).order_by('-entry_date')
@@ -0,0 +1,91 @@
+# Generated by Django 5.0.14 on 2026-10-19 07:59
+
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+TAG_NAMES = {
+    'postgresql': "string_agg(t.name, ' ')",
+    'sqlite': "group_concat(t.name, ' ')",
+}
+
+ENTRY_TAG_NAMES = """
+    (SELECT {aggregate} FROM journal_journalentry_tags et
+     JOIN journal_journaltag t ON t.id = et.journaltag_id
+     WHERE et.journalentry_id = e.id)
+"""
+
+POSTGRES_FORWARD = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    f"""
+    UPDATE journal_journalentry e SET search_vector =
+        setweight(to_tsvector('english', coalesce(e.title, '')), 'A')
+        || setweight(to_tsvector('english', coalesce({ENTRY_TAG_NAMES.format(aggregate=TAG_NAMES['postgresql'])}, '')), 'A')
+        || setweight(to_tsvector('english', coalesce(e.content, '')), 'B')
+    """,
+    'CREATE INDEX journal_entry_search_gin ON journal_journalentry USING gin (search_vector)',
+    'CREATE INDEX journal_entry_title_trgm ON journal_journalentry USING gin (title gin_trgm_ops)',
+]
+
+POSTGRES_REVERSE = [
+    'DROP INDEX IF EXISTS journal_entry_title_trgm',
+    'DROP INDEX IF EXISTS journal_entry_search_gin',
+]
+
+SQLITE_FORWARD = [
+    # entry_id stays indexed so a document can be found by its entry
+    "CREATE VIRTUAL TABLE journal_entry_fts USING fts5(entry_id, title, content, tags, tokenize='porter unicode61')",
+    # bm25 weights per column: title and tags count as much as PostgreSQL's A, content as B
+    "INSERT INTO journal_entry_fts (journal_entry_fts, rank) VALUES ('rank', 'bm25(0.0, 10.0, 4.0, 10.0)')",
+    f"""
+    INSERT INTO journal_entry_fts (entry_id, title, content, tags)
+    SELECT e.id, e.title, e.content, coalesce({ENTRY_TAG_NAMES.format(aggregate=TAG_NAMES['sqlite'])}, '')
+    FROM journal_journalentry e
+    """,
+]
+
+SQLITE_REVERSE = ['DROP TABLE IF EXISTS journal_entry_fts']
+
+
+def _run(schema_editor, statements):
+    for sql in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def create_search_indexes(apps, schema_editor):
+    """Build the search documents of existing entries and index them"""
+    _run(schema_editor, {'postgresql': POSTGRES_FORWARD, 'sqlite': SQLITE_FORWARD})
+
+
+def drop_search_indexes(apps, schema_editor):
+    _run(schema_editor, {'postgresql': POSTGRES_REVERSE, 'sqlite': SQLITE_REVERSE})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('journal', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JournalEntrySearchDocument',
+            fields=[
+                ('rowid', models.BigAutoField(primary_key=True, serialize=False)),
+                ('title', models.TextField()),
+                ('content', models.TextField()),
+                ('tags', models.TextField()),
+                ('document', models.TextField(db_column='journal_entry_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'journal_entry_fts',
+                'managed': False,
+            },
+        ),
+        migrations.AddField(
+            model_name='journalentry',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
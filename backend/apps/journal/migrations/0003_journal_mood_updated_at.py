@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-19 08:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('journal', '0002_journal_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='journalmood',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.0.14 on 2026-10-19 08:13
+
+import apps.journal.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('journal', '0003_journal_mood_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='journalentry',
+            index=models.Index(models.F('user'), apps.journal.models.EntryMonth('entry_date'), apps.journal.models.EntryDay('entry_date'), name='journal_entry_user_month_day'),
+        ),
+    ]
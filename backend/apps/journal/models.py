@@ -1,7 +1,9 @@
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVectorField
 from django.utils import timezone
-from django.db.models import Count, Q
+from django.db.models import Count, F, Q
+from django.db.models.functions import ExtractDay, ExtractMonth
 from datetime import timedelta, date
 import uuid
 import re
@@ -9,6 +11,25 @@ import re
 User = get_user_model()
 
 
+class _InlineDatePart:
+    """Date part extraction that SQLite can serve from an expression index.
+    
+    Django passes the part name to SQLite as a bound parameter, and SQLite
+    only matches an indexed expression written out in full.
+    """
+    def as_sqlite(self, compiler, connection, **extra_context):
+        sql, params = compiler.compile(self.lhs)
+        return f"django_date_extract('{self.lookup_name}', {sql})", params
+
+
+class EntryMonth(_InlineDatePart, ExtractMonth):
+    pass
+
+
+class EntryDay(_InlineDatePart, ExtractDay):
+    pass
+
+
 class JournalTag(models.Model):
     """Tags for categorizing journal entries by themes, people, events"""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4)
@@ -51,6 +72,7 @@ class JournalMood(models.Model):
     
     # Timestamp
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     date = models.DateField(default=timezone.now)
     
     class Meta:
@@ -193,12 +215,22 @@ class JournalEntry(models.Model):
     # Word count tracking
     word_count = models.PositiveIntegerField(default=0)
     
+    # Full-text document on PostgreSQL, kept by search.index_entries
+    search_vector = SearchVectorField(null=True, editable=False)
+    
     class Meta:
         ordering = ['-entry_date', '-created_at']
         unique_together = ['user', 'entry_date']
+        # The GIN indexes on search_vector and title are PostgreSQL only, so
+        # migration 0002 creates them rather than this list
         indexes = [
             models.Index(fields=['user', '-entry_date']),
             models.Index(fields=['user', 'is_favorite']),
+            # "On this day" lookups
+            models.Index(
+                F('user'), EntryMonth('entry_date'), EntryDay('entry_date'),
+                name='journal_entry_user_month_day',
+            ),
         ]
     
     def __str__(self):
@@ -265,6 +297,42 @@ class JournalEntry(models.Model):
         return [word for word, count in sorted_words[:top_n]]
 
 
+class FullTextMatch(models.Lookup):
+    """``<column> MATCH <query>`` for SQLite FTS5 tables"""
+    lookup_name = 'match'
+    
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', [*lhs_params, *rhs_params]
+
+
+class JournalEntrySearchDocument(models.Model):
+    """A row of the SQLite FTS5 table ``journal_entry_fts``.
+    
+    Only exists on SQLite, where it stands in for ``JournalEntry.search_vector``;
+    see search.py.
+    """
+    rowid = models.BigAutoField(primary_key=True)
+    entry = models.OneToOneField(
+        JournalEntry, on_delete=models.DO_NOTHING, db_constraint=False, related_name='search_document'
+    )
+    title = models.TextField()
+    content = models.TextField()
+    tags = models.TextField()
+    
+    # FTS5 hidden columns: the one named after the table takes MATCH, rank is bm25
+    document = models.TextField(db_column='journal_entry_fts')
+    rank = models.FloatField()
+    
+    class Meta:
+        managed = False
+        db_table = 'journal_entry_fts'
+
+
+JournalEntrySearchDocument._meta.get_field('document').register_lookup(FullTextMatch)
+
+
 class JournalStreak(models.Model):
     """Track consecutive journaling days for users"""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4)
@@ -0,0 +1,176 @@
+"""Ranked full-text search over journal entries.
+
+Each entry has one search document. It is made of the entry's title and tag
+names, weighted A, and its content, weighted B. Where the document lives
+depends on the database:
+
+- PostgreSQL: ``JournalEntry.search_vector``, a tsvector with a GIN index.
+  Titles are also matched by trigram similarity, through a ``gin_trgm_ops``
+  index, so a misspelt title still finds its entry.
+- SQLite (the default settings database): the FTS5 table
+  ``journal_entry_fts``, ranked by bm25 with the same weights.
+
+The match, the rank and every filter of the search endpoint compile to a
+single statement. Results are paginated by a keyset cursor on (rank, id), so
+a later page costs the same as the first. Other databases fall back to
+unranked ``icontains`` matching.
+
+Documents are rewritten by ``index_entries``. The journal signals call it on
+every entry save and tag change. ``manage.py rebuild_journal_search`` rebuilds
+all of them.
+"""
+import base64
+import binascii
+import json
+import re
+import uuid
+from collections import defaultdict
+
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramSimilarity
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.db.models import F, FloatField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Cast, Greatest
+
+from .models import JournalEntry
+
+SEARCH_CONFIG = 'english'
+FTS_TABLE = 'journal_entry_fts'
+
+# FTS5 limits query expression depth, which bounds the ids deleted per statement
+FTS_DELETE_CHUNK = 100
+
+# Phrases in double quotes, or single words; a leading '-' excludes the term
+TERM_PATTERN = re.compile(r'(-?)"([^"]*)"|(-?)(\w+)')
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _tag_names():
+    """An entry's tag names as one string, for use inside an UPDATE"""
+    return Subquery(
+        JournalEntry.tags.through.objects.filter(journalentry_id=OuterRef('pk'))
+        .values('journalentry_id').annotate(names=StringAgg('journaltag__name', ' ')).values('names')
+    )
+
+
+def _search_vector():
+    return (
+        SearchVector('title', weight='A', config=SEARCH_CONFIG)
+        + SearchVector(_tag_names(), weight='A', config=SEARCH_CONFIG)
+        + SearchVector('content', weight='B', config=SEARCH_CONFIG)
+    )
+
+
+def _index_sqlite(entry_ids):
+    pk = JournalEntry._meta.pk
+    entries = JournalEntry.objects.filter(pk__in=entry_ids).values_list('pk', 'title', 'content')
+    tags = defaultdict(list)
+    for entry_id, name in JournalEntry.tags.through.objects.filter(journalentry_id__in=entry_ids).values_list(
+        'journalentry_id', 'journaltag__name',
+    ):
+        tags[entry_id].append(name)
+    stored_ids = [pk.get_db_prep_value(entry_id, connection) for entry_id in entry_ids]
+    with connection.cursor() as cursor:
+        # entry_id is indexed by FTS5 itself, so this finds the old rows without a scan
+        for start in range(0, len(stored_ids), FTS_DELETE_CHUNK):
+            chunk = stored_ids[start:start + FTS_DELETE_CHUNK]
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+                [' OR '.join(f'entry_id:"{entry_id}"' for entry_id in chunk)],
+            )
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE} (entry_id, title, content, tags) VALUES (%s, %s, %s, %s)',
+            [
+                (pk.get_db_prep_value(entry_id, connection), title, content, ' '.join(tags[entry_id]))
+                for entry_id, title, content in entries
+            ],
+        )
+
+
+def index_entries(entry_ids):
+    """Rewrite the search documents of the given entries; deleted entries lose theirs"""
+    entry_ids = list(entry_ids)
+    if not entry_ids:
+        return
+    if connection.vendor == 'postgresql':
+        JournalEntry.objects.filter(pk__in=entry_ids).update(search_vector=_search_vector())
+    elif connection.vendor == 'sqlite':
+        _index_sqlite(entry_ids)
+
+
+def fts5_query(text):
+    """FTS5 query for free text: all words and "quoted phrases" must match, -terms must not.
+
+    Terms are reduced to their word characters and quoted, so no user input
+    reaches FTS5 as query syntax. Returns '' when nothing is left to match.
+    """
+    include, exclude = [], []
+    for phrase_sign, phrase, word_sign, word in TERM_PATTERN.findall(text):
+        tokens = re.findall(r'\w+', phrase or word)
+        if tokens:
+            term = '"{}"'.format(' '.join(tokens))
+            (exclude if phrase_sign or word_sign else include).append(term)
+    if not include:
+        return ''
+    columns = '{title content tags}'
+    query = f'{columns}: ({" AND ".join(include)})'
+    for term in exclude:
+        query += f' NOT {columns}: {term}'
+    return query
+
+
+def search_entries(queryset, text):
+    """Entries of ``queryset`` matching ``text``, annotated with ``search_rank`` (higher is better)"""
+    if connection.vendor == 'postgresql':
+        query = SearchQuery(text, config=SEARCH_CONFIG, search_type='websearch')
+        # double precision, so a rank read back from a cursor compares equal
+        rank = Cast(Greatest(SearchRank(F('search_vector'), query), TrigramSimilarity('title', text)), FloatField())
+        return queryset.filter(Q(search_vector=query) | Q(title__trigram_similar=text)).annotate(search_rank=rank)
+    if connection.vendor == 'sqlite':
+        query = fts5_query(text)
+        if not query:
+            return queryset.annotate(search_rank=Value(0.0, output_field=FloatField())).none()
+        # bm25 is lower for better matches
+        return queryset.filter(search_document__document__match=query).annotate(
+            search_rank=-F('search_document__rank'),
+        )
+    return queryset.filter(Q(title__icontains=text) | Q(content__icontains=text)).annotate(
+        search_rank=Value(0.0, output_field=FloatField()),
+    )
+
+
+def encode_cursor(value, pk):
+    if hasattr(value, 'isoformat'):
+        value = value.isoformat()
+    return base64.urlsafe_b64encode(json.dumps([value, str(pk)]).encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        value, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        pk = uuid.UUID(pk)
+    except (binascii.Error, UnicodeError, ValueError, TypeError, AttributeError) as exc:
+        raise InvalidCursor('Invalid cursor') from exc
+    if not isinstance(value, (str, int, float)):
+        raise InvalidCursor('Invalid cursor')
+    return value, pk
+
+
+def keyset_page(queryset, field, cursor=None, limit=20):
+    """One page of ``queryset`` by ``field`` descending, ties by id; returns (rows, next cursor)"""
+    queryset = queryset.order_by(f'-{field}', 'id')
+    if cursor:
+        value, pk = decode_cursor(cursor)
+        try:
+            queryset = queryset.filter(Q(**{f'{field}__lt': value}) | Q(**{field: value, 'id__gt': pk}))
+        except ValidationError as exc:
+            raise InvalidCursor('Invalid cursor') from exc
+    rows = list(queryset[:limit + 1])
+    if len(rows) <= limit:
+        return rows, None
+    last = rows[limit - 1]
+    return rows[:limit], encode_cursor(getattr(last, field), last.pk)
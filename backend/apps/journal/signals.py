@@ -0,0 +1,56 @@
+"""Keep journal search documents in step with entries and tags."""
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+
+from .models import JournalEntry, JournalTag
+from .search import index_entries
+
+# Entry fields that are part of the search document
+SEARCHED_FIELDS = {'title', 'content'}
+
+
+def _index_saved_entry(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and not SEARCHED_FIELDS & set(update_fields)):
+        return
+    index_entries([instance.pk])
+
+
+def _index_deleted_entry(sender, instance, **kwargs):
+    # Drops the entry's document
+    index_entries([instance.pk])
+
+
+def _entry_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear' and reverse:
+        # The cleared entries cannot be told apart afterwards
+        instance._search_cleared_entries = list(instance.journalentry_set.values_list('pk', flat=True))
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        index_entries([instance.pk])
+    elif action == 'post_clear':
+        index_entries(getattr(instance, '_search_cleared_entries', []))
+    elif pk_set:
+        index_entries(pk_set)
+
+
+def _index_renamed_tag(sender, instance, created=False, raw=False, **kwargs):
+    if raw or created:
+        return
+    index_entries(instance.journalentry_set.values_list('pk', flat=True))
+
+
+def _remember_tagged_entries(sender, instance, **kwargs):
+    instance._search_tagged_entries = list(instance.journalentry_set.values_list('pk', flat=True))
+
+
+def _index_after_tag_deleted(sender, instance, **kwargs):
+    index_entries(getattr(instance, '_search_tagged_entries', []))
+
+
+def connect_search_signals():
+    post_save.connect(_index_saved_entry, sender=JournalEntry, dispatch_uid='journal_search:entry_save')
+    post_delete.connect(_index_deleted_entry, sender=JournalEntry, dispatch_uid='journal_search:entry_delete')
+    m2m_changed.connect(_entry_tags_changed, sender=JournalEntry.tags.through, dispatch_uid='journal_search:tags')
+    post_save.connect(_index_renamed_tag, sender=JournalTag, dispatch_uid='journal_search:tag_save')
+    pre_delete.connect(_remember_tagged_entries, sender=JournalTag, dispatch_uid='journal_search:tag_pre_delete')
+    post_delete.connect(_index_after_tag_deleted, sender=JournalTag, dispatch_uid='journal_search:tag_delete')
@@ -0,0 +1,9 @@
+from celery import shared_task
+
+from .reminders import process_due_reminders
+
+
+@shared_task
+def process_journal_reminders():
+    """Fire due journal reminders into the notification outbox"""
+    return {'processed': process_due_reminders()}
@@ -1,12 +1,22 @@
-from django.test import TestCase
+import random
+from collections import Counter
+
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.utils import timezone
-from datetime import timedelta
+from datetime import date, datetime, time, timedelta
+from rest_framework.test import APIClient
+
+from apps.automation.models import BatchOperation, SmartNotification
 
+from .memory_lane import MAX_DRAW_ROUNDS, sample_entries
 from .models import (
     JournalTag, JournalMood, JournalPrompt, JournalTemplate,
-    JournalEntry, JournalStreak, EntryAnalytics
+    JournalEntry, JournalStreak, EntryAnalytics, JournalEntrySearchDocument, JournalReminder
 )
+from .reminders import next_fire_dates, process_due_reminders
 
 User = get_user_model()
 
@@ -131,3 +141,296 @@ class EntryAnalyticsModelTests(TestCase):
         self.assertGreater(self.analytics.word_count, 0)
         self.assertGreater(self.analytics.character_count, 0)
         self.assertIn(self.analytics.sentiment_label, ['positive', 'negative', 'neutral'])
+
+
+class JournalSearchTests(TestCase):
+    url = '/api/v1/journal/entries/search/'
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='searcher', email='searcher@example.com', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.today = timezone.now().date()
+        self.days = 0
+    
+    def entry(self, title='', content='Nothing much happened.', tags=(), mood=None, days_ago=None):
+        if days_ago is None:
+            self.days += 1
+            days_ago = self.days
+        entry = JournalEntry.objects.create(
+            user=self.user, title=title, content=content, mood=mood,
+            entry_date=self.today - timedelta(days=days_ago),
+        )
+        entry.tags.set(tags)
+        EntryAnalytics.objects.create(entry=entry).update_analytics()
+        return entry
+    
+    def search(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return [row['id'] for row in response.data['results']]
+    
+    def test_title_and_tag_matches_rank_above_content(self):
+        outdoors = JournalTag.objects.create(user=self.user, name='hiking')
+        titled = self.entry(title='Hiking the ridge')
+        tagged = self.entry(tags=[outdoors])
+        mentioned = self.entry(content='Talked about hiking plans over lunch, then worked late.')
+        self.entry(title='Quiet day')
+        
+        ids = self.search(q='hikes')
+        self.assertEqual(set(ids[:2]), {str(titled.pk), str(tagged.pk)})
+        self.assertEqual(ids[2:], [str(mentioned.pk)])
+        self.assertEqual(self.search(q='hiking -ridge'), [str(tagged.pk), str(mentioned.pk)])
+    
+    def test_filters_run_in_the_match_statement(self):
+        happy = JournalMood.objects.create(user=self.user, mood=5)
+        tag = JournalTag.objects.create(user=self.user, name='garden')
+        match = self.entry(content='Wonderful morning in the garden, so grateful.', mood=happy, tags=[tag], days_ago=3)
+        self.entry(content='Garden chores, tired and stressed.', tags=[tag], days_ago=4)
+        self.entry(content='Garden again, wonderful and grateful.', mood=happy, days_ago=40)
+        
+        params = {
+            'q': 'garden', 'min_mood': 4, 'tags': [str(tag.pk)], 'min_sentiment': '0.5',
+            'start_date': (self.today - timedelta(days=10)).isoformat(),
+        }
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.search(**params), [str(match.pk)])
+        searches = [query['sql'] for query in queries if ' MATCH ' in query['sql']]
+        self.assertEqual(len(searches), 1)
+        for column in ('"entry_date"', '"mood"', '"sentiment_score"', '"journaltag_id"'):
+            self.assertIn(column, searches[0])
+    
+    def test_cursor_pages_cover_every_match_once(self):
+        entries = [self.entry(content=f'Morning run number {i}.' + ' Run.' * (i % 3)) for i in range(25)]
+        seen, ranks, cursor = [], [], None
+        while True:
+            params = {'q': 'run', 'limit': 10}
+            if cursor:
+                params['cursor'] = cursor
+            data = self.client.get(self.url, params).data
+            seen.extend(row['id'] for row in data['results'])
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(len(seen), 25)
+        self.assertEqual(set(seen), {str(entry.pk) for entry in entries})
+        
+        bad = self.client.get(self.url, {'q': 'run', 'cursor': 'not-a-cursor'})
+        self.assertEqual(bad.status_code, 400)
+        # Without a query, entries page newest first
+        self.assertEqual(self.search(limit=2), [str(entries[0].pk), str(entries[1].pk)])
+    
+    def test_documents_follow_entry_and_tag_changes(self):
+        tag = JournalTag.objects.create(user=self.user, name='travel')
+        entry = self.entry(title='Lisbon', content='Trams and custard tarts.', tags=[tag])
+        entry.content = 'Ferries and sardines.'
+        entry.save()
+        self.assertEqual(self.search(q='tarts'), [])
+        self.assertEqual(self.search(q='sardines'), [str(entry.pk)])
+
+        BatchOperation.objects.create(
+            user=self.user, target_type='journal_entries', action_type='update',
+            target_ids=[str(entry.pk)], payload={'content': 'Castles and fado.'},
+        ).apply()
+        self.assertEqual(self.search(q='sardines'), [])
+        self.assertEqual(self.search(q='fado'), [str(entry.pk)])
+        
+        tag.name = 'holiday'
+        tag.save()
+        self.assertEqual(self.search(q='holiday'), [str(entry.pk)])
+        tag.journalentry_set.clear()
+        self.assertEqual(self.search(q='holiday'), [])
+        
+        entry.delete()
+        self.assertFalse(JournalEntrySearchDocument.objects.exists())
+    
+    def test_query_syntax_is_not_passed_through(self):
+        entry = self.entry(content='Read "Dune" (again) AND loved it.')
+        self.assertEqual(self.search(q='"dune" (again'), [str(entry.pk)])
+        self.assertEqual(self.search(q='AND OR NOT * ^'), [])
+        self.assertEqual(self.search(q='-dune'), [])
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class JournalActivityTests(TestCase):
+    base = '/api/v1/journal/stats/'
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='writer', email='writer@example.com', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.today = timezone.now().date()
+    
+    def entry(self, days_ago, words=10, hour=9, mood=None):
+        day = self.today - timedelta(days=days_ago)
+        entry = JournalEntry.objects.create(user=self.user, content='word ' * words, entry_date=day, mood=mood)
+        created = timezone.make_aware(datetime.combine(day, time(hour)))
+        JournalEntry.objects.filter(pk=entry.pk).update(created_at=created)
+        return entry
+    
+    def get(self, endpoint, **params):
+        return self.client.get(f'{self.base}{endpoint}/', params).data
+    
+    def test_calendar_patterns_and_mood_series(self):
+        evening = self.entry(0, words=600, hour=21)
+        self.entry(1, words=50, hour=7)
+        self.entry(8, words=1200, hour=7)
+        self.entry(200, words=150, hour=12)
+        JournalMood.objects.create(user=self.user, mood=4, energy_level=6, date=self.today)
+        JournalMood.objects.create(user=self.user, mood=2, date=self.today - timedelta(days=3))
+        
+        consistency = self.get('consistency', days=9)
+        self.assertEqual((consistency['total_days'], consistency['days_with_entries']), (10, 3))
+        self.assertEqual(consistency['consistency_percent'], 30.0)
+        self.assertEqual([day['has_entry'] for day in consistency['data']][-2:], [True, True])
+        
+        moods = self.get('mood_over_time', days=9)
+        self.assertEqual([(row['mood'], row['has_entry']) for row in moods], [(2, False), (4, True)])
+        self.assertEqual((moods[1]['entry_id'], moods[1]['word_count'], moods[1]['energy_level']), (str(evening.pk), 600, 6))
+        
+        patterns = self.get('writing_patterns')
+        weekdays = Counter(
+            (self.today - timedelta(days=days_ago)).strftime('%A') for days_ago in (0, 1, 8, 200)
+        )
+        self.assertEqual({row['day']: row['count'] for row in patterns['day_distribution']}, weekdays)
+        self.assertEqual(patterns['hour_distribution'], [{'hour': 7, 'count': 2}, {'hour': 12, 'count': 1}, {'hour': 21, 'count': 1}])
+        self.assertEqual([row['count'] for row in patterns['word_distribution']], [1, 1, 1, 1])
+        self.assertEqual(sum(row['count'] for row in self.get('writing_patterns', days=30)['word_distribution']), 3)
+    
+    def test_query_budget_and_invalidation(self):
+        entries = [self.entry(days_ago) for days_ago in range(0, 90, 2)]
+        with self.assertNumQueries(2):
+            self.assertEqual(self.get('consistency')['days_with_entries'], 45)
+        with self.assertNumQueries(1):
+            self.get('consistency')
+        
+        entries[0].delete()
+        self.assertEqual(self.get('consistency')['days_with_entries'], 44)
+        self.entry(1)
+        self.assertEqual(self.get('consistency')['days_with_entries'], 45)
+        
+        mood = JournalMood.objects.create(user=self.user, mood=3, date=self.today)
+        self.assertEqual(self.get('mood_over_time')[0]['mood'], 3)
+        mood.mood = 5
+        mood.save()
+        self.assertEqual(self.get('mood_over_time')[0]['mood'], 5)
+
+
+class MemoryLaneTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='reminisce', email='reminisce@example.com', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.today = timezone.now().date()
+    
+    def write(self, days_ago):
+        JournalEntry.objects.bulk_create([
+            JournalEntry(user=self.user, content='Remembering.', entry_date=self.today - timedelta(days=n))
+            for n in days_ago
+        ])
+    
+    def sample(self, days, k, rng):
+        entries = JournalEntry.objects.filter(user=self.user)
+        return sample_entries(entries, self.today - timedelta(days=days), self.today, k, rng)
+    
+    def test_dense_window_is_sampled_uniformly_from_few_rows(self):
+        self.write(range(0, 60, 2))
+        self.write([400])
+        rng = random.Random(1)
+        counts = Counter()
+        for _ in range(300):
+            with CaptureQueriesContext(connection) as queries:
+                picked = self.sample(60, 5, rng)
+            self.assertLessEqual(len(queries), 1 + MAX_DRAW_ROUNDS)
+            self.assertEqual(len({entry.pk for entry in picked}), 5)
+            counts.update(entry.entry_date for entry in picked)
+        self.assertEqual(len(counts), 30)
+        self.assertTrue(all(self.today - date <= timedelta(days=60) for date in counts))
+        # 50 picks expected per entry
+        self.assertGreater(min(counts.values()), 25)
+    
+    def test_sparse_and_small_windows(self):
+        self.write([3, 500, 1200, 2000, 3000])
+        picked = self.sample(3650, 3, random.Random(2))
+        self.assertEqual(len({entry.pk for entry in picked}), 3)
+        self.assertEqual(len(self.sample(3650, 10, random.Random(3))), 5)
+        self.assertEqual(self.sample(2, 3, random.Random(4)), [])
+    
+    def test_endpoints(self):
+        self.write(range(10))
+        for day in ('2023-03-15', '2021-03-15', '2023-03-16', '2024-03-15'):
+            JournalEntry.objects.create(user=self.user, content='Back then.', entry_date=day)
+        
+        lane = self.client.get('/api/v1/journal/entries/memory_lane/', {'days_ago': 30, 'count': 4}).data
+        self.assertEqual(len({row['id'] for row in lane}), 4)
+        on_this_day = self.client.get('/api/v1/journal/entries/on_this_day/', {'date': '2024-03-15'}).data
+        self.assertEqual([row['entry_date'] for row in on_this_day], ['2023-03-15', '2021-03-15'])
+        bad = self.client.get('/api/v1/journal/entries/on_this_day/', {'date': 'soon'})
+        self.assertEqual(bad.status_code, 400)
+
+
+class ReminderProcessingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='recall', email='recall@example.com', password='testpass123')
+        self.entry = JournalEntry.objects.create(
+            user=self.user, title='Lake day', content='Swam.', entry_date=date(2023, 6, 1),
+        )
+        self.now = timezone.make_aware(datetime(2024, 3, 15, 9))
+    
+    def remind(self, next_date, reminder_type='weekly', user=None, **fields):
+        return JournalReminder.objects.create(
+            user=user or self.user, entry=self.entry, reminder_type=reminder_type,
+            next_reminder_date=next_date, **fields
+        )
+    
+    def test_next_fire_dates(self):
+        today = date(2024, 3, 15)
+        fires = next_fire_dates(
+            [date(2024, 3, 12), date(2024, 3, 8), date(2024, 3, 15), date(2024, 1, 31),
+             date(2024, 1, 20), date(2023, 12, 31), date(2020, 2, 29), date(2024, 3, 1)],
+            ['daily', 'weekly', 'weekly', 'monthly', 'monthly', 'monthly', 'yearly', 'once'],
+            today,
+        )
+        self.assertEqual(fires, [
+            date(2024, 3, 16), date(2024, 3, 22), date(2024, 3, 22), date(2024, 3, 31),
+            date(2024, 3, 20), date(2024, 3, 31), date(2025, 2, 28), None,
+        ])
+        self.assertEqual(next_fire_dates([], [], today), [])
+    
+    def test_due_reminders_fire_into_outbox_in_chunks(self):
+        due = [self.remind(date(2024, 3, 15) - timedelta(days=n), reflection_question='Still true?') for n in range(5)]
+        self.remind(date(2024, 3, 1), 'monthly', is_dismissed=True)
+        self.remind(date(2024, 3, 16))
+        other = User.objects.create_user(username='other', email='other@example.com', password='testpass123')
+        self.remind(date(2024, 3, 1), user=other)
+        
+        with CaptureQueriesContext(connection) as queries:
+            processed = process_due_reminders(
+                JournalReminder.objects.filter(user=self.user), now=self.now, chunk_size=2,
+            )
+        self.assertEqual(processed, 5)
+        # One read per chunk of 2, 2 and 1; the short chunk ends the run
+        selects = [q for q in queries if q['sql'].startswith('SELECT')]
+        self.assertEqual(len(selects), 3)
+        
+        notifications = SmartNotification.objects.filter(user=self.user)
+        self.assertEqual(notifications.count(), 5)
+        self.assertTrue(all(n.status == 'pending' and n.message == 'Still true?' for n in notifications))
+        self.assertEqual(
+            {n.context_payload['reminder_id'] for n in notifications}, {str(reminder.pk) for reminder in due},
+        )
+        for reminder in due:
+            reminder.refresh_from_db()
+            self.assertGreater(reminder.next_reminder_date, date(2024, 3, 15))
+            self.assertFalse(reminder.is_sent)
+            self.assertEqual(reminder.sent_at, self.now)
+        self.assertFalse(SmartNotification.objects.filter(user=other).exists())
+        self.assertEqual(process_due_reminders(JournalReminder.objects.filter(user=self.user), now=self.now), 0)
+    
+    def test_process_due_endpoint(self):
+        self.remind(timezone.now().date())
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.post('/api/v1/journal/reminders/process_due/')
+        self.assertEqual(response.data, {'processed': 1})
+        self.assertEqual(SmartNotification.objects.filter(user=self.user).count(), 1)
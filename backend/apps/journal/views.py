@@ -1,7 +1,7 @@
 from rest_framework import viewsets, permissions, filters, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Q, Count, Avg, F, ExpressionWrapper, FloatField
+from django.db.models import Q, Count, Avg, F, Exists, ExpressionWrapper, FloatField, OuterRef
 from django.db.models.functions import TruncDate, TruncWeek, TruncMonth
 from django.utils import timezone
 from datetime import timedelta, datetime
@@ -18,6 +18,13 @@ from .serializers import (
     EntryAnalyticsSerializer, JournalStreakSerializer, JournalReminderSerializer,
     JournalStatsSerializer
 )
+from .activity import get_journal_activity
+from .memory_lane import on_this_day, sample_entries
+from .reminders import process_due_reminders
+from .search import InvalidCursor, keyset_page, search_entries
+
+SEARCH_PAGE_SIZE = 20
+MAX_SEARCH_PAGE_SIZE = 100
 
 
 class JournalTagViewSet(viewsets.ModelViewSet):
@@ -220,9 +227,10 @@ class JournalEntryViewSet(viewsets.ModelViewSet):
         return JournalEntrySerializer
     
     def get_queryset(self):
+        # search_vector is only read inside the database
         queryset = JournalEntry.objects.filter(user=self.request.user).select_related(
             'mood', 'template', 'prompt'
-        ).prefetch_related('tags')
+        ).prefetch_related('tags').defer('search_vector')
         
         # Filter by favorites
         favorites = self.request.query_params.get('favorites')
@@ -393,55 +401,50 @@ class JournalEntryViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def search(self, request):
-        """Advanced search with multiple filters"""
-        queryset = self.get_queryset()
-        
-        # Search query
-        query = request.query_params.get('q')
-        if query:
-            queryset = queryset.filter(
-                Q(title__icontains=query) | Q(content__icontains=query)
-            )
+        """Ranked search with filters, paginated by cursor; see search.py"""
+        # Favorites, date range, tag, template and mood filters come from get_queryset
+        queryset = self.get_queryset().select_related('analytics')
         
         # Tags
         tags = request.query_params.getlist('tags')
         if tags:
-            queryset = queryset.filter(tags__id__in=tags).distinct()
-        
-        # Date range
-        start_date = request.query_params.get('start_date')
-        end_date = request.query_params.get('end_date')
-        if start_date:
-            queryset = queryset.filter(entry_date__gte=start_date)
-        if end_date:
-            queryset = queryset.filter(entry_date__lte=end_date)
+            queryset = queryset.filter(Exists(JournalEntry.tags.through.objects.filter(
+                journalentry_id=OuterRef('pk'), journaltag_id__in=tags
+            )))
+        
+        # Sentiment and word count ranges
+        ranges = [
+            ('min_sentiment', 'analytics__sentiment_score__gte'),
+            ('max_sentiment', 'analytics__sentiment_score__lte'),
+            ('min_words', 'word_count__gte'),
+            ('max_words', 'word_count__lte'),
+        ]
+        for param, lookup in ranges:
+            value = request.query_params.get(param)
+            if value:
+                try:
+                    queryset = queryset.filter(**{lookup: float(value)})
+                except ValueError:
+                    return Response(
+                        {'detail': f'{param} must be a number'},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+        
+        # Search query; without one, the newest entries come first
+        query = request.query_params.get('q', '').strip()
+        if query:
+            queryset, order_field = search_entries(queryset, query), 'search_rank'
+        else:
+            order_field = 'entry_date'
         
-        # Sentiment filtering
-        min_sentiment = request.query_params.get('min_sentiment')
-        max_sentiment = request.query_params.get('max_sentiment')
-        
-        # Apply sentiment filter in Python
-        if min_sentiment or max_sentiment:
-            filtered_ids = []
-            for entry in queryset:
-                sentiment = entry.get_sentiment_score()
-                if min_sentiment and sentiment < float(min_sentiment):
-                    continue
-                if max_sentiment and sentiment > float(max_sentiment):
-                    continue
-                filtered_ids.append(entry.id)
-            queryset = queryset.filter(id__in=filtered_ids)
-        
-        # Word count range
-        min_words = request.query_params.get('min_words')
-        max_words = request.query_params.get('max_words')
-        if min_words:
-            queryset = queryset.filter(word_count__gte=min_words)
-        if max_words:
-            queryset = queryset.filter(word_count__lte=max_words)
+        try:
+            limit = min(max(int(request.query_params.get('limit', SEARCH_PAGE_SIZE)), 1), MAX_SEARCH_PAGE_SIZE)
+            entries, next_cursor = keyset_page(queryset, order_field, request.query_params.get('cursor'), limit)
+        except (ValueError, InvalidCursor) as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
         
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        serializer = self.get_serializer(entries, many=True)
+        return Response({'results': serializer.data, 'next_cursor': next_cursor})
     
     @action(detail=False, methods=['get'])
     def favorites(self, request):
@@ -456,18 +459,26 @@ class JournalEntryViewSet(viewsets.ModelViewSet):
         days_ago = int(request.query_params.get('days_ago', 365))
         count = int(request.query_params.get('count', 5))
         
-        since_date = timezone.now().date() - timedelta(days=days_ago)
-        queryset = self.get_queryset().filter(entry_date__gte=since_date)
-        
-        # Get random entries
-        total_count = queryset.count()
-        if total_count == 0:
-            return Response([])
-        
-        random_entries = random.sample(list(queryset), min(count, total_count))
+        today = timezone.now().date()
+        random_entries = sample_entries(self.get_queryset(), today - timedelta(days=days_ago), today, count)
         serializer = self.get_serializer(random_entries, many=True)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['get'])
+    def on_this_day(self, request):
+        """Get entries written on this month and day in earlier years"""
+        date_str = request.query_params.get('date')
+        try:
+            day = datetime.strptime(date_str, '%Y-%m-%d').date() if date_str else timezone.now().date()
+        except ValueError:
+            return Response(
+                {'detail': 'Invalid date format. Use YYYY-MM-DD'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        serializer = self.get_serializer(on_this_day(self.get_queryset(), day), many=True)
+        return Response(serializer.data)
+    
     @action(detail=False, methods=['get'])
     def word_count_trends(self, request):
         """Get word count trends over time"""
@@ -638,20 +649,9 @@ class JournalReminderViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['post'])
     def process_due(self, request):
-        """Process all due reminders"""
-        today = timezone.now().date()
-        due_reminders = self.get_queryset().filter(
-            next_reminder_date__lte=today,
-            is_sent=False,
-            is_dismissed=False
-        )
-        
-        for reminder in due_reminders:
-            reminder.is_sent = True
-            reminder.sent_at = timezone.now()
-            reminder.save()
-        
-        return Response({'processed': due_reminders.count()})
+        """Process the user's due reminders now, ahead of the beat job"""
+        processed = process_due_reminders(JournalReminder.objects.filter(user=request.user))
+        return Response({'processed': processed})
 
 
 class JournalStatsViewSet(viewsets.ModelViewSet):
@@ -676,114 +676,21 @@ class JournalStatsViewSet(viewsets.ModelViewSet):
     def consistency(self, request):
         """Get consistency metrics over time"""
         days = int(request.query_params.get('days', 90))
-        since_date = timezone.now().date() - timedelta(days=days)
-        
-        entries = JournalEntry.objects.filter(
-            user=request.user,
-            entry_date__gte=since_date
-        ).order_by('entry_date')
-        
-        # Calculate daily streaks
-        consistency_data = []
-        current_date = since_date
-        while current_date <= timezone.now().date():
-            has_entry = entries.filter(entry_date=current_date).exists()
-            consistency_data.append({
-                'date': current_date.strftime('%Y-%m-%d'),
-                'has_entry': has_entry
-            })
-            current_date += timedelta(days=1)
-        
-        # Calculate consistency percentage
-        days_with_entries = sum(1 for d in consistency_data if d['has_entry'])
-        consistency_percent = round(days_with_entries / len(consistency_data) * 100, 1) if consistency_data else 0
-        
-        return Response({
-            'data': consistency_data,
-            'consistency_percent': consistency_percent,
-            'days_with_entries': days_with_entries,
-            'total_days': len(consistency_data)
-        })
+        return Response(get_journal_activity(request.user.pk, days)['consistency'])
     
     @action(detail=False, methods=['get'])
     def mood_over_time(self, request):
         """Get mood trends over time with journal context"""
         days = int(request.query_params.get('days', 30))
-        since_date = timezone.now().date() - timedelta(days=days)
-        
-        moods = JournalMood.objects.filter(
-            user=request.user,
-            date__gte=since_date
-        ).order_by('date')
-        
-        data = []
-        for mood in moods:
-            entry = JournalEntry.objects.filter(
-                user=request.user,
-                entry_date=mood.date
-            ).first()
-            
-            data.append({
-                'date': mood.date.strftime('%Y-%m-%d'),
-                'mood': mood.mood,
-                'energy_level': mood.energy_level,
-                'stress_level': mood.stress_level,
-                'sleep_quality': mood.sleep_quality,
-                'has_entry': entry is not None,
-                'entry_id': str(entry.id) if entry else None,
-                'word_count': entry.word_count if entry else 0
-            })
-        
-        return Response(data)
+        return Response(get_journal_activity(request.user.pk, days)['mood_series'])
     
     @action(detail=False, methods=['get'])
     def writing_patterns(self, request):
-        """Analyze writing patterns"""
-        from django.db.models.functions import ExtractWeekDay, ExtractHour
-        
-        entries = JournalEntry.objects.filter(user=request.user)
-        
-        # Day of week distribution
-        day_distribution = list(
-            entries.annotate(
-                day_of_week=ExtractWeekDay('entry_date')
-            ).values('day_of_week').annotate(
-                count=Count('id')
-            ).order_by('day_of_week')
-        )
-        
-        # Convert to proper format
-        days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-        day_data = []
-        for item in day_distribution:
-            day_index = item['day_of_week'] - 1  # 1-7 to 0-6
-            if 0 <= day_index < 7:
-                day_data.append({
-                    'day': days[day_index],
-                    'count': item['count']
-                })
-        
-        # Word count distribution
-        word_ranges = [
-            ('0-100', 0, 100),
-            ('100-500', 100, 500),
-            ('500-1000', 500, 1000),
-            ('1000+', 1000, float('inf'))
-        ]
-        
-        word_distribution = []
-        for label, min_words, max_words in word_ranges:
-            if max_words == float('inf'):
-                count = entries.filter(word_count__gte=min_words).count()
-            else:
-                count = entries.filter(word_count__gte=min_words, word_count__lt=max_words).count()
-            
-            word_distribution.append({
-                'range': label,
-                'count': count
-            })
-        
+        """Analyze writing patterns, over all entries unless ``days`` is given"""
+        days = request.query_params.get('days')
+        activity = get_journal_activity(request.user.pk, int(days) if days else None)
         return Response({
-            'day_distribution': day_data,
-            'word_distribution': word_distribution
+            'day_distribution': activity['day_distribution'],
+            'hour_distribution': activity['hour_distribution'],
+            'word_distribution': activity['word_distribution'],
         })
@@ -197,6 +197,7 @@ class Emotion(models.Model):
     is_dominant = models.BooleanField(default=False)
     
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['-is_dominant', '-intensity']
@@ -0,0 +1,231 @@
+"""Per-user mood series shared by the timeline, heatmap, pattern and emotion endpoints.
+
+The series is built from two grouped queries (entries per day and time of
+day, emotions per day) and cached as a whole. The cache key carries the
+user's latest ``MoodEntry`` and ``Emotion`` ``updated_at`` plus entry/emotion
+counts, so any write or delete produces a new key and the old series simply
+expires. Requests narrowed by list filters build an uncached series from the
+filtered entries instead.
+"""
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import date
+from itertools import accumulate
+
+from django.core.cache import cache
+from django.db.models import Count, Max, Min, Q, Sum
+
+from .models import Emotion, MoodEntry
+
+SERIES_TIMEOUT = 60 * 60 * 24
+
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+
+def _series_key(user_id):
+    stamp = MoodEntry.objects.filter(user_id=user_id).aggregate(
+        latest=Max('updated_at'),
+        emotion_latest=Max('emotions__updated_at'),
+        entries=Count('id', distinct=True),
+        emotions=Count('emotions'),
+    )
+    latest, emotion_latest = (
+        stamp[key].timestamp() if stamp[key] else 0 for key in ('latest', 'emotion_latest')
+    )
+    return f"mood_series:{user_id}:{latest}:{emotion_latest}:{stamp['entries']}:{stamp['emotions']}"
+
+
+def _build_series(entries):
+    days = defaultdict(lambda: {'sum': 0, 'count': 0, 'min': None, 'max': None, 'by_time': {}})
+    entries = entries.select_related(None).prefetch_related(None).order_by()
+    rows = entries.values('entry_date', 'time_of_day').annotate(
+        total=Sum('mood_value'),
+        count=Count('id'),
+        low=Min('mood_value'),
+        high=Max('mood_value'),
+    )
+    for row in rows:
+        day = days[row['entry_date'].isoformat()]
+        day['sum'] += row['total']
+        day['count'] += row['count']
+        day['min'] = row['low'] if day['min'] is None else min(day['min'], row['low'])
+        day['max'] = row['high'] if day['max'] is None else max(day['max'], row['high'])
+        day['by_time'][row['time_of_day']] = [row['total'], row['count']]
+
+    emotions = Emotion.objects.filter(mood_entry__in=entries.values('pk')).values(
+        'mood_entry__entry_date', 'primary_emotion'
+    ).annotate(
+        count=Count('id'),
+        intensity=Sum('intensity'),
+        dominant=Count('id', filter=Q(is_dominant=True)),
+    )
+    emotion_rows = [
+        [row['mood_entry__entry_date'].isoformat(), row['primary_emotion'], row['count'], row['intensity'], row['dominant']]
+        for row in emotions
+    ]
+
+    dates = sorted(days)
+    return {
+        'dates': dates,
+        'days': [days[d] for d in dates],
+        'emotions': sorted(emotion_rows),
+    }
+
+
+class MoodSeries:
+    """Daily mood aggregates for one user, sliced per endpoint in memory"""
+
+    def __init__(self, data):
+        self.dates = [date.fromisoformat(d) for d in data['dates']]
+        self.days = data['days']
+        self.emotions = [(date.fromisoformat(row[0]), *row[1:]) for row in data['emotions']]
+
+    @classmethod
+    def for_user(cls, user_id):
+        key = _series_key(user_id)
+        data = cache.get(key)
+        if data is None:
+            data = _build_series(MoodEntry.objects.filter(user_id=user_id))
+            cache.set(key, data, SERIES_TIMEOUT)
+        return cls(data)
+
+    @classmethod
+    def for_entries(cls, entries):
+        """Uncached series over a filtered ``MoodEntry`` queryset"""
+        return cls(_build_series(entries))
+
+    def window(self, start_date, end_date=None):
+        """(date, day aggregate) pairs inside the window, in date order"""
+        lo = bisect_left(self.dates, start_date)
+        hi = bisect_right(self.dates, end_date) if end_date else len(self.dates)
+        return list(zip(self.dates[lo:hi], self.days[lo:hi]))
+
+    def timeline(self, start_date):
+        """Daily averages with 7- and 30-recorded-day rolling averages in O(n)"""
+        window = self.window(start_date)
+        averages = [agg['sum'] / agg['count'] for _, agg in window]
+        prefix = [0, *accumulate(averages)]
+
+        timeline = []
+        for i, (day, agg) in enumerate(window):
+            point = {
+                'date': day.isoformat(),
+                'mood_value': round(averages[i], 2),
+                'entry_count': agg['count'],
+            }
+            for size, key in ((7, 'rolling_avg_7d'), (30, 'rolling_avg_30d')):
+                if i >= size - 1:
+                    point[key] = round((prefix[i + 1] - prefix[i + 1 - size]) / size, 2)
+            timeline.append(point)
+
+        return {
+            'timeline': timeline,
+            'overall_average': round(sum(averages) / len(averages), 2) if averages else 0,
+            'highest': max((agg['max'] for _, agg in window), default=0),
+            'lowest': min((agg['min'] for _, agg in window), default=0),
+        }
+
+    def heatmap(self, year):
+        return [
+            {
+                'date': day.isoformat(),
+                'mood_value': round(agg['sum'] / agg['count'], 2),
+                'color': heatmap_color(agg['sum'] / agg['count']),
+                'entry_count': agg['count'],
+            }
+            for day, agg in reversed(self.window(date(year, 1, 1), date(year, 12, 31)))
+        ]
+
+    def patterns(self, start_date, days):
+        window = self.window(start_date)
+        if not window:
+            return []
+        patterns = []
+
+        by_weekday = defaultdict(lambda: [0, 0])
+        by_time = defaultdict(lambda: [0, 0])
+        by_month = defaultdict(lambda: [0, 0])
+        for day, agg in window:
+            for bucket in (by_weekday[day.weekday()], by_month[day.strftime('%Y-%m')]):
+                bucket[0] += agg['sum']
+                bucket[1] += agg['count']
+            for time_of_day, (total, count) in agg['by_time'].items():
+                by_time[time_of_day][0] += total
+                by_time[time_of_day][1] += count
+
+        # Weekly pattern - day of week analysis
+        weekday_avg = {WEEKDAYS[d]: total / count for d, (total, count) in sorted(by_weekday.items())}
+        best_day = max(weekday_avg, key=weekday_avg.get)
+        worst_day = min(weekday_avg, key=weekday_avg.get)
+        patterns.append({
+            'pattern_type': 'weekly',
+            'pattern_data': {
+                'by_day': {d: round(v, 2) for d, v in weekday_avg.items()},
+                'best_day': best_day,
+                'worst_day': worst_day,
+            },
+            'insight': f"Your mood tends to be highest on {best_day} and lowest on {worst_day}."
+        })
+
+        # Time of day pattern
+        time_avg = {t: total / count for t, (total, count) in sorted(by_time.items())}
+        best_time = max(time_avg, key=time_avg.get)
+        patterns.append({
+            'pattern_type': 'time_of_day',
+            'pattern_data': {
+                'by_time': {t: round(v, 2) for t, v in time_avg.items()}
+            },
+            'insight': f"You tend to feel best during the {best_time}."
+        })
+
+        # Monthly trend
+        monthly = [(month, total / count) for month, (total, count) in sorted(by_month.items())]
+        if len(monthly) > 1:
+            trend = 'improving' if monthly[-1][1] > monthly[0][1] else 'declining'
+            patterns.append({
+                'pattern_type': 'monthly_trend',
+                'pattern_data': {
+                    'monthly_averages': [
+                        {'month': month, 'avg_mood': round(avg, 2)} for month, avg in monthly
+                    ]
+                },
+                'insight': f"Your mood has been generally {trend} over the past {days} days."
+            })
+
+        return patterns
+
+    def emotion_distribution(self, start_date):
+        totals = defaultdict(lambda: [0, 0, 0])
+        for day, emotion, count, intensity, dominant in self.emotions:
+            if day >= start_date:
+                bucket = totals[emotion]
+                bucket[0] += count
+                bucket[1] += intensity
+                bucket[2] += dominant
+
+        ranked = sorted(totals.items(), key=lambda item: -item[1][0])
+        return {
+            'distribution': [
+                {'primary_emotion': emotion, 'count': count, 'avg_intensity': intensity / count}
+                for emotion, (count, intensity, _) in ranked
+            ],
+            'total_emotions': sum(count for count, _, _ in totals.values()),
+            'dominant_emotions': [
+                {'primary_emotion': emotion, 'count': dominant}
+                for emotion, (_, _, dominant) in sorted(totals.items(), key=lambda item: -item[1][2])
+                if dominant
+            ][:5],
+        }
+
+
+def heatmap_color(avg_mood):
+    """Calendar color for an average mood (assuming 1-10 scale)"""
+    if avg_mood >= 8:
+        return '#10B981'  # Green
+    if avg_mood >= 6:
+        return '#34D399'  # Light green
+    if avg_mood >= 5:
+        return '#FBBF24'  # Yellow
+    if avg_mood >= 3:
+        return '#F97316'  # Orange
+    return '#EF4444'  # Red
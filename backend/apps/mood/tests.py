@@ -1,8 +1,10 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
 from django.utils import timezone
+from rest_framework.test import APIClient
 from datetime import date, timedelta
 
+from .series import MoodSeries
 from .models import (
     MoodScale, MoodEntry, MoodFactor, Emotion, MoodTrigger,
     MoodInsight, MoodStats
@@ -179,3 +181,125 @@ class MoodInsightModelTest(TestCase):
         )
         self.assertEqual(insight.insight_type, 'pattern')
         self.assertFalse(insight.is_dismissed)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class MoodSeriesTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='series',
+            email='series@example.com',
+            password='testpass123'
+        )
+        self.today = timezone.now().date()
+        for offset in range(40):
+            MoodEntry.objects.create(
+                user=self.user,
+                mood_value=offset % 10 + 1,
+                time_of_day='morning' if offset % 2 else 'evening',
+                entry_date=self.today - timedelta(days=offset)
+            )
+    
+    def test_rolling_averages_match_window_rescan(self):
+        timeline = MoodSeries.for_user(self.user.pk).timeline(self.today - timedelta(days=60))['timeline']
+        values = [point['mood_value'] for point in timeline]
+        for i, point in enumerate(timeline):
+            if i >= 6:
+                self.assertAlmostEqual(point['rolling_avg_7d'], round(sum(values[i - 6:i + 1]) / 7, 2))
+            if i >= 29:
+                self.assertAlmostEqual(point['rolling_avg_30d'], round(sum(values[i - 29:i + 1]) / 30, 2))
+            else:
+                self.assertNotIn('rolling_avg_30d', point)
+    
+    def test_series_cached_until_entries_change(self):
+        MoodSeries.for_user(self.user.pk)
+        with self.assertNumQueries(1):
+            series = MoodSeries.for_user(self.user.pk)
+        self.assertEqual(series.heatmap(self.today.year)[0]['date'], self.today.isoformat())
+        
+        MoodEntry.objects.filter(user=self.user, entry_date=self.today).delete()
+        series = MoodSeries.for_user(self.user.pk)
+        self.assertNotEqual(series.dates[-1], self.today)
+
+    def test_series_cached_until_emotions_change(self):
+        entry = MoodEntry.objects.filter(user=self.user).first()
+        emotion = Emotion.objects.create(mood_entry=entry, primary_emotion='joy', intensity=1)
+        start = self.today - timedelta(days=60)
+        self.assertEqual(MoodSeries.for_user(self.user.pk).emotion_distribution(start)['dominant_emotions'], [])
+
+        emotion.intensity = 4
+        emotion.is_dominant = True
+        emotion.save()
+        distribution = MoodSeries.for_user(self.user.pk).emotion_distribution(start)
+        self.assertEqual(distribution['distribution'][0]['avg_intensity'], 4)
+        self.assertEqual(distribution['dominant_emotions'], [{'primary_emotion': 'joy', 'count': 1}])
+    
+    def test_list_filters_narrow_the_series(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        timeline = client.get('/api/v1/mood/entries/timeline/', {'time_of_day': 'morning'}).data['timeline']
+        self.assertEqual(len(timeline), 15)
+        self.assertEqual(timeline[-1]['date'], (self.today - timedelta(days=1)).isoformat())
+        heatmap = client.get('/api/v1/mood/entries/heatmap/', {'min_mood': 9, 'year': self.today.year}).data
+        self.assertTrue(all(point['mood_value'] >= 9 for point in heatmap))
+        self.assertEqual(len(client.get('/api/v1/mood/entries/timeline/').data['timeline']), 31)
+
+    def test_patterns_use_calendar_weekdays(self):
+        patterns = MoodSeries.for_user(self.user.pk).patterns(self.today - timedelta(days=6), 7)
+        weekly = patterns[0]['pattern_data']
+        self.assertEqual(weekly['best_day'], (self.today - timedelta(days=6)).strftime('%A'))
+        self.assertEqual(weekly['worst_day'], self.today.strftime('%A'))
+
+
+class MoodCompareTest(TestCase):
+    def setUp(self):
+        from apps.health.models import SleepLog
+        self.user = User.objects.create_user(
+            username='compare',
+            email='compare@example.com',
+            password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.today = timezone.now().date()
+        MoodEntry.objects.bulk_create([
+            MoodEntry(user=self.user, mood_value=4 + offset % 5, entry_date=self.today - timedelta(days=offset))
+            for offset in range(366)
+        ])
+        night = timezone.now().replace(hour=23, minute=0, second=0, microsecond=0)
+        SleepLog.objects.bulk_create([
+            SleepLog(
+                user=self.user,
+                date=self.today - timedelta(days=offset),
+                bed_time=night - timedelta(days=offset + 1),
+                wake_time=night - timedelta(days=offset + 1) + timedelta(hours=8),
+                duration_minutes=300 + (offset - 1) % 5 * 60,
+                quality=7
+            )
+            for offset in range(367)
+        ])
+    
+    def test_query_count_is_constant_across_windows(self):
+        for days in (30, 180, 365):
+            with self.assertNumQueries(2):
+                response = self.client.get(f'/api/v1/mood/entries/compare/?metric=sleep&days={days}')
+            self.assertEqual(len(response.data['mood_data']), days + 1)
+    
+    def test_previous_night_offset(self):
+        response = self.client.get('/api/v1/mood/entries/compare/?metric=sleep&days=30&offset=-1')
+        self.assertEqual(response.data['correlation'], 1.0)
+        first = response.data['metric_data'][0]
+        self.assertEqual(first['date'], (self.today - timedelta(days=31)).isoformat())
+        
+        same_day = self.client.get('/api/v1/mood/entries/compare/?metric=sleep&days=30')
+        self.assertNotEqual(same_day.data['correlation'], 1.0)
+    
+    def test_list_filters_narrow_the_comparison(self):
+        response = self.client.get('/api/v1/mood/entries/compare/?metric=sleep&days=30&min_mood=6')
+        self.assertTrue(all(point['value'] >= 6 for point in response.data['mood_data']))
+        self.assertEqual(len(response.data['mood_data']), 18)
+
+    def test_habits_keep_every_mood_day(self):
+        response = self.client.get('/api/v1/mood/entries/compare/?metric=habits&days=10')
+        self.assertEqual(len(response.data['metric_data']), 11)
+        self.assertTrue(all(d['value'] == 0 for d in response.data['metric_data']))
@@ -1,13 +1,14 @@
 from rest_framework import viewsets, permissions, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Avg, Count, StdDev, Q, F, FloatField
-from django.db.models.functions import TruncDate, TruncWeek, TruncMonth, ExtractWeekDay, ExtractHour
+from django.db.models import Avg, Count, StdDev, Q, F, FloatField, Sum
+from django.db.models.functions import TruncDate, TruncWeek, ExtractHour
 from django.utils import timezone
 from datetime import timedelta, datetime
 from collections import defaultdict
 import statistics
 
+from apps.core.series import date_aligned_join
 from .models import (
     MoodScale, MoodEntry, MoodFactor, Emotion, MoodTrigger,
     MoodCorrelation, MoodInsight, MoodStats, MoodJournalLink
@@ -19,6 +20,7 @@ from .serializers import (
     MoodStatsSerializer, MoodJournalLinkSerializer, QuickMoodSerializer,
     EmotionWheelSerializer
 )
+from .series import MoodSeries
 
 
 class MoodScaleViewSet(viewsets.ModelViewSet):
@@ -45,6 +47,8 @@ class MoodScaleViewSet(viewsets.ModelViewSet):
 
 class MoodEntryViewSet(viewsets.ModelViewSet):
     """Main mood entry CRUD with analytics"""
+    # Query params get_queryset narrows entries by
+    ENTRY_FILTERS = ['start_date', 'end_date', 'time_of_day', 'min_mood', 'max_mood']
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [filters.OrderingFilter]
     ordering_fields = ['entry_date', 'entry_time', 'mood_value', 'created_at']
@@ -86,6 +90,12 @@ class MoodEntryViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
     
+    def get_series(self):
+        """The user's cached mood series, or one built from the filtered entries"""
+        if any(self.request.query_params.get(name) for name in self.ENTRY_FILTERS):
+            return MoodSeries.for_entries(self.get_queryset())
+        return MoodSeries.for_user(self.request.user.pk)
+    
     @action(detail=False, methods=['post'])
     def quick_log(self, request):
         """Quick mood logging with minimal fields"""
@@ -118,273 +128,91 @@ class MoodEntryViewSet(viewsets.ModelViewSet):
         """Get mood timeline with rolling averages"""
         days = int(request.query_params.get('days', 30))
         since_date = timezone.now().date() - timedelta(days=days)
-        
-        entries = self.get_queryset().filter(entry_date__gte=since_date).order_by('entry_date')
-        
-        # Group by date and calculate averages
-        daily_data = {}
-        for entry in entries:
-            date_str = entry.entry_date.isoformat()
-            if date_str not in daily_data:
-                daily_data[date_str] = []
-            daily_data[date_str].append(entry.mood_value)
-        
-        # Calculate timeline with rolling averages
-        timeline = []
-        sorted_dates = sorted(daily_data.keys())
-        
-        for i, date_str in enumerate(sorted_dates):
-            values = daily_data[date_str]
-            avg_mood = sum(values) / len(values)
-            
-            data_point = {
-                'date': date_str,
-                'mood_value': round(avg_mood, 2),
-                'entry_count': len(values)
-            }
-            
-            # Calculate 7-day rolling average
-            if i >= 6:
-                last_7 = [sum(daily_data[sorted_dates[j]]) / len(daily_data[sorted_dates[j]]) 
-                         for j in range(i-6, i+1)]
-                data_point['rolling_avg_7d'] = round(sum(last_7) / 7, 2)
-            
-            # Calculate 30-day rolling average
-            if i >= 29:
-                last_30 = [sum(daily_data[sorted_dates[j]]) / len(daily_data[sorted_dates[j]]) 
-                          for j in range(i-29, i+1)]
-                data_point['rolling_avg_30d'] = round(sum(last_30) / 30, 2)
-            
-            timeline.append(data_point)
-        
-        return Response({
-            'timeline': timeline,
-            'overall_average': round(sum(daily_data[d]) / len(daily_data[d]) for d in daily_data) / len(daily_data) if daily_data else 0,
-            'highest': max(max(v) for v in daily_data.values()) if daily_data else 0,
-            'lowest': min(min(v) for v in daily_data.values()) if daily_data else 0,
-        })
+        return Response(self.get_series().timeline(since_date))
     
     @action(detail=False, methods=['get'])
     def heatmap(self, request):
         """Get mood heatmap data for calendar visualization"""
         year = int(request.query_params.get('year', timezone.now().year))
-        
-        entries = self.get_queryset().filter(entry_date__year=year)
-        
-        # Group by date and calculate average mood
-        heatmap_data = {}
-        for entry in entries:
-            date_str = entry.entry_date.isoformat()
-            if date_str not in heatmap_data:
-                heatmap_data[date_str] = []
-            heatmap_data[date_str].append(entry.mood_value)
-        
-        # Format for heatmap with colors
-        result = []
-        for date_str, values in heatmap_data.items():
-            avg_mood = sum(values) / len(values)
-            # Determine color based on average mood (assuming 1-10 scale)
-            if avg_mood >= 8:
-                color = '#10B981'  # Green
-            elif avg_mood >= 6:
-                color = '#34D399'  # Light green
-            elif avg_mood >= 5:
-                color = '#FBBF24'  # Yellow
-            elif avg_mood >= 3:
-                color = '#F97316'  # Orange
-            else:
-                color = '#EF4444'  # Red
-            
-            result.append({
-                'date': date_str,
-                'mood_value': round(avg_mood, 2),
-                'color': color,
-                'entry_count': len(values)
-            })
-        
-        return Response(result)
+        return Response(self.get_series().heatmap(year))
     
     @action(detail=False, methods=['get'])
     def patterns(self, request):
         """Identify mood patterns (weekly, monthly, seasonal)"""
         days = int(request.query_params.get('days', 90))
         since_date = timezone.now().date() - timedelta(days=days)
-        
-        entries = self.get_queryset().filter(entry_date__gte=since_date)
-        
-        if not entries.exists():
-            return Response({'patterns': []})
-        
-        patterns = []
-        
-        # Weekly pattern - day of week analysis
-        dow_data = entries.annotate(
-            dow=ExtractWeekDay('entry_date')
-        ).values('dow').annotate(
-            avg_mood=Avg('mood_value'),
-            count=Count('id')
-        ).order_by('dow')
-        
-        days_map = {1: 'Monday', 2: 'Tuesday', 3: 'Wednesday', 4: 'Thursday', 
-                   5: 'Friday', 6: 'Saturday', 7: 'Sunday'}
-        
-        if dow_data:
-            best_day = max(dow_data, key=lambda x: x['avg_mood'])
-            worst_day = min(dow_data, key=lambda x: x['avg_mood'])
-            
-            patterns.append({
-                'pattern_type': 'weekly',
-                'pattern_data': {
-                    'by_day': {days_map.get(d['dow'], d['dow']): round(float(d['avg_mood']), 2) 
-                              for d in dow_data},
-                    'best_day': days_map.get(best_day['dow'], best_day['dow']),
-                    'worst_day': days_map.get(worst_day['dow'], worst_day['dow']),
-                },
-                'insight': f"Your mood tends to be highest on {days_map.get(best_day['dow'])} "
-                          f"and lowest on {days_map.get(worst_day['dow'])}."
-            })
-        
-        # Time of day pattern
-        tod_data = entries.values('time_of_day').annotate(
-            avg_mood=Avg('mood_value'),
-            count=Count('id')
-        ).order_by('time_of_day')
-        
-        if tod_data:
-            best_time = max(tod_data, key=lambda x: x['avg_mood'])
-            patterns.append({
-                'pattern_type': 'time_of_day',
-                'pattern_data': {
-                    'by_time': {d['time_of_day']: round(float(d['avg_mood']), 2) for d in tod_data}
-                },
-                'insight': f"You tend to feel best during the {best_time['time_of_day']}."
-            })
-        
-        # Monthly trend
-        monthly_data = entries.annotate(
-            month=TruncMonth('entry_date')
-        ).values('month').annotate(
-            avg_mood=Avg('mood_value'),
-            count=Count('id')
-        ).order_by('month')
-        
-        if len(monthly_data) > 1:
-            trend = 'improving' if monthly_data[-1]['avg_mood'] > monthly_data[0]['avg_mood'] else 'declining'
-            patterns.append({
-                'pattern_type': 'monthly_trend',
-                'pattern_data': {
-                    'monthly_averages': [
-                        {'month': d['month'].strftime('%Y-%m'), 'avg_mood': round(float(d['avg_mood']), 2)}
-                        for d in monthly_data
-                    ]
-                },
-                'insight': f"Your mood has been generally {trend} over the past {days} days."
-            })
-        
-        return Response({'patterns': patterns})
+        return Response({'patterns': self.get_series().patterns(since_date, days)})
     
     @action(detail=False, methods=['get'])
     def compare(self, request):
-        """Compare mood against other metrics (sleep, exercise, habits, productivity)"""
+        """Compare daily mood against other metrics (sleep, exercise, habits)
+
+        ``offset`` shifts the compared metric relative to the mood day, e.g.
+        ``offset=-1`` pairs each day's mood with the previous night's sleep.
+        """
         metric = request.query_params.get('metric', 'sleep')
         days = int(request.query_params.get('days', 30))
-        since_date = timezone.now().date() - timedelta(days=days)
-        
-        entries = self.get_queryset().filter(entry_date__gte=since_date)
+        offset = int(request.query_params.get('offset', 0))
+        today = timezone.now().date()
+        since_date = today - timedelta(days=days)
         
         comparison_data = {
             'metric_name': metric,
+            'offset_days': offset,
             'mood_data': [],
             'metric_data': [],
             'correlation': None
         }
         
+        entries = self.get_queryset().select_related(None).prefetch_related(None).order_by()
+        mood = (entries, 'entry_date', {'value': Avg('mood_value')})
+        how, fill = 'inner', None
+        
         if metric == 'sleep':
-            # Get sleep data from health app
             from apps.health.models import SleepLog
-            sleep_logs = SleepLog.objects.filter(
-                user=request.user,
-                date__gte=since_date
+            other = (
+                SleepLog.objects.filter(user=request.user),
+                'date',
+                {'minutes': Sum('duration_minutes'), 'quality': Avg('quality')}
             )
-            
-            for entry in entries:
-                sleep = sleep_logs.filter(date=entry.entry_date).first()
-                if sleep:
-                    comparison_data['mood_data'].append({
-                        'date': entry.entry_date.isoformat(),
-                        'value': entry.mood_value
-                    })
-                    comparison_data['metric_data'].append({
-                        'date': entry.entry_date.isoformat(),
-                        'value': getattr(sleep, 'duration_hours', 0) or 0,
-                        'quality': getattr(sleep, 'quality', None)
-                    })
-        
         elif metric == 'exercise':
-            # Get exercise data from health app
             from apps.health.models import ExerciseLog
-            exercise_logs = ExerciseLog.objects.filter(
-                user=request.user,
-                date__gte=since_date
-            )
-            
-            # Group by date
-            exercise_by_date = {}
-            for log in exercise_logs:
-                date_str = log.date.isoformat()
-                if date_str not in exercise_by_date:
-                    exercise_by_date[date_str] = 0
-                exercise_by_date[date_str] += getattr(log, 'duration_minutes', 0) or 0
-            
-            for entry in entries:
-                date_str = entry.entry_date.isoformat()
-                if date_str in exercise_by_date:
-                    comparison_data['mood_data'].append({
-                        'date': date_str,
-                        'value': entry.mood_value
-                    })
-                    comparison_data['metric_data'].append({
-                        'date': date_str,
-                        'value': exercise_by_date[date_str]
-                    })
-        
+            other = (ExerciseLog.objects.filter(user=request.user), 'date', {'value': Sum('duration_minutes')})
         elif metric == 'habits':
-            # Get habit completion data
             from apps.habits.models import HabitCompletion
-            completions = HabitCompletion.objects.filter(
-                habit__user=request.user,
-                date__gte=since_date,
-                completed=True
+            other = (
+                HabitCompletion.objects.filter(habit__user=request.user, completed=True),
+                'date',
+                {'value': Count('id')}
             )
-            
-            # Count completions per day
-            habit_by_date = {}
-            for comp in completions:
-                date_str = comp.date.isoformat()
-                habit_by_date[date_str] = habit_by_date.get(date_str, 0) + 1
-            
-            for entry in entries:
-                date_str = entry.entry_date.isoformat()
-                comparison_data['mood_data'].append({
-                    'date': date_str,
-                    'value': entry.mood_value
-                })
-                comparison_data['metric_data'].append({
-                    'date': date_str,
-                    'value': habit_by_date.get(date_str, 0)
-                })
+            how, fill = 'left', {'value': 0}
+        else:
+            return Response(comparison_data)
+        
+        for day, mood_values, metric_values in date_aligned_join(mood, other, since_date, today, offset, how, fill):
+            comparison_data['mood_data'].append({
+                'date': day.isoformat(),
+                'value': round(float(mood_values['value']), 2)
+            })
+            if metric == 'sleep':
+                metric_values = {
+                    'value': round(metric_values['minutes'] / 60, 2),
+                    'quality': metric_values['quality']
+                }
+            comparison_data['metric_data'].append({
+                'date': (day + timedelta(days=offset)).isoformat(),
+                **metric_values
+            })
         
         # Calculate correlation
         if len(comparison_data['mood_data']) > 2:
             mood_values = [d['value'] for d in comparison_data['mood_data']]
             metric_values = [d['value'] for d in comparison_data['metric_data']]
-            
-            if len(mood_values) == len(metric_values) and len(mood_values) > 2:
-                try:
-                    correlation = statistics.correlation(mood_values, metric_values)
-                    comparison_data['correlation'] = round(correlation, 3)
-                except:
-                    pass
+            try:
+                correlation = statistics.correlation(mood_values, metric_values)
+                comparison_data['correlation'] = round(correlation, 3)
+            except statistics.StatisticsError:
+                pass
         
         return Response(comparison_data)
     
@@ -393,24 +221,7 @@ class MoodEntryViewSet(viewsets.ModelViewSet):
         """Get emotion wheel distribution"""
         days = int(request.query_params.get('days', 30))
         since_date = timezone.now().date() - timedelta(days=days)
-        
-        emotions = Emotion.objects.filter(
-            mood_entry__user=request.user,
-            mood_entry__entry_date__gte=since_date
-        )
-        
-        distribution = emotions.values('primary_emotion').annotate(
-            count=Count('id'),
-            avg_intensity=Avg('intensity')
-        ).order_by('-count')
-        
-        return Response({
-            'distribution': list(distribution),
-            'total_emotions': emotions.count(),
-            'dominant_emotions': list(emotions.filter(is_dominant=True).values(
-                'primary_emotion'
-            ).annotate(count=Count('id')).order_by('-count')[:5])
-        })
+        return Response(self.get_series().emotion_distribution(since_date))
 
 
 class MoodFactorViewSet(viewsets.ModelViewSet):
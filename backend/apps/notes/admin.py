@@ -66,10 +66,10 @@ class NoteTemplateAdmin(admin.ModelAdmin):
 
 @admin.register(NoteRevision)
 class NoteRevisionAdmin(admin.ModelAdmin):
-    list_display = ['note', 'title', 'word_count', 'edited_at']
-    list_filter = ['edited_at']
+    list_display = ['note', 'title', 'sequence', 'is_keyframe', 'word_count', 'edited_at']
+    list_filter = ['is_keyframe', 'edited_at']
     search_fields = ['note__title', 'title']
-    readonly_fields = ['id', 'edited_at']
+    readonly_fields = ['id', 'edited_at', 'sequence', 'is_keyframe', 'delta']
 
 
 @admin.register(NoteAnalytics)
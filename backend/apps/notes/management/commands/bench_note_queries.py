@@ -0,0 +1,128 @@
+import logging
+import time
+import tracemalloc
+from contextlib import contextmanager
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models.signals import post_init
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+
+from apps.notes import view_buffer
+from apps.notes.models import Note, NoteAnalytics, NoteLink, NoteRevision, NoteTag
+from apps.notes.views import NoteViewSet
+
+
+def legacy_profile(self, queryset):
+    """The queryset every NoteViewSet action used before per-action profiles"""
+    return queryset.select_related('folder', 'template').prefetch_related(
+        'tags', 'checklist_items', 'attachments', 'outgoing_links', 'incoming_links', 'revisions',
+    )
+
+
+@contextmanager
+def counting_instances():
+    """Count the model instances built"""
+    counter = {'instances': 0}
+
+    def count(sender, **kwargs):
+        counter['instances'] += 1
+
+    post_init.connect(count, weak=False)
+    try:
+        yield counter
+    finally:
+        post_init.disconnect(count)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark NoteViewSet list/retrieve: one prefetch for every action vs per-action profiles'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--notes', type=int, default=5000)
+        parser.add_argument('--revisions', type=int, default=5, help='Revisions of every note')
+        parser.add_argument('--hot-revisions', type=int, default=500, help='Revisions of the retrieved note')
+        parser.add_argument('--content-size', type=int, default=4000, help='Characters of content per note and revision')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        # Views go straight to the row, so Redis is not part of the measurement
+        logging.getLogger(view_buffer.__name__).setLevel(logging.ERROR)
+        with override_settings(REDIS_URL='redis://127.0.0.1:1/0'), transaction.atomic():
+            self.run(options)
+            transaction.set_rollback(True)
+
+    def run(self, options):
+        user = get_user_model().objects.create_user(
+            username='bench-note-queries', email='bench-note-queries@example.com', password='x',
+        )
+        content = ('lorem ipsum dolor sit amet ' * (options['content_size'] // 27 + 1))[:options['content_size']]
+        notes = Note.objects.bulk_create([
+            Note(user=user, title=f'Note {i}', content=content, is_archived=i % 10 == 0)
+            for i in range(options['notes'])
+        ], batch_size=1000)
+        NoteAnalytics.objects.bulk_create([NoteAnalytics(note=note, word_count=500) for note in notes], batch_size=1000)
+        tags = NoteTag.objects.bulk_create([NoteTag(user=user, name=f'tag {i}') for i in range(20)])
+        Note.tags.through.objects.bulk_create([
+            Note.tags.through(note_id=note.pk, notetag_id=tags[i % len(tags)].pk) for i, note in enumerate(notes)
+        ], batch_size=1000)
+        NoteLink.objects.bulk_create([
+            NoteLink(source_note=note, target_note=notes[i - 1]) for i, note in enumerate(notes) if i
+        ], batch_size=1000)
+        hot = notes[1]
+        NoteRevision.objects.bulk_create([
+            NoteRevision(note=note, title=note.title, content=content, sequence=r + 1)
+            for note in notes for r in range(options['revisions'])
+        ] + [
+            NoteRevision(note=hot, title=hot.title, content=content, sequence=options['revisions'] + r + 1)
+            for r in range(options['hot_revisions'])
+        ], batch_size=1000)
+
+        client = APIClient(SERVER_NAME='localhost')
+        client.force_authenticate(user)
+        endpoints = [
+            ('list', '/api/v1/notes/'),
+            ('archived', '/api/v1/notes/archived/'),
+            ('retrieve', f'/api/v1/notes/{hot.pk}/'),
+        ]
+        for label, url in endpoints:
+            with mock.patch.object(NoteViewSet, 'apply_profile', legacy_profile):
+                if label == 'archived':
+                    # The archived action rendered the bare queryset
+                    with mock.patch('apps.notes.views.note_list_queryset', lambda queryset: queryset):
+                        before = self.measure(client, url, options['repeat'])
+                else:
+                    before = self.measure(client, url, options['repeat'])
+            after = self.measure(client, url, options['repeat'])
+            self.report(label, before, after)
+
+    def measure(self, client, url, repeat):
+        client.get(url)
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            client.get(url)
+        elapsed = (time.perf_counter() - t0) / repeat
+        tracemalloc.start()
+        with CaptureQueriesContext(connection) as queries, counting_instances() as built:
+            response = client.get(url)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        assert response.status_code == 200, response.status_code
+        return {
+            'ms': elapsed * 1000,
+            'queries': len(queries),
+            'instances': built['instances'],
+            'peak_kb': peak / 1024,
+            'response_kb': len(response.content) / 1024,
+        }
+
+    def report(self, label, before, after):
+        self.stdout.write(f'{label}:')
+        for profile, stats in (('before', before), ('after', after)):
+            self.stdout.write(
+                f'  {profile:>6}: {stats["ms"]:8.1f}ms  {stats["queries"]:3d} queries  '
+                f'{stats["instances"]:6d} instances  {stats["peak_kb"]:9.0f}KB peak  {stats["response_kb"]:6.1f}KB response'
+            )
@@ -0,0 +1,94 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.functions import Length
+
+from apps.notes.models import Note, NoteRevision
+from apps.notes.revisions import KEYFRAME_INTERVAL, note_history, save_revision
+
+
+def edit(lines, rng):
+    """Apply a small random edit in place: rewrite, insert or delete a line"""
+    at = rng.randrange(len(lines))
+    choice = rng.random()
+    if choice < 0.6:
+        lines[at] = f'{lines[at].rstrip()} edit {rng.randrange(1000)}\n'
+    elif choice < 0.9:
+        lines.insert(at, f'Paragraph {rng.randrange(10 ** 6)}: ' + 'lorem ipsum dolor sit amet ' * rng.randint(2, 12) + '\n')
+    elif len(lines) > 1:
+        del lines[at]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark note revision storage: full copies vs keyframes and line deltas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--edits', type=int, default=1000)
+        parser.add_argument('--lines', type=int, default=200, help='Lines in the starting note')
+        parser.add_argument('--reads', type=int, default=200, help='Random revisions rebuilt')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        # Everything happens in a rolled-back transaction
+        with transaction.atomic():
+            self.run(options)
+            transaction.set_rollback(True)
+
+    def run(self, options):
+        User = get_user_model()
+        user = User.objects.create_user(username='bench-revisions', email='bench-revisions@example.com', password='x')
+        rng = random.Random(options['seed'])
+        lines = [f'Line {i}: ' + 'lorem ipsum dolor sit amet ' * rng.randint(2, 12) + '\n' for i in range(options['lines'])]
+        contents = []
+        for _ in range(options['edits']):
+            edit(lines, rng)
+            contents.append(''.join(lines))
+        self.stdout.write(
+            f"{options['edits']} edits, final note {len(contents[-1]):,} characters, keyframe every {KEYFRAME_INTERVAL}"
+        )
+
+        full = Note.objects.create(user=user, title='Full copies')
+        t0 = time.perf_counter()
+        for content in contents:
+            NoteRevision.objects.create(note=full, title=full.title, content=content, word_count=len(content.split()))
+        self.report_writes('full copies', full, time.perf_counter() - t0)
+
+        delta = Note.objects.create(user=user, title='Deltas')
+        t0 = time.perf_counter()
+        for content in contents:
+            delta.content = content
+            save_revision(delta)
+        self.report_writes('deltas', delta, time.perf_counter() - t0)
+
+        revisions = list(NoteRevision.objects.filter(note=delta).order_by('sequence'))
+        picks = [rng.randrange(len(revisions)) for _ in range(options['reads'])]
+        timings = []
+        for index in picks:
+            t0 = time.perf_counter()
+            content = revisions[index].get_content()
+            timings.append(time.perf_counter() - t0)
+            assert content == contents[index], f'revision {index + 1} rebuilt wrongly'
+        timings.sort()
+        self.stdout.write(
+            f"{'reconstruct':>12}: mean {statistics.mean(timings) * 1000:.2f}ms, "
+            f"p95 {timings[int(len(timings) * 0.95) - 1] * 1000:.2f}ms over {len(timings)} random revisions"
+        )
+        t0 = time.perf_counter()
+        replayed = sum(1 for _ in note_history(delta.pk))
+        self.stdout.write(f"{'full history':>12}: {replayed} revisions in {(time.perf_counter() - t0) * 1000:.0f}ms")
+
+    def report_writes(self, label, note, elapsed):
+        stored = NoteRevision.objects.filter(note=note).aggregate(
+            content=Sum(Length('content')), delta=Sum(Length('delta')),
+        )
+        total = (stored['content'] or 0) + (stored['delta'] or 0)
+        count = note.revisions.count()
+        self.stdout.write(
+            f'{label:>12}: {total:,} characters stored ({total / count:,.0f} per revision), '
+            f'{elapsed / count * 1000:.2f}ms per write'
+        )
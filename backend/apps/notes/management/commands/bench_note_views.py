@@ -0,0 +1,91 @@
+import random
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import override_settings
+
+from apps.notes import view_buffer
+from apps.notes.models import Note, NoteAnalytics
+
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE')
+
+
+@contextmanager
+def counting_writes():
+    """Count the write statements sent to the database"""
+    counter = {'writes': 0}
+
+    def count(execute, sql, params, many, context):
+        if sql.lstrip().upper().startswith(WRITE_STATEMENTS):
+            counter['writes'] += 1
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(count):
+        yield counter
+
+
+class Command(BaseCommand):
+    help = 'Load-test note views: a row write per view vs the Redis view buffer'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--views', type=int, default=20_000)
+        parser.add_argument('--notes', type=int, default=200)
+        parser.add_argument('--hot-share', type=float, default=0.5, help='Share of views that hit one popular note')
+        parser.add_argument(
+            '--redis-url', default=settings.REDIS_URL.rsplit('/', 1)[0] + '/15',
+            help='Redis database for the buffer; keep it apart from the live buffer',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        with override_settings(REDIS_URL=options['redis_url']):
+            try:
+                view_buffer._client().ping()
+            except view_buffer.redis.RedisError as exc:
+                raise CommandError(f"Redis at {options['redis_url']} is not reachable: {exc}")
+            view_buffer._client().delete(view_buffer.BUFFER_KEY, view_buffer.FLUSHING_KEY)
+            # Everything happens in a rolled-back transaction
+            with transaction.atomic():
+                self.run(options)
+                transaction.set_rollback(True)
+
+    def run(self, options):
+        User = get_user_model()
+        user = User.objects.create_user(username='bench-note-views', email='bench-note-views@example.com', password='x')
+        notes = Note.objects.bulk_create([Note(user=user, title=f'Note {i}') for i in range(options['notes'])])
+        analytics = NoteAnalytics.objects.bulk_create([NoteAnalytics(note=note) for note in notes])
+        hot = analytics[0]
+        views = [hot if random.random() < options['hot_share'] else random.choice(analytics) for _ in range(options['views'])]
+
+        with counting_writes() as direct:
+            t0 = time.perf_counter()
+            for item in views:
+                item.record_view()
+            direct_elapsed = time.perf_counter() - t0
+        self.report('row write per view', len(views), direct_elapsed, direct['writes'])
+
+        with counting_writes() as buffered:
+            t0 = time.perf_counter()
+            for item in views:
+                view_buffer.record_note_view(item.pk)
+            record_elapsed = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            flushed = view_buffer.flush_note_views()
+            flush_elapsed = time.perf_counter() - t0
+        self.report('redis buffer', len(views), record_elapsed, buffered['writes'])
+        self.stdout.write(f'{"":>20}  flush: {flushed} rows in {flush_elapsed * 1000:.1f}ms')
+
+        hot.refresh_from_db()
+        expected = 2 * sum(item is hot for item in views)
+        self.stdout.write(f'hot note views: {hot.view_count} (expected {expected})')
+
+    def report(self, label, views, elapsed, writes):
+        self.stdout.write(
+            f'{label:>20}: {views / elapsed:,.0f} views/s, {writes} DB writes '
+            f'({writes / elapsed:,.0f} writes/s, {writes / views:.4f} per view)'
+        )
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from apps.notes.models import Note
+from apps.notes.revisions import KEYFRAME_INTERVAL, compress_note_history
+
+
+class Command(BaseCommand):
+    help = 'Convert full-copy note revisions to keyframes and line deltas, one note per transaction'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--note', help='Only compress the revisions of this note id')
+        parser.add_argument('--all', action='store_true', help='Re-encode notes whose revisions are already compressed')
+        parser.add_argument('--keyframe-interval', type=int, default=KEYFRAME_INTERVAL)
+        parser.add_argument('--chunk-size', type=int, default=500, help='Notes per chunk')
+
+    def handle(self, *args, **options):
+        notes = Note.objects.filter(revisions__isnull=False)
+        if not options['all']:
+            notes = notes.filter(revisions__sequence=0)
+        if options['note']:
+            notes = notes.filter(pk=options['note'])
+        note_ids = notes.values_list('pk', flat=True).distinct().order_by('pk')
+
+        total_notes = total_revisions = total_before = total_after = 0
+        last_id = None
+        while True:
+            # Keyset chunks: the filter changes under us as notes are converted
+            chunk = note_ids if last_id is None else note_ids.filter(pk__gt=last_id)
+            chunk = list(chunk[:options['chunk_size']])
+            if not chunk:
+                break
+            for note_id in chunk:
+                revisions, before, after = compress_note_history(note_id, options['keyframe_interval'])
+                total_notes += 1
+                total_revisions += revisions
+                total_before += before
+                total_after += after
+            last_id = chunk[-1]
+            self.stdout.write(f'{total_notes} notes, {total_revisions} revisions')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Compressed {total_revisions} revisions of {total_notes} notes: '
+            f'{total_before:,} -> {total_after:,} characters'
+        ))
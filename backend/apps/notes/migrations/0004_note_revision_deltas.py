@@ -0,0 +1,32 @@
+# Generated by Django 5.0.14 on 2026-10-19 07:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0003_rename_notes_note_user_id_9af683_idx_notes_note_user_id_d67ab6_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='noterevision',
+            name='delta',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='noterevision',
+            name='is_keyframe',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddField(
+            model_name='noterevision',
+            name='sequence',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddConstraint(
+            model_name='noterevision',
+            constraint=models.UniqueConstraint(condition=models.Q(('sequence__gt', 0)), fields=('note', 'sequence'), name='unique_note_revision_sequence'),
+        ),
+    ]
@@ -110,12 +110,8 @@ class Note(models.Model):
     
     def save_revision(self):
         """Save a revision of the current note state"""
-        return NoteRevision.objects.create(
-            note=self,
-            title=self.title,
-            content=self.content,
-            word_count=len(self.content.split()) if self.content else 0
-        )
+        from .revisions import save_revision
+        return save_revision(self)
 
 
 class NoteChecklistItem(models.Model):
@@ -224,7 +220,12 @@ class NoteTemplate(models.Model):
 
 
 class NoteRevision(models.Model):
-    """Track note edit history"""
+    """Track note edit history.
+
+    Keyframes hold the full content; other revisions hold a line delta
+    against the previous revision (see revisions.py). Revisions written
+    before delta storage have sequence 0 until compress_note_revisions runs.
+    """
     id = models.UUIDField(primary_key=True, default=uuid.uuid4)
     note = models.ForeignKey(Note, on_delete=models.CASCADE, related_name='revisions')
     title = models.CharField(max_length=300)
@@ -232,11 +233,26 @@ class NoteRevision(models.Model):
     edited_at = models.DateTimeField(auto_now_add=True)
     word_count = models.PositiveIntegerField(default=0)
     
+    # Position in the note's history, from 1
+    sequence = models.PositiveIntegerField(default=0)
+    is_keyframe = models.BooleanField(default=True)
+    delta = models.TextField(blank=True)
+    
     class Meta:
         ordering = ['-edited_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['note', 'sequence'], condition=models.Q(sequence__gt=0), name='unique_note_revision_sequence',
+            ),
+        ]
     
     def __str__(self):
         return f"Revision of {self.note.title} at {self.edited_at}"
+    
+    def get_content(self):
+        """Full content of this revision, rebuilt from the nearest keyframe"""
+        from .revisions import revision_content
+        return revision_content(self)
 
 
 class NoteAnalytics(models.Model):
@@ -0,0 +1,134 @@
+"""Note revision history stored as line deltas with periodic keyframes.
+
+Every ``KEYFRAME_INTERVAL``-th revision of a note (and its first) is a
+keyframe holding the full content. The revisions in between each store
+only a line delta against the previous revision: a JSON list in which
+``[start, end]`` copies that range of the previous revision's lines and a
+string inserts new text. A delta that would be no smaller than the content
+is stored as a keyframe instead. Any revision is rebuilt by applying, in
+one query's worth of rows, the deltas that follow its nearest keyframe, so
+reads never apply more than ``KEYFRAME_INTERVAL - 1`` deltas.
+
+Revisions written before delta storage are full copies with sequence 0.
+They read as keyframes, and ``compress_note_revisions`` renumbers and
+re-encodes them.
+"""
+import json
+from difflib import SequenceMatcher
+
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+
+from .models import NoteRevision
+
+KEYFRAME_INTERVAL = 20
+
+
+def encode_delta(old, new):
+    """Line delta turning ``old`` into ``new``"""
+    old_lines = old.splitlines(keepends=True)
+    new_lines = new.splitlines(keepends=True)
+    ops = []
+    for tag, i1, i2, j1, j2 in SequenceMatcher(None, old_lines, new_lines).get_opcodes():
+        if tag == 'equal':
+            ops.append([i1, i2])
+        elif j2 > j1:
+            ops.append(''.join(new_lines[j1:j2]))
+    return json.dumps(ops, separators=(',', ':'), ensure_ascii=False)
+
+
+def apply_delta(old, delta):
+    """Content of the revision ``delta`` was encoded for, given its predecessor's"""
+    old_lines = old.splitlines(keepends=True)
+    return ''.join(
+        ''.join(old_lines[op[0]:op[1]]) if isinstance(op, list) else op
+        for op in json.loads(delta)
+    )
+
+
+def encode_revision(sequence, previous, content, interval=KEYFRAME_INTERVAL):
+    """(is_keyframe, stored content, delta) for revision ``sequence`` of a history"""
+    if previous is not None and (sequence - 1) % interval:
+        delta = encode_delta(previous, content)
+        if len(delta) < len(content):
+            return False, '', delta
+    return True, content, ''
+
+
+def _chain(note_id, sequence):
+    """Rows from the nearest keyframe at or before ``sequence`` up to it, oldest first"""
+    keyframe = NoteRevision.objects.filter(
+        note_id=OuterRef('note_id'), is_keyframe=True, sequence__gt=0, sequence__lte=sequence,
+    ).order_by('-sequence').values('sequence')[:1]
+    return NoteRevision.objects.filter(
+        note_id=note_id, sequence__gt=0, sequence__lte=sequence, sequence__gte=Subquery(keyframe),
+    ).order_by('sequence').values_list('is_keyframe', 'content', 'delta')
+
+
+def _replay(rows, content=None):
+    for is_keyframe, stored, delta in rows:
+        content = stored if is_keyframe else apply_delta(content, delta)
+        yield content
+
+
+def revision_content(revision):
+    """Full content of ``revision``"""
+    if revision.is_keyframe:
+        return revision.content
+    content = None
+    for content in _replay(_chain(revision.note_id, revision.sequence)):
+        pass
+    return content
+
+
+def note_history(note_id):
+    """Yield ``(revision, content)`` for every revision of a note, oldest first, in one pass"""
+    revisions = NoteRevision.objects.filter(note_id=note_id).order_by('sequence', 'edited_at')
+    content = None
+    for revision in revisions.iterator(chunk_size=500):
+        content = revision.content if revision.is_keyframe else apply_delta(content, revision.delta)
+        yield revision, content
+
+
+def save_revision(note):
+    """Record the note's current title and content as its next revision"""
+    with transaction.atomic():
+        latest = (
+            NoteRevision.objects.select_for_update()
+            .filter(note_id=note.pk).order_by('-sequence', '-edited_at').first()
+        )
+        sequence = latest.sequence + 1 if latest else 1
+        # Deltas are only taken against sequenced revisions
+        previous = revision_content(latest) if latest and latest.sequence else None
+        is_keyframe, content, delta = encode_revision(sequence, previous, note.content)
+        return NoteRevision.objects.create(
+            note=note,
+            title=note.title,
+            content=content,
+            delta=delta,
+            is_keyframe=is_keyframe,
+            sequence=sequence,
+            word_count=len(note.content.split()) if note.content else 0,
+        )
+
+
+def compress_note_history(note_id, interval=KEYFRAME_INTERVAL):
+    """Renumber and re-encode a note's revisions; returns (revisions, bytes before, bytes after)"""
+    with transaction.atomic():
+        revisions = sorted(
+            NoteRevision.objects.select_for_update().filter(note_id=note_id),
+            # Unsequenced revisions predate every sequenced one
+            key=lambda revision: (revision.sequence > 0, revision.sequence, revision.edited_at),
+        )
+        before = sum(len(revision.content) + len(revision.delta) for revision in revisions)
+        contents = list(_replay((r.is_keyframe, r.content, r.delta) for r in revisions))
+        previous = None
+        for sequence, (revision, content) in enumerate(zip(revisions, contents), start=1):
+            revision.sequence = sequence
+            revision.is_keyframe, revision.content, revision.delta = encode_revision(sequence, previous, content, interval)
+            previous = content
+        # Clear the numbering first so renumbering cannot collide mid-statement
+        NoteRevision.objects.filter(note_id=note_id).update(sequence=0)
+        NoteRevision.objects.bulk_update(revisions, ['sequence', 'is_keyframe', 'content', 'delta'], batch_size=500)
+        after = sum(len(revision.content) + len(revision.delta) for revision in revisions)
+    return len(revisions), before, after
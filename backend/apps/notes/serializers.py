@@ -4,6 +4,14 @@ from .models import (
     NoteAttachment, NoteLink, NoteTemplate, NoteRevision,
     NoteAnalytics, QuickCapture
 )
+from .view_buffer import apply_pending_views, pending_views
+
+# Characters of content shown in note lists
+PREVIEW_LENGTH = 150
+
+# Revisions rendered with a note, and their columns; content is fetched one revision at a time
+DETAIL_REVISIONS = 20
+REVISION_SUMMARY_FIELDS = ('id', 'note_id', 'title', 'word_count', 'edited_at')
 
 
 class NoteFolderSerializer(serializers.ModelSerializer):
@@ -17,6 +25,8 @@ class NoteFolderSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at']
     
     def get_note_count(self, obj):
+        if hasattr(obj, 'active_note_count'):
+            return obj.active_note_count
         return obj.notes.filter(is_archived=False).count()
     
     def get_full_path(self, obj):
@@ -42,6 +52,8 @@ class NoteTagSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
     
     def get_note_count(self, obj):
+        if hasattr(obj, 'active_note_count'):
+            return obj.active_note_count
         return obj.notes.filter(is_archived=False).count()
 
 
@@ -126,8 +138,17 @@ class NoteRevisionSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'edited_at']
 
 
+class NoteAnalyticsListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        # One Redis round trip for the buffered views of the whole page
+        analytics = list(data.all() if hasattr(data, 'all') else data)
+        pending = pending_views([item.pk for item in analytics])
+        return super().to_representation([apply_pending_views(item, pending) for item in analytics])
+
+
 class NoteAnalyticsSerializer(serializers.ModelSerializer):
     class Meta:
+        list_serializer_class = NoteAnalyticsListSerializer
         model = NoteAnalytics
         fields = [
             'word_count', 'character_count', 'reading_time_minutes',
@@ -135,6 +156,10 @@ class NoteAnalyticsSerializer(serializers.ModelSerializer):
             'first_viewed_at', 'last_viewed_at', 'last_edited_at'
         ]
 
+    def to_representation(self, instance):
+        # Include views still buffered in Redis
+        return super().to_representation(apply_pending_views(instance))
+
 
 class QuickCaptureSerializer(serializers.ModelSerializer):
     tags = NoteTagSerializer(many=True, read_only=True)
@@ -178,10 +203,12 @@ class NoteListSerializer(serializers.ModelSerializer):
         ]
     
     def get_preview(self, obj):
-        # Return first 150 characters of content
-        content = obj.content or ''
-        if len(content) > 150:
-            return content[:150] + '...'
+        # List querysets annotate the start of the content instead of loading it
+        content = getattr(obj, 'preview_text', None)
+        if content is None:
+            content = obj.content or ''
+        if len(content) > PREVIEW_LENGTH:
+            return content[:PREVIEW_LENGTH] + '...'
         return content
     
     def get_word_count(self, obj):
@@ -190,6 +217,8 @@ class NoteListSerializer(serializers.ModelSerializer):
         return len(obj.content.split()) if obj.content else 0
     
     def get_link_count(self, obj):
+        if hasattr(obj, 'outgoing_link_count'):
+            return obj.outgoing_link_count
         return obj.outgoing_links.count()
 
 
@@ -201,7 +230,7 @@ class NoteSerializer(serializers.ModelSerializer):
     outgoing_links = NoteLinkSerializer(many=True, read_only=True)
     backlinks = serializers.SerializerMethodField()
     analytics = NoteAnalyticsSerializer(read_only=True)
-    revisions = NoteRevisionSerializer(many=True, read_only=True)
+    revisions = serializers.SerializerMethodField()
     linked_notes = serializers.SerializerMethodField()
     template_info = NoteTemplateSerializer(source='template', read_only=True)
     
@@ -222,10 +251,18 @@ class NoteSerializer(serializers.ModelSerializer):
         backlinks = NoteLink.objects.filter(target_note=obj).select_related('source_note')[:20]
         return BacklinkSerializer(backlinks, many=True).data
     
+    def get_revisions(self, obj):
+        # note_detail_queryset prefetches these as recent_revisions
+        revisions = getattr(obj, 'recent_revisions', None)
+        if revisions is None:
+            revisions = obj.revisions.only(*REVISION_SUMMARY_FIELDS)[:DETAIL_REVISIONS]
+        return NoteRevisionSerializer(revisions, many=True).data
+    
     def get_linked_notes(self, obj):
         """Get IDs of all linked notes for graph view"""
-        outgoing = list(obj.outgoing_links.values_list('target_note_id', flat=True))
-        incoming = list(obj.incoming_links.values_list('source_note_id', flat=True))
+        # Iterating .all() reuses the detail queryset's prefetched links
+        outgoing = [link.target_note_id for link in obj.outgoing_links.all()]
+        incoming = [link.source_note_id for link in obj.incoming_links.all()]
         return list(set(outgoing + incoming))
 
 
@@ -238,6 +275,8 @@ class NoteGraphNodeSerializer(serializers.ModelSerializer):
         fields = ['id', 'title', 'note_type', 'is_favorite', 'link_count', 'updated_at']
     
     def get_link_count(self, obj):
+        if hasattr(obj, 'outgoing_link_count'):
+            return obj.outgoing_link_count + obj.incoming_link_count
         return obj.outgoing_links.count() + obj.incoming_links.count()
 
 
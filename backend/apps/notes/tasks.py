@@ -0,0 +1,9 @@
+from celery import shared_task
+
+from .view_buffer import flush_note_views
+
+
+@shared_task
+def flush_note_view_counts():
+    """Write buffered note views to NoteAnalytics"""
+    return flush_note_views()
@@ -1,3 +1,251 @@
-from django.test import TestCase
+import random
+from datetime import timedelta
+from io import StringIO
+from unittest import skipUnless
 
-# Create your tests here.
+import redis
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from . import view_buffer
+from .models import Note, NoteAnalytics, NoteLink, NoteRevision, NoteTag
+from .serializers import DETAIL_REVISIONS, PREVIEW_LENGTH
+from .revisions import KEYFRAME_INTERVAL, apply_delta, encode_delta, note_history
+
+User = get_user_model()
+
+# A database of its own, emptied before every test
+TEST_REDIS_URL = settings.REDIS_URL.rsplit('/', 1)[0] + '/15'
+
+
+def redis_available():
+    try:
+        return redis.Redis.from_url(TEST_REDIS_URL, socket_connect_timeout=0.5).ping()
+    except redis.RedisError:
+        return False
+
+
+@skipUnless(redis_available(), 'Redis is not reachable')
+@override_settings(REDIS_URL=TEST_REDIS_URL)
+class NoteViewBufferTest(TestCase):
+    def setUp(self):
+        redis.Redis.from_url(TEST_REDIS_URL).flushdb()
+        self.user = User.objects.create_user(username='viewer', email='viewer@example.com', password='testpass123')
+        self.note = Note.objects.create(user=self.user, title='Shared')
+        self.analytics = NoteAnalytics.objects.create(note=self.note)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_views_are_buffered_and_merged_into_reads(self):
+        for _ in range(3):
+            response = self.client.get(f'/api/v1/notes/{self.note.pk}/')
+        self.assertEqual(response.data['analytics']['view_count'], 3)
+        self.analytics.refresh_from_db()
+        self.assertEqual(self.analytics.view_count, 0)
+
+        listed = self.client.get('/api/v1/notes/analytics/').data
+        rows = listed['results'] if isinstance(listed, dict) else listed
+        self.assertEqual(rows[0]['view_count'], 3)
+
+    def test_flush_applies_deltas_once(self):
+        earlier = timezone.now() - timedelta(hours=2)
+        view_buffer.record_note_view(self.analytics.pk, now=earlier)
+        view_buffer.record_note_view(self.analytics.pk)
+        other = NoteAnalytics.objects.create(note=Note.objects.create(user=self.user, title='Other'))
+        view_buffer.record_note_view(other.pk)
+
+        with self.assertNumQueries(1):
+            # One UPDATE for every buffered note, without reading the rows
+            self.assertEqual(view_buffer.flush_note_views(), 2)
+        self.assertEqual(view_buffer.flush_note_views(), 0)
+        self.analytics.refresh_from_db()
+        self.assertEqual(self.analytics.view_count, 2)
+        self.assertEqual(self.analytics.first_viewed_at.replace(microsecond=0), earlier.replace(microsecond=0))
+        self.assertGreater(self.analytics.last_viewed_at, earlier)
+        self.assertEqual(view_buffer.pending_views([self.analytics.pk]), {})
+
+        view_buffer.record_note_view(self.analytics.pk)
+        view_buffer.flush_note_views()
+        self.analytics.refresh_from_db()
+        self.assertEqual(self.analytics.view_count, 3)
+        self.assertEqual(self.analytics.first_viewed_at.replace(microsecond=0), earlier.replace(microsecond=0))
+
+    def test_views_during_a_flush_stay_pending(self):
+        view_buffer.record_note_view(self.analytics.pk)
+        # A flush that renamed the buffer but has not written yet
+        redis.Redis.from_url(TEST_REDIS_URL).rename(view_buffer.BUFFER_KEY, view_buffer.FLUSHING_KEY)
+        view_buffer.record_note_view(self.analytics.pk)
+        self.assertEqual(view_buffer.pending_views([self.analytics.pk])[str(self.analytics.pk)][0], 2)
+        view_buffer.flush_note_views()
+        view_buffer.flush_note_views()
+        self.analytics.refresh_from_db()
+        self.assertEqual(self.analytics.view_count, 2)
+
+
+class NoteViewBufferFallbackTest(TestCase):
+    @override_settings(REDIS_URL='redis://127.0.0.1:1/0')
+    def test_unreachable_redis_writes_the_view_directly(self):
+        user = User.objects.create_user(username='offline', email='offline@example.com', password='testpass123')
+        analytics = NoteAnalytics.objects.create(note=Note.objects.create(user=user, title='Offline'))
+        with self.assertLogs('apps.notes.view_buffer', 'WARNING'):
+            view_buffer.record_note_view(analytics.pk)
+            self.assertEqual(view_buffer.pending_views([analytics.pk]), {})
+        analytics.refresh_from_db()
+        self.assertEqual(analytics.view_count, 1)
+        self.assertIsNotNone(analytics.first_viewed_at)
+
+
+def edit(content, rng):
+    """A random small edit: change, insert or delete a line"""
+    lines = content.splitlines(keepends=True)
+    at = rng.randrange(len(lines) + 1)
+    choice = rng.random()
+    if choice < 0.5 and at < len(lines):
+        lines[at] = f'line {rng.randrange(10 ** 6)} édité\n'
+    elif choice < 0.8 or not lines:
+        lines.insert(at, f'new line {rng.randrange(10 ** 6)}\n')
+    else:
+        del lines[min(at, len(lines) - 1)]
+    return ''.join(lines)
+
+
+class NoteRevisionStoreTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='writer', email='writer@example.com', password='testpass123')
+        self.note = Note.objects.create(user=self.user, title='Draft', content=''.join(f'line {i}\n' for i in range(50)))
+        self.rng = random.Random(0)
+
+    def write_history(self, edits):
+        contents = []
+        for _ in range(edits):
+            contents.append(self.note.content)
+            self.note.save_revision()
+            self.note.content = edit(self.note.content, self.rng)
+        return contents
+
+    def test_delta_round_trip(self):
+        cases = [('', ''), ('', 'a'), ('a\nb', 'a\nb\n'), ('x\ny\nz', 'y\nz\nw'), ('ünï\r\ncode', 'ünï\r\ncodé')]
+        for old, new in cases:
+            self.assertEqual(apply_delta(old, encode_delta(old, new)), new)
+
+    def test_revisions_rebuild_from_keyframes(self):
+        contents = self.write_history(2 * KEYFRAME_INTERVAL + 5)
+        revisions = list(NoteRevision.objects.filter(note=self.note).order_by('sequence'))
+        self.assertEqual([r.sequence for r in revisions], list(range(1, len(contents) + 1)))
+        self.assertEqual([r.sequence for r in revisions if r.is_keyframe], [1, KEYFRAME_INTERVAL + 1, 2 * KEYFRAME_INTERVAL + 1])
+        self.assertTrue(all(r.content == '' and r.delta for r in revisions if not r.is_keyframe))
+
+        last = revisions[KEYFRAME_INTERVAL]
+        with self.assertNumQueries(0):
+            self.assertEqual(last.get_content(), contents[KEYFRAME_INTERVAL])
+        with self.assertNumQueries(1):
+            self.assertEqual(revisions[-1].get_content(), contents[-1])
+        self.assertEqual([r.get_content() for r in revisions], contents)
+        self.assertEqual([content for _, content in note_history(self.note.pk)], contents)
+
+    def test_compress_converts_full_copies_in_edit_order(self):
+        start = timezone.now() - timedelta(days=1)
+        legacy = []
+        for i in range(30):
+            legacy.append(self.note.content)
+            revision = NoteRevision.objects.create(note=self.note, title=self.note.title, content=self.note.content)
+            NoteRevision.objects.filter(pk=revision.pk).update(edited_at=start + timedelta(minutes=i))
+            self.note.content = edit(self.note.content, self.rng)
+        contents = legacy + self.write_history(3)
+
+        out = StringIO()
+        call_command('compress_note_revisions', chunk_size=1, stdout=out)
+        self.assertIn('Compressed 33 revisions of 1 notes', out.getvalue())
+        self.assertEqual([content for _, content in note_history(self.note.pk)], contents)
+        self.assertFalse(NoteRevision.objects.filter(sequence=0).exists())
+        self.assertEqual(NoteRevision.objects.filter(is_keyframe=True).count(), 2)
+
+    def test_update_records_revision_and_endpoint_returns_content(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        client.patch(f'/api/v1/notes/{self.note.pk}/', {'content': self.note.content + 'more'}, format='json')
+        self.note.refresh_from_db()
+        edited = self.note.content
+        client.patch(f'/api/v1/notes/{self.note.pk}/', {'content': 'rewritten'}, format='json')
+        second = NoteRevision.objects.get(note=self.note, sequence=2)
+        self.assertFalse(second.is_keyframe)
+        data = client.get(f'/api/v1/notes/{self.note.pk}/revisions/{second.pk}/').data
+        self.assertEqual(data['content'], edited)
+        missing = client.get(f'/api/v1/notes/{self.note.pk}/revisions/not-a-revision/')
+        self.assertEqual(missing.status_code, 404)
+
+
+@override_settings(REDIS_URL='redis://127.0.0.1:1/0')
+class NoteQuerysetProfileTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='lister', email='lister@example.com', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.tag = NoteTag.objects.create(user=self.user, name='work')
+
+    def make_notes(self, count):
+        notes = []
+        for i in range(count):
+            note = Note.objects.create(user=self.user, title=f'Note {i}', content='word ' * 100)
+            note.tags.add(self.tag)
+            NoteAnalytics.objects.create(note=note, word_count=100)
+            if notes:
+                NoteLink.objects.create(source_note=note, target_note=notes[-1])
+            notes.append(note)
+        return notes
+
+    def list_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/v1/notes/')
+        return response.data['results'], len(queries)
+
+    def test_list_queries_do_not_grow_with_notes(self):
+        self.make_notes(3)
+        _, few = self.list_queries()
+        self.make_notes(10)
+        results, many = self.list_queries()
+        self.assertEqual(few, many)
+        self.assertEqual(len(results), 13)
+
+    def test_list_renders_preview_and_counts_without_content(self):
+        first, second = self.make_notes(2)
+        results, _ = self.list_queries()
+        row = next(row for row in results if row['id'] == str(second.pk))
+        self.assertNotIn('content', row)
+        self.assertEqual(row['preview'], ('word ' * 100)[:PREVIEW_LENGTH] + '...')
+        self.assertEqual((row['link_count'], row['word_count']), (1, 100))
+        self.assertEqual([(tag['name'], tag['note_count']) for tag in row['tag_list']], [('work', 2)])
+        short = Note.objects.create(user=self.user, title='Short', content='tiny')
+        results, _ = self.list_queries()
+        self.assertEqual(next(row['preview'] for row in results if row['id'] == str(short.pk)), 'tiny')
+
+    def test_retrieve_renders_latest_revisions_only(self):
+        note = self.make_notes(1)[0]
+        for i in range(DETAIL_REVISIONS + 5):
+            note.title = f'Title {i}'
+            note.save_revision()
+        revisions = self.client.get(f'/api/v1/notes/{note.pk}/').data['revisions']
+        self.assertEqual(len(revisions), DETAIL_REVISIONS)
+        self.assertEqual(revisions[0]['title'], f'Title {DETAIL_REVISIONS + 4}')
+
+        # The revision an update records is part of its response
+        response = self.client.patch(f'/api/v1/notes/{note.pk}/', {'title': 'Renamed'}, format='json')
+        latest = NoteRevision.objects.filter(note=note).latest('sequence')
+        self.assertEqual(response.data['revisions'][0]['id'], str(latest.pk))
+        self.assertEqual(response.data['title'], 'Renamed')
+
+    def test_toggles_write_only_their_flags(self):
+        note = self.make_notes(1)[0]
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(f'/api/v1/notes/{note.pk}/pin/')
+        update = next(query['sql'] for query in queries if query['sql'].startswith('UPDATE'))
+        self.assertNotIn('"content"', update)
+        note.refresh_from_db()
+        self.assertTrue(note.is_pinned)
+        self.assertEqual(note.content, 'word ' * 100)
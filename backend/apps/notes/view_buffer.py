@@ -0,0 +1,167 @@
+"""Note view counts buffered in Redis and flushed to NoteAnalytics in batches.
+
+A view no longer writes the NoteAnalytics row. It adds to one Redis hash,
+keyed by analytics id:
+
+- ``<id>``: views not yet flushed (``HINCRBY``)
+- ``<id>:first``: time of the first buffered view (``HSETNX``)
+- ``<id>:last``: time of the latest buffered view (``HSET``)
+
+``flush_note_views`` runs periodically. It renames the hash out of the way,
+so views recorded during a flush land in a fresh hash. It then applies every
+delta with one ``bulk_update`` made of ``F()`` expressions, which means no
+analytics row is read first. Reads add the pending deltas on top of the
+stored row (``apply_pending_views``), so counts stay exact between flushes.
+
+If Redis cannot be reached, a view falls back to a direct row update, and
+reads show the stored counts only.
+"""
+import logging
+from datetime import datetime, timezone as dt_timezone
+from uuid import UUID
+
+import redis
+from django.conf import settings
+from django.db.models import DateTimeField, F, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .models import NoteAnalytics
+
+logger = logging.getLogger(__name__)
+
+BUFFER_KEY = 'notes:view_buffer'
+FLUSHING_KEY = 'notes:view_buffer:flushing'
+FLUSH_LOCK_KEY = 'notes:view_buffer:lock'
+FLUSH_LOCK_TIMEOUT = 300
+FLUSH_BATCH_SIZE = 1000
+
+# A note view must not hang on an unreachable Redis
+SOCKET_TIMEOUT = 0.5
+
+_clients = {}
+
+
+def _client():
+    url = settings.REDIS_URL
+    if url not in _clients:
+        _clients[url] = redis.Redis.from_url(url, socket_timeout=SOCKET_TIMEOUT, socket_connect_timeout=SOCKET_TIMEOUT)
+    return _clients[url]
+
+
+def _timestamp(value):
+    return datetime.fromtimestamp(float(value), tz=dt_timezone.utc)
+
+
+def _parse_buffer(fields):
+    """{analytics id: (views, first viewed, last viewed)} from raw hash fields"""
+    views = {}
+    for field, value in fields.items():
+        analytics_id, _, kind = field.decode().partition(':')
+        count, first, last = views.get(analytics_id, (0, None, None))
+        if kind == 'first':
+            first = _timestamp(value)
+        elif kind == 'last':
+            last = _timestamp(value)
+        else:
+            count = int(value)
+        views[analytics_id] = (count, first, last)
+    return views
+
+
+def _apply_views(views):
+    """Add view deltas to their NoteAnalytics rows without reading them"""
+    rows = []
+    for analytics_id, (count, first, last) in views.items():
+        if not count:
+            continue
+        first, last = first or last, last or first
+        rows.append(NoteAnalytics(
+            pk=UUID(analytics_id),
+            view_count=F('view_count') + count,
+            first_viewed_at=Coalesce('first_viewed_at', Value(first, output_field=DateTimeField())),
+            last_viewed_at=Greatest(
+                Coalesce('last_viewed_at', Value(last, output_field=DateTimeField())),
+                Value(last, output_field=DateTimeField()),
+            ),
+        ))
+    NoteAnalytics.objects.bulk_update(
+        rows, ['view_count', 'first_viewed_at', 'last_viewed_at'], batch_size=FLUSH_BATCH_SIZE,
+    )
+    return len(rows)
+
+
+def record_note_view(analytics_id, now=None):
+    """Count one view of a note"""
+    now = now or timezone.now()
+    field = str(analytics_id)
+    try:
+        with _client().pipeline() as pipe:
+            pipe.hincrby(BUFFER_KEY, field, 1)
+            pipe.hsetnx(BUFFER_KEY, f'{field}:first', now.timestamp())
+            pipe.hset(BUFFER_KEY, f'{field}:last', now.timestamp())
+            pipe.execute()
+    except redis.RedisError:
+        logger.warning('Note view buffer unavailable, writing view of %s directly', field, exc_info=True)
+        _apply_views({field: (1, now, now)})
+
+
+def pending_views(analytics_ids):
+    """Buffered, not yet flushed views of the given analytics rows"""
+    fields = [str(pk) for pk in analytics_ids]
+    if not fields:
+        return {}
+    keys = [key for field in fields for key in (field, f'{field}:first', f'{field}:last')]
+    try:
+        # Views mid-flush are still pending until their rows are written
+        with _client().pipeline() as pipe:
+            pipe.hmget(BUFFER_KEY, keys)
+            pipe.hmget(FLUSHING_KEY, keys)
+            buffered, flushing = pipe.execute()
+    except redis.RedisError:
+        logger.warning('Note view buffer unavailable, reading stored view counts only', exc_info=True)
+        return {}
+    views = {}
+    # The flushing hash holds the older views
+    for values in (flushing, buffered):
+        present = {key.encode(): value for key, value in zip(keys, values) if value is not None}
+        for analytics_id, (count, first, last) in _parse_buffer(present).items():
+            seen_count, seen_first, seen_last = views.get(analytics_id, (0, None, None))
+            views[analytics_id] = (seen_count + count, seen_first or first, last or seen_last)
+    return views
+
+
+def apply_pending_views(analytics, pending=None):
+    """Add buffered views onto an analytics instance (not saved); applies once per instance"""
+    if getattr(analytics, '_pending_views_applied', False):
+        return analytics
+    if pending is None:
+        pending = pending_views([analytics.pk])
+    count, first, last = pending.get(str(analytics.pk), (0, None, None))
+    if count:
+        analytics.view_count += count
+        analytics.first_viewed_at = analytics.first_viewed_at or first
+        analytics.last_viewed_at = max(filter(None, (analytics.last_viewed_at, last)))
+    analytics._pending_views_applied = True
+    return analytics
+
+
+def flush_note_views():
+    """Write buffered views to NoteAnalytics; returns the number of rows updated"""
+    client = _client()
+    lock = client.lock(FLUSH_LOCK_KEY, timeout=FLUSH_LOCK_TIMEOUT, blocking=False)
+    if not lock.acquire():
+        return 0
+    try:
+        # A flushing hash left by a failed run is written before new views are taken
+        if not client.exists(FLUSHING_KEY):
+            try:
+                client.rename(BUFFER_KEY, FLUSHING_KEY)
+            except redis.ResponseError:
+                # Nothing buffered
+                return 0
+        updated = _apply_views(_parse_buffer(client.hgetall(FLUSHING_KEY)))
+        client.delete(FLUSHING_KEY)
+        return updated
+    finally:
+        lock.release()
@@ -1,8 +1,9 @@
 from rest_framework import viewsets, permissions, filters, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Q, Count, Avg, F
-from django.db.models.functions import TruncDate
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q, Count, Avg, F, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce, Substr, TruncDate
 from django.utils import timezone
 from datetime import timedelta, datetime
 import re
@@ -18,8 +19,10 @@ from .serializers import (
     NoteAttachmentSerializer, NoteLinkSerializer, NoteTemplateSerializer,
     NoteRevisionSerializer, NoteAnalyticsSerializer, QuickCaptureSerializer,
     NoteGraphNodeSerializer, NoteGraphEdgeSerializer,
-    GlobalNoteAnalyticsSerializer, WebClipSerializer
+    GlobalNoteAnalyticsSerializer, WebClipSerializer,
+    DETAIL_REVISIONS, PREVIEW_LENGTH, REVISION_SUMMARY_FIELDS,
 )
+from .view_buffer import record_note_view
 
 
 class NoteFolderViewSet(viewsets.ModelViewSet):
@@ -60,6 +63,45 @@ class NoteTagViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
+def link_count(field):
+    """Subquery counting a note's links in one direction"""
+    links = NoteLink.objects.filter(**{field: OuterRef('pk')}).values(field).annotate(n=Count('id')).values('n')
+    return Coalesce(Subquery(links), 0)
+
+
+def tags_with_counts():
+    """Tag prefetch carrying NoteTagSerializer's note count, instead of a COUNT per tag"""
+    # A subquery, since a Count over the tag's notes would share the prefetch's join
+    active = Note.tags.through.objects.filter(notetag_id=OuterRef('pk'), note__is_archived=False)
+    return Prefetch('tags', queryset=NoteTag.objects.annotate(
+        active_note_count=Coalesce(Subquery(active.values('notetag_id').annotate(n=Count('id')).values('n')), 0),
+    ))
+
+
+def note_list_queryset(queryset):
+    """Notes as NoteListSerializer renders them: no content, only a DB-side preview"""
+    return queryset.select_related('folder', 'analytics').only(
+        'id', 'title', 'note_type', 'is_pinned', 'is_favorite', 'is_archived', 'created_at', 'updated_at',
+        'folder__name', 'analytics__word_count',
+    ).annotate(
+        # One character past the cut, so the serializer knows to add an ellipsis
+        preview_text=Substr('content', 1, PREVIEW_LENGTH + 1),
+        outgoing_link_count=link_count('source_note'),
+    ).prefetch_related(tags_with_counts())
+
+
+def note_detail_queryset(queryset):
+    """Notes as NoteSerializer renders them, with only the latest revisions' metadata"""
+    revisions = NoteRevision.objects.only(*REVISION_SUMMARY_FIELDS).order_by('-edited_at')
+    return queryset.select_related('folder', 'template', 'analytics').prefetch_related(
+        tags_with_counts(), 'checklist_items', 'attachments', 'template__default_tags', 'incoming_links',
+        Prefetch('outgoing_links', queryset=NoteLink.objects.select_related('target_note').only(
+            'id', 'source_note_id', 'link_text', 'context', 'created_at', 'target_note__id', 'target_note__title',
+        )),
+        Prefetch('revisions', queryset=revisions[:DETAIL_REVISIONS], to_attr='recent_revisions'),
+    )
+
+
 class NoteViewSet(viewsets.ModelViewSet):
     serializer_class = NoteSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -116,9 +158,25 @@ class NoteViewSet(viewsets.ModelViewSet):
                 Q(title__icontains=search) | Q(content__icontains=search)
             )
         
-        return queryset.select_related('folder', 'template').prefetch_related(
-            'tags', 'checklist_items', 'attachments', 'outgoing_links', 'incoming_links', 'revisions'
-        ).order_by('-is_pinned', '-updated_at')
+        return self.apply_profile(queryset).order_by('-is_pinned', '-updated_at')
+    
+    def apply_profile(self, queryset):
+        """Load only what the current action reads or renders"""
+        if self.action == 'list':
+            return note_list_queryset(queryset)
+        if self.action == 'retrieve':
+            return note_detail_queryset(queryset)
+        if self.action in ('update', 'partial_update'):
+            # The response is rendered after the write, which drops prefetched relations
+            return queryset.select_related('folder', 'template', 'analytics')
+        if self.action in ('pin', 'favorite', 'archive', 'restore'):
+            # save() on a partly loaded instance writes only the loaded fields
+            return queryset.only('id', 'user_id', 'is_pinned', 'is_favorite', 'is_archived', 'updated_at')
+        if self.action in ('add_link', 'remove_link'):
+            return queryset.select_related('analytics')
+        if self.action in ('destroy', 'add_tag', 'remove_tag', 'revision', 'backlinks'):
+            return queryset.only('id', 'user_id')
+        return queryset
     
     def perform_create(self, serializer):
         note = serializer.save(user=self.request.user)
@@ -180,9 +238,9 @@ class NoteViewSet(viewsets.ModelViewSet):
         """Override to record view analytics"""
         instance = self.get_object()
         
-        # Record view
+        # Record view (buffered, see view_buffer)
         if hasattr(instance, 'analytics'):
-            instance.analytics.record_view()
+            record_note_view(instance.analytics.pk)
         
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
@@ -211,7 +269,7 @@ class NoteViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def archived(self, request):
         """List archived notes"""
-        notes = Note.objects.filter(user=request.user, is_archived=True)
+        notes = note_list_queryset(Note.objects.filter(user=request.user, is_archived=True))
         serializer = NoteListSerializer(notes, many=True)
         return Response(serializer.data)
     
@@ -240,6 +298,18 @@ class NoteViewSet(viewsets.ModelViewSet):
             note.tags.remove(tag)
         return Response({'status': 'tag removed'})
     
+    @action(detail=True, methods=['get'], url_path=r'revisions/(?P<revision_id>[^/.]+)')
+    def revision(self, request, pk=None, revision_id=None):
+        """Get one revision with its full content"""
+        note = self.get_object()
+        try:
+            revision = note.revisions.get(id=revision_id)
+        except (NoteRevision.DoesNotExist, DjangoValidationError):
+            return Response({'error': 'Revision not found'}, status=status.HTTP_404_NOT_FOUND)
+        data = NoteRevisionSerializer(revision).data
+        data['content'] = revision.get_content()
+        return Response(data)
+    
     @action(detail=True, methods=['post'])
     def add_link(self, request, pk=None):
         """Add a bidirectional link to another note"""
@@ -385,7 +455,12 @@ class NoteViewSet(viewsets.ModelViewSet):
     def graph(self, request):
         """Get knowledge graph data for visualization"""
         # Get all non-archived notes
-        notes = Note.objects.filter(user=request.user, is_archived=False)
+        notes = Note.objects.filter(user=request.user, is_archived=False).only(
+            'id', 'title', 'note_type', 'is_favorite', 'updated_at',
+        ).annotate(
+            outgoing_link_count=link_count('source_note'),
+            incoming_link_count=link_count('target_note'),
+        )
         
         # Get all links
         links = NoteLink.objects.filter(
@@ -506,7 +581,7 @@ class NoteViewSet(viewsets.ModelViewSet):
         if date_to:
             notes = notes.filter(updated_at__date__lte=date_to)
         
-        serializer = NoteListSerializer(notes[:50], many=True)
+        serializer = NoteListSerializer(note_list_queryset(notes)[:50], many=True)
         return Response({'results': serializer.data, 'count': notes.count()})
 
 
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class PomodoroConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.pomodoro'
+
+    def ready(self):
+        from .signals import connect_focus_stats_signals
+        connect_focus_stats_signals()
@@ -0,0 +1,133 @@
+"""Focus statistics for ``PomodoroSessionViewSet.stats``, built in four queries.
+
+The today/week/month windows come from one conditional aggregate over the
+month's work sessions. The most productive hour and weekday are each one
+grouped query. Streak, distraction and deep-work figures are read as a single
+row: the user joined to their FocusStreak, with scalar subqueries for the
+rest. Deep-work hours are summed in the database from the stored timestamps.
+
+The result is cached under the user's focus data version, a random token
+replaced on every pomodoro, distraction, deep-work or streak write. The key
+also includes the date, because the windows and the streak reset move at
+midnight.
+"""
+import uuid
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import DeepWorkSession, DistractionLog, PomodoroSession
+
+STATS_TIMEOUT = 60 * 60 * 24
+
+# Sessions a weekday or hour needs before it can be the most productive one
+MIN_SESSIONS_FOR_BEST = 3
+
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+WINDOW_DAYS = {'today': 0, 'week': 7, 'month': 30}
+
+
+def _version_key(user_id):
+    return f'focus_data_version:{user_id}'
+
+
+def get_focus_data_version(user_id):
+    return cache.get_or_set(_version_key(user_id), uuid.uuid4().hex, None)
+
+
+def bump_focus_data_version(user_id):
+    """Invalidate the cached focus stats of a user"""
+    cache.set(_version_key(user_id), uuid.uuid4().hex, None)
+
+
+def _window_aggregates(today):
+    aggregates = {}
+    for window, days in WINDOW_DAYS.items():
+        in_window = Q(started_at__date=today) if not days else Q(started_at__date__gte=today - timedelta(days=days))
+        done = in_window & Q(completed=True)
+        aggregates.update({
+            f'{window}_count': Count('id', filter=in_window),
+            f'{window}_minutes': Coalesce(Sum('duration', filter=done), 0),
+            f'{window}_completed': Count('id', filter=done),
+            f'{window}_productivity_avg': Avg('productivity_score', filter=done),
+        })
+    return aggregates
+
+
+def _most_productive(sessions, field):
+    best = (
+        sessions.filter(completed=True, productivity_score__isnull=False)
+        .values(field)
+        .annotate(avg_productivity=Avg('productivity_score'), count=Count('id'))
+        .filter(count__gte=MIN_SESSIONS_FOR_BEST)
+        .order_by('-avg_productivity', field)
+        .first()
+    )
+    return best[field] if best else None
+
+
+def _count(queryset):
+    return Coalesce(Subquery(queryset.values('user').annotate(n=Count('id')).values('n')[:1]), 0)
+
+
+def _user_scalars(user_id, month_ago):
+    """Streak columns, month distraction count and deep-work totals in one row"""
+    deep_work = DeepWorkSession.objects.filter(user=OuterRef('pk'), started_at__date__gte=month_ago)
+    worked = ExpressionWrapper(F('ended_at') - F('started_at'), output_field=DurationField())
+    return get_user_model().objects.filter(pk=user_id).values(
+        current_streak=F('focus_streak__current_streak'),
+        longest_streak=F('focus_streak__longest_streak'),
+        last_session_date=F('focus_streak__last_session_date'),
+        distraction_count=_count(DistractionLog.objects.filter(user=OuterRef('pk'), timestamp__date__gte=month_ago)),
+        deep_work_count=_count(deep_work),
+        deep_work_time=Subquery(
+            deep_work.filter(ended_at__isnull=False).values('user')
+            .annotate(total=Sum(worked)).values('total')[:1],
+            output_field=DurationField(),
+        ),
+    ).get()
+
+
+def build_focus_stats(user_id, today):
+    month_ago = today - timedelta(days=WINDOW_DAYS['month'])
+    sessions = PomodoroSession.objects.filter(user_id=user_id, started_at__date__gte=month_ago)
+    stats = sessions.filter(session_type='work').aggregate(**_window_aggregates(today))
+    for window in WINDOW_DAYS:
+        stats[f'{window}_productivity_avg'] = round(stats[f'{window}_productivity_avg'] or 0, 1)
+
+    scalars = _user_scalars(user_id, month_ago)
+    current_streak = scalars['current_streak'] or 0
+    last_session = scalars['last_session_date']
+    if last_session and (today - last_session).days > 1:
+        # FocusStreak.reset_streak, without the write
+        current_streak = 0
+    best_day = _most_productive(sessions, 'day_of_week')
+    deep_work_time = scalars['deep_work_time'] or timedelta()
+
+    stats.update({
+        'current_streak': current_streak,
+        'longest_streak': scalars['longest_streak'] or 0,
+        'total_distractions': scalars['distraction_count'],
+        'avg_distractions_per_session': round(scalars['distraction_count'] / max(stats['month_completed'], 1), 2),
+        'most_productive_hour': _most_productive(sessions, 'hour_of_day'),
+        'most_productive_day': DAY_NAMES[best_day] if best_day is not None else None,
+        'deep_work_sessions_this_month': scalars['deep_work_count'],
+        'total_deep_work_hours': round(deep_work_time.total_seconds() / 3600, 2),
+    })
+    return stats
+
+
+def get_focus_stats(user_id):
+    """Cached ``build_focus_stats`` for today"""
+    today = timezone.now().date()
+    key = f'focus_stats:{user_id}:{get_focus_data_version(user_id)}:{today.isoformat()}'
+    stats = cache.get(key)
+    if stats is None:
+        stats = build_focus_stats(user_id, today)
+        cache.set(key, stats, STATS_TIMEOUT)
+    return stats
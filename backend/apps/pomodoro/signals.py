@@ -0,0 +1,19 @@
+"""Keep cached focus stats in step with the rows they are built from."""
+from django.db.models.signals import post_delete, post_save
+
+from .focus_stats import bump_focus_data_version
+from .models import DeepWorkSession, DistractionLog, FocusStreak, PomodoroSession
+
+# Models whose writes change the focus stats
+FOCUS_STATS_SOURCES = [PomodoroSession, DistractionLog, DeepWorkSession, FocusStreak]
+
+
+def _bump_focus_version(sender, instance, **kwargs):
+    bump_focus_data_version(instance.user_id)
+
+
+def connect_focus_stats_signals():
+    for model in FOCUS_STATS_SOURCES:
+        label = model._meta.label
+        post_save.connect(_bump_focus_version, sender=model, dispatch_uid=f'focus_stats:{label}:save')
+        post_delete.connect(_bump_focus_version, sender=model, dispatch_uid=f'focus_stats:{label}:delete')
@@ -0,0 +1,78 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .models import DeepWorkSession, DistractionLog, FocusStreak, PomodoroSession
+
+User = get_user_model()
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class FocusStatsTest(TestCase):
+    url = '/api/v1/pomodoro/sessions/stats/'
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='focus', email='focus@example.com', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.now = timezone.now()
+
+    def session(self, days_ago=0, hour=9, duration=25, completed=True, score=None, session_type='work'):
+        started = (self.now - timedelta(days=days_ago)).replace(hour=hour, minute=0)
+        session = PomodoroSession.objects.create(
+            user=self.user, duration=duration, completed=completed, productivity_score=score, session_type=session_type,
+        )
+        PomodoroSession.objects.filter(pk=session.pk).update(
+            started_at=started, hour_of_day=started.hour, day_of_week=started.weekday(),
+        )
+        return session
+
+    def test_windows_histograms_and_deep_work(self):
+        self.session(score=8)
+        self.session(completed=False)
+        self.session(session_type='short_break', duration=5)
+        for _ in range(3):
+            self.session(days_ago=3, hour=14, score=9, duration=50)
+        self.session(days_ago=20, score=4)
+        self.session(days_ago=40, score=10)
+        DistractionLog.objects.create(user=self.user, distraction_type='notification')
+        FocusStreak.objects.create(user=self.user, current_streak=4, longest_streak=6, last_session_date=self.now.date())
+        deep = DeepWorkSession.objects.create(user=self.user)
+        DeepWorkSession.objects.filter(pk=deep.pk).update(
+            started_at=self.now - timedelta(hours=3), ended_at=self.now - timedelta(minutes=30),
+        )
+        DeepWorkSession.objects.create(user=self.user)
+
+        stats = self.client.get(self.url).data
+        self.assertEqual(
+            {key: stats[key] for key in ('today_count', 'today_completed', 'today_minutes', 'today_productivity_avg')},
+            {'today_count': 2, 'today_completed': 1, 'today_minutes': 25, 'today_productivity_avg': 8.0},
+        )
+        self.assertEqual((stats['week_count'], stats['week_minutes']), (5, 175))
+        self.assertEqual((stats['month_completed'], stats['month_minutes'], stats['month_productivity_avg']), (5, 200, 7.8))
+        self.assertEqual((stats['current_streak'], stats['longest_streak']), (4, 6))
+        self.assertEqual((stats['total_distractions'], stats['avg_distractions_per_session']), (1, 0.2))
+        self.assertEqual(stats['most_productive_hour'], 14)
+        self.assertEqual(stats['most_productive_day'], (self.now - timedelta(days=3)).strftime('%A'))
+        self.assertEqual((stats['deep_work_sessions_this_month'], stats['total_deep_work_hours']), (2, 2.5))
+
+    def test_lapsed_streak_reads_as_zero(self):
+        FocusStreak.objects.create(user=self.user, current_streak=4, last_session_date=self.now.date() - timedelta(days=3))
+        self.assertEqual(self.client.get(self.url).data['current_streak'], 0)
+
+    def test_query_budget_and_cache_invalidation(self):
+        for days_ago in range(10):
+            self.session(days_ago=days_ago, score=7)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(self.url).data['month_count'], 10)
+        self.assertLessEqual(len(queries), 5)
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+        self.session()
+        self.assertEqual(self.client.get(self.url).data['month_count'], 11)
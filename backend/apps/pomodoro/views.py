@@ -8,6 +8,7 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from collections import defaultdict
 
+from .focus_stats import get_focus_stats
 from .models import (
     PomodoroSettings, 
     PomodoroSession, 
@@ -199,119 +200,7 @@ class PomodoroSessionViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def stats(self, request):
         """Get comprehensive statistics"""
-        user = request.user
-        today = timezone.now().date()
-        week_ago = today - timedelta(days=7)
-        month_ago = today - timedelta(days=30)
-        
-        # Today's stats
-        today_sessions = PomodoroSession.objects.filter(
-            user=user,
-            started_at__date=today,
-            session_type='work',
-        )
-        today_completed = today_sessions.filter(completed=True)
-        today_productivity = today_completed.aggregate(
-            avg=Avg('productivity_score')
-        )['avg'] or 0
-        
-        # Week stats
-        week_sessions = PomodoroSession.objects.filter(
-            user=user,
-            started_at__date__gte=week_ago,
-            session_type='work',
-        )
-        week_completed = week_sessions.filter(completed=True)
-        week_productivity = week_completed.aggregate(
-            avg=Avg('productivity_score')
-        )['avg'] or 0
-        
-        # Month stats
-        month_sessions = PomodoroSession.objects.filter(
-            user=user,
-            started_at__date__gte=month_ago,
-            session_type='work',
-        )
-        month_completed = month_sessions.filter(completed=True)
-        month_productivity = month_completed.aggregate(
-            avg=Avg('productivity_score')
-        )['avg'] or 0
-        
-        # Streak info
-        streak, _ = FocusStreak.objects.get_or_create(user=user)
-        streak.reset_streak()
-        
-        # Distraction stats
-        distractions = DistractionLog.objects.filter(
-            user=user,
-            timestamp__date__gte=month_ago
-        )
-        total_sessions = month_completed.count()
-        avg_distractions = distractions.count() / max(total_sessions, 1)
-        
-        # Most productive hour
-        hour_stats = PomodoroSession.objects.filter(
-            user=user,
-            started_at__date__gte=month_ago,
-            completed=True,
-            productivity_score__isnull=False
-        ).values('hour_of_day').annotate(
-            avg_productivity=Avg('productivity_score'),
-            count=Count('id')
-        ).filter(count__gte=3).order_by('-avg_productivity').first()
-        
-        most_productive_hour = hour_stats['hour_of_day'] if hour_stats else None
-        
-        # Most productive day
-        day_names = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-        day_stats = PomodoroSession.objects.filter(
-            user=user,
-            started_at__date__gte=month_ago,
-            completed=True,
-            productivity_score__isnull=False
-        ).values('day_of_week').annotate(
-            avg_productivity=Avg('productivity_score'),
-            count=Count('id')
-        ).filter(count__gte=3).order_by('-avg_productivity').first()
-        
-        most_productive_day = day_names[day_stats['day_of_week']] if day_stats else None
-        
-        # Deep work stats
-        deep_work_sessions = DeepWorkSession.objects.filter(
-            user=user,
-            started_at__date__gte=month_ago
-        )
-        
-        stats = {
-            'today_count': today_sessions.count(),
-            'today_minutes': sum(s.duration for s in today_sessions if s.completed),
-            'today_completed': today_completed.count(),
-            'today_productivity_avg': round(today_productivity, 1),
-            
-            'week_count': week_sessions.count(),
-            'week_minutes': sum(s.duration for s in week_completed),
-            'week_completed': week_completed.count(),
-            'week_productivity_avg': round(week_productivity, 1),
-            
-            'month_count': month_sessions.count(),
-            'month_minutes': sum(s.duration for s in month_completed),
-            'month_completed': month_completed.count(),
-            'month_productivity_avg': round(month_productivity, 1),
-            
-            'current_streak': streak.current_streak,
-            'longest_streak': streak.longest_streak,
-            
-            'total_distractions': distractions.count(),
-            'avg_distractions_per_session': round(avg_distractions, 2),
-            
-            'most_productive_hour': most_productive_hour,
-            'most_productive_day': most_productive_day,
-            
-            'deep_work_sessions_this_month': deep_work_sessions.count(),
-            'total_deep_work_hours': sum(dw.duration_hours for dw in deep_work_sessions),
-        }
-        
-        return Response(stats)
+        return Response(get_focus_stats(request.user.pk))
 
     @action(detail=False, methods=['get'])
     def time_of_day(self, request):
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Project, Task, Tag, TaskTag, TaskDependency, TaskTimeLog
+from .models import Project, Task, Tag, TaskTag, TaskDependency, TaskTimeLog, TaskDailyRollup
 
 @admin.register(Project)
 class ProjectAdmin(admin.ModelAdmin):
@@ -36,3 +36,10 @@ class TaskTimeLogAdmin(admin.ModelAdmin):
     list_display = ('task', 'user', 'source', 'minutes', 'started_at', 'ended_at', 'created_at')
     list_filter = ('source', 'user')
     search_fields = ('task__title',)
+
+
+@admin.register(TaskDailyRollup)
+class TaskDailyRollupAdmin(admin.ModelAdmin):
+    list_display = ('user', 'date', 'created', 'completed', 'overdue', 'logged_minutes')
+    list_filter = ('user',)
+    date_hierarchy = 'date'
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class TasksConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.tasks'
+
+    def ready(self):
+        from .signals import connect_occurrence_signals, connect_rollup_signals
+        connect_rollup_signals()
+        connect_occurrence_signals()
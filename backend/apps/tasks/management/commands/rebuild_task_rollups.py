@@ -0,0 +1,29 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, OuterRef
+
+from apps.tasks.models import Task, TaskTimeLog
+from apps.tasks.rollups import rebuild_task_rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the TaskDailyRollup table from Task and TaskTimeLog rows, one user at a time'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Only rebuild the rollup for this user email')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        users = User.objects.filter(
+            Exists(Task.objects.filter(user=OuterRef('pk'))) | Exists(TaskTimeLog.objects.filter(user=OuterRef('pk')))
+        ).order_by('pk')
+        if options['user']:
+            users = users.filter(email=options['user'])
+
+        total_rows = 0
+        for user in users.iterator(chunk_size=500):
+            rows = rebuild_task_rollups(user.pk)
+            total_rows += rows
+            self.stdout.write(f'{user.email}: {rows} rows')
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {total_rows} task rollup rows'))
@@ -0,0 +1,42 @@
+# Generated by Django 5.0.14 on 2026-10-19 08:34
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0003_tasktimelog'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskDailyRollup',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('date', models.DateField()),
+                ('created', models.IntegerField(default=0)),
+                ('completed', models.IntegerField(default=0)),
+                ('created_completed', models.IntegerField(default=0)),
+                ('overdue', models.IntegerField(default=0)),
+                ('estimated', models.IntegerField(default=0)),
+                ('est_minutes', models.IntegerField(default=0)),
+                ('actual_minutes', models.IntegerField(default=0)),
+                ('estimate_accuracy', models.FloatField(default=0)),
+                ('logged_minutes', models.IntegerField(default=0)),
+                ('by_priority', models.JSONField(blank=True, default=dict)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_daily_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='taskdailyrollup',
+            constraint=models.UniqueConstraint(fields=('user', 'date'), name='unique_task_rollup_per_day'),
+        ),
+    ]
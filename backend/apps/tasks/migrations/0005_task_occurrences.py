@@ -0,0 +1,70 @@
+# Generated by Django 5.0.14 on 2026-10-19 08:40
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+from apps.tasks.recurrence import OCCURRENCES_AHEAD, upcoming_dates
+
+
+def project_recurring_tasks(apps, schema_editor):
+    """Store the next occurrences of every open recurring task"""
+    Task = apps.get_model('tasks', 'Task')
+    TaskOccurrence = apps.get_model('tasks', 'TaskOccurrence')
+    today = timezone.now().date()
+    recurring = Task.objects.filter(
+        recurrence_rule__isnull=False, due_date__isnull=False, status__in=['inbox', 'active'],
+    )
+    rows = []
+    for task in recurring.iterator(chunk_size=500):
+        rows += [
+            TaskOccurrence(user_id=task.user_id, task_id=task.pk, date=day)
+            for day in upcoming_dates(task.recurrence_rule, task.due_date, today, OCCURRENCES_AHEAD)
+        ]
+    TaskOccurrence.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0004_task_daily_rollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskOccurrence',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('date', models.DateField()),
+            ],
+            options={
+                'ordering': ['date'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['user', 'due_date'], name='tasks_task_user_id_075050_idx'),
+        ),
+        migrations.AddField(
+            model_name='taskoccurrence',
+            name='task',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occurrences', to='tasks.task'),
+        ),
+        migrations.AddField(
+            model_name='taskoccurrence',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_occurrences', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='taskoccurrence',
+            index=models.Index(fields=['user', 'date'], name='tasks_tasko_user_id_e8d4b9_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='taskoccurrence',
+            constraint=models.UniqueConstraint(fields=('task', 'date'), name='unique_task_occurrence'),
+        ),
+        migrations.RunPython(project_recurring_tasks, migrations.RunPython.noop),
+    ]
@@ -54,6 +54,11 @@ class Task(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     completed_at = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'due_date']),
+        ]
+
     def __str__(self):
         return self.title
 
@@ -111,3 +116,61 @@ class TaskTimeLog(models.Model):
 
     def __str__(self):
         return f"{self.task.title} - {self.minutes}m"
+
+
+class TaskOccurrence(models.Model):
+    """A future date of a recurring task, projected from its rule by apps.tasks.recurrence"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='task_occurrences')
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='occurrences')
+    date = models.DateField()
+
+    class Meta:
+        ordering = ['date']
+        constraints = [
+            models.UniqueConstraint(fields=['task', 'date'], name='unique_task_occurrence'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'date']),
+        ]
+
+    def __str__(self):
+        return f"{self.task.title} - {self.date}"
+
+
+class TaskDailyRollup(models.Model):
+    """Per-day task counters for the heatmap, analytics and distribution, maintained from Task and TaskTimeLog writes.
+
+    A task counts on the day it was created (``created``, ``created_completed``,
+    the estimate columns and ``by_priority``), the day it was completed
+    (``completed``) and, while open, its due day (``overdue``, which is overdue
+    once that day has passed). ``by_priority`` holds open tasks as
+    ``{priority: {status: count}}``. ``logged_minutes`` sums the TaskTimeLog
+    minutes of the day.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='task_daily_rollups')
+    date = models.DateField()
+
+    created = models.IntegerField(default=0)
+    completed = models.IntegerField(default=0)
+    created_completed = models.IntegerField(default=0)
+    overdue = models.IntegerField(default=0)
+
+    # Tasks created that day with both an estimate and an actual time
+    estimated = models.IntegerField(default=0)
+    est_minutes = models.IntegerField(default=0)
+    actual_minutes = models.IntegerField(default=0)
+    estimate_accuracy = models.FloatField(default=0)
+
+    logged_minutes = models.IntegerField(default=0)
+    by_priority = models.JSONField(default=dict, blank=True)
+
+    class Meta:
+        ordering = ['-date']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'date'], name='unique_task_rollup_per_day'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} {self.date}"
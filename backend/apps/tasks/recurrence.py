@@ -0,0 +1,160 @@
+"""Projected occurrences of recurring tasks.
+
+A recurring task is an open task with a ``recurrence_rule`` and a due date.
+Completing it creates the next concrete task, on ``next_recurrence_date``.
+The dates after that are stored ahead of time as TaskOccurrence rows, so
+date range reads see them without evaluating rules in Python.
+
+- ``materialize_occurrences`` replaces one task's rows with its next
+  ``OCCURRENCES_AHEAD`` dates from today on. The Task signals call it
+  whenever the rule, due date, status or owner changes. Completing a task
+  therefore clears its rows, and the next concrete task projects its own.
+- ``extend_occurrence_horizon`` runs daily. It drops past rows and the rows
+  of tasks that stopped recurring without signals (bulk updates), then tops
+  every recurring task back up to ``OCCURRENCES_AHEAD`` rows, in chunks.
+- ``tasks_in_range`` reads concrete and projected tasks for a date range in
+  one query.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import BooleanField, Count, F, Max, Q, Value
+from django.utils import timezone
+
+from .models import Task, TaskOccurrence
+from .rollups import OPEN_STATUSES
+
+OCCURRENCES_AHEAD = 30
+
+# Tasks that project occurrences, as ``recurrence_state`` decides in Python
+RECURRING = Q(recurrence_rule__isnull=False, due_date__isnull=False, status__in=OPEN_STATUSES)
+
+OCCURRENCE_CHUNK_SIZE = 500
+
+# Rule steps walked per task, which bounds overdue daily tasks years back
+MAX_RECURRENCE_STEPS = 5000
+
+
+def next_recurrence_date(rule, from_date):
+    """Return next due date from recurrence rule. from_date is the completed task's due_date or today."""
+    if not rule or not from_date:
+        return None
+    freq = rule.get('frequency', 'daily')
+    interval = rule.get('interval', 1)
+    weekdays = rule.get('weekdays')  # 0=Mon, 6=Sun
+    if freq == 'daily':
+        return from_date + timedelta(days=interval)
+    if freq == 'weekly':
+        if weekdays:
+            # Next occurrence on one of weekdays
+            for d in range(1, 8):
+                candidate = from_date + timedelta(days=d)
+                if candidate.weekday() in weekdays:
+                    return candidate
+        return from_date + timedelta(weeks=interval)
+    if freq == 'monthly':
+        year = from_date.year
+        month = from_date.month + interval
+        while month > 12:
+            month -= 12
+            year += 1
+        day = min(from_date.day, 28)
+        try:
+            return from_date.replace(year=year, month=month, day=day)
+        except ValueError:
+            return from_date.replace(year=year, month=month, day=28)
+    return from_date + timedelta(days=1)
+
+
+def upcoming_dates(rule, start, today, count):
+    """The first ``count`` dates of ``rule`` after ``start`` that fall on or after ``today``"""
+    dates, day = [], start
+    for _ in range(MAX_RECURRENCE_STEPS):
+        if len(dates) >= count:
+            break
+        following = next_recurrence_date(rule, day)
+        # A rule that does not move forward (interval 0 or below) ends here
+        if following is None or following <= day:
+            break
+        day = following
+        if day >= today:
+            dates.append(day)
+    return dates
+
+
+def recurrence_state(task):
+    """What a task's projected occurrences depend on; None when it does not recur"""
+    # Views may assign the raw request value before saving
+    due_date = Task._meta.get_field('due_date').to_python(task.due_date)
+    if not task.recurrence_rule or not due_date or task.status not in OPEN_STATUSES:
+        return None
+    return task.user_id, task.recurrence_rule, due_date
+
+
+def materialize_occurrences(task, today=None):
+    """Replace a task's projected occurrences from its current rule and due date"""
+    today = today or timezone.now().date()
+    state = recurrence_state(task)
+    rows = []
+    if state is not None:
+        user_id, rule, due_date = state
+        rows = [
+            TaskOccurrence(user_id=user_id, task_id=task.pk, date=day)
+            for day in upcoming_dates(rule, due_date, today, OCCURRENCES_AHEAD)
+        ]
+    with transaction.atomic():
+        TaskOccurrence.objects.filter(task_id=task.pk).delete()
+        TaskOccurrence.objects.bulk_create(rows)
+    return len(rows)
+
+
+def _top_up(tasks, today):
+    """Occurrence rows bringing each of ``tasks`` back to ``OCCURRENCES_AHEAD``"""
+    stored = {
+        row['task']: (row['count'], row['last'])
+        for row in TaskOccurrence.objects.filter(task__in=[task.pk for task in tasks])
+        .values('task').annotate(count=Count('id'), last=Max('date')).order_by()
+    }
+    rows = []
+    for task in tasks:
+        count, last = stored.get(task.pk, (0, None))
+        if count >= OCCURRENCES_AHEAD:
+            continue
+        rows += [
+            TaskOccurrence(user_id=task.user_id, task_id=task.pk, date=day)
+            for day in upcoming_dates(task.recurrence_rule, last or task.due_date, today, OCCURRENCES_AHEAD - count)
+        ]
+    return rows
+
+
+def extend_occurrence_horizon(today=None, chunk_size=OCCURRENCE_CHUNK_SIZE):
+    """Drop past and orphaned occurrences, then top every recurring task up again; returns the rows added"""
+    today = today or timezone.now().date()
+    TaskOccurrence.objects.filter(Q(date__lt=today) | ~Q(task__in=Task.objects.filter(RECURRING))).delete()
+    recurring = Task.objects.filter(RECURRING).only('user', 'recurrence_rule', 'due_date').order_by('pk')
+    added, chunk = 0, []
+    for task in recurring.iterator(chunk_size=chunk_size):
+        chunk.append(task)
+        if len(chunk) == chunk_size:
+            added += len(TaskOccurrence.objects.bulk_create(_top_up(chunk, today), ignore_conflicts=True))
+            chunk = []
+    if chunk:
+        added += len(TaskOccurrence.objects.bulk_create(_top_up(chunk, today), ignore_conflicts=True))
+    return added
+
+
+def tasks_in_range(tasks, user_id, start, end):
+    """Tasks of ``tasks`` due from ``start`` to ``end``, plus their projected occurrences in that range.
+
+    One ``UNION ALL`` over the (user, due_date) and (user, date) indexes. A
+    recurring task appears once per occurrence. Each row carries
+    ``occurrence_date`` and ``is_projected``.
+    """
+    concrete = tasks.filter(due_date__range=(start, end)).annotate(
+        occurrence_date=F('due_date'), is_projected=Value(False, output_field=BooleanField()),
+    )
+    # Filtering before annotating keeps the annotation on the filtered join
+    projected = tasks.filter(occurrences__user_id=user_id, occurrences__date__range=(start, end)).annotate(
+        occurrence_date=F('occurrences__date'), is_projected=Value(True, output_field=BooleanField()),
+    )
+    return concrete.order_by().union(projected.order_by(), all=True).order_by('occurrence_date', 'order')
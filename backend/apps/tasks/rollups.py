@@ -0,0 +1,146 @@
+"""Daily task rollup maintained from Task and TaskTimeLog writes.
+
+A task's contribution to its user's TaskDailyRollup rows is a set of counters
+keyed by (user, day, counter), from ``task_contribution``. Saving a task
+applies the difference between its new and stored contributions; deleting it
+subtracts what it contributed. Time logs add their minutes to the day they
+started, or were logged. ``rebuild_task_rollups`` recomputes a user's rows
+from the same contributions, for the backfill command.
+
+Counters keyed by a (priority, status) pair go to the ``by_priority`` JSON.
+Rows are only created for added contributions, so cascading deletes never
+re-insert them, and rows left empty are deleted.
+"""
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Task, TaskDailyRollup, TaskTimeLog
+
+OPEN_STATUSES = ('inbox', 'active')
+
+COUNTERS = [
+    'created', 'completed', 'created_completed', 'overdue',
+    'estimated', 'est_minutes', 'actual_minutes', 'estimate_accuracy', 'logged_minutes',
+]
+
+TASK_FIELDS = ['user', 'status', 'priority', 'due_date', 'estimated_minutes', 'actual_minutes', 'created_at', 'completed_at']
+TIME_LOG_FIELDS = ['user', 'minutes', 'started_at', 'created_at']
+
+
+def estimate_accuracy(estimated, actual):
+    """How close an actual time came to its estimate, from 0 to 100"""
+    return max(0, 100 - (100 * abs(actual - estimated) / max(estimated, 1)))
+
+
+def task_contribution(task):
+    """{(user_id, day, counter): amount} one task adds to the rollup"""
+    parts = Counter()
+    user_id = task.user_id
+    if task.created_at:
+        created = timezone.localdate(task.created_at)
+        parts[user_id, created, 'created'] += 1
+        if task.status == 'completed':
+            parts[user_id, created, 'created_completed'] += 1
+        if task.status in OPEN_STATUSES:
+            parts[user_id, created, (str(task.priority), task.status)] += 1
+        if task.estimated_minutes and task.actual_minutes:
+            parts[user_id, created, 'estimated'] += 1
+            parts[user_id, created, 'est_minutes'] += task.estimated_minutes
+            parts[user_id, created, 'actual_minutes'] += task.actual_minutes
+            parts[user_id, created, 'estimate_accuracy'] += estimate_accuracy(task.estimated_minutes, task.actual_minutes)
+    if task.status == 'completed' and task.completed_at:
+        parts[user_id, timezone.localdate(task.completed_at), 'completed'] += 1
+    # Views may assign the raw request value before saving
+    due_date = Task._meta.get_field('due_date').to_python(task.due_date)
+    if task.status in OPEN_STATUSES and due_date:
+        parts[user_id, due_date, 'overdue'] += 1
+    return parts
+
+
+def time_log_contribution(log):
+    """{(user_id, day, 'logged_minutes'): minutes} of one time log"""
+    logged_at = log.started_at or log.created_at
+    if not logged_at:
+        return Counter()
+    return Counter({(log.user_id, timezone.localdate(logged_at), 'logged_minutes'): log.minutes or 0})
+
+
+def subtract(after, before):
+    """``after - before`` keeping negative amounts, which Counter subtraction drops"""
+    changes = Counter(after)
+    for key, amount in before.items():
+        changes[key] -= amount
+    return changes
+
+
+def _add(row, amounts):
+    """Add {counter: amount} to an unsaved row; returns whether the row is now empty"""
+    for key, amount in amounts.items():
+        if isinstance(key, tuple):
+            priority, status = key
+            statuses = row.by_priority.setdefault(priority, {})
+            statuses[status] = statuses.get(status, 0) + amount
+            if not statuses[status]:
+                del statuses[status]
+            if not statuses:
+                del row.by_priority[priority]
+        else:
+            setattr(row, key, getattr(row, key) + amount)
+    if not row.estimated:
+        # Float sums do not cancel exactly
+        row.estimate_accuracy = 0
+    return not row.by_priority and not any(getattr(row, counter) for counter in COUNTERS)
+
+
+def _by_row(changes):
+    rows = defaultdict(dict)
+    for (user_id, day, key), amount in changes.items():
+        if amount:
+            rows[user_id, day][key] = amount
+    return rows
+
+
+def apply_rollup_changes(changes, create=True):
+    """Add signed {(user_id, day, counter): amount} changes to the rollup rows.
+
+    Each row is read and written under a row lock, since ``by_priority``
+    cannot be updated with ``F()`` expressions. With ``create=False`` missing
+    rows are left missing.
+    """
+    for (user_id, day), amounts in _by_row(changes).items():
+        with transaction.atomic():
+            if create:
+                TaskDailyRollup.objects.get_or_create(user_id=user_id, date=day)
+            row = TaskDailyRollup.objects.select_for_update().filter(user_id=user_id, date=day).first()
+            if row is None:
+                continue
+            if _add(row, amounts):
+                row.delete()
+            else:
+                row.save()
+
+
+def aggregate_rollup_rows(user_id):
+    """A user's TaskDailyRollup rows, summed from every task and time log"""
+    totals = Counter()
+    for task in Task.objects.filter(user_id=user_id).only(*TASK_FIELDS).iterator(chunk_size=2000):
+        totals.update(task_contribution(task))
+    for log in TaskTimeLog.objects.filter(user_id=user_id).only(*TIME_LOG_FIELDS).iterator(chunk_size=2000):
+        totals.update(time_log_contribution(log))
+    rows = []
+    for (row_user_id, day), amounts in _by_row(totals).items():
+        row = TaskDailyRollup(user_id=row_user_id, date=day)
+        if not _add(row, amounts):
+            rows.append(row)
+    return rows
+
+
+def rebuild_task_rollups(user_id):
+    """Replace a user's rollup rows from their tasks and time logs"""
+    rows = aggregate_rollup_rows(user_id)
+    with transaction.atomic():
+        TaskDailyRollup.objects.filter(user_id=user_id).delete()
+        TaskDailyRollup.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
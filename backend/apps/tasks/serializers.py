@@ -48,6 +48,15 @@ class TaskSerializer(serializers.ModelSerializer):
         return list(obj.dependency_outgoing.values_list('depends_on_task_id', flat=True))
 
 
+class TaskOccurrenceSerializer(TaskSerializer):
+    """A task on one of its dates, concrete or projected from its recurrence rule"""
+    occurrence_date = serializers.DateField(read_only=True)
+    is_projected = serializers.BooleanField(read_only=True)
+
+    class Meta(TaskSerializer.Meta):
+        fields = TaskSerializer.Meta.fields + ['occurrence_date', 'is_projected']
+
+
 class TaskDependencySerializer(serializers.ModelSerializer):
     class Meta:
         model = TaskDependency
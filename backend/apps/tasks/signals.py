@@ -0,0 +1,72 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from .models import Task, TaskTimeLog
+from .recurrence import materialize_occurrences, recurrence_state
+from .rollups import (
+    TASK_FIELDS,
+    TIME_LOG_FIELDS,
+    apply_rollup_changes,
+    subtract,
+    task_contribution,
+    time_log_contribution,
+)
+
+
+def _remember_previous_task(sender, instance, raw=False, **kwargs):
+    # Shared by the rollup and occurrence handlers
+    instance._previous_row = None
+    if not raw and not instance._state.adding:
+        instance._previous_row = Task.objects.filter(pk=instance.pk).only(*TASK_FIELDS, 'recurrence_rule').first()
+
+
+def _apply_task_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous_row = getattr(instance, '_previous_row', None)
+    previous = task_contribution(previous_row) if previous_row is not None else {}
+    apply_rollup_changes(subtract(task_contribution(instance), previous))
+
+
+def _apply_task_deleted(sender, instance, **kwargs):
+    apply_rollup_changes(subtract({}, task_contribution(instance)), create=False)
+
+
+def _refresh_occurrences(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous_row = getattr(instance, '_previous_row', None)
+    previous = recurrence_state(previous_row) if previous_row is not None else None
+    if recurrence_state(instance) != previous:
+        materialize_occurrences(instance)
+
+
+def _remember_previous_time_log(sender, instance, raw=False, **kwargs):
+    instance._previous_row = None
+    if not raw and not instance._state.adding:
+        instance._previous_row = TaskTimeLog.objects.filter(pk=instance.pk).only(*TIME_LOG_FIELDS).first()
+
+
+def _apply_time_log_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous_row = getattr(instance, '_previous_row', None)
+    previous = time_log_contribution(previous_row) if previous_row is not None else {}
+    apply_rollup_changes(subtract(time_log_contribution(instance), previous))
+
+
+def _apply_time_log_deleted(sender, instance, **kwargs):
+    apply_rollup_changes(subtract({}, time_log_contribution(instance)), create=False)
+
+
+def connect_rollup_signals():
+    pre_save.connect(_remember_previous_task, sender=Task, dispatch_uid='task:pre_save')
+    post_save.connect(_apply_task_saved, sender=Task, dispatch_uid='task_rollup:task_save')
+    post_delete.connect(_apply_task_deleted, sender=Task, dispatch_uid='task_rollup:task_delete')
+    pre_save.connect(_remember_previous_time_log, sender=TaskTimeLog, dispatch_uid='task_rollup:time_log_pre_save')
+    post_save.connect(_apply_time_log_saved, sender=TaskTimeLog, dispatch_uid='task_rollup:time_log_save')
+    post_delete.connect(_apply_time_log_deleted, sender=TaskTimeLog, dispatch_uid='task_rollup:time_log_delete')
+
+
+def connect_occurrence_signals():
+    pre_save.connect(_remember_previous_task, sender=Task, dispatch_uid='task:pre_save')
+    post_save.connect(_refresh_occurrences, sender=Task, dispatch_uid='task_occurrences:save')
@@ -0,0 +1,9 @@
+from celery import shared_task
+
+from .recurrence import extend_occurrence_horizon
+
+
+@shared_task
+def extend_task_occurrences():
+    """Drop past projected occurrences and top recurring tasks up to the horizon"""
+    return {'added': extend_occurrence_horizon()}
@@ -1,3 +1,252 @@
+from collections import defaultdict
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db.models import Count
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.automation.models import BatchOperation
+
+from .models import Project, Task, TaskDailyRollup, TaskOccurrence, TaskTimeLog
+from .recurrence import OCCURRENCES_AHEAD, extend_occurrence_horizon
+from .rollups import aggregate_rollup_rows
+
+User = get_user_model()
+
+ROLLUP_COLUMNS = [
+    'date', 'created', 'completed', 'created_completed', 'overdue',
+    'estimated', 'est_minutes', 'actual_minutes', 'logged_minutes', 'by_priority',
+]
+
+
+def legacy_heatmap(user, days):
+    """TaskViewSet.heatmap before the rollup"""
+    today = timezone.now().date()
+    start = today - timedelta(days=days)
+    by_date = defaultdict(int)
+    for t in Task.objects.filter(user=user, status='completed', completed_at__date__gte=start, completed_at__date__lte=today):
+        by_date[t.completed_at.date().isoformat()] += 1
+    return {'completions': dict(by_date)}
+
+
+def legacy_analytics(user, days):
+    """TaskViewSet.analytics before the rollup"""
+    today = timezone.now().date()
+    start = today - timedelta(days=days)
+    tasks = Task.objects.filter(user=user)
+    qs = tasks.filter(created_at__date__gte=start)
+    total = qs.count()
+    completed = qs.filter(status='completed').count()
+    with_actual = qs.filter(estimated_minutes__isnull=False).exclude(estimated_minutes=0).filter(
+        actual_minutes__isnull=False).exclude(actual_minutes=0)
+    estimation_count = with_actual.count()
+    accuracy = None
+    if estimation_count:
+        accuracy_sum = sum(
+            max(0, 100 - (100 * abs(t.actual_minutes - t.estimated_minutes) / max(t.estimated_minutes, 1)))
+            for t in with_actual
+        )
+        accuracy = round(accuracy_sum / estimation_count, 1)
+    return {
+        'completion_rate': round(100.0 * completed / total, 1) if total else 0,
+        'total_tasks': total,
+        'completed_count': completed,
+        'overdue_count': tasks.filter(due_date__lt=today, status__in=['inbox', 'active']).count(),
+        'estimation_accuracy': accuracy,
+        'estimation_sample_count': estimation_count,
+    }
+
+
+def legacy_distribution(user):
+    """TaskViewSet.distribution before the rollup"""
+    qs = Task.objects.filter(user=user, status__in=['inbox', 'active'])
+    by_project = qs.values('project__name').annotate(count=Count('id')).order_by('-count')
+    return {
+        'by_project': [{'name': p['project__name'] or 'No project', 'count': p['count']} for p in by_project],
+        'by_priority': list(qs.values('priority').annotate(count=Count('id')).order_by('priority')),
+        'by_status': list(qs.values('status').annotate(count=Count('id')).order_by('status')),
+    }
+
+
+class TaskDailyRollupTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='planner', email='planner@example.com', password='testpass123')
+        self.other = User.objects.create_user(username='other', email='other@example.com', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.now = timezone.now()
+        self.today = self.now.date()
+
+    def task(self, days_ago=0, user=None, **fields):
+        task = Task.objects.create(user=user or self.user, title='Task', **fields)
+        if days_ago:
+            # auto_now_add only applies on insert
+            task.created_at = self.now - timedelta(days=days_ago)
+            task.save()
+        return task
+
+    def complete(self, task, days_ago=0):
+        task.status = 'completed'
+        task.completed_at = self.now - timedelta(days=days_ago)
+        task.save()
+
+    def build_history(self):
+        project = Project.objects.create(user=self.user, name='Home')
+        for n in range(40):
+            task = self.task(
+                days_ago=n * 3, priority=n % 4 + 1, status=['inbox', 'active'][n % 2],
+                project=project if n % 3 else None,
+                due_date=self.today + timedelta(days=10 - n) if n % 5 else None,
+                estimated_minutes=[None, 0, 30, 45][n % 4], actual_minutes=[None, 20, 50, 0, 45][n % 5],
+            )
+            if n % 3 == 0:
+                self.complete(task, days_ago=n)
+            TaskTimeLog.objects.create(user=self.user, task=task, minutes=n + 5, started_at=self.now - timedelta(days=n))
+        # Edits, a reopened task, a rescheduled one and deletes
+        reopened = self.task(days_ago=4, priority=3, due_date=self.today - timedelta(days=2))
+        self.complete(reopened, days_ago=1)
+        reopened.status, reopened.completed_at, reopened.priority = 'active', None, 4
+        reopened.save()
+        moved = self.task(days_ago=6, due_date=self.today - timedelta(days=1), estimated_minutes=60, actual_minutes=90)
+        moved.due_date = str(self.today + timedelta(days=3))
+        moved.save(update_fields=['due_date'])
+        moved.actual_minutes = 75
+        moved.save()
+        self.task(days_ago=2).delete()
+        log = TaskTimeLog.objects.create(user=self.user, task=moved, minutes=15)
+        log.minutes = 25
+        log.save()
+        TaskTimeLog.objects.create(user=self.user, task=reopened, minutes=10).delete()
+        self.task(days_ago=1, user=self.other, due_date=self.today - timedelta(days=3))
+
+    def test_endpoints_match_legacy_implementations(self):
+        self.build_history()
+        for days in (7, 30, 365):
+            heatmap = self.client.get('/api/v1/tasks/heatmap/', {'days': days}).data
+            self.assertEqual(heatmap, legacy_heatmap(self.user, days))
+            analytics = self.client.get('/api/v1/tasks/analytics/', {'days': days}).data
+            expected = legacy_analytics(self.user, days)
+            self.assertEqual({key: analytics[key] for key in expected}, expected)
+        self.assertEqual(self.client.get('/api/v1/tasks/distribution/').data, legacy_distribution(self.user))
+        self.assertEqual(self.client.get('/api/v1/tasks/analytics/').data['logged_minutes'], sum(range(5, 36)) + 25)
+
+    def test_signals_match_rebuild(self):
+        self.build_history()
+        for user in (self.user, self.other):
+            stored = list(TaskDailyRollup.objects.filter(user=user).order_by('date').values(*ROLLUP_COLUMNS))
+            rebuilt = sorted(aggregate_rollup_rows(user.pk), key=lambda row: row.date)
+            self.assertEqual(stored, [{column: getattr(row, column) for column in ROLLUP_COLUMNS} for row in rebuilt])
+
+        TaskDailyRollup.objects.all().delete()
+        call_command('rebuild_task_rollups', stdout=StringIO())
+        self.assertEqual(self.client.get('/api/v1/tasks/distribution/').data, legacy_distribution(self.user))
+
+    def test_batch_updates_rebuild_rows(self):
+        tasks = [self.task(days_ago=n, priority=2, due_date=self.today - timedelta(days=1)) for n in range(3)]
+        BatchOperation.objects.create(
+            user=self.user, target_type='tasks', action_type='update',
+            target_ids=[str(task.pk) for task in tasks[:2]], payload={'status': 'completed', 'completed_at': self.now.isoformat(), 'priority': 4},
+        ).apply()
+        stored = list(TaskDailyRollup.objects.filter(user=self.user).order_by('date').values(*ROLLUP_COLUMNS))
+        rebuilt = sorted(aggregate_rollup_rows(self.user.pk), key=lambda row: row.date)
+        self.assertEqual(stored, [{column: getattr(row, column) for column in ROLLUP_COLUMNS} for row in rebuilt])
+        self.assertEqual((sum(row['overdue'] for row in stored), sum(row['completed'] for row in stored)), (1, 2))
+
+    def test_deletes_leave_no_rows(self):
+        task = self.task(days_ago=3, due_date=self.today, estimated_minutes=10, actual_minutes=12)
+        self.complete(task)
+        TaskTimeLog.objects.create(user=self.user, task=task, minutes=30)
+        self.assertTrue(TaskDailyRollup.objects.filter(user=self.user).exists())
+        task.delete()
+        self.assertFalse(TaskDailyRollup.objects.exists())
+
+
+class TaskOccurrenceTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='routine', email='routine@example.com', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.today = timezone.now().date()
+
+    def dates(self, task):
+        return list(TaskOccurrence.objects.filter(task=task).values_list('date', flat=True))
+
+    def test_rule_edits_regenerate_occurrences(self):
+        task = Task.objects.create(
+            user=self.user, title='Water plants', due_date=self.today, recurrence_rule={'frequency': 'daily', 'interval': 2},
+        )
+        self.assertEqual(self.dates(task), [self.today + timedelta(days=2 * n) for n in range(1, OCCURRENCES_AHEAD + 1)])
+
+        task.recurrence_rule = {'frequency': 'weekly', 'interval': 1}
+        task.save()
+        self.assertEqual(self.dates(task)[:2], [self.today + timedelta(weeks=1), self.today + timedelta(weeks=2)])
+        task.title = 'Water the plants'
+        with CaptureQueriesContext(connection) as queries:
+            task.save()
+        self.assertFalse([q for q in queries if 'tasks_taskoccurrence' in q['sql']])
+
+        self.client.post(f'/api/v1/tasks/{task.pk}/reschedule_recurrence/', {'due_date': str(self.today + timedelta(days=1))})
+        self.assertEqual(self.dates(task)[0], self.today + timedelta(days=8))
+        self.client.post(f'/api/v1/tasks/{task.pk}/skip_recurrence/')
+        self.assertEqual(self.dates(task), [])
+
+    def test_completing_hands_occurrences_to_the_next_task(self):
+        task = Task.objects.create(user=self.user, title='Stretch', due_date=self.today, recurrence_rule={'frequency': 'daily'})
+        projected = self.dates(task)
+        self.client.post(f'/api/v1/tasks/{task.pk}/complete/')
+        self.assertEqual(self.dates(task), [])
+        following = Task.objects.get(user=self.user, status='inbox')
+        self.assertEqual(following.due_date, projected[0])
+        self.assertEqual(self.dates(following), projected[1:] + [projected[-1] + timedelta(days=1)])
+
+    def test_horizon_extension(self):
+        task = Task.objects.create(user=self.user, title='Standup', due_date=self.today, recurrence_rule={'frequency': 'daily'})
+        later = self.today + timedelta(days=10)
+        # today + 1 to today + 9 are dropped and as many added
+        self.assertEqual(extend_occurrence_horizon(today=later), 9)
+        dates = self.dates(task)
+        self.assertEqual(dates, [later + timedelta(days=n) for n in range(OCCURRENCES_AHEAD)])
+        self.assertEqual(extend_occurrence_horizon(today=later), 0)
+
+    def test_batch_updates_rematerialize_and_horizon_drops_orphans(self):
+        daily = Task.objects.create(user=self.user, title='Journal', due_date=self.today, recurrence_rule={'frequency': 'daily'})
+        weekly = Task.objects.create(user=self.user, title='Review', due_date=self.today, recurrence_rule={'frequency': 'weekly'})
+        BatchOperation.objects.create(
+            user=self.user, target_type='tasks', action_type='update',
+            target_ids=[str(daily.pk)], payload={'recurrence_rule': None},
+        ).apply()
+        self.assertEqual(self.dates(daily), [])
+
+        # Rows left behind by writes that sent no signals go with the next horizon run
+        Task.objects.filter(pk=weekly.pk).update(status='completed')
+        extend_occurrence_horizon()
+        self.assertEqual(self.dates(weekly), [])
+
+    def test_today_and_upcoming_include_projected_tasks(self):
+        Task.objects.create(user=self.user, title='Weekly review', due_date=self.today, recurrence_rule={'frequency': 'weekly'})
+        Task.objects.create(user=self.user, title='Gym', due_date=self.today + timedelta(days=1), recurrence_rule={'frequency': 'daily', 'interval': 3})
+        Task.objects.create(user=self.user, title='Dentist', due_date=self.today + timedelta(days=2))
+        Task.objects.create(user=self.user, title='Later', due_date=self.today + timedelta(days=30))
 
-# Create your tests here.
+        with CaptureQueriesContext(connection) as queries:
+            upcoming = self.client.get('/api/v1/tasks/upcoming/').data
+        self.assertEqual(len([q for q in queries if 'tasks_taskoccurrence' in q['sql']]), 1)
+        self.assertEqual(
+            [(row['title'], row['occurrence_date'], row['is_projected']) for row in upcoming],
+            [
+                ('Weekly review', str(self.today), False),
+                ('Gym', str(self.today + timedelta(days=1)), False),
+                ('Dentist', str(self.today + timedelta(days=2)), False),
+                ('Gym', str(self.today + timedelta(days=4)), True),
+                ('Weekly review', str(self.today + timedelta(days=7)), True),
+                ('Gym', str(self.today + timedelta(days=7)), True),
+            ],
+        )
+        today = self.client.get('/api/v1/tasks/today/').data
+        self.assertEqual([(row['title'], row['is_projected']) for row in today], [('Weekly review', False)])
@@ -1,6 +1,6 @@
-from collections import defaultdict
+from collections import Counter
 from datetime import timedelta
-from django.db.models import Count, Sum
+from django.db.models import Count, Q, Sum
 from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import viewsets, filters, status
@@ -10,39 +10,10 @@ from rest_framework.response import Response
 
 from apps.habits.models import HabitCompletion
 from apps.automation.models import TaskHabitLink
-from .models import Project, Task, Tag, TaskTimeLog
-from .serializers import ProjectSerializer, TaskSerializer, TagSerializer, TaskTimeLogSerializer
-
-
-def next_recurrence_date(rule, from_date):
-    """Return next due date from recurrence rule. from_date is the completed task's due_date or today."""
-    if not rule or not from_date:
-        return None
-    freq = rule.get('frequency', 'daily')
-    interval = rule.get('interval', 1)
-    weekdays = rule.get('weekdays')  # 0=Mon, 6=Sun
-    if freq == 'daily':
-        return from_date + timedelta(days=interval)
-    if freq == 'weekly':
-        if weekdays:
-            # Next occurrence on one of weekdays
-            for d in range(1, 8):
-                candidate = from_date + timedelta(days=d)
-                if candidate.weekday() in weekdays:
-                    return candidate
-        return from_date + timedelta(weeks=interval)
-    if freq == 'monthly':
-        year = from_date.year
-        month = from_date.month + interval
-        while month > 12:
-            month -= 12
-            year += 1
-        day = min(from_date.day, 28)
-        try:
-            return from_date.replace(year=year, month=month, day=day)
-        except ValueError:
-            return from_date.replace(year=year, month=month, day=28)
-    return from_date + timedelta(days=1)
+from .models import Project, Task, Tag, TaskDailyRollup, TaskTimeLog
+from .recurrence import next_recurrence_date, tasks_in_range
+from .rollups import OPEN_STATUSES
+from .serializers import ProjectSerializer, TaskOccurrenceSerializer, TaskSerializer, TagSerializer, TaskTimeLogSerializer
 
 
 class ProjectViewSet(viewsets.ModelViewSet):
@@ -149,74 +120,64 @@ class TaskViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def analytics(self, request):
         """Completion rates, overdue count, time estimation accuracy."""
-        user = request.user
         today = timezone.now().date()
         days = int(request.query_params.get('days', 30))
         start = today - timedelta(days=days)
-        qs = self.get_full_queryset().filter(created_at__date__gte=start)
-        total = qs.count()
-        completed = qs.filter(status='completed').count()
-        completion_rate = round(100.0 * completed / total, 1) if total else 0
-        overdue_count = self.get_full_queryset().filter(
-            due_date__lt=today, status__in=['inbox', 'active']
-        ).count()
-        with_estimate = qs.filter(estimated_minutes__isnull=False).exclude(estimated_minutes=0)
-        with_actual = with_estimate.filter(actual_minutes__isnull=False).exclude(actual_minutes=0)
-        estimation_count = with_actual.count()
-        if estimation_count:
-            accuracy_sum = 0
-            for t in with_actual:
-                diff = abs((t.actual_minutes or 0) - (t.estimated_minutes or 0))
-                accuracy_sum += max(0, 100 - (100 * diff / max(t.estimated_minutes, 1)))
-            estimation_accuracy = round(accuracy_sum / estimation_count, 1)
-        else:
-            estimation_accuracy = None
+        in_window = Q(date__gte=start)
+        totals = TaskDailyRollup.objects.filter(user=request.user).aggregate(
+            total=Sum('created', filter=in_window),
+            completed=Sum('created_completed', filter=in_window),
+            overdue=Sum('overdue', filter=Q(date__lt=today)),
+            estimated=Sum('estimated', filter=in_window),
+            est_minutes=Sum('est_minutes', filter=in_window),
+            actual_minutes=Sum('actual_minutes', filter=in_window),
+            accuracy=Sum('estimate_accuracy', filter=in_window),
+            logged_minutes=Sum('logged_minutes', filter=in_window),
+        )
+        total = totals['total'] or 0
+        completed = totals['completed'] or 0
+        estimation_count = totals['estimated'] or 0
         return Response({
-            'completion_rate': completion_rate,
+            'completion_rate': round(100.0 * completed / total, 1) if total else 0,
             'total_tasks': total,
             'completed_count': completed,
-            'overdue_count': overdue_count,
-            'estimation_accuracy': estimation_accuracy,
+            'overdue_count': totals['overdue'] or 0,
+            'estimation_accuracy': round(totals['accuracy'] / estimation_count, 1) if estimation_count else None,
             'estimation_sample_count': estimation_count,
+            'estimated_minutes': totals['est_minutes'] or 0,
+            'actual_minutes': totals['actual_minutes'] or 0,
+            'logged_minutes': totals['logged_minutes'] or 0,
         })
 
     @action(detail=False, methods=['get'])
     def distribution(self, request):
         """Tasks by project, priority, status."""
-        user = request.user
-        qs = self.get_full_queryset().filter(status__in=['inbox', 'active'])
         by_project = list(
-            qs.values('project__name').annotate(count=Count('id')).order_by('-count')
-        )
-        by_priority = list(
-            qs.values('priority').annotate(count=Count('id')).order_by('priority')
-        )
-        by_status = list(
-            qs.values('status').annotate(count=Count('id')).order_by('status')
+            self.get_full_queryset().filter(status__in=OPEN_STATUSES)
+            .values('project__name').annotate(count=Count('id')).order_by('-count')
         )
+        by_priority, by_status = Counter(), Counter()
+        for open_tasks in TaskDailyRollup.objects.filter(user=request.user).values_list('by_priority', flat=True):
+            for priority, statuses in open_tasks.items():
+                for task_status, count in statuses.items():
+                    by_priority[int(priority)] += count
+                    by_status[task_status] += count
         return Response({
             'by_project': [{'name': p['project__name'] or 'No project', 'count': p['count']} for p in by_project],
-            'by_priority': [{'priority': p['priority'], 'count': p['count']} for p in by_priority],
-            'by_status': [{'status': p['status'], 'count': p['count']} for p in by_status],
+            'by_priority': [{'priority': p, 'count': by_priority[p]} for p in sorted(by_priority) if by_priority[p]],
+            'by_status': [{'status': s, 'count': by_status[s]} for s in sorted(by_status) if by_status[s]],
         })
 
     @action(detail=False, methods=['get'])
     def heatmap(self, request):
         """Task completion intensity by day (for calendar heatmap)."""
-        user = request.user
         days = int(request.query_params.get('days', 365))
         today = timezone.now().date()
         start = today - timedelta(days=days)
-        qs = self.get_full_queryset().filter(
-            status='completed',
-            completed_at__date__gte=start,
-            completed_at__date__lte=today,
-        )
-        by_date = defaultdict(int)
-        for t in qs:
-            if t.completed_at:
-                by_date[t.completed_at.date().isoformat()] += 1
-        return Response({'completions': dict(by_date)})
+        completions = TaskDailyRollup.objects.filter(
+            user=request.user, date__range=(start, today), completed__gt=0,
+        ).order_by('date').values_list('date', 'completed')
+        return Response({'completions': {day.isoformat(): count for day, count in completions}})
 
     @action(detail=True, methods=['get'])
     def time_logged(self, request, pk=None):
@@ -247,9 +208,8 @@ class TaskViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def today(self, request):
         today = timezone.now().date()
-        tasks = self.get_queryset().filter(due_date=today)
-        serializer = self.get_serializer(tasks, many=True)
-        return Response(serializer.data)
+        tasks = tasks_in_range(self.get_queryset(), request.user.pk, today, today)
+        return Response(TaskOccurrenceSerializer(tasks, many=True, context=self.get_serializer_context()).data)
 
     @action(detail=False, methods=['get'])
     def overdue(self, request):
@@ -265,9 +225,8 @@ class TaskViewSet(viewsets.ModelViewSet):
     def upcoming(self, request):
         today = timezone.now().date()
         week_later = today + timedelta(days=7)
-        tasks = self.get_queryset().filter(due_date__range=[today, week_later])
-        serializer = self.get_serializer(tasks, many=True)
-        return Response(serializer.data)
+        tasks = tasks_in_range(self.get_queryset(), request.user.pk, today, week_later)
+        return Response(TaskOccurrenceSerializer(tasks, many=True, context=self.get_serializer_context()).data)
 
     @action(detail=False, methods=['get'])
     def inbox(self, request):
@@ -27,6 +27,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework_simplejwt',
     'rest_framework_simplejwt.token_blacklist',
@@ -92,6 +93,7 @@ REDIS_URL = os.environ.get('REDIS_URL', 'redis://redis:6379/0')
 # Celery configuration
 CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL', REDIS_URL)
 CELERY_RESULT_BACKEND = os.environ.get('CELERY_RESULT_BACKEND', REDIS_URL)
+CELERY_TASK_ALWAYS_EAGER = os.environ.get('CELERY_TASK_ALWAYS_EAGER', 'False').lower() == 'true'
 
 # Example beat schedule: run smart reminders daily at 07:00 UTC (adjust to your TZ)
 CELERY_BEAT_SCHEDULE = {
@@ -103,6 +105,49 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'apps.finance.tasks.process_recurring_transactions',
         'schedule': crontab(minute=0, hour='*'),
     },
+    'finance.rollover_budget_periods_daily': {
+        'task': 'apps.finance.tasks.rollover_budget_periods',
+        'schedule': crontab(hour=0, minute=5),
+    },
+    'finance.reconcile_budget_spend_nightly': {
+        'task': 'apps.finance.tasks.reconcile_budget_spend',
+        'schedule': crontab(hour=3, minute=15),
+    },
+    'notes.flush_view_counts': {
+        'task': 'apps.notes.tasks.flush_note_view_counts',
+        'schedule': crontab(minute='*'),
+    },
+    'tasks.extend_occurrences_daily': {
+        'task': 'apps.tasks.tasks.extend_task_occurrences',
+        'schedule': crontab(hour=0, minute=15),
+    },
+    'journal.process_reminders_hourly': {
+        'task': 'apps.journal.tasks.process_journal_reminders',
+        'schedule': crontab(minute=0, hour='*'),
+    },
+    'analytics.refresh_daily_facts_nightly': {
+        'task': 'apps.analytics.tasks.refresh_recent_daily_facts',
+        'schedule': crontab(hour=2, minute=0),
+    },
+    'analytics.scan_anomalies_nightly': {
+        'task': 'apps.analytics.tasks.scan_anomalies_nightly',
+        'schedule': crontab(hour=2, minute=30),
+    },
+    'analytics.backtest_forecasts_weekly': {
+        'task': 'apps.analytics.tasks.backtest_stale_forecasts',
+        'schedule': crontab(hour=4, minute=0, day_of_week=0),
+    },
+    # Off-peak pre-generation so the report GET path only reads stored rows
+    'analytics.weekly_reports': {
+        'task': 'apps.analytics.tasks.pregenerate_periodic_reports',
+        'schedule': crontab(hour=3, minute=0, day_of_week=1),
+        'kwargs': {'report_type': 'weekly'},
+    },
+    'analytics.monthly_reports': {
+        'task': 'apps.analytics.tasks.pregenerate_periodic_reports',
+        'schedule': crontab(hour=3, minute=30, day_of_month=1),
+        'kwargs': {'report_type': 'monthly'},
+    },
 }
 
 CACHES = {
@@ -467,6 +467,14 @@ export const financeApi = {
   createTransaction: (data: unknown) => api.post('/finance/transactions/', data),
   deleteTransaction: (id: string) => api.delete(`/finance/transactions/${id}/`),
 
+  // Statement imports (multipart: account, file, optional column_mapping JSON)
+  importTransactions: (data: FormData) => api.post('/finance/imports/', data),
+  getImports: () => api.get('/finance/imports/'),
+  getImport: (id: string) => api.get(`/finance/imports/${id}/`),
+  getMerchantRules: () => api.get('/finance/merchant-rules/'),
+  createMerchantRule: (data: unknown) => api.post('/finance/merchant-rules/', data),
+  deleteMerchantRule: (id: string) => api.delete(`/finance/merchant-rules/${id}/`),
+
   // Budgets & Goals
   getBudgets: () => api.get('/finance/budgets/'),
   createBudget: (data: unknown) => api.post('/finance/budgets/', data),
@@ -673,6 +681,10 @@ export const journalApi = {
     max_sentiment?: string;
     min_words?: string;
     max_words?: string;
+    min_mood?: number;
+    max_mood?: number;
+    cursor?: string;
+    limit?: number;
   }) => api.get('/journal/entries/search/', { params }),
 
   // Special views
@@ -19,6 +19,7 @@ type AccountType = 'bank' | 'credit' | 'cash' | 'investment' | 'loan';
 type Account = {
   id: string;
   name: string;
+  opening_balance: string;
   balance: string;
   currency: string;
   account_type?: AccountType;
@@ -71,7 +72,7 @@ export function AccountList({ onUpdate }: AccountListProps) {
     e.preventDefault();
     if (!name.trim()) return;
     try {
-      await financeApi.createAccount({ name, balance: '0.00', currency, account_type: accountType });
+      await financeApi.createAccount({ name, opening_balance: '0.00', currency, account_type: accountType });
       setName('');
       setShowForm(false);
       load();
@@ -20,6 +20,7 @@ export function BudgetForm({ onSaved }: BudgetFormProps) {
   const [startDate, setStartDate] = useState('');
   const [endDate, setEndDate] = useState('');
   const [category, setCategory] = useState('');
+  const [period, setPeriod] = useState('none');
   const [categories, setCategories] = useState<CategoryOption[]>([]);
   const [loading, setLoading] = useState(false);
 
@@ -54,6 +55,7 @@ export function BudgetForm({ onSaved }: BudgetFormProps) {
         start_date: startDate,
         end_date: endDate,
         category: category || null,
+        period,
       });
       
       setName('');
@@ -148,6 +150,16 @@ export function BudgetForm({ onSaved }: BudgetFormProps) {
             />
           </div>
         </div>
+        <select
+          value={period}
+          onChange={(e) => setPeriod(e.target.value)}
+          className="h-10 w-full rounded-md border border-border bg-bg-subtle px-3 text-sm focus-visible:ring-2 focus-visible:ring-ring focus-visible:ring-offset-2 focus-visible:ring-offset-background"
+        >
+          <option value="none">Does not repeat</option>
+          <option value="weekly">Repeats weekly</option>
+          <option value="monthly">Repeats monthly</option>
+          <option value="yearly">Repeats yearly</option>
+        </select>
       </div>
 
       {/* Submit */}
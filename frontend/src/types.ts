@@ -33,6 +33,9 @@ export interface Task {
   completed_at?: string | null;
   is_urgent?: boolean;
   is_important?: boolean;
+  // Set by the today and upcoming endpoints
+  occurrence_date?: string;
+  is_projected?: boolean;
 }
 
 export interface RecurrenceRule {
@@ -55,6 +58,9 @@ export interface TaskAnalytics {
   overdue_count: number;
   estimation_accuracy: number | null;
   estimation_sample_count: number;
+  estimated_minutes: number;
+  actual_minutes: number;
+  logged_minutes: number;
 }
 
 export interface TaskDistribution {
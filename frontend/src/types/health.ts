@@ -556,11 +556,14 @@ export interface WorkoutHeatmapEntry {
 export interface ExerciseVolumeData {
   date: string;
   total_volume: number;
-  exercise_count: number;
+  set_count: number;
+  total_reps: number;
 }
 
 export interface MuscleGroupBalanceData {
   muscle_group: string;
   workout_count: number;
   percentage: number;
+  total_reps: number;
+  total_volume: number;
 }